@@ -6,14 +6,31 @@ Creates and configures the Flask application using environment variables.
 
 import os
 from flask import Flask, jsonify
-from flask_cors import CORS
 from config import get_config
 from models import db
+from routes.admin import admin_bp
 from routes.auth import auth_bp
 from routes.user import user_bp
+from utils.activity import init_activity
+from utils.admission import init_admission
+from utils.audit import init_audit
+from utils.breached_passwords import init_breached_passwords
+from utils.cache import init_user_cache
+from utils.cors import init_cors
+from utils.domain_policy import init_domain_policy
+from utils.health import init_health
+from utils.idempotency import init_idempotency
+from utils.metrics import collect_metrics
+from utils.pool_metrics import init_pool_metrics
+from utils.replicas import init_replicas
+from utils.routing import all_engines
+from utils.sharding import init_sharding
+from utils.shm_cache import init_shared_cache
+from utils.singleflight import init_single_flight
+from utils.sqlite_pragmas import init_sqlite_pragmas
 
 
-def create_app(config_name=None):
+def create_app(config_name=None, config_overrides=None):
     """
     Application factory function.
     Creates and configures a Flask application instance.
@@ -21,6 +38,8 @@ def create_app(config_name=None):
     Args:
         config_name (str): Configuration name (development/production/testing)
                           If None, uses FLASK_ENV from environment
+        config_overrides (dict, optional): Settings applied on top of the
+                          configuration class, mainly for tests
         
     Returns:
         Flask: Configured Flask application
@@ -32,6 +51,9 @@ def create_app(config_name=None):
     config_class = get_config(config_name)
     app.config.from_object(config_class)
     
+    if config_overrides:
+        app.config.update(config_overrides)
+    
     # Initialize configuration-specific settings
     config_class.init_app(app)
     
@@ -61,17 +83,26 @@ def initialize_extensions(app):
     Args:
         app (Flask): Flask application instance
     """
-    # Initialize SQLAlchemy
+    # Initialize SQLAlchemy, plus optional read replicas and user shards;
+    # the replica router keeps its sticky window in the host's shared cache
     db.init_app(app)
+    init_shared_cache(app)
+    init_replicas(app, db)
+    init_sharding(app, db)
+    init_sqlite_pragmas(app, all_engines(app))
+    init_pool_metrics(app)
+    init_health(app, db)
+    init_audit(app, db)
+    init_activity(app, db)
+    init_single_flight(app)
+    init_user_cache(app)
+    init_idempotency(app, db)
+    init_admission(app)
+    init_breached_passwords(app)
+    init_domain_policy(app)
     
-    # Initialize CORS
-    CORS(app, resources={
-        r"/*": {
-            "origins": app.config['CORS_ORIGINS']
-        }
-    })
-    
-    app.logger.info(f"CORS enabled for origins: {app.config['CORS_ORIGINS']}")
+    # Initialize CORS; outermost, so preflights skip everything else
+    init_cors(app)
 
 
 def register_blueprints(app):
@@ -83,8 +114,9 @@ def register_blueprints(app):
     """
     app.register_blueprint(auth_bp)
     app.register_blueprint(user_bp)
+    app.register_blueprint(admin_bp)
     
-    app.logger.info("Blueprints registered: auth, user")
+    app.logger.info("Blueprints registered: auth, user, admin")
 
 
 def register_error_handlers(app):
@@ -163,23 +195,38 @@ def register_general_routes(app):
             'environment': app.config['FLASK_ENV'],
             'endpoints': {
                 'health': '/health',
+                'liveness': '/health/live',
+                'readiness': '/health/ready',
+                'metrics': '/metrics',
                 'login': '/auth/login',
                 'user_info': '/user/me',
                 'user_update': '/user/update'
             }
         }), 200
     
+    @app.route('/health/live', methods=['GET'])
+    def liveness():
+        """Liveness probe; never touches the database."""
+        return jsonify({
+            'success': True,
+            'status': 'alive'
+        }), 200
+    
+    @app.route('/health/ready', methods=['GET'])
+    def readiness():
+        """Readiness probe served from the cached background checks."""
+        is_ready, checks = app.extensions['health'].readiness()
+        
+        return jsonify({
+            'success': is_ready,
+            'status': 'ready' if is_ready else 'not_ready',
+            'checks': checks
+        }), 200 if is_ready else 503
+    
     @app.route('/health', methods=['GET'])
     def health_check():
-        """Health check endpoint for monitoring."""
-        try:
-            # Test database connection
-            from sqlalchemy import text
-            db.session.execute(text('SELECT 1'))
-            db_status = 'connected'
-        except Exception as e:
-            app.logger.error(f'Database health check failed: {str(e)}')
-            db_status = 'disconnected'
+        """Health check endpoint for monitoring (cached database status)."""
+        db_status = app.extensions['health'].database_status()['database']
         
         is_healthy = db_status == 'connected'
         status_code = 200 if is_healthy else 503
@@ -191,6 +238,14 @@ def register_general_routes(app):
             'database': db_status,
             'environment': app.config['FLASK_ENV']
         }), status_code
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Operational metrics (connection pools and other subsystems)."""
+        return jsonify({
+            'success': True,
+            'metrics': collect_metrics(app)
+        }), 200
 
 
 def init_db(app):
@@ -202,10 +257,16 @@ def init_db(app):
     """
     with app.app_context():
         # Import models to register them with SQLAlchemy
-        from models import User
+        from models import User, UserSearchGram, LoginAudit, IdempotencyKey
         
         # Create all tables
         db.create_all()
+        
+        # Sharded tables also live on every shard
+        shard_map = app.extensions.get('shard_map')
+        if shard_map is not None:
+            shard_map.create_all(db.metadata)
+        
         app.logger.info('Database tables created successfully')
 
 
@@ -217,9 +278,11 @@ def setup_logging(app):
         app (Flask): Flask application instance
     """
     if not app.debug and not app.testing:
+        import atexit
         import logging
-        from logging.handlers import RotatingFileHandler
         import os
+        from flask import request
+        from utils.log_pipeline import BatchRotatingFileHandler, JsonFormatter, init_log_pipeline
         
         # Create logs directory if it doesn't exist
         log_dir = os.path.dirname(app.config['LOG_FILE'])
@@ -227,26 +290,39 @@ def setup_logging(app):
             os.makedirs(log_dir)
         
         # Setup file handler
-        file_handler = RotatingFileHandler(
+        file_handler = BatchRotatingFileHandler(
             app.config['LOG_FILE'],
             maxBytes=app.config['LOG_MAX_BYTES'],
             backupCount=app.config['LOG_BACKUP_COUNT']
         )
         
         # Set log format
-        formatter = logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-        )
+        if app.config.get('LOG_FORMAT') == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+            )
         file_handler.setFormatter(formatter)
         
         # Set log level
         log_level = getattr(logging, app.config['LOG_LEVEL'].upper(), logging.INFO)
         file_handler.setLevel(log_level)
         
-        # Add handler to app logger
-        app.logger.addHandler(file_handler)
+        # Add handler to app logger, through the queue unless disabled
+        if app.config.get('LOG_QUEUE_ENABLED', True):
+            listener = init_log_pipeline(app, [file_handler])
+            atexit.register(listener.stop)
+        else:
+            app.logger.addHandler(file_handler)
         app.logger.setLevel(log_level)
         
+        if app.config.get('LOG_REQUESTS'):
+            @app.after_request
+            def log_request(response):
+                app.logger.info(f'{request.method} {request.path} {response.status_code}')
+                return response
+        
         app.logger.info(f'Logging configured: {app.config["LOG_FILE"]}')
 
 
@@ -0,0 +1,12 @@
+"""
+ASGI entry point.
+Used by Gunicorn with Uvicorn workers:
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+or by Uvicorn directly: uvicorn asgi:app
+"""
+
+from app import setup_logging
+from async_app import create_asgi_app
+
+app = create_asgi_app()
+setup_logging(app.flask_app)
@@ -0,0 +1,102 @@
+"""
+ASGI application module.
+Wraps the Flask application for ASGI servers: login, current user and
+profile update run natively on the event loop with the async database
+engines, and every other route is served by Flask on a thread pool.
+"""
+
+from app import create_app
+from routes.async_routes import ROUTES
+from utils.asgi import WsgiBridge, build_environ, read_body, send_response
+from utils.async_db import init_async_db
+from utils.cors import is_preflight
+
+
+class AsyncAuthApp:
+    """
+    ASGI application serving the auth API.
+
+    A worker holds a connection per client without a thread per request;
+    database I/O is awaited on the async engines and password hashes run
+    on the hashing executor.
+
+    Attributes:
+        flask_app (Flask): Application providing configuration, extensions
+            and the routes that are not served natively
+        bridge (WsgiBridge): Serves the Flask routes
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.bridge = WsgiBridge(flask_app, flask_app.config.get('ASGI_WSGI_THREADS', 8))
+        self.cors = flask_app.extensions['cors']
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        # Answer preflights on the event loop, like the WSGI middleware does
+        request_headers = dict(scope['headers'])
+        origin = request_headers.get(b'origin')
+        origin = origin.decode('latin-1') if origin is not None else None
+        if is_preflight(scope['method'], origin, request_headers.get(b'access-control-request-method')):
+            allow_headers = request_headers.get(b'access-control-request-headers')
+            allow_headers = allow_headers.decode('latin-1') if allow_headers is not None else None
+            await send_response(send, 204, self.cors.preflight_headers(origin, allow_headers), b'')
+            return
+
+        handler = ROUTES.get((scope['method'], scope['path']))
+        if handler is None:
+            await self.bridge(scope, receive, send)
+            return
+
+        # Handlers use Flask's request and current_app; the contexts are
+        # context variables, so each request's task sees its own
+        environ = build_environ(scope, await read_body(receive))
+        with self.flask_app.request_context(environ):
+            body, status_code, headers = await handler()
+            payload = self.flask_app.json.dumps(body).encode('utf-8') + b'\n'
+
+        await send_response(send, status_code, [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(payload))),
+            *headers,
+            *self.cors.response_headers(origin)
+        ], payload)
+
+    async def _lifespan(self, receive, send):
+        """Handle server startup and shutdown."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def shutdown(self):
+        """Close the async engines and stop the thread pools."""
+        await self.flask_app.extensions['async_db'].dispose()
+        self.flask_app.extensions['hash_executor'].shutdown()
+        self.bridge.close()
+
+
+def create_asgi_app(config_name=None, config_overrides=None):
+    """
+    Application factory for ASGI servers.
+
+    Args:
+        config_name (str): Configuration name, as for create_app
+        config_overrides (dict, optional): Settings applied over the
+            configuration, as for create_app
+
+    Returns:
+        AsyncAuthApp: ASGI application
+    """
+    flask_app = create_app(config_name, config_overrides=config_overrides)
+    init_async_db(flask_app)
+    return AsyncAuthApp(flask_app)
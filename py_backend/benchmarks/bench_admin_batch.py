@@ -0,0 +1,105 @@
+"""
+Batch profile update benchmark.
+Seeds a SQLite file in process, then renames the same number of users two
+ways and compares wall time and statements sent to the database:
+
+- one authenticated PATCH /user/update per user, each with its own commit;
+- one PATCH /admin/users carrying every record.
+
+Usage:
+    python benchmarks/bench_admin_batch.py --users 50000 --batches 50,500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+import harness
+
+sys.path.insert(0, harness.BACKEND_DIR)
+
+from sqlalchemy import event  # noqa: E402
+from app import create_app, init_db  # noqa: E402
+from models import db, User  # noqa: E402
+from utils.auth import generate_token  # noqa: E402
+
+ADMIN_KEY = 'benchmark-admin-key'
+
+
+def build_app(directory, user_count):
+    """Application on a SQLite file holding user_count users; returns it and their ids."""
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'batch.db')}",
+        'ADMIN_API_KEY': ADMIN_KEY,
+        'ADMISSION_ENABLED': False
+    })
+    init_db(app)
+    ids = [str(uuid.uuid4()) for _ in range(user_count)]
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            dict(id=user_id, email=harness.user_email(index), password='x' * 100,
+                 first_name='Bench', last_name=str(index), version=1)
+            for index, user_id in enumerate(ids)
+        ])
+        db.session.commit()
+    return app, ids
+
+
+def count_statements(app):
+    """Start counting statements on the app's engine; returns the live list."""
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def one_by_one(app, ids, statements, suffix):
+    """Rename each user with its own PATCH /user/update."""
+    client = app.test_client()
+    with app.app_context():
+        tokens = [generate_token(user_id) for user_id in ids]
+    del statements[:]
+    started = time.perf_counter()
+    for token in tokens:
+        response = client.patch('/user/update', headers={'Authorization': f'Bearer {token}'},
+                                json={'last_name': f'Single{suffix}'})
+        assert response.status_code == 200
+    return {'mode': 'PATCH /user/update each', 'seconds': time.perf_counter() - started,
+            'statements': len(statements)}
+
+
+def batched(app, ids, statements, suffix):
+    """Rename every user with one PATCH /admin/users."""
+    client = app.test_client()
+    del statements[:]
+    started = time.perf_counter()
+    response = client.patch('/admin/users', headers={'X-Admin-Key': ADMIN_KEY},
+                            json={'users': [{'id': user_id, 'last_name': f'Batch{suffix}'} for user_id in ids]})
+    assert response.get_json()['updated'] == len(ids)
+    return {'mode': 'PATCH /admin/users', 'seconds': time.perf_counter() - started,
+            'statements': len(statements)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--batches', default='50,500')
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        app, ids = build_app(directory, args.users)
+        statements = count_statements(app)
+        for size in [int(size) for size in args.batches.split(',')]:
+            sample = ids[:size]
+            for result in (one_by_one(app, sample, statements, size), batched(app, sample, statements, size)):
+                rows.append(dict(records=size, **result, ms_per_record=result['seconds'] * 1000 / size))
+
+    harness.print_table(f'Renaming users, in-process SQLite ({args.users} users)', rows)
+
+
+if __name__ == '__main__':
+    main()
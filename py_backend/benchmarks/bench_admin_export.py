@@ -0,0 +1,103 @@
+"""
+Admin listing and export benchmark.
+Seeds SQLite databases of increasing size in process, then measures:
+
+- the latency of fetching a page deep into the table with the keyset
+  cursor versus the equivalent LIMIT/OFFSET query;
+- the peak memory (tracemalloc) and duration of streaming the whole table
+  through /admin/users/export, which should not grow with the table.
+
+Usage:
+    python benchmarks/bench_admin_export.py --sizes 10000,100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+import harness
+
+sys.path.insert(0, harness.BACKEND_DIR)
+
+from app import create_app, init_db  # noqa: E402
+from models import db, User  # noqa: E402
+from utils.user_listing import encode_cursor, listing_statement  # noqa: E402
+
+ADMIN_KEY = 'benchmark-admin-key'
+PAGE_SIZE = 100
+
+
+def build_app(directory, user_count):
+    """Application on a SQLite file holding user_count users."""
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, f'users{user_count}.db')}",
+        'ADMIN_API_KEY': ADMIN_KEY,
+        'ADMISSION_ENABLED': False
+    })
+    init_db(app)
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            dict(id=str(uuid.uuid4()), email=harness.user_email(index), password='x' * 100,
+                 first_name='Bench', last_name=str(index), version=1,
+                 updated_at=start + timedelta(seconds=index))
+            for index in range(user_count)
+        ])
+        db.session.commit()
+    return app
+
+
+def page_latency(app, position, repeat=50):
+    """Median milliseconds for one page at position, by OFFSET and by cursor."""
+    with app.app_context():
+        boundary = db.session.execute(listing_statement().offset(position - 1).limit(1)).one()
+        statements = {
+            'offset': listing_statement(limit=PAGE_SIZE).offset(position),
+            'keyset': listing_statement(after=(boundary.updated_at, boundary.id), limit=PAGE_SIZE)
+        }
+        result = {}
+        for name, statement in statements.items():
+            latencies = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                db.session.execute(statement).all()
+                latencies.append((time.perf_counter() - started) * 1000)
+            result[f'{name}_ms'] = harness.percentile(latencies, 0.50)
+        return result
+
+
+def export_cost(app):
+    """Peak traced memory and duration of a full NDJSON export."""
+    client = app.test_client()
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get('/admin/users/export', headers={'X-Admin-Key': ADMIN_KEY}, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    duration = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'export_mib': size / 2**20, 'export_s': duration, 'export_peak_kib': peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000')
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for user_count in [int(size) for size in args.sizes.split(',')]:
+            app = build_app(directory, user_count)
+            rows.append(dict(users=user_count, page_at=user_count - PAGE_SIZE,
+                             **page_latency(app, user_count - PAGE_SIZE), **export_cost(app)))
+
+    harness.print_table(f'Deep page ({PAGE_SIZE} rows) and full export, in-process SQLite', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Admission control benchmark.
+Runs a login storm and /user/me reads at the same time under gunicorn and
+compares read latency, and how many logins were shed with 503, with the
+admission controller off and on.
+
+Usage:
+    python benchmarks/bench_admission.py --workers 2 --threads 8 --duration 10
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+import harness
+
+MODES = (
+    ('off', {'ADMISSION_ENABLED': 'False'}),
+    ('on', {'ADMISSION_ENABLED': 'True'})
+)
+
+
+def benchmark_mode(name, settings, args):
+    """Run the mixed login and read workload with one admission setting."""
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        env = harness.benchmark_env('sqlite', database_url, **settings)
+        users = args.logins + args.readers
+        harness.seed_database(env, users)
+
+        server = harness.GunicornServer(env, workers=args.workers, threads=args.threads)
+        with server:
+            tokens = [harness.login(server.port, index) for index in range(args.readers)]
+            results = {}
+
+            def login_request(worker, iteration):
+                # Clients pause between attempts, as they would after a 503's
+                # Retry-After; without it shed logins are retried in a tight loop
+                if iteration:
+                    time.sleep(args.login_pause)
+                return ('POST', '/auth/login', {
+                    'email': harness.user_email(args.readers + worker),
+                    'password': harness.PASSWORD
+                }, None)
+
+            def logins():
+                results['login'] = harness.run_load(server.port, login_request, args.logins, args.duration)
+
+            def reads():
+                results['/user/me'] = harness.run_load(
+                    server.port,
+                    lambda worker, iteration: ('GET', '/user/me', None,
+                                               {'Authorization': f'Bearer {tokens[worker]}'}),
+                    args.readers,
+                    args.duration
+                )
+
+            threads = [threading.Thread(target=logins), threading.Thread(target=reads)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        return [dict(admission=name, traffic=traffic, **result) for traffic, result in results.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=32, help='concurrent login clients')
+    parser.add_argument('--readers', type=int, default=8, help='concurrent /user/me clients')
+    parser.add_argument('--login-pause', type=float, default=1.0, help='seconds between a client\'s logins')
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    rows = [row for name, settings in MODES for row in benchmark_mode(name, settings, args)]
+    harness.print_table(
+        f'Login storm vs /user/me ({args.workers} workers x {args.threads} threads, '
+        f'{args.logins} login + {args.readers} read clients, {args.duration:.0f}s per run; '
+        f'errors include 503 sheds)',
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
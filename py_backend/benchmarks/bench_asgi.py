@@ -0,0 +1,69 @@
+"""
+ASGI benchmark.
+Runs the same workload against the WSGI app on gthread workers and the ASGI
+app on Uvicorn workers: many concurrent keep-alive clients calling /user/me,
+optionally mixed with logins, at increasing client counts.
+
+Usage:
+    python benchmarks/bench_asgi.py --workers 2 --threads 8 --clients 16,64,256 --duration 10
+"""
+
+import argparse
+import os
+import tempfile
+import harness
+
+MODES = (
+    ('wsgi (gthread)', 'app:create_app()', []),
+    ('asgi (uvicorn)', 'asgi:app', ['--worker-class', 'uvicorn.workers.UvicornWorker'])
+)
+
+
+def benchmark_mode(name, app_target, extra_args, clients, args):
+    """Run the workload with one server mode and client count."""
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        env = harness.benchmark_env('sqlite', database_url)
+        harness.seed_database(env, clients)
+
+        server = harness.GunicornServer(
+            env, workers=args.workers, threads=args.threads, extra_args=extra_args, app_target=app_target
+        )
+        with server:
+            tokens = [harness.login(server.port, index) for index in range(clients)]
+
+            def make_request(worker, iteration):
+                if args.login_every and iteration % args.login_every == args.login_every - 1:
+                    return ('POST', '/auth/login', {
+                        'email': harness.user_email(worker),
+                        'password': harness.PASSWORD
+                    }, None)
+                return ('GET', '/user/me', None, {'Authorization': f'Bearer {tokens[worker]}'})
+
+            result = harness.run_load(server.port, make_request, clients, args.duration)
+        return dict(mode=name, clients=clients, **result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help='gthread threads per worker (WSGI mode)')
+    parser.add_argument('--clients', default='16,64,256', help='comma-separated client counts')
+    parser.add_argument('--login-every', type=int, default=0, help='every Nth request of a client is a login (0 = none)')
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    rows = [
+        benchmark_mode(name, app_target, extra_args, int(clients), args)
+        for clients in args.clients.split(',')
+        for name, app_target, extra_args in MODES
+    ]
+    harness.print_table(
+        f'WSGI vs ASGI ({args.workers} workers, {args.threads} gthread threads, '
+        f'login every {args.login_every} requests, {args.duration:.0f}s per run)',
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
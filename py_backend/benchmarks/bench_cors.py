@@ -0,0 +1,91 @@
+"""
+CORS benchmark.
+Measures the server-side cost of CORS preflights and of a simple GET with
+an Origin header, calling the WSGI application in-process: flask_cors as
+previously configured (when the package is still installed) versus the
+precomputed headers and preflight short-circuit of utils/cors.py.
+
+Browsers also cache each preflight for Access-Control-Max-Age seconds,
+which flask_cors did not send, so most preflights never reach the server.
+
+Usage:
+    python benchmarks/bench_cors.py --requests 20000
+"""
+
+import argparse
+import sys
+import time
+import harness
+
+sys.path.insert(0, harness.BACKEND_DIR)
+
+from werkzeug.test import EnvironBuilder  # noqa: E402
+from app import create_app  # noqa: E402
+
+ORIGINS = ['https://pos.example.com', 'https://admin.example.com', 'http://localhost:8080']
+
+REQUESTS = (
+    ('preflight', dict(method='OPTIONS', path='/user/me', headers={
+        'Origin': ORIGINS[0],
+        'Access-Control-Request-Method': 'GET',
+        'Access-Control-Request-Headers': 'authorization'
+    })),
+    ('GET /', dict(method='GET', path='/', headers={'Origin': ORIGINS[0]}))
+)
+
+
+def flask_cors_app():
+    """The application with flask_cors configured as before, or None."""
+    try:
+        from flask_cors import CORS
+    except ImportError:
+        return None
+    app = create_app('testing', config_overrides={'CORS_ORIGINS': ORIGINS})
+    app.wsgi_app = app.wsgi_app.wsgi_app
+    CORS(app, resources={r"/*": {"origins": ORIGINS}})
+    return app
+
+
+def measure(app, request, count):
+    """Call the application count times; returns latency percentiles in microseconds."""
+    environ = EnvironBuilder(**request).get_environ()
+    latencies = []
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    for _ in range(count):
+        started = time.perf_counter()
+        result = app(dict(environ), start_response)
+        b''.join(result)
+        if hasattr(result, 'close'):
+            result.close()
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return {
+        'p50_us': harness.percentile(latencies, 0.50),
+        'p99_us': harness.percentile(latencies, 0.99),
+        'per_second': count / (sum(latencies) / 1e6)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    modes = [('flask_cors', flask_cors_app()),
+             ('precomputed', create_app('testing', config_overrides={'CORS_ORIGINS': ORIGINS}))]
+    rows = []
+    for request_name, request in REQUESTS:
+        for mode, app in modes:
+            if app is None:
+                print(f'{mode}: not installed, skipped')
+                continue
+            measure(app, request, args.requests // 10)
+            rows.append(dict(request=request_name, mode=mode, **measure(app, request, args.requests)))
+
+    harness.print_table(f'CORS handling per request, in-process ({args.requests} requests each)', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Gunicorn lifecycle benchmark.
+Starts the API with gunicorn.conf.py with and without preload_app and reports
+startup time and memory per worker (RSS, PSS and private/unique memory) after
+a short warm-up load.
+
+Usage:
+    python benchmarks/bench_gunicorn.py --workers 4 --threads 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import harness
+
+
+def worker_pids(master_pid):
+    """Return the pids of the processes whose parent is master_pid."""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                fields = stat.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def memory_mb(pid):
+    """Return RSS, PSS and private memory of a process in megabytes."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    private = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values.get('Rss', 0), values.get('Pss', 0), private
+
+
+def benchmark_mode(preload, args):
+    """Start gunicorn in one mode and collect startup and memory figures."""
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        env = harness.benchmark_env(
+            'sqlite', database_url,
+            GUNICORN_PRELOAD=preload,
+            GUNICORN_WORKERS=args.workers,
+            GUNICORN_THREADS=args.threads
+        )
+        harness.seed_database(env, args.concurrency)
+
+        server = harness.GunicornServer(env, workers=args.workers, threads=args.threads)
+        with server:
+            deadline = time.monotonic() + 60
+            while len(worker_pids(server.process.pid)) < args.workers and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+            tokens = [harness.login(server.port, index) for index in range(args.concurrency)]
+            harness.run_load(
+                server.port,
+                lambda worker, iteration: ('GET', '/user/me', None, {'Authorization': f'Bearer {tokens[worker]}'}),
+                args.concurrency,
+                args.warmup
+            )
+
+            workers = [memory_mb(pid) for pid in worker_pids(server.process.pid)]
+            count = len(workers) or 1
+            return {
+                'preload': preload,
+                'workers': len(workers),
+                'startup_s': server.started_in,
+                'rss_mb': sum(rss for rss, _, _ in workers) / count,
+                'pss_mb': sum(pss for _, pss, _ in workers) / count,
+                'private_mb': sum(private for _, _, private in workers) / count,
+                'master_rss_mb': memory_mb(server.process.pid)[0]
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=float, default=3)
+    args = parser.parse_args()
+
+    rows = [benchmark_mode(preload, args) for preload in (False, True)]
+    harness.print_table(
+        f'Gunicorn startup and memory per worker ({args.workers} workers x {args.threads} threads)',
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Idempotency benchmark.
+Times PATCH /user/update in process on a SQLite file: a first request with
+a fresh Idempotency-Key (which runs the transaction) against retries that
+repeat a key (which replay the stored response), with the in-process store
+alone and with the shared table.
+
+Usage:
+    python benchmarks/bench_idempotency.py --requests 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import harness
+
+sys.path.insert(0, harness.BACKEND_DIR)
+
+from app import create_app, init_db  # noqa: E402
+from models import db, User  # noqa: E402
+from utils.auth import generate_token, hash_password  # noqa: E402
+
+
+def build_client(directory, shared_table):
+    """Test client on a fresh SQLite file with one user; returns it and auth headers."""
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, f'idempotency{int(shared_table)}.db')}",
+        'IDEMPOTENCY_DB_ENABLED': shared_table,
+        'ADMISSION_ENABLED': False
+    })
+    init_db(app)
+    with app.app_context():
+        user = User(email=harness.user_email(0), password=hash_password(harness.PASSWORD),
+                    first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.flush()
+        token = generate_token(user.id)
+        db.session.commit()
+    return app.test_client(), {'Authorization': f'Bearer {token}'}
+
+
+def measure(client, headers, keys):
+    """Latency percentiles in milliseconds for one update per key."""
+    latencies = []
+    for key in keys:
+        started = time.perf_counter()
+        response = client.patch('/user/update', headers=dict(headers, **{'Idempotency-Key': key}),
+                                json={'last_name': f'Name{key}'})
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200
+    return {'p50_ms': harness.percentile(latencies, 0.50), 'p99_ms': harness.percentile(latencies, 0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for shared_table in (False, True):
+            client, headers = build_client(directory, shared_table)
+            keys = [str(index) for index in range(args.requests)]
+            store = 'memory + table' if shared_table else 'memory'
+            rows.append(dict(store=store, request='first (runs update)', **measure(client, headers, keys)))
+            rows.append(dict(store=store, request='retry (replayed)', **measure(client, headers, keys)))
+
+    harness.print_table(f'PATCH /user/update with Idempotency-Key, in-process SQLite ({args.requests} keys)', rows)
+
+
+if __name__ == '__main__':
+    main()
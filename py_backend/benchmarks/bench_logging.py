@@ -0,0 +1,65 @@
+"""
+Logging pipeline benchmark.
+Runs /user/me under gunicorn with one INFO log line per request and compares
+request latency with the file handler attached directly to app.logger versus
+the queue-based pipeline (optionally with JSON output or route sampling).
+
+Usage:
+    python benchmarks/bench_logging.py --workers 2 --threads 4 --duration 10
+"""
+
+import argparse
+import os
+import tempfile
+import harness
+
+MODES = (
+    ('direct', {'LOG_QUEUE_ENABLED': 'False'}),
+    ('queue', {'LOG_QUEUE_ENABLED': 'True'}),
+    ('queue+json', {'LOG_QUEUE_ENABLED': 'True', 'LOG_FORMAT': 'json'}),
+    ('queue+sampled', {'LOG_QUEUE_ENABLED': 'True', 'LOG_SAMPLE_RATES': '/user/me=0.1'})
+)
+
+
+def benchmark_mode(name, settings, args):
+    """Run the /user/me workload with one logging configuration."""
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        env = harness.benchmark_env(
+            'sqlite', database_url,
+            LOG_FILE=os.path.join(directory, 'app.log'),
+            LOG_REQUESTS='True',
+            **settings
+        )
+        harness.seed_database(env, args.concurrency)
+
+        server = harness.GunicornServer(env, workers=args.workers, threads=args.threads, app_target='wsgi:app')
+        with server:
+            tokens = [harness.login(server.port, index) for index in range(args.concurrency)]
+            result = harness.run_load(
+                server.port,
+                lambda worker, iteration: ('GET', '/user/me', None, {'Authorization': f'Bearer {tokens[worker]}'}),
+                args.concurrency,
+                args.duration
+            )
+        return dict(mode=name, **result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    rows = [benchmark_mode(name, settings, args) for name, settings in MODES]
+    harness.print_table(
+        f'/user/me latency by logging mode ({args.workers} workers x {args.threads} threads, '
+        f'{args.concurrency} clients, {args.duration:.0f}s per run)',
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+User search benchmark.
+Seeds a SQLite file with generated staff names, then times searches in
+process: indexed prefix search, trigram substring search, and the naive
+LIKE '%query%' scan they replace. Queries are drawn from the seeded names,
+so every one has matches.
+
+Usage:
+    python benchmarks/bench_search.py --users 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+import harness
+
+sys.path.insert(0, harness.BACKEND_DIR)
+
+from sqlalchemy import func, insert, or_, select  # noqa: E402
+from app import create_app, init_db  # noqa: E402
+from models import db, User, UserSearchGram  # noqa: E402
+from utils.search import search_columns, search_users, user_grams  # noqa: E402
+
+SYLLABLES = ['an', 'bel', 'car', 'da', 'el', 'fen', 'gar', 'ha', 'is', 'jo', 'ka', 'li', 'mar', 'na',
+             'o', 'pe', 'qui', 'ro', 'sa', 'ta', 'u', 'vin', 'wen', 'xa', 'yo', 'zel']
+BATCH = 20000
+
+
+def name(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def build_app(directory, user_count, seed=1):
+    """Application on a SQLite file with user_count users and their trigrams."""
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'search.db')}",
+        'SEARCH_NGRAM_ENABLED': True
+    })
+    init_db(app)
+    rng = random.Random(seed)
+    names = []
+    with app.app_context():
+        for start in range(0, user_count, BATCH):
+            users, grams = [], []
+            for index in range(start, min(start + BATCH, user_count)):
+                first_name, last_name = name(rng), name(rng)
+                email = f'{first_name}.{last_name}{index}@example.com'.lower()
+                search = search_columns(first_name, last_name, email)
+                user_id = str(uuid.uuid4())
+                users.append(dict(id=user_id, email=email, password='x', first_name=first_name,
+                                  last_name=last_name, version=1, **search))
+                grams.extend({'gram': gram, 'user_id': user_id}
+                             for gram in user_grams(search['search_name'], search['search_email']))
+                if index % 1000 == 0:
+                    names.append((first_name, last_name))
+            db.session.execute(insert(User.__table__), users)
+            db.session.execute(insert(UserSearchGram.__table__), grams)
+            db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+    return app, names
+
+
+def queries(names, rng, count):
+    """Prefix and substring queries taken from seeded names."""
+    prefix, substring = [], []
+    for _ in range(count):
+        first_name, last_name = rng.choice(names)
+        prefix.append(rng.choice([first_name[:2], first_name[:4], f'{first_name} {last_name[:2]}', last_name[:3]]))
+        word = max(first_name, last_name, key=len).lower()
+        if len(word) >= 3:
+            offset = rng.randint(0, max(len(word) - 4, 0))
+            substring.append(word[offset:offset + 4])
+    return prefix, substring
+
+
+def like_scan(query, limit):
+    """The naive search: LIKE '%query%' over name and email."""
+    pattern = f'%{query}%'
+    statement = select(User.id).where(or_(
+        func.lower(User.first_name + ' ' + User.last_name).like(pattern),
+        User.email.like(pattern)
+    )).limit(limit)
+    return db.session.execute(statement).all()
+
+
+def measure(app, function, items):
+    """Latency percentiles in milliseconds."""
+    latencies = []
+    with app.test_request_context():
+        for item in items:
+            started = time.perf_counter()
+            function(item)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': harness.percentile(latencies, 0.50),
+        'p99_ms': harness.percentile(latencies, 0.99),
+        'max_ms': max(latencies)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        app, names = build_app(directory, args.users)
+        print(f'Seeded {args.users} users in {time.perf_counter() - started:.0f}s')
+
+        rng = random.Random(2)
+        prefix, substring = queries(names, rng, args.queries)
+        rows = [
+            dict(search='prefix', **measure(app, lambda q: search_users(q.lower(), args.limit), prefix)),
+            dict(search='substring (trigrams)',
+                 **measure(app, lambda q: search_users(q, args.limit, substring=True), substring)),
+            dict(search="LIKE '%q%' scan", **measure(app, lambda q: like_scan(q, args.limit), substring[:50])),
+            # A query nobody matches: the worst case for each approach
+            dict(search='substring, no match', **measure(app, lambda q: search_users(q, args.limit, substring=True),
+                                                         ['anxq'] * 20)),
+            dict(search="LIKE scan, no match", **measure(app, lambda q: like_scan(q, args.limit), ['anxq'] * 5))
+        ]
+
+    harness.print_table(f'User search, in-process SQLite ({args.users} users, limit {args.limit})', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Token verification sidecar benchmark.
+Compares the ways another service on the host can verify a token and get
+its user: calling /user/me over HTTP on gunicorn, and asking the
+verification sidecar over its Unix socket, one token per request or in
+batches.
+
+Usage:
+    python benchmarks/bench_sidecar.py --clients 8 --batch 32 --duration 10
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import harness
+
+sys.path.insert(0, harness.BACKEND_DIR)
+
+from utils.verify_protocol import VerifyClient  # noqa: E402
+
+
+def run_sidecar_load(path, tokens, clients, batch, duration):
+    """
+    Drive the sidecar with client threads for duration seconds.
+
+    Returns:
+        dict: requests, tokens verified, errors, rates and latency percentiles
+    """
+    latencies = [[] for _ in range(clients)]
+    verified = [0] * clients
+    errors = [0] * clients
+    deadline = time.perf_counter() + duration
+
+    def client(worker):
+        with VerifyClient(path, timeout=60) as verifier:
+            batch_tokens = [tokens[(worker + offset) % len(tokens)] for offset in range(batch)]
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                if batch == 1:
+                    users = [verifier.verify_user(batch_tokens[0])]
+                else:
+                    users = verifier.verify_many(batch_tokens, with_user=True)
+                latencies[worker].append((time.perf_counter() - started) * 1000)
+                verified[worker] += len(users)
+                errors[worker] += users.count(None)
+
+    threads = [threading.Thread(target=client, args=(worker,)) for worker in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    merged = [value for values in latencies for value in values]
+    return {
+        'requests': len(merged),
+        'errors': sum(errors),
+        'rps': len(merged) / elapsed,
+        'tokens_per_s': sum(verified) / elapsed,
+        'p50_ms': harness.percentile(merged, 0.50),
+        'p99_ms': harness.percentile(merged, 0.99)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers for the HTTP path')
+    parser.add_argument('--threads', type=int, default=4, help='gthread threads per worker')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--users', type=int, default=16)
+    parser.add_argument('--batch', type=int, default=32, help='tokens per batched sidecar request')
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        socket_path = os.path.join(directory, 'verify.sock')
+        env = harness.benchmark_env('sqlite', database_url, VERIFY_SOCKET_PATH=socket_path)
+        harness.seed_database(env, args.users)
+
+        with harness.GunicornServer(env, workers=args.workers, threads=args.threads) as server:
+            tokens = [harness.login(server.port, index) for index in range(args.users)]
+
+            def make_request(worker, iteration):
+                token = tokens[(worker + iteration) % len(tokens)]
+                return ('GET', '/user/me', None, {'Authorization': f'Bearer {token}'})
+
+            result = harness.run_load(server.port, make_request, args.clients, args.duration)
+            rows.append({
+                'path': f'HTTP /user/me ({args.workers}x{args.threads} gthread)',
+                'requests': result['requests'],
+                'errors': result['errors'],
+                'rps': result['rps'],
+                'tokens_per_s': result['rps'],
+                'p50_ms': result['p50_ms'],
+                'p99_ms': result['p99_ms']
+            })
+
+        sidecar = subprocess.Popen([sys.executable, 'token_sidecar.py'], cwd=harness.BACKEND_DIR, env=env)
+        try:
+            deadline = time.monotonic() + 30
+            while not os.path.exists(socket_path):
+                if sidecar.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError('token_sidecar.py did not start')
+                time.sleep(0.1)
+
+            for batch in (1, args.batch):
+                result = run_sidecar_load(socket_path, tokens, args.clients, batch, args.duration)
+                rows.append(dict(path=f'sidecar, {batch} token(s) per request', **result))
+        finally:
+            sidecar.terminate()
+            sidecar.wait(timeout=30)
+
+    harness.print_table(f'Token verification with user lookup ({args.clients} clients, {args.duration:.0f}s per run)',
+                        rows)
+
+
+if __name__ == '__main__':
+    main()
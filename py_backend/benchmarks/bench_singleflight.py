@@ -0,0 +1,104 @@
+"""
+Single-flight benchmark.
+Simulates a terminal fleet reconnecting with the same token: bursts of
+concurrent /user/me requests hit one worker at once. Counts the user queries
+reaching the database and the burst latency with single-flight coalescing
+enabled and disabled. A delay is added to every user query to stand in for
+the network round trip to a remote database.
+
+Usage:
+    python benchmarks/bench_singleflight.py --herd 100 --bursts 20 --query-delay-ms 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import harness
+
+sys.path.insert(0, harness.BACKEND_DIR)
+
+from sqlalchemy import event  # noqa: E402
+from app import create_app, init_db  # noqa: E402
+from models import db, User  # noqa: E402
+from utils.auth import hash_password, generate_token  # noqa: E402
+
+
+def benchmark_mode(enabled, args):
+    """Run the bursts against an in-process app and count user queries."""
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app('testing', config_overrides={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'auth.db')}",
+            'SINGLE_FLIGHT_ENABLED': enabled,
+            'ACTIVITY_FLUSH_INTERVAL': 60
+        })
+        init_db(app)
+
+        queries = []
+        with app.app_context():
+            user = User(email='fleet@example.com', password=hash_password(harness.PASSWORD),
+                        first_name='Fleet', last_name='Terminal')
+            db.session.add(user)
+            db.session.commit()
+            token = generate_token(user.id)
+
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def delay_user_queries(conn, cursor, statement, *params):
+                if statement.startswith('SELECT') and 'FROM users' in statement:
+                    queries.append(statement)
+                    time.sleep(args.query_delay_ms / 1000)
+
+        headers = {'Authorization': f'Bearer {token}'}
+        latencies = []
+        errors = []
+
+        for _ in range(args.bursts):
+            barrier = threading.Barrier(args.herd)
+
+            def terminal():
+                client = app.test_client()
+                barrier.wait()
+                started = time.perf_counter()
+                response = client.get('/user/me', headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+            threads = [threading.Thread(target=terminal) for _ in range(args.herd)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        app.extensions['activity'].stop()
+        requests = args.herd * args.bursts
+        return {
+            'single_flight': enabled,
+            'requests': requests,
+            'errors': len(errors),
+            'user_queries': len(queries),
+            'queries_per_request': len(queries) / requests,
+            'p50_ms': harness.percentile(latencies, 0.50),
+            'p99_ms': harness.percentile(latencies, 0.99)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--herd', type=int, default=100, help='concurrent requests per burst')
+    parser.add_argument('--bursts', type=int, default=20)
+    parser.add_argument('--query-delay-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    rows = [benchmark_mode(enabled, args) for enabled in (False, True)]
+    harness.print_table(
+        f'Thundering herd on one token ({args.herd} concurrent requests x {args.bursts} bursts, '
+        f'{args.query_delay_ms:.0f}ms per user query)',
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+SQLite profile benchmark.
+Compares concurrent login and /user/me throughput on one SQLite file under
+gunicorn with several workers, with the default pool settings versus the
+tuned sqlite configuration (WAL, synchronous=NORMAL, mmap, page cache).
+
+Usage:
+    python benchmarks/bench_sqlite.py --workers 4 --threads 4 --duration 10
+"""
+
+import argparse
+import os
+import tempfile
+import harness
+
+
+def benchmark_profile(config_name, args):
+    """Run the login and /user/me workloads against one configuration."""
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        env = harness.benchmark_env(config_name, database_url)
+        harness.seed_database(env, args.users)
+
+        with harness.GunicornServer(env, workers=args.workers, threads=args.threads) as server:
+            tokens = [harness.login(server.port, index) for index in range(args.concurrency)]
+
+            def user_me(worker, iteration):
+                headers = {'Authorization': f'Bearer {tokens[worker]}'}
+                return 'GET', '/user/me', None, headers
+
+            def user_login(worker, iteration):
+                index = (worker + iteration * args.concurrency) % args.users
+                body = {'email': harness.user_email(index), 'password': harness.PASSWORD}
+                return 'POST', '/auth/login', body, None
+
+            results = []
+            for name, make_request in (('/user/me', user_me), ('/auth/login', user_login)):
+                result = harness.run_load(server.port, make_request, args.concurrency, args.duration)
+                results.append(dict(profile=config_name, endpoint=name, **result))
+            return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args()
+
+    rows = []
+    for config_name in ('production', 'sqlite'):
+        rows.extend(benchmark_profile(config_name, args))
+
+    harness.print_table(
+        f'SQLite single-file throughput ({args.workers} workers x {args.threads} threads, '
+        f'{args.concurrency} clients, {args.duration:.0f}s per run)',
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
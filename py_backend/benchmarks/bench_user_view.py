@@ -0,0 +1,135 @@
+"""
+UserView benchmark.
+Measures a user lookup by id as an ORM User (every column, identity map,
+instance state) and as a UserView (the profile columns in slots), in
+process on a seeded SQLite database: allocations per lookup with
+tracemalloc, then latency without tracing. /user/me is measured both ways
+as well, the ORM way by swapping the route's lookup back to User.
+
+The user caches are disabled so every lookup reads the database.
+
+Usage:
+    python benchmarks/bench_user_view.py --lookups 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import harness
+
+sys.path.insert(0, harness.BACKEND_DIR)
+
+from app import create_app, init_db  # noqa: E402
+from models import db, User  # noqa: E402
+from utils import auth  # noqa: E402
+from utils.auth import find_user, generate_token, hash_password  # noqa: E402
+
+USER_COUNT = 1000
+
+
+def build_app(directory):
+    """Application on a seeded SQLite file, without user caches."""
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'view.db')}",
+        'ADMISSION_ENABLED': False
+    })
+    init_db(app)
+    with app.app_context():
+        password = hash_password(harness.PASSWORD)
+        for index in range(USER_COUNT):
+            db.session.add(User(email=harness.user_email(index), password=password,
+                                first_name='Bench', last_name=str(index)))
+        db.session.commit()
+        ids = [user_id for (user_id,) in db.session.query(User.id)]
+    return app, ids
+
+
+def lookup(app, ids, view):
+    """Return a function doing one lookup and serialization per call."""
+    def run(index):
+        with app.test_request_context():
+            user = find_user(db.session, 'id', ids[index % len(ids)], view=view)
+            user.to_dict()
+            db.session.remove()
+    return run
+
+
+def me_request(client, tokens):
+    """Return a function doing one GET /user/me per call."""
+    def run(index):
+        response = client.get('/user/me', headers={'Authorization': f'Bearer {tokens[index % len(tokens)]}'})
+        assert response.status_code == 200
+    return run
+
+
+def allocations(run, count):
+    """
+    Memory allocated per call: the traced peak above the memory held before
+    the call, averaged, plus what is still held afterwards.
+    """
+    tracemalloc.start()
+    peaks = 0
+    for index in range(count):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        run(index)
+        peaks += tracemalloc.get_traced_memory()[1] - current
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {'peak_kib_per_call': peaks / count / 1024, 'retained_kib': retained / 1024}
+
+
+def latency(run, count):
+    """Latency percentiles in microseconds."""
+    latencies = []
+    for index in range(count):
+        started = time.perf_counter()
+        run(index)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return {
+        'p50_us': harness.percentile(latencies, 0.50),
+        'p99_us': harness.percentile(latencies, 0.99),
+        'per_second': count / (sum(latencies) / 1e6)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lookups', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, ids = build_app(directory)
+        with app.app_context():
+            tokens = [generate_token(user_id) for user_id in ids]
+        client = app.test_client()
+        original = auth.find_user
+
+        def orm_find_user(session, field, value, replica=True, sticky_key=None, view=False):
+            return original(session, field, value, replica=replica, sticky_key=sticky_key)
+
+        rows = []
+        for name, view in (('find_user', False), ('find_user', True)):
+            run = lookup(app, ids, view)
+            run(0)
+            rows.append(dict(path=name, model='UserView' if view else 'User',
+                             **allocations(run, 2000),
+                             **latency(run, args.lookups)))
+
+        for model in ('User', 'UserView'):
+            auth.find_user = orm_find_user if model == 'User' else original
+            run = me_request(client, tokens)
+            run(0)
+            rows.append(dict(path='GET /user/me', model=model,
+                             **allocations(run, 2000),
+                             **latency(run, args.lookups // 4)))
+        auth.find_user = original
+
+    harness.print_table(f'User lookup by id, in-process ({args.lookups} lookups, {USER_COUNT} users)', rows)
+
+
+if __name__ == '__main__':
+    main()
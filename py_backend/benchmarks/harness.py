@@ -0,0 +1,263 @@
+"""
+Load harness shared by the benchmark scripts.
+Runs the API under gunicorn on a throwaway database and drives it with
+concurrent keep-alive clients, reporting throughput and latency percentiles.
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'password123'
+
+
+def free_port():
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def benchmark_env(config_name, database_url, **extra):
+    """
+    Build the environment for a benchmark server.
+
+    Args:
+        config_name (str): FLASK_ENV configuration name
+        database_url (str): Database the server should use
+        **extra: Additional environment variables
+
+    Returns:
+        dict: Environment for subprocesses
+    """
+    env = dict(os.environ)
+    env.update({
+        'FLASK_ENV': config_name,
+        'DATABASE_URL': database_url,
+        'SECRET_KEY': 'benchmark-secret-key',
+        'JWT_SECRET_KEY': 'benchmark-jwt-secret-key',
+        'CORS_ORIGINS': 'http://localhost',
+        'LOG_FILE': os.path.join(tempfile.gettempdir(), 'humblepos-bench.log')
+    })
+    env.update({key: str(value) for key, value in extra.items()})
+    return env
+
+
+def user_email(index):
+    """Email of the index-th seeded benchmark user."""
+    return f'bench{index}@example.com'
+
+
+def seed_database(env, user_count):
+    """
+    Create the schema and user_count users in a subprocess using env.
+
+    The password is hashed once and reused so seeding stays fast.
+
+    Args:
+        env (dict): Environment from benchmark_env
+        user_count (int): Number of users to create
+    """
+    script = (
+        'import sys\n'
+        'from app import create_app, init_db\n'
+        'from models import db, User\n'
+        'from utils.auth import hash_password\n'
+        'app = create_app()\n'
+        'init_db(app)\n'
+        'with app.app_context():\n'
+        f'    password = hash_password({PASSWORD!r})\n'
+        f'    for index in range({user_count}):\n'
+        '        db.session.add(User(email=f"bench{index}@example.com", password=password,\n'
+        '                            first_name="Bench", last_name=str(index)))\n'
+        '    db.session.commit()\n'
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env, check=True)
+
+
+class GunicornServer:
+    """
+    Context manager running the API under gunicorn.
+
+    Attributes:
+        port (int): Port the server listens on
+        started_in (float): Seconds until the server answered /health/live
+    """
+
+    def __init__(self, env, workers=2, threads=4, extra_args=None, app_target='app:create_app()'):
+        self.env = env
+        self.app_target = app_target
+        self.workers = workers
+        self.threads = threads
+        self.extra_args = list(extra_args or [])
+        self.port = free_port()
+        self.process = None
+        self.started_in = None
+
+    def __enter__(self):
+        command = [
+            sys.executable, '-m', 'gunicorn',
+            '--workers', str(self.workers),
+            '--threads', str(self.threads),
+            '--bind', f'127.0.0.1:{self.port}',
+            '--log-level', 'warning',
+            *self.extra_args,
+            self.app_target
+        ]
+        started = time.perf_counter()
+        self.process = subprocess.Popen(command, cwd=BACKEND_DIR, env=self.env)
+        self._wait_until_up()
+        self.started_in = time.perf_counter() - started
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def _wait_until_up(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError('gunicorn exited during startup')
+            try:
+                status, _ = request(self.port, 'GET', '/')
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError('gunicorn did not start in time')
+
+
+def request(port, method, path, body=None, headers=None, connection=None):
+    """
+    Send one HTTP request and return (status, parsed JSON body).
+
+    Args:
+        port (int): Server port
+        method (str): HTTP method
+        path (str): Request path
+        body (dict, optional): JSON body
+        headers (dict, optional): Extra headers
+        connection (HTTPConnection, optional): Keep-alive connection to reuse
+    """
+    conn = connection or http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    payload = json.dumps(body) if body is not None else None
+    all_headers = {'Content-Type': 'application/json'} if payload else {}
+    all_headers.update(headers or {})
+    try:
+        conn.request(method, path, body=payload, headers=all_headers)
+        response = conn.getresponse()
+        data = response.read()
+    finally:
+        if connection is None:
+            conn.close()
+    return response.status, (json.loads(data) if data else None)
+
+
+def login(port, index):
+    """Log in the index-th benchmark user and return its token."""
+    status, data = request(port, 'POST', '/auth/login', {'email': user_email(index), 'password': PASSWORD})
+    if status != 200:
+        raise RuntimeError(f'login failed with {status}')
+    return data['token']
+
+
+def percentile(values, fraction):
+    """Return the given percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_load(port, make_request, concurrency, duration):
+    """
+    Drive the server with concurrent keep-alive clients for duration seconds.
+
+    Args:
+        port (int): Server port
+        make_request (callable): make_request(worker_index, iteration) returning
+            (method, path, body, headers)
+        concurrency (int): Number of client threads
+        duration (float): Seconds to run
+
+    Returns:
+        dict: requests, errors, rps and latency percentiles in milliseconds
+    """
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    deadline = time.perf_counter() + duration
+
+    def client(worker):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        iteration = 0
+        while time.perf_counter() < deadline:
+            method, path, body, headers = make_request(worker, iteration)
+            started = time.perf_counter()
+            try:
+                status, _ = request(port, method, path, body, headers, connection=conn)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                status = None
+            latencies[worker].append((time.perf_counter() - started) * 1000)
+            if status is None or status >= 400:
+                errors[worker] += 1
+            iteration += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(worker,)) for worker in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    merged = [value for values in latencies for value in values]
+    return {
+        'requests': len(merged),
+        'errors': sum(errors),
+        'rps': len(merged) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(merged, 0.50),
+        'p95_ms': percentile(merged, 0.95),
+        'p99_ms': percentile(merged, 0.99)
+    }
+
+
+def print_table(title, rows):
+    """
+    Print benchmark results as an aligned table.
+
+    Args:
+        title (str): Table heading
+        rows (list): Dicts sharing the same keys
+    """
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    cells = [[_format(row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(cell[index]) for cell in cells)) for index, column in enumerate(columns)]
+
+    print(f'\n{title}')
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for cell in cells:
+        print('  '.join(value.ljust(width) for value, width in zip(cell, widths)))
+
+
+def _format(value):
+    if isinstance(value, float):
+        return f'{value:.1f}'
+    return str(value)
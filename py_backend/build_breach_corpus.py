@@ -0,0 +1,178 @@
+# build_breach_corpus.py
+"""
+Build the breached password corpus used by BREACHED_PASSWORDS_FILE.
+
+Converts the Pwned Passwords text dump (one "SHA1HEX:count" line per
+password, as downloaded from haveibeenpwned.com) into the compact sorted
+binary format mapped by utils/breached_passwords.py. Input that is not
+already ordered by hash is sorted in chunks on disk, so the full dump can
+be converted without holding it in memory.
+
+Usage:
+    python build_breach_corpus.py pwned-passwords-sha1.txt breached.bin
+    python build_breach_corpus.py pwned-passwords-sha1.txt breached.bin --min-count 10 --hash-bytes 10
+    python build_breach_corpus.py common-passwords.txt breached.bin --plaintext
+"""
+
+import argparse
+import hashlib
+import heapq
+import os
+import sys
+import tempfile
+from utils.breached_passwords import MIN_RECORD_SIZE, SHA1_SIZE, BreachedPasswords, write_corpus
+
+# Digests sorted in memory per run when the input is not ordered by hash
+CHUNK_SIZE = 5_000_000
+
+
+def parse_digests(lines, min_count=1, plaintext=False):
+    """
+    Turn dump lines into SHA-1 digests.
+
+    Args:
+        lines (iterable): "SHA1HEX:count" lines, or plain passwords
+        min_count (int): Skip hashes seen fewer times than this
+        plaintext (bool): Lines are passwords to hash, not dump entries
+
+    Yields:
+        bytes: 20-byte SHA-1 digests in input order
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if plaintext:
+            if line:
+                yield hashlib.sha1(line.encode('utf-8')).digest()
+            continue
+
+        line = line.strip()
+        if not line:
+            continue
+        hex_digest, _, count = line.partition(':')
+        if count and int(count) < min_count:
+            continue
+        try:
+            digest = bytes.fromhex(hex_digest)
+        except ValueError:
+            digest = b''
+        if len(digest) != SHA1_SIZE:
+            raise ValueError(f'Line {number} is not a SHA-1 hash: {line[:60]}')
+        yield digest
+
+
+def sorted_digests(digests, directory, chunk_size=CHUNK_SIZE):
+    """
+    Sort digests, spilling sorted runs to disk when they do not fit a chunk.
+
+    Args:
+        digests (iterable): Digests in any order
+        directory (str): Where to keep temporary runs
+        chunk_size (int): Digests sorted in memory at a time
+
+    Yields:
+        bytes: Digests in ascending order (duplicates included)
+    """
+    runs = []
+    chunk = []
+    for digest in digests:
+        chunk.append(digest)
+        if len(chunk) >= chunk_size:
+            runs.append(write_run(sorted(chunk), directory))
+            chunk = []
+
+    if not runs:
+        yield from sorted(chunk)
+        return
+
+    if chunk:
+        runs.append(write_run(sorted(chunk), directory))
+    files = [open(run, 'rb') for run in runs]
+    try:
+        yield from heapq.merge(*(read_run(run) for run in files))
+    finally:
+        for run in files:
+            run.close()
+
+
+def write_run(digests, directory):
+    """Write one sorted run of digests and return its path."""
+    descriptor, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(descriptor, 'wb') as run:
+        for digest in digests:
+            run.write(digest)
+    return path
+
+
+def read_run(run):
+    """Read digests back from a sorted run."""
+    while True:
+        digest = run.read(SHA1_SIZE)
+        if not digest:
+            return
+        yield digest
+
+
+def is_ascending(path, min_count, plaintext):
+    """Check whether an input file is already ordered by hash."""
+    if plaintext:
+        return False
+    previous = b''
+    with open(path, encoding='utf-8', errors='replace') as source:
+        for digest in parse_digests(source, min_count):
+            if digest < previous:
+                return False
+            previous = digest
+    return True
+
+
+def build(source_path, output_path, min_count=1, hash_bytes=SHA1_SIZE, plaintext=False, chunk_size=CHUNK_SIZE):
+    """
+    Convert a text dump into a corpus file.
+
+    Args:
+        source_path (str): Text dump
+        output_path (str): Corpus file to write
+        min_count (int): Skip hashes seen fewer times than this
+        hash_bytes (int): Bytes kept per hash
+        plaintext (bool): Source lines are passwords rather than hashes
+        chunk_size (int): Digests sorted in memory at a time
+
+    Returns:
+        int: Number of hashes written
+    """
+    # The published dump is ordered by hash, which is streamed straight
+    # through; anything else takes the slower on-disk sort
+    ascending = is_ascending(source_path, min_count, plaintext)
+    with open(source_path, encoding='utf-8', errors='replace') as source:
+        digests = parse_digests(source, min_count, plaintext)
+        if ascending:
+            return write_corpus(output_path, digests, hash_bytes)
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as directory:
+            return write_corpus(output_path, sorted_digests(digests, directory, chunk_size), hash_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='Pwned Passwords SHA-1 dump (or password list with --plaintext)')
+    parser.add_argument('output', help='corpus file to write')
+    parser.add_argument('--min-count', type=int, default=1, help='skip hashes seen fewer times than this')
+    parser.add_argument('--hash-bytes', type=int, default=SHA1_SIZE,
+                        help=f'bytes kept per hash ({MIN_RECORD_SIZE}-{SHA1_SIZE}); smaller files, rare false positives')
+    parser.add_argument('--plaintext', action='store_true', help='source lines are passwords, not hashes')
+    args = parser.parse_args()
+
+    try:
+        count = build(args.source, args.output, args.min_count, args.hash_bytes, args.plaintext)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    corpus = BreachedPasswords(args.output)
+    size = corpus.snapshot()['bytes']
+    corpus.close()
+    print(f"Wrote {count} hashes ({size / 1024 / 1024:.1f} MiB) to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# build_domain_policy.py
+"""
+Build the email domain policy used by EMAIL_DOMAIN_POLICY_FILE.
+
+Compiles one or more text domain lists (for example the community
+disposable-email-domains blocklist plus a local list of exceptions) into
+the memory-mapped trie read by utils/domain_policy.py. Running workers
+pick up the new file within EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL seconds.
+
+List syntax, one rule per line ('#' starts a comment):
+    mailinator.com        block the domain and every subdomain
+    =mail.example.org     block exactly this domain
+    !ok.mailinator.com    allow this domain and its subdomains again
+
+Usage:
+    python build_domain_policy.py disposable_email_blocklist.conf local_rules.txt domains.bin
+"""
+
+import argparse
+import sys
+from utils.domain_policy import DomainPolicy, parse_rules, write_policy
+
+
+def build(source_paths, output_path):
+    """
+    Compile text lists into a policy file.
+
+    Args:
+        source_paths (list): Text lists, merged in order
+        output_path (str): Policy file to write
+
+    Returns:
+        int: Number of rules written
+    """
+    rules = {}
+    for source_path in source_paths:
+        with open(source_path, encoding='utf-8') as source:
+            for domain, flags in parse_rules(source).items():
+                rules[domain] = rules.get(domain, 0) | flags
+    return write_policy(output_path, rules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='+', help='text domain lists')
+    parser.add_argument('output', help='policy file to write')
+    args = parser.parse_args()
+
+    try:
+        count = build(args.sources, args.output)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    policy = DomainPolicy(args.output)
+    size = policy.snapshot()['bytes']
+    policy.close()
+    print(f"Wrote {count} rules ({size / 1024:.0f} KiB) to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
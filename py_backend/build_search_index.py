@@ -0,0 +1,106 @@
+# build_search_index.py
+"""
+Fill the user search columns, and optionally the trigram table, for users
+created before search existed or written outside the ORM.
+
+New users and name changes keep both up to date on their own; run this
+once after adding the columns to an existing database, and again with
+--grams when enabling SEARCH_NGRAM_ENABLED. Users are processed in id
+order, batch by batch, each batch in its own transaction.
+
+Usage:
+    python build_search_index.py
+    python build_search_index.py --grams --batch-size 5000
+"""
+
+import argparse
+import sys
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+from app import create_app
+from models import db, User, UserSearchGram
+from utils.search import search_columns, user_grams
+
+
+def backfill(session, batch_size=1000, grams=False):
+    """
+    Recompute the search columns of every user reachable through session.
+
+    Args:
+        session: Session bound to one database (or shard)
+        batch_size (int): Users per transaction
+        grams (bool): Also rebuild the trigram rows
+
+    Returns:
+        int: Users processed
+    """
+    table = User.__table__
+    gram_table = UserSearchGram.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam('user_id'))
+        .values(
+            search_name=bindparam('search_name'),
+            search_last_name=bindparam('search_last_name'),
+            search_email=bindparam('search_email')
+        )
+    )
+
+    count = 0
+    last_id = ''
+    while True:
+        rows = session.execute(
+            select(table.c.id, table.c.first_name, table.c.last_name, table.c.email)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return count
+
+        updates = [dict(search_columns(row.first_name, row.last_name, row.email), user_id=row.id) for row in rows]
+        session.execute(statement, updates)
+
+        if grams:
+            ids = [row.id for row in rows]
+            session.execute(delete(gram_table).where(gram_table.c.user_id.in_(ids)))
+            gram_rows = [
+                {'gram': gram, 'user_id': values['user_id']}
+                for values in updates
+                for gram in user_grams(values['search_name'], values['search_email'])
+            ]
+            if gram_rows:
+                session.execute(insert(gram_table), gram_rows)
+
+        session.commit()
+        count += len(rows)
+        last_id = rows[-1].id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=1000, help='users updated per transaction')
+    parser.add_argument('--grams', action='store_true', help='also rebuild the trigram table')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        shard_map = app.extensions.get('shard_map')
+        if shard_map is not None:
+            shard_map.create_all(db.metadata)
+            engines = shard_map.engines
+        else:
+            engines = [db.engine]
+
+        total = 0
+        for engine in engines:
+            with Session(bind=engine) as session:
+                total += backfill(session, args.batch_size, args.grams)
+
+    print(f"Indexed {total} users{' with trigrams' if args.grams else ''}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
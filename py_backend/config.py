@@ -57,6 +57,140 @@ class Config:
         'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20))
     }
     
+    # Log a warning when waiting for a pooled connection takes this long
+    DB_POOL_WAIT_WARNING_MS = float(os.getenv('DB_POOL_WAIT_WARNING_MS', 100))
+    
+    # Share one query between concurrent lookups of the same user
+    SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    
+    # ==================== Shared Cache Settings ====================
+    # Memory-mapped cache shared by all workers on the host for verified
+    # token payloads and user snapshots (slots x slot size bytes)
+    SHARED_CACHE_ENABLED = os.getenv('SHARED_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH')
+    SHARED_CACHE_SLOTS = int(os.getenv('SHARED_CACHE_SLOTS', 65536))
+    SHARED_CACHE_SLOT_SIZE = int(os.getenv('SHARED_CACHE_SLOT_SIZE', 512))
+    SHARED_CACHE_TOKEN_TTL = float(os.getenv('SHARED_CACHE_TOKEN_TTL', 300))
+    SHARED_CACHE_USER_TTL = float(os.getenv('SHARED_CACHE_USER_TTL', 60))
+    
+    # Two-tier user cache across nodes: in-process L1 plus a shared L2
+    # (redis://... or memory://name); disabled unless CACHE_L2_URL is set.
+    # Updates are broadcast on the channel so every node drops its L1 copy.
+    CACHE_L2_URL = os.getenv('CACHE_L2_URL')
+    CACHE_INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'humblepos:auth:invalidate')
+    CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'humblepos:auth:')
+    CACHE_L1_TTL = float(os.getenv('CACHE_L1_TTL', 30))
+    CACHE_L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 10000))
+    CACHE_L2_TTL = float(os.getenv('CACHE_L2_TTL', 300))
+    CACHE_NEGATIVE_TTL = float(os.getenv('CACHE_NEGATIVE_TTL', 30))
+    
+    # ==================== Admission Settings ====================
+    # Expensive endpoints (login, password change) and cheap token-authenticated
+    # reads get separate concurrency limits. A request waiting for a slot is
+    # shed with 503 + Retry-After once queue waits have stayed above the
+    # lane's target for a whole interval (CoDel), and never waits longer than
+    # ADMISSION_MAX_WAIT_MS. Keep the limits below gunicorn's --threads so
+    # running logins cannot occupy every thread. *_MAX_WAITING optionally
+    # caps how many requests a lane may hold waiting and sheds arrivals
+    # beyond it at once; it is off (0) by default, so shedding follows
+    # queue wait alone.
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    ADMISSION_MAX_WAIT_MS = float(os.getenv('ADMISSION_MAX_WAIT_MS', 1000))
+    ADMISSION_EXPENSIVE_ENDPOINTS = [
+        endpoint.strip() for endpoint in
+        os.getenv('ADMISSION_EXPENSIVE_ENDPOINTS', 'auth.login,auth.change_password').split(',')
+        if endpoint.strip()
+    ]
+    ADMISSION_EXPENSIVE_LIMIT = int(os.getenv('ADMISSION_EXPENSIVE_LIMIT', 2))
+    ADMISSION_EXPENSIVE_TARGET_MS = float(os.getenv('ADMISSION_EXPENSIVE_TARGET_MS', 100))
+    ADMISSION_EXPENSIVE_INTERVAL_MS = float(os.getenv('ADMISSION_EXPENSIVE_INTERVAL_MS', 500))
+    ADMISSION_EXPENSIVE_MAX_WAITING = int(os.getenv('ADMISSION_EXPENSIVE_MAX_WAITING', 0))
+    ADMISSION_CHEAP_ENDPOINTS = [
+        endpoint.strip() for endpoint in
+        os.getenv('ADMISSION_CHEAP_ENDPOINTS', 'user.*').split(',')
+        if endpoint.strip()
+    ]
+    ADMISSION_CHEAP_LIMIT = int(os.getenv('ADMISSION_CHEAP_LIMIT', 8))
+    ADMISSION_CHEAP_TARGET_MS = float(os.getenv('ADMISSION_CHEAP_TARGET_MS', 20))
+    ADMISSION_CHEAP_INTERVAL_MS = float(os.getenv('ADMISSION_CHEAP_INTERVAL_MS', 200))
+    ADMISSION_CHEAP_MAX_WAITING = int(os.getenv('ADMISSION_CHEAP_MAX_WAITING', 0))
+    
+    # ==================== ASGI Settings ====================
+    # Used by the ASGI entry point (asgi:app) only. Login, /user/me and
+    # /user/update run on the event loop with asyncio database drivers
+    # (aiosqlite, aiomysql); other routes run on ASGI_WSGI_THREADS threads.
+    # Password hashes run on ASGI_HASH_THREADS threads (0 = one per CPU); while
+    # more than ASGI_HASH_MAX_BACKLOG hashes are queued, readiness fails and
+    # logins are shed with 503 + Retry-After.
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 8))
+    ASGI_HASH_THREADS = int(os.getenv('ASGI_HASH_THREADS', 0))
+    ASGI_HASH_MAX_BACKLOG = int(os.getenv('ASGI_HASH_MAX_BACKLOG', 16))
+    
+    # ==================== Verification Sidecar Settings ====================
+    # Used by token_sidecar.py only: other services on the host verify
+    # tokens over this Unix domain socket, up to VERIFY_MAX_BATCH per request
+    VERIFY_SOCKET_PATH = os.getenv('VERIFY_SOCKET_PATH')
+    VERIFY_SOCKET_MODE = int(os.getenv('VERIFY_SOCKET_MODE', '660'), 8)
+    VERIFY_MAX_BATCH = int(os.getenv('VERIFY_MAX_BATCH', 256))
+
+    # ==================== Admin API Settings ====================
+    # The /admin endpoints require this key in the X-Admin-Key header and
+    # are disabled while it is unset. Listings are keyset-paginated on
+    # (updated_at, id); exports stream ADMIN_EXPORT_BATCH_SIZE rows per fetch.
+    ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
+    ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', 100))
+    ADMIN_MAX_PAGE_SIZE = int(os.getenv('ADMIN_MAX_PAGE_SIZE', 1000))
+    ADMIN_EXPORT_BATCH_SIZE = int(os.getenv('ADMIN_EXPORT_BATCH_SIZE', 1000))
+    # Batch updates take at most ADMIN_BATCH_MAX_RECORDS users per request
+    # and write ADMIN_BATCH_CHUNK_SIZE of them per UPDATE statement.
+    ADMIN_BATCH_MAX_RECORDS = int(os.getenv('ADMIN_BATCH_MAX_RECORDS', 1000))
+    ADMIN_BATCH_CHUNK_SIZE = int(os.getenv('ADMIN_BATCH_CHUNK_SIZE', 200))
+
+    # ==================== Search Settings ====================
+    # /user/search matches name and email prefixes on indexed, normalized
+    # columns. With SEARCH_NGRAM_ENABLED a trigram table is maintained on
+    # every insert and name change, which also allows substring search.
+    SEARCH_NGRAM_ENABLED = os.getenv('SEARCH_NGRAM_ENABLED', 'False').lower() in ('true', '1', 'yes')
+    SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', 10))
+    SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', 50))
+
+    # ==================== Idempotency Settings ====================
+    # Mutating endpoints replay the stored response when a request is
+    # retried with the same Idempotency-Key within IDEMPOTENCY_TTL seconds;
+    # a duplicate arriving while the first is running waits for it. Keys
+    # live in process memory, and with IDEMPOTENCY_DB_ENABLED also in the
+    # idempotency_keys table, shared by every worker. A row claimed by a
+    # worker that dies before answering is freed after IDEMPOTENCY_LOCK_TIMEOUT
+    # seconds (above GUNICORN_TIMEOUT, which bounds a healthy request).
+    IDEMPOTENCY_ENABLED = os.getenv('IDEMPOTENCY_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    IDEMPOTENCY_DB_ENABLED = os.getenv('IDEMPOTENCY_DB_ENABLED', 'False').lower() in ('true', '1', 'yes')
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 10000))
+    IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 5))
+    IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+    # ==================== Health Settings ====================
+    # The database is probed in the background; probes read the cached result
+    HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+    HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))
+    READINESS_MAX_POOL_SATURATION = float(os.getenv('READINESS_MAX_POOL_SATURATION', 0.9))
+    
+    # Read replicas (optional, comma-separated URLs)
+    # Read-only lookups are spread over replicas; writes stay on the primary
+    SQLALCHEMY_REPLICA_URIS = [
+        uri.strip() for uri in os.getenv('DATABASE_REPLICA_URLS', '').split(',')
+        if uri.strip()
+    ]
+    DB_REPLICA_EJECT_SECONDS = float(os.getenv('DB_REPLICA_EJECT_SECONDS', 30))
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+    
+    # User shards (optional, comma-separated URLs)
+    # Users are placed by a stable hash of their email; the order is fixed
+    SQLALCHEMY_SHARD_URIS = [
+        uri.strip() for uri in os.getenv('DATABASE_SHARD_URLS', '').split(',')
+        if uri.strip()
+    ]
+    
     # ==================== JWT Settings ====================
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(
@@ -68,11 +202,48 @@ class Config:
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
     CORS_ORIGINS = [origin.strip() for origin in CORS_ORIGINS]
     
+    # Headers for every allowed origin are built once at startup; preflights
+    # are answered before routing and cached by browsers for CORS_MAX_AGE
+    # seconds (Chromium caps this at 7200). CORS_ALLOW_HEADERS='*' echoes
+    # whatever request headers a preflight asks for
+    CORS_ALLOW_METHODS = [method.strip() for method in
+                          os.getenv('CORS_ALLOW_METHODS', 'GET,HEAD,POST,PUT,PATCH,DELETE,OPTIONS').split(',')]
+    CORS_ALLOW_HEADERS = [header.strip() for header in
+                          os.getenv('CORS_ALLOW_HEADERS', '*').split(',')]
+    CORS_EXPOSE_HEADERS = [header.strip() for header in
+                           os.getenv('CORS_EXPOSE_HEADERS', 'ETag,Retry-After,Idempotent-Replayed').split(',') if header.strip()]
+    CORS_MAX_AGE = int(os.getenv('CORS_MAX_AGE', 7200))
+    
     # ==================== Security Settings ====================
     PASSWORD_MIN_LENGTH = int(os.getenv('PASSWORD_MIN_LENGTH', 8))
     PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
     PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
     
+    # Reject passwords found in this breached password corpus (built with
+    # build_breach_corpus.py); disabled when unset
+    BREACHED_PASSWORDS_FILE = os.getenv('BREACHED_PASSWORDS_FILE')
+    
+    # Refuse new email addresses on domains blocked by this policy file
+    # (built with build_domain_policy.py); replaced files are picked up
+    # within the reload interval, without restarting workers
+    EMAIL_DOMAIN_POLICY_FILE = os.getenv('EMAIL_DOMAIN_POLICY_FILE')
+    EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL = float(os.getenv('EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL', 30))
+    
+    # ==================== Audit Settings ====================
+    # Login attempts are queued in memory and inserted in batches
+    AUDIT_ENABLED = os.getenv('AUDIT_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 100))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1))
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+    
+    # ==================== Activity Settings ====================
+    # last_login_at/last_seen_at are kept in memory and written in bulk,
+    # ACTIVITY_CHUNK_SIZE users per UPDATE; the flush interval bounds how
+    # stale the stored values may be
+    ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 30))
+    ACTIVITY_MAX_PENDING = int(os.getenv('ACTIVITY_MAX_PENDING', 10000))
+    ACTIVITY_CHUNK_SIZE = int(os.getenv('ACTIVITY_CHUNK_SIZE', 500))
+    
     # ==================== Application Settings ====================
     APP_NAME = os.getenv('APP_NAME', 'Flask Auth API')
     APP_VERSION = os.getenv('APP_VERSION', '1.0.0')
@@ -87,6 +258,20 @@ class Config:
     LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10485760))  # 10MB
     LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 10))
     
+    # Write logs from a background thread through a bounded queue;
+    # records are dropped (and counted) when the queue is full
+    LOG_QUEUE_ENABLED = os.getenv('LOG_QUEUE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 256))
+    
+    # 'text' or 'json' (one JSON object per line)
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    
+    # Log one INFO line per request, and the fraction of INFO records kept
+    # per route, e.g. "/health/live=0.01,/user/me=0.1"
+    LOG_REQUESTS = os.getenv('LOG_REQUESTS', 'False').lower() in ('true', '1', 'yes')
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+    
     # ==================== Environment ====================
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     
@@ -163,6 +348,21 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     SQLALCHEMY_ECHO = False
     
+    # In-memory SQLite uses a StaticPool, which rejects the
+    # pool_size/max_overflow options of the base configuration
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    
+    # Probe inline instead of from a background thread sharing the connection
+    HEALTH_CHECK_INTERVAL = 0
+    
+    # Write audit rows and activity timestamps inline instead of from
+    # background threads
+    AUDIT_FLUSH_INTERVAL = 0
+    ACTIVITY_FLUSH_INTERVAL = 0
+    
+    # Tests that need the host-wide cache point it at their own file
+    SHARED_CACHE_ENABLED = False
+    
     # Disable CSRF for testing
     WTF_CSRF_ENABLED = False
     
@@ -173,10 +373,60 @@ class TestingConfig(Config):
         app.logger.info('Testing mode enabled')
 
 
+class SQLiteConfig(ProductionConfig):
+    """
+    Production configuration for single-store deployments on SQLite.
+    DATABASE_URL must point at a SQLite file, e.g. sqlite:////var/lib/humblepos/auth.db
+    """
+    
+    # Per-connection PRAGMAs, applied through engine connect events
+    # WAL lets readers run alongside the single writer; NORMAL sync is
+    # durable across application crashes in WAL mode
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 268435456)),  # 256MB
+        'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KIB', 65536)),  # 64MB
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON'
+    }
+    
+    # A few long-lived connections per worker; SQLite allows one writer at a
+    # time, so extra overflow connections only add lock contention.
+    # Local files need neither pre-ping nor recycling.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('SQLITE_POOL_SIZE', 4)),
+        'max_overflow': 0,
+        'pool_timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+        'pool_pre_ping': False,
+        'connect_args': {
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+            'check_same_thread': False
+        }
+    }
+    
+    @classmethod
+    def init_app(cls, app):
+        """Initialize SQLite production settings."""
+        ProductionConfig.init_app(app)
+        
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        if not uri.startswith('sqlite:///') or uri.endswith(':memory:'):
+            raise ValueError(
+                "The sqlite configuration requires DATABASE_URL to be a SQLite file, "
+                "e.g. sqlite:////var/lib/humblepos/auth.db"
+            )
+        
+        app.logger.info('SQLite production mode enabled')
+
+
 # Configuration dictionary
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'sqlite': SQLiteConfig,
     'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,188 @@
+"""
+Gunicorn configuration.
+Loaded automatically when gunicorn is started from py_backend:
+
+    gunicorn wsgi:app
+
+Workers and threads are sized from the CPU count and the measured cost of
+one password hash, and the total pool size is checked against the
+database's connection limit before any worker starts. With preload_app the
+application is imported once in the master and shared copy-on-write; each
+worker then drops the pooled connections it inherited.
+
+Environment overrides: GUNICORN_WORKERS, GUNICORN_THREADS, GUNICORN_PRELOAD,
+GUNICORN_TIMEOUT, GUNICORN_READ_COST_MS, DB_MAX_CONNECTIONS,
+DB_RESERVED_CONNECTIONS.
+"""
+
+import gc
+import math
+import os
+import time
+from werkzeug.security import generate_password_hash
+from config import get_config
+
+# Reads (/user/me, token checks) are dominated by one indexed query
+READ_COST_MS = float(os.getenv('GUNICORN_READ_COST_MS', 5))
+MAX_THREADS = 8
+
+
+def measure_hash_cost_ms(method=None, rounds=2):
+    """
+    Measure the wall time of one password hash with the configured method.
+
+    Args:
+        method (str, optional): Werkzeug hash method, PASSWORD_HASH_METHOD by default
+        rounds (int): Number of hashes to average
+
+    Returns:
+        float: Milliseconds per hash
+    """
+    method = method or os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    started = time.perf_counter()
+    for _ in range(rounds):
+        generate_password_hash('gunicorn-sizing-probe', method=method)
+    return (time.perf_counter() - started) * 1000 / rounds
+
+
+def default_workers(cpu_count, hash_cost_ms):
+    """
+    Pick the worker count.
+
+    When a login hash costs much more than a read, workers are CPU-bound
+    during login bursts and extra processes only add contention and memory,
+    so one worker per core (plus one) is used. Otherwise the usual 2n+1
+    covers time spent waiting on the database.
+
+    Args:
+        cpu_count (int): Available CPUs
+        hash_cost_ms (float): Measured cost of one password hash
+
+    Returns:
+        int: Number of workers
+    """
+    if hash_cost_ms >= 10 * READ_COST_MS:
+        return cpu_count + 1
+    return 2 * cpu_count + 1
+
+
+def default_threads(hash_cost_ms):
+    """
+    Pick the thread count per worker.
+
+    A thread busy hashing should not hold up the cheap reads queued behind
+    it, so a worker gets enough threads to serve reads for the duration of
+    one hash, capped at MAX_THREADS.
+
+    Args:
+        hash_cost_ms (float): Measured cost of one password hash
+
+    Returns:
+        int: Threads per worker
+    """
+    return max(2, min(MAX_THREADS, 1 + math.ceil(hash_cost_ms / READ_COST_MS)))
+
+
+def validate_pool_budget(workers, engine_options, max_connections, reserved=0):
+    """
+    Check that every worker's pool fits the database connection limit.
+
+    Args:
+        workers (int): Number of gunicorn workers
+        engine_options (dict): SQLALCHEMY_ENGINE_OPTIONS of the app
+        max_connections (int): Database connection limit
+        reserved (int): Connections kept free for admin tools and migrations
+
+    Returns:
+        int: Peak connections the workers can open
+
+    Raises:
+        ValueError: If the peak exceeds the available connections
+    """
+    per_worker = engine_options.get('pool_size', 5) + engine_options.get('max_overflow', 10)
+    peak = workers * per_worker
+    available = max_connections - reserved
+
+    if peak > available:
+        raise ValueError(
+            f'{workers} workers x {per_worker} pooled connections = {peak} exceeds the '
+            f'{available} connections available (DB_MAX_CONNECTIONS={max_connections}, '
+            f'reserved {reserved}). Lower GUNICORN_WORKERS, DB_POOL_SIZE or DB_MAX_OVERFLOW.'
+        )
+    return peak
+
+
+# ==================== Server Socket ====================
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+wsgi_app = 'wsgi:app'
+
+# ==================== Worker Processes ====================
+_cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+_explicit_workers = os.getenv('GUNICORN_WORKERS')
+_explicit_threads = os.getenv('GUNICORN_THREADS')
+_hash_cost_ms = None if _explicit_workers and _explicit_threads else measure_hash_cost_ms()
+
+workers = int(_explicit_workers) if _explicit_workers else default_workers(_cpu_count, _hash_cost_ms)
+threads = int(_explicit_threads) if _explicit_threads else default_threads(_hash_cost_ms)
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() in ('true', '1', 'yes')
+
+# Heartbeat files on tmpfs avoid worker stalls on slow disks
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+# ==================== Server Hooks ====================
+def _flask_app(server):
+    """Return the Flask application, also when serving the ASGI wrapper."""
+    app = server.app.wsgi()
+    return getattr(app, 'flask_app', app)
+
+
+def on_starting(server):
+    """Refuse to start if the workers could exhaust the database connections."""
+    flask_config = get_config(os.getenv('FLASK_ENV'))
+    if flask_config.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        return
+
+    max_connections = os.getenv('DB_MAX_CONNECTIONS')
+    if not max_connections:
+        server.log.warning('DB_MAX_CONNECTIONS not set; skipping connection budget check')
+        return
+
+    peak = validate_pool_budget(
+        workers,
+        flask_config.SQLALCHEMY_ENGINE_OPTIONS,
+        int(max_connections),
+        int(os.getenv('DB_RESERVED_CONNECTIONS', 5))
+    )
+    server.log.info(f'Connection budget: up to {peak} of {max_connections} connections')
+
+
+def when_ready(server):
+    """Log the sizing and close any connections the preloaded app opened."""
+    cost = f'{_hash_cost_ms:.0f}ms' if _hash_cost_ms is not None else 'not measured'
+    server.log.info(
+        f'{workers} workers x {threads} threads on {_cpu_count} CPUs '
+        f'(hash cost {cost}, preload {preload_app})'
+    )
+
+    if preload_app:
+        from utils.routing import dispose_engines
+        dispose_engines(_flask_app(server))
+
+
+def pre_fork(server, worker):
+    """Move the preloaded heap out of the collector's reach before forking."""
+    if preload_app:
+        # Objects in the permanent generation are never scanned, so the
+        # collector does not touch (and un-share) pages inherited by workers
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """Drop pooled connections inherited from the master."""
+    if preload_app:
+        from utils.routing import dispose_engines
+        dispose_engines(_flask_app(server), close=False)
@@ -0,0 +1,33 @@
+"""
+HumblePOS auth API client.
+Blocking and asyncio clients for internal services, with pooled
+keep-alive connections, cached tokens that are renewed before they
+expire, and jittered retries. Depends only on the standard library.
+
+Usage:
+    from humblepos_client import AuthClient
+
+    client = AuthClient('http://localhost:5000', email='test@example.com', password='password123')
+    print(client.me())
+"""
+
+from humblepos_client.client import (
+    ApiError, AsyncAuthClient, AuthClient, AuthenticationError, RetryPolicy, token_expiry
+)
+from humblepos_client.transport import (
+    AsyncHttpTransport, AsyncWsgiTransport, HttpTransport, TransportError, WsgiTransport
+)
+
+__all__ = [
+    'ApiError',
+    'AsyncAuthClient',
+    'AsyncHttpTransport',
+    'AsyncWsgiTransport',
+    'AuthClient',
+    'AuthenticationError',
+    'HttpTransport',
+    'RetryPolicy',
+    'TransportError',
+    'WsgiTransport',
+    'token_expiry'
+]
@@ -0,0 +1,489 @@
+"""
+HumblePOS auth API clients.
+AuthClient (blocking) and AsyncAuthClient (asyncio) share token handling,
+retries and error mapping; only the I/O differs.
+"""
+
+import asyncio
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from humblepos_client.transport import AsyncHttpTransport, HttpTransport, TransportError
+
+# Responses retried with backoff. 502 and 503 mean the request was shed or
+# never reached the application, but a 504 (like a connection dropped
+# mid-response) may come after the server committed; updates carry an
+# Idempotency-Key so their retries are replayed rather than applied twice
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+
+class ApiError(Exception):
+    """
+    Raised for error responses.
+
+    Attributes:
+        status (int): HTTP status code (None when the server was unreachable)
+        message (str): Message from the response body
+    """
+
+    def __init__(self, status, message):
+        super().__init__(f'{status}: {message}' if status else message)
+        self.status = status
+        self.message = message
+
+
+class AuthenticationError(ApiError):
+    """Raised when credentials or the token are rejected."""
+
+
+def token_expiry(token):
+    """
+    Read a JWT's expiry without verifying it.
+
+    The client only uses this to decide when to log in again; the server
+    still verifies every token.
+
+    Args:
+        token (str): JWT token
+
+    Returns:
+        float: Expiry as a Unix timestamp, or None if unreadable
+    """
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    Attempt n waits a random time up to min(cap, base * 2**n), so clients
+    shed together do not all come back at the same moment. A Retry-After
+    header, when present, is the lower bound.
+
+    Attributes:
+        attempts (int): Total tries per request, including the first
+        base (float): Seconds of the first backoff ceiling
+        cap (float): Longest backoff in seconds
+    """
+
+    def __init__(self, attempts=3, base=0.1, cap=2.0):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before the next try.
+
+        Args:
+            attempt (int): Tries made so far (1 after the first)
+            retry_after (str, optional): Retry-After header value
+
+        Returns:
+            float: Seconds
+        """
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        try:
+            return max(delay, min(float(retry_after), self.cap)) if retry_after else delay
+        except ValueError:
+            return delay
+
+
+class BaseClient:
+    """
+    Token state and response handling shared by both clients.
+
+    Attributes:
+        email (str): Account used to log in, if any
+        refresh_margin (float): Log in again this many seconds before expiry
+        retry (RetryPolicy): Backoff for shed requests and broken connections
+        user (dict): User returned by the last login
+    """
+
+    def __init__(self, email=None, password=None, token=None, retry=None, refresh_margin=60):
+        self.email = email
+        self._password = password
+        self.retry = retry or RetryPolicy()
+        self.refresh_margin = refresh_margin
+        self.user = None
+        self._token = None
+        self._expires_at = None
+        if token:
+            self._store_token(token)
+
+    def _store_token(self, token):
+        self._token = token
+        self._expires_at = token_expiry(token)
+
+    def _token_fresh(self):
+        if not self._token:
+            return False
+        return self._expires_at is None or time.time() < self._expires_at - self.refresh_margin
+
+    def _can_login(self):
+        return bool(self.email and self._password)
+
+    @staticmethod
+    def _raise_for(status, body):
+        message = body.get('message', 'Request failed') if isinstance(body, dict) else 'Request failed'
+        if status == 401:
+            raise AuthenticationError(status, message)
+        raise ApiError(status, message)
+
+    @staticmethod
+    def _bearer(token):
+        return {'Authorization': f'Bearer {token}'}
+
+    @staticmethod
+    def _update_headers(version):
+        # One key per call, shared by its retries
+        headers = {'Idempotency-Key': uuid.uuid4().hex}
+        if version is not None:
+            headers['If-Match'] = f'"{version}"'
+        return headers
+
+    @staticmethod
+    def _update_body(first_name, last_name):
+        body = {}
+        if first_name is not None:
+            body['first_name'] = first_name
+        if last_name is not None:
+            body['last_name'] = last_name
+        return body
+
+    def _credentials(self, email, password):
+        if email is not None:
+            self.email, self._password = email, password
+        if not self._can_login():
+            raise AuthenticationError(None, 'No credentials to log in with')
+        return {'email': self.email, 'password': self._password}
+
+
+class AuthClient(BaseClient):
+    """
+    Blocking client for the HumblePOS auth API.
+
+    Logs in on first use and again shortly before the token expires or
+    when the server rejects it, retries shed requests and broken
+    connections with jittered backoff, and reuses pooled connections.
+    Safe to share between threads.
+
+    Usage:
+        with AuthClient('http://localhost:5000', email='test@example.com', password='password123') as client:
+            user = client.me()
+            client.update_profile(first_name='Ada', version=user['version'])
+
+    Attributes:
+        transport: HttpTransport, WsgiTransport or compatible object
+        verifier: Optional batch token verifier (e.g. the sidecar's VerifyClient)
+    """
+
+    def __init__(self, base_url=None, email=None, password=None, token=None, transport=None,
+                 pool_size=10, timeout=10, retry=None, refresh_margin=60, verifier=None):
+        super().__init__(email, password, token, retry, refresh_margin)
+        if transport is None:
+            if base_url is None:
+                raise ValueError('Either base_url or transport is required')
+            transport = HttpTransport(base_url, pool_size=pool_size, timeout=timeout)
+        self.transport = transport
+        self.verifier = verifier
+        self._pool_size = pool_size
+        self._login_lock = threading.Lock()
+
+    def _send(self, method, path, body=None, headers=None):
+        """Send with retries; returns (status, headers, body)."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                status, response_headers, data = self.transport.request(method, path, body, headers)
+            except TransportError as e:
+                if attempt >= self.retry.attempts:
+                    raise ApiError(None, str(e)) from e
+                time.sleep(self.retry.delay(attempt))
+                continue
+            if status in RETRY_STATUSES and attempt < self.retry.attempts:
+                time.sleep(self.retry.delay(attempt, response_headers.get('retry-after')))
+                continue
+            return status, response_headers, data
+
+    def login(self, email=None, password=None):
+        """
+        Log in and cache the token.
+
+        Args:
+            email (str, optional): Replaces the configured account
+            password (str, optional): Its password
+
+        Returns:
+            str: JWT token
+        """
+        status, _, body = self._send('POST', '/auth/login', self._credentials(email, password))
+        if status != 200:
+            self._raise_for(status, body)
+        self._store_token(body['token'])
+        self.user = body.get('user')
+        return self._token
+
+    @property
+    def token(self):
+        """A token valid for at least refresh_margin seconds, logging in if needed."""
+        if not self._token_fresh() and self._can_login():
+            # One thread logs in; the others wait and use its token
+            with self._login_lock:
+                if not self._token_fresh():
+                    self.login()
+        if not self._token:
+            raise AuthenticationError(None, 'Not logged in')
+        return self._token
+
+    def _authorized(self, method, path, body=None, headers=None):
+        token = self.token
+        status, response_headers, data = self._send(method, path, body, dict(headers or {}, **self._bearer(token)))
+        # The token may have been revoked or the secret rotated; log in once more
+        if status == 401 and self._can_login():
+            with self._login_lock:
+                if self._token == token:
+                    self.login()
+            status, response_headers, data = self._send(method, path, body,
+                                                        dict(headers or {}, **self._bearer(self._token)))
+        if status >= 400:
+            self._raise_for(status, data)
+        return response_headers, data
+
+    def me(self):
+        """
+        Get the logged-in user.
+
+        Returns:
+            dict: User
+        """
+        return self._authorized('GET', '/user/me')[1]['user']
+
+    def update_profile(self, first_name=None, last_name=None, version=None):
+        """
+        Update the logged-in user's names.
+
+        Args:
+            first_name (str, optional): New first name
+            last_name (str, optional): New last name
+            version (int, optional): Expected version; the update fails with
+                412 if the profile changed since
+
+        Returns:
+            dict: Updated user
+        """
+        return self._authorized('PATCH', '/user/update', self._update_body(first_name, last_name),
+                                self._update_headers(version))[1]['user']
+
+    def user_for_token(self, token):
+        """
+        Resolve another caller's token to its user.
+
+        Args:
+            token (str): JWT token
+
+        Returns:
+            dict: User, or None if the token is invalid
+        """
+        status, _, body = self._send('GET', '/user/me', headers=self._bearer(token))
+        if status == 401:
+            return None
+        if status >= 400:
+            self._raise_for(status, body)
+        return body['user']
+
+    def users_for_tokens(self, tokens):
+        """
+        Resolve many tokens to users.
+
+        Uses one batched request when a verifier (the verification sidecar)
+        is configured, otherwise concurrent /user/me calls over the pool.
+
+        Args:
+            tokens (list): JWT tokens
+
+        Returns:
+            list: User per token, None where invalid
+        """
+        if self.verifier is not None:
+            return self.verifier.verify_many(tokens, with_user=True)
+        if len(tokens) <= 1:
+            return [self.user_for_token(token) for token in tokens]
+        with ThreadPoolExecutor(max_workers=min(self._pool_size, len(tokens))) as executor:
+            return list(executor.map(self.user_for_token, tokens))
+
+    def close(self):
+        """Close pooled connections."""
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncAuthClient(BaseClient):
+    """
+    asyncio client for the HumblePOS auth API; same behavior as AuthClient.
+
+    Usage:
+        async with AsyncAuthClient('http://localhost:5000', email=..., password=...) as client:
+            user = await client.me()
+
+    Attributes:
+        transport: AsyncHttpTransport, AsyncWsgiTransport or compatible object
+        verifier: Optional batch token verifier, called in a worker thread
+    """
+
+    def __init__(self, base_url=None, email=None, password=None, token=None, transport=None,
+                 pool_size=10, timeout=10, retry=None, refresh_margin=60, verifier=None):
+        super().__init__(email, password, token, retry, refresh_margin)
+        if transport is None:
+            if base_url is None:
+                raise ValueError('Either base_url or transport is required')
+            transport = AsyncHttpTransport(base_url, pool_size=pool_size, timeout=timeout)
+        self.transport = transport
+        self.verifier = verifier
+        self._login_lock = None
+
+    async def _send(self, method, path, body=None, headers=None):
+        """Send with retries; returns (status, headers, body)."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                status, response_headers, data = await self.transport.request(method, path, body, headers)
+            except TransportError as e:
+                if attempt >= self.retry.attempts:
+                    raise ApiError(None, str(e)) from e
+                await asyncio.sleep(self.retry.delay(attempt))
+                continue
+            if status in RETRY_STATUSES and attempt < self.retry.attempts:
+                await asyncio.sleep(self.retry.delay(attempt, response_headers.get('retry-after')))
+                continue
+            return status, response_headers, data
+
+    async def login(self, email=None, password=None):
+        """
+        Log in and cache the token.
+
+        Args:
+            email (str, optional): Replaces the configured account
+            password (str, optional): Its password
+
+        Returns:
+            str: JWT token
+        """
+        status, _, body = await self._send('POST', '/auth/login', self._credentials(email, password))
+        if status != 200:
+            self._raise_for(status, body)
+        self._store_token(body['token'])
+        self.user = body.get('user')
+        return self._token
+
+    async def get_token(self):
+        """
+        Return a token valid for at least refresh_margin seconds.
+
+        Concurrent callers share one login.
+
+        Returns:
+            str: JWT token
+        """
+        if not self._token_fresh() and self._can_login():
+            if self._login_lock is None:
+                self._login_lock = asyncio.Lock()
+            async with self._login_lock:
+                if not self._token_fresh():
+                    await self.login()
+        if not self._token:
+            raise AuthenticationError(None, 'Not logged in')
+        return self._token
+
+    async def _authorized(self, method, path, body=None, headers=None):
+        token = await self.get_token()
+        status, response_headers, data = await self._send(method, path, body,
+                                                          dict(headers or {}, **self._bearer(token)))
+        # The token may have been revoked or the secret rotated; log in once more
+        if status == 401 and self._can_login():
+            if self._login_lock is None:
+                self._login_lock = asyncio.Lock()
+            async with self._login_lock:
+                if self._token == token:
+                    await self.login()
+            status, response_headers, data = await self._send(method, path, body,
+                                                              dict(headers or {}, **self._bearer(self._token)))
+        if status >= 400:
+            self._raise_for(status, data)
+        return response_headers, data
+
+    async def me(self):
+        """
+        Get the logged-in user.
+
+        Returns:
+            dict: User
+        """
+        return (await self._authorized('GET', '/user/me'))[1]['user']
+
+    async def update_profile(self, first_name=None, last_name=None, version=None):
+        """
+        Update the logged-in user's names (see AuthClient.update_profile).
+
+        Returns:
+            dict: Updated user
+        """
+        return (await self._authorized('PATCH', '/user/update', self._update_body(first_name, last_name),
+                                       self._update_headers(version)))[1]['user']
+
+    async def user_for_token(self, token):
+        """
+        Resolve another caller's token to its user.
+
+        Args:
+            token (str): JWT token
+
+        Returns:
+            dict: User, or None if the token is invalid
+        """
+        status, _, body = await self._send('GET', '/user/me', headers=self._bearer(token))
+        if status == 401:
+            return None
+        if status >= 400:
+            self._raise_for(status, body)
+        return body['user']
+
+    async def users_for_tokens(self, tokens):
+        """
+        Resolve many tokens to users (see AuthClient.users_for_tokens).
+
+        Args:
+            tokens (list): JWT tokens
+
+        Returns:
+            list: User per token, None where invalid
+        """
+        if self.verifier is not None:
+            return await asyncio.to_thread(self.verifier.verify_many, tokens, True)
+        return list(await asyncio.gather(*(self.user_for_token(token) for token in tokens)))
+
+    async def close(self):
+        """Close pooled connections."""
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,305 @@
+"""
+Client transports.
+Send one HTTP request and return (status, headers, parsed JSON body).
+The HTTP transports keep a pool of keep-alive connections; the WSGI
+transports call an application in-process, for tests and tools.
+"""
+
+import asyncio
+import http.client
+import io
+import json
+import queue
+import sys
+from urllib.parse import urlsplit
+
+
+class TransportError(Exception):
+    """Raised when the server could not be reached or the connection broke."""
+
+
+def encode_body(body, headers):
+    """Serialize a JSON body and add its headers."""
+    headers = dict(headers or {})
+    headers.setdefault('Accept', 'application/json')
+    if body is None:
+        return b'', headers
+    payload = json.dumps(body).encode('utf-8')
+    headers['Content-Type'] = 'application/json'
+    return payload, headers
+
+
+def decode_body(data):
+    """Parse a JSON response body; non-JSON bodies come back as None."""
+    if not data:
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+class HttpTransport:
+    """
+    Blocking HTTP/1.1 transport with a pool of keep-alive connections.
+
+    Up to pool_size idle connections are kept for reuse; more requests than
+    that can run at once, the extra connections are just not kept.
+
+    Attributes:
+        base_url (str): e.g. http://localhost:5000
+        pool_size (int): Idle connections kept open
+        timeout (float): Socket timeout in seconds
+    """
+
+    def __init__(self, base_url, pool_size=10, timeout=10):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._secure = parts.scheme == 'https'
+        self._host = parts.hostname
+        self._port = parts.port
+        self._prefix = parts.path.rstrip('/')
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+
+    def _connection(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            connection_class = http.client.HTTPSConnection if self._secure else http.client.HTTPConnection
+            return connection_class(self._host, self._port, timeout=self.timeout)
+
+    def _release(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Send a request on a pooled connection.
+
+        Returns:
+            tuple: (status, headers dict with lowercase names, parsed JSON body)
+        """
+        payload, headers = encode_body(body, headers)
+        connection = self._connection()
+        try:
+            connection.request(method, self._prefix + path, body=payload or None, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise TransportError(f'{method} {path} failed: {e}') from e
+
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        return response.status, response_headers, decode_body(data)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def wsgi_environ(method, path, payload, headers):
+    """Build a WSGI environ for an in-process request."""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in headers.items():
+        key = name.upper().replace('-', '_')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        else:
+            environ[f'HTTP_{key}'] = value
+    return environ
+
+
+class WsgiTransport:
+    """
+    Transport calling a WSGI application in-process.
+
+    Usage:
+        client = AuthClient(transport=WsgiTransport(create_app('testing')))
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Call the application.
+
+        Returns:
+            tuple: (status, headers dict with lowercase names, parsed JSON body)
+        """
+        payload, headers = encode_body(body, headers)
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = {name.lower(): value for name, value in response_headers}
+
+        result = self.app(wsgi_environ(method, path, payload, headers), start_response)
+        try:
+            data = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return started['status'], started['headers'], decode_body(data)
+
+    def close(self):
+        """Nothing to release."""
+
+
+class AsyncHttpTransport:
+    """
+    asyncio HTTP/1.1 transport with a pool of keep-alive connections.
+
+    At most pool_size requests are in flight at once; the rest wait for a
+    connection.
+
+    Attributes:
+        base_url (str): e.g. http://localhost:5000
+        pool_size (int): Connections kept open
+        timeout (float): Seconds allowed per request
+    """
+
+    def __init__(self, base_url, pool_size=10, timeout=10):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._secure = parts.scheme == 'https'
+        self._host = parts.hostname
+        self._port = parts.port or (443 if self._secure else 80)
+        self._prefix = parts.path.rstrip('/')
+        self._idle = []
+        self._slots = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """
+        Send a request on a pooled connection.
+
+        Returns:
+            tuple: (status, headers dict with lowercase names, parsed JSON body)
+        """
+        # Created lazily so the transport can be built outside a running loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+        payload, headers = encode_body(body, headers)
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(
+                        asyncio.open_connection(self._host, self._port, ssl=self._secure or None), self.timeout
+                    )
+                status, response_headers, data, keep_alive = await asyncio.wait_for(
+                    self._exchange(connection, method, path, payload, headers), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                if connection is not None:
+                    connection[1].close()
+                raise TransportError(f'{method} {path} failed: {e}') from e
+
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+        return status, response_headers, decode_body(data)
+
+    async def _exchange(self, connection, method, path, payload, headers):
+        reader, writer = connection
+        lines = [f'{method} {self._prefix + path} HTTP/1.1', f'Host: {self._host}:{self._port}',
+                 f'Content-Length: {len(payload)}']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('Server closed the connection')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+
+        response_headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = response_headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+        if method == 'HEAD' or status in ('204', '304'):
+            data = b''
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            data = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            data = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return int(status), response_headers, data, keep_alive
+
+    async def close(self):
+        """Close every idle connection."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class AsyncWsgiTransport:
+    """
+    Async transport calling a WSGI application in a worker thread.
+
+    Usage:
+        client = AsyncAuthClient(transport=AsyncWsgiTransport(create_app('testing')))
+    """
+
+    def __init__(self, app):
+        self._transport = WsgiTransport(app)
+
+    async def request(self, method, path, body=None, headers=None):
+        """
+        Call the application without blocking the event loop.
+
+        Returns:
+            tuple: (status, headers dict with lowercase names, parsed JSON body)
+        """
+        return await asyncio.to_thread(self._transport.request, method, path, body, headers)
+
+    async def close(self):
+        """Nothing to release."""
@@ -7,8 +7,9 @@ Contains all SQLAlchemy model definitions.
 from datetime import datetime
 import uuid
 from flask_sqlalchemy import SQLAlchemy
+from utils.routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(db.Model):
@@ -22,10 +23,23 @@ class User(db.Model):
         first_name (str): User's first name
         last_name (str): User's last name
         updated_at (datetime): Timestamp of last update
+        version (int): Row version used for optimistic concurrency control
+        last_login_at (datetime): Last successful login (written behind)
+        last_seen_at (datetime): Last authenticated request (written behind)
+        search_name (str): Normalized "first last", for prefix search
+        search_last_name (str): Normalized last name, for prefix search
+        search_email (str): Normalized email, for prefix search
     """
     
     __tablename__ = 'users'
     
+    # Users may be spread over shard binds (see utils.sharding). The
+    # (updated_at, id) index serves the admin listing's keyset pagination.
+    __table_args__ = (
+        db.Index('ix_users_updated_at_id', 'updated_at', 'id'),
+        {'info': {'sharded': True}}
+    )
+    
     id = db.Column(
         db.String(36),
         primary_key=True,
@@ -55,11 +69,52 @@ class User(db.Model):
         default=datetime.utcnow,
         onupdate=datetime.utcnow
     )
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default='1'
+    )
+    
+    # Maintained by utils.activity, which persists them in bulk a few
+    # seconds late; never written through the session
+    last_login_at = db.Column(
+        db.DateTime,
+        nullable=True
+    )
+    last_seen_at = db.Column(
+        db.DateTime,
+        nullable=True,
+        index=True
+    )
+    
+    # Lowercased, accent-free copies for indexed prefix search, kept in
+    # step on insert and by every profile update (see utils.search)
+    search_name = db.Column(
+        db.String(201),
+        nullable=True,
+        index=True
+    )
+    search_last_name = db.Column(
+        db.String(100),
+        nullable=True,
+        index=True
+    )
+    search_email = db.Column(
+        db.String(255),
+        nullable=True,
+        index=True
+    )
     
     def __repr__(self):
         """String representation of User object."""
         return f'<User {self.email}>'
     
+    @property
+    def etag(self):
+        """Strong entity tag derived from the row version."""
+        return f'"{self.version}"'
+    
     def to_dict(self, include_sensitive=False):
         """
         Convert user object to dictionary.
@@ -75,7 +130,8 @@ class User(db.Model):
             'email': self.email,
             'first_name': self.first_name,
             'last_name': self.last_name,
-            'updated_at': self.updated_at.isoformat()
+            'updated_at': self.updated_at.isoformat(),
+            'version': self.version
         }
         
         if include_sensitive:
@@ -83,3 +139,148 @@ class User(db.Model):
             
         return data
 
+
+class UserView:
+    """
+    Immutable read model of a user for read-only requests.
+    
+    Holds only the columns needed to serve a profile, in slots, without
+    the identity map, instance state and attribute instrumentation of an
+    ORM User. Load it with a Core select of UserView.__slots__ (see
+    utils.auth.find_user) and use User only where the row is changed.
+    
+    Attributes:
+        id (str): UUID primary key
+        email (str): User email address
+        first_name (str): User's first name
+        last_name (str): User's last name
+        updated_at (datetime): Timestamp of last update
+        version (int): Row version
+    """
+    
+    __slots__ = ('id', 'email', 'first_name', 'last_name', 'updated_at', 'version')
+    
+    def __init__(self, id, email, first_name, last_name, updated_at, version):
+        setattr_ = object.__setattr__
+        setattr_(self, 'id', id)
+        setattr_(self, 'email', email)
+        setattr_(self, 'first_name', first_name)
+        setattr_(self, 'last_name', last_name)
+        setattr_(self, 'updated_at', updated_at)
+        setattr_(self, 'version', version)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('UserView is read-only')
+    
+    def __repr__(self):
+        """String representation of UserView object."""
+        return f'<UserView {self.email}>'
+    
+    @property
+    def etag(self):
+        """Strong entity tag derived from the row version."""
+        return f'"{self.version}"'
+    
+    def to_dict(self):
+        """
+        Convert to the dictionary returned by User.to_dict().
+        
+        Returns:
+            dict: User data as dictionary
+        """
+        return {
+            'id': self.id,
+            'email': self.email,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'updated_at': self.updated_at.isoformat(),
+            'version': self.version
+        }
+
+
+class UserSearchGram(db.Model):
+    """
+    Trigram index for substring search over user names and emails.
+    
+    One row per distinct trigram of a user's normalized name words and
+    email local part. Only maintained while SEARCH_NGRAM_ENABLED is set.
+    
+    Attributes:
+        gram (str): Three normalized characters
+        user_id (str): User whose name or email contains the trigram
+    """
+    
+    __tablename__ = 'user_search_grams'
+    
+    # Grams live on the shard of their user
+    __table_args__ = {'info': {'sharded': True}}
+    
+    gram = db.Column(db.String(3), primary_key=True)
+    user_id = db.Column(db.String(36), primary_key=True, index=True)
+    
+    def __repr__(self):
+        """String representation of UserSearchGram object."""
+        return f'<UserSearchGram {self.gram} {self.user_id}>'
+
+
+class LoginAudit(db.Model):
+    """
+    Login audit trail, one row per login attempt.
+    
+    Rows are written in batches by utils.audit, not through the session.
+    
+    Attributes:
+        id (int): Autoincrement primary key
+        user_id (str): Authenticated user, if the login succeeded
+        email (str): Email the login was attempted with
+        ip_address (str): Client address
+        user_agent (str): Client User-Agent header
+        outcome (str): success, invalid_credentials, invalid_request or error
+        latency_ms (float): Time spent handling the login
+        created_at (datetime): Time of the attempt
+    """
+    
+    __tablename__ = 'login_audit'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.String(36), nullable=True, index=True)
+    email = db.Column(db.String(255), nullable=True)
+    ip_address = db.Column(db.String(45), nullable=True)
+    user_agent = db.Column(db.String(255), nullable=True)
+    outcome = db.Column(db.String(32), nullable=False)
+    latency_ms = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        """String representation of LoginAudit object."""
+        return f'<LoginAudit {self.outcome} {self.email}>'
+
+
+class IdempotencyKey(db.Model):
+    """
+    Response stored for an Idempotency-Key, shared by every worker.
+    
+    Rows are written by utils.idempotency, not through the session. A row
+    without a status_code is a request still in progress.
+    
+    Attributes:
+        key (str): SHA-256 of the key, method, path and credentials
+        fingerprint (str): SHA-256 of the request the key was first used with
+        status_code (int): Stored response status, None while in progress
+        headers (str): Stored response headers as JSON
+        body (str): Stored response body
+        expires_at (datetime): When the key may be used for a new request
+    """
+    
+    __tablename__ = 'idempotency_keys'
+    
+    key = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    headers = db.Column(db.Text, nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        """String representation of IdempotencyKey object."""
+        return f'<IdempotencyKey {self.key} {self.status_code}>'
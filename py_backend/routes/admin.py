@@ -0,0 +1,232 @@
+# ==================== routes/admin.py ====================
+"""
+Admin routes module.
+Contains user listing, export and batch update endpoints for operations
+tooling.
+"""
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from utils.auth import admin_required, invalidate_cached_users
+from utils.idempotency import idempotent
+from utils.profile_batch import apply_profile_batch, parse_records
+from utils.replicas import stick_to_primary
+from utils.user_listing import (
+    EXPORT_FORMATS, decode_cursor, export_chunks, iter_users, list_users, parse_timestamp
+)
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+def parse_listing_args(args):
+    """
+    Parse the cursor and updated_at range shared by listing and export.
+
+    Args:
+        args (MultiDict): Query string arguments
+
+    Returns:
+        tuple: (filters dict for list_users/iter_users, error message or None)
+    """
+    filters = {}
+
+    try:
+        if args.get('cursor'):
+            filters['after'] = decode_cursor(args['cursor'])
+    except ValueError:
+        return None, 'Invalid cursor'
+
+    for name, key in (('updated_since', 'since'), ('updated_before', 'until')):
+        if args.get(name):
+            try:
+                filters[key] = parse_timestamp(args[name])
+            except ValueError:
+                return None, f'{name} must be an ISO 8601 timestamp'
+
+    return filters, None
+
+
+@admin_bp.route('/users', methods=['GET'])
+@admin_required
+def list_users_page():
+    """
+    List users ordered by (updated_at, id), one page at a time.
+
+    Headers:
+        X-Admin-Key: <ADMIN_API_KEY>
+
+    Query Parameters:
+        limit: Page size (default ADMIN_PAGE_SIZE, at most ADMIN_MAX_PAGE_SIZE)
+        cursor: next_cursor of the previous page
+        updated_since: Only users updated at or after this ISO 8601 time
+        updated_before: Only users updated before this ISO 8601 time
+
+    Returns:
+        200: Users and next_cursor (null on the last page)
+        400: Invalid query parameters
+        401: Invalid admin key
+        404: Admin API disabled
+    """
+    filters, error = parse_listing_args(request.args)
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        }), 400
+
+    max_limit = current_app.config.get('ADMIN_MAX_PAGE_SIZE', 1000)
+    limit = request.args.get('limit', str(current_app.config.get('ADMIN_PAGE_SIZE', 100)))
+    if not (limit.isascii() and limit.isdigit()) or not 1 <= int(limit) <= max_limit:
+        return jsonify({
+            'success': False,
+            'message': f'limit must be between 1 and {max_limit}'
+        }), 400
+
+    users, next_cursor = list_users(int(limit), **filters)
+
+    return jsonify({
+        'success': True,
+        'users': users,
+        'next_cursor': next_cursor
+    }), 200
+
+
+@admin_bp.route('/users/export', methods=['GET'])
+@admin_required
+def export_users():
+    """
+    Stream every matching user as NDJSON or CSV.
+
+    Rows are read from a server-side cursor and written as they arrive, so
+    the export runs in constant memory. For incremental syncs, pass the
+    previous run's updated_before as updated_since.
+
+    Headers:
+        X-Admin-Key: <ADMIN_API_KEY>
+
+    Query Parameters:
+        format: ndjson (default) or csv
+        cursor: Resume after a row (as from the listing)
+        updated_since: Only users updated at or after this ISO 8601 time
+        updated_before: Only users updated before this ISO 8601 time
+
+    Returns:
+        200: Streamed export
+        400: Invalid query parameters
+        401: Invalid admin key
+        404: Admin API disabled
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'message': f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        }), 400
+
+    filters, error = parse_listing_args(request.args)
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        }), 400
+
+    batch_size = current_app.config.get('ADMIN_EXPORT_BATCH_SIZE', 1000)
+
+    def generate():
+        try:
+            yield from export_chunks(iter_users(batch_size=batch_size, **filters), export_format, batch_size)
+        except Exception as e:
+            # Headers are already sent; a truncated body is all that is left
+            current_app.logger.error(f'User export error: {str(e)}')
+            raise
+
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=users.{export_format}'
+    return response
+
+
+@admin_bp.route('/users', methods=['PATCH'])
+@admin_required
+@idempotent
+def batch_update_users():
+    """
+    Rename many users in one transaction.
+
+    Every record is validated first; invalid records are reported and the
+    rest are applied in chunks of ADMIN_BATCH_CHUNK_SIZE, one UPDATE per
+    chunk. Cached snapshots of the updated users are invalidated together
+    after the commit.
+
+    Headers:
+        X-Admin-Key: <ADMIN_API_KEY>
+        Idempotency-Key: <unique key>  // optional, retries replay the response
+
+    Request Body:
+        {
+            "users": [
+                {"id": "...", "first_name": "John", "last_name": "Doe", "version": 3}
+            ]
+        }
+        first_name and last_name are each optional (at least one is
+        required); version, when given, must match the stored row version.
+
+    Returns:
+        200: Per-record results in request order, with status updated,
+            invalid, not_found or conflict
+        400: Missing, empty or oversized batch
+        401: Invalid admin key
+        404: Admin API disabled
+        409: A request with the same Idempotency-Key is still running
+        422: Idempotency-Key was used with a different request
+        500: Server error; nothing was written
+    """
+    data = request.get_json(silent=True)
+    records = data.get('users') if isinstance(data, dict) else None
+    max_records = current_app.config.get('ADMIN_BATCH_MAX_RECORDS', 1000)
+    if not isinstance(records, list) or not records:
+        return jsonify({
+            'success': False,
+            'message': 'users must be a non-empty list'
+        }), 400
+    if len(records) > max_records:
+        return jsonify({
+            'success': False,
+            'message': f'At most {max_records} users per batch'
+        }), 400
+
+    changes, errors = parse_records(records)
+
+    try:
+        outcomes = apply_profile_batch(changes, current_app.config.get('ADMIN_BATCH_CHUNK_SIZE', 200))
+    except Exception as e:
+        current_app.logger.error(f'Batch user update error: {str(e)}')
+        return jsonify({
+            'success': False,
+            'message': 'An error occurred while updating users'
+        }), 500
+
+    updated = {user_id: version for user_id, (status, version) in outcomes.items() if status == 'updated'}
+    for user_id in updated:
+        stick_to_primary(user_id)
+    invalidate_cached_users(updated)
+
+    messages = {'not_found': 'User not found', 'conflict': 'User has been modified; reload and retry'}
+    results = [None] * len(records)
+    for index, message in errors.items():
+        record = records[index]
+        results[index] = {
+            'id': record.get('id') if isinstance(record, dict) else None,
+            'status': 'invalid',
+            'message': message
+        }
+    for user_id, change in changes.items():
+        status, version = outcomes[user_id]
+        results[change['index']] = dict(
+            {'id': user_id, 'status': status, 'version': version},
+            **({'message': messages[status]} if status in messages else {})
+        )
+
+    return jsonify({
+        'success': True,
+        'updated': len(updated),
+        'results': results
+    }), 200
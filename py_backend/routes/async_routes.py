@@ -0,0 +1,221 @@
+# ==================== routes/async_routes.py ====================
+"""
+Async routes module.
+Native asyncio versions of the hot endpoints served by the ASGI entry
+point: login, current user and profile update. They behave like their
+Flask counterparts in routes/auth.py and routes/user.py; every other
+route is served by the Flask application.
+"""
+
+import time
+from flask import current_app, request
+from routes.user import parse_if_match
+from utils.activity import touch_user
+from utils.async_db import async_find_user, async_versioned_update, run_cache_call
+from utils.audit import record_login
+from utils.auth import READ_ONLY_METHODS, decode_token, generate_token, invalidate_cached_user, verify_password
+from utils.idempotency import run_idempotent
+from utils.replicas import stick_to_primary
+from utils.validators import validate_email, validate_name
+
+
+def error(message, status_code):
+    """Return the standard failure body with a status code."""
+    return {'success': False, 'message': message}, status_code, []
+
+
+async def authenticate(view=False):
+    """
+    Async counterpart of the token_required decorator.
+
+    Args:
+        view (bool): Load a read-only UserView instead of a User
+
+    Returns:
+        tuple: (user, None) when authenticated, or (None, error response)
+    """
+    token = None
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        token = auth_header.split(' ')[1]
+
+    if not token:
+        return None, error('Authentication token is missing', 401)
+
+    payload = decode_token(token)
+    if not payload:
+        return None, error('Invalid or expired token', 401)
+
+    # Safe methods may read from a replica
+    user_id = payload.get('user_id')
+    current_user = await async_find_user(
+        'id',
+        user_id,
+        replica=request.method in READ_ONLY_METHODS,
+        sticky_key=user_id,
+        view=view
+    )
+    if not current_user:
+        return None, error('User not found', 401)
+
+    # Remember the user was active; written to the database in bulk later
+    touch_user(user_id)
+    return current_user, None
+
+
+async def login():
+    """
+    Authenticate user and return JWT token (see routes.auth.login).
+
+    The password hash is verified on the hashing executor, so the event
+    loop keeps serving other requests meanwhile.
+
+    Returns:
+        tuple: (body, status code, extra headers)
+    """
+    # Shed logins up front while the hashing backlog is too deep to clear
+    # in time, like the admission controller does for the WSGI app
+    hash_executor = current_app.extensions['hash_executor']
+    if not hash_executor.check()[0]:
+        return {
+            'success': False,
+            'message': 'Server is busy, please retry shortly'
+        }, 503, [('Retry-After', '1')]
+
+    started = time.perf_counter()
+    email = None
+    try:
+        data = request.get_json(silent=True)
+
+        if not data:
+            record_login('invalid_request', started)
+            return error('No data provided', 400)
+
+        email = data.get('email', '').strip().lower()
+        password = data.get('password', '')
+
+        if not email or not password:
+            record_login('invalid_request', started, email=email)
+            return error('Email and password are required', 400)
+
+        if not validate_email(email):
+            record_login('invalid_request', started, email=email)
+            return error('Invalid email format', 400)
+
+        user = await async_find_user('email', email)
+
+        # Same error message for both cases to prevent user enumeration
+        if not user or not await hash_executor.run(verify_password, user.password, password):
+            record_login('invalid_credentials', started, email=email)
+            return error('Invalid email or password', 401)
+
+        token = generate_token(user.id)
+        record_login('success', started, email=email, user_id=user.id)
+        touch_user(user.id, login=True)
+
+        return {
+            'success': True,
+            'message': 'Login successful',
+            'token': token,
+            'user': user.to_dict()
+        }, 200, []
+
+    except Exception as e:
+        current_app.logger.error(f'Login error: {str(e)}')
+        record_login('error', started, email=email)
+        return error('An error occurred during login', 500)
+
+
+async def get_current_user():
+    """
+    Get current authenticated user's information (see routes.user.get_current_user).
+
+    Returns:
+        tuple: (body, status code, extra headers)
+    """
+    current_user, failure = await authenticate(view=True)
+    if failure:
+        return failure
+
+    return {'success': True, 'user': current_user.to_dict()}, 200, [('ETag', current_user.etag)]
+
+
+async def update_user():
+    """
+    Update user's first name and/or last name (see routes.user.update_user).
+
+    Returns:
+        tuple: (body, status code, extra headers)
+    """
+    current_user, failure = await authenticate()
+    if failure:
+        return failure
+
+    return await run_idempotent(lambda: apply_update(current_user))
+
+
+async def apply_update(current_user):
+    """
+    Validate the body and write the update for an authenticated user.
+
+    Returns:
+        tuple: (body, status code, extra headers)
+    """
+    try:
+        is_valid, if_match = parse_if_match(request.headers.get('If-Match'))
+        if not is_valid:
+            return error('Invalid If-Match header', 400)
+
+        data = request.get_json(silent=True)
+        if not data:
+            return error('No data provided', 400)
+
+        first_name = data.get('first_name', '').strip() if data.get('first_name') else None
+        last_name = data.get('last_name', '').strip() if data.get('last_name') else None
+
+        if not first_name and not last_name:
+            return error('At least one field (first_name or last_name) is required', 400)
+
+        changes = {}
+
+        if first_name:
+            is_valid, error_msg = validate_name(first_name, "First name")
+            if not is_valid:
+                return error(error_msg, 400)
+            changes['first_name'] = first_name
+
+        if last_name:
+            is_valid, error_msg = validate_name(last_name, "Last name")
+            if not is_valid:
+                return error(error_msg, 400)
+            changes['last_name'] = last_name
+
+        if if_match is not None and if_match != current_user.version:
+            return error('User has been modified; reload and retry', 412)
+
+        expected_version = current_user.version if if_match is None else if_match
+
+        if not await async_versioned_update(current_user, expected_version, changes):
+            return error('User has been modified; reload and retry', 409 if if_match is None else 412)
+
+        user_data = current_user.to_dict()
+        stick_to_primary(user_data['id'])
+        await run_cache_call(invalidate_cached_user, user_data['id'], user_data['version'])
+
+        return {
+            'success': True,
+            'message': 'User updated successfully',
+            'user': user_data
+        }, 200, [('ETag', current_user.etag)]
+
+    except Exception as e:
+        current_app.logger.error(f'Update error: {str(e)}')
+        return error('An error occurred while updating user', 500)
+
+
+# (method, path) -> handler; everything else goes to the Flask application
+ROUTES = {
+    ('POST', '/auth/login'): login,
+    ('GET', '/user/me'): get_current_user,
+    ('PATCH', '/user/update'): update_user
+}
@@ -4,9 +4,13 @@ Authentication routes module.
 Contains login and authentication-related endpoints.
 """
 
+import time
 from flask import Blueprint, request, jsonify, current_app
-from models import db, User
-from utils.auth import verify_password, generate_token
+from models import db
+from utils.activity import touch_user
+from utils.audit import record_login
+from utils.auth import find_user, verify_password, generate_token
+from utils.sharding import bind_user_shard
 from utils.validators import validate_email
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -28,12 +32,17 @@ def login():
         400: Invalid request data
         401: Invalid credentials
         500: Server error
+    
+    Every attempt is recorded in the login audit trail.
     """
+    started = time.perf_counter()
+    email = None
     try:
         # Parse request data
         data = request.get_json()
         
         if not data:
+            record_login('invalid_request', started)
             return jsonify({
                 'success': False,
                 'message': 'No data provided'
@@ -45,6 +54,7 @@ def login():
         
         # Validate required fields
         if not email or not password:
+            record_login('invalid_request', started, email=email)
             return jsonify({
                 'success': False,
                 'message': 'Email and password are required'
@@ -52,17 +62,20 @@ def login():
         
         # Validate email format
         if not validate_email(email):
+            record_login('invalid_request', started, email=email)
             return jsonify({
                 'success': False,
                 'message': 'Invalid email format'
             }), 400
         
-        # Find user by email
-        user = User.query.filter_by(email=email).first()
+        # Find user by email (read-only, may be served by a replica)
+        bind_user_shard(db.session, email=email)
+        user = find_user(db.session, 'email', email)
         
         # Check if user exists and password is correct
         # Use same error message for both cases to prevent user enumeration
         if not user or not verify_password(user.password, password):
+            record_login('invalid_credentials', started, email=email)
             return jsonify({
                 'success': False,
                 'message': 'Invalid email or password'
@@ -70,6 +83,8 @@ def login():
         
         # Generate JWT token
         token = generate_token(user.id)
+        record_login('success', started, email=email, user_id=user.id)
+        touch_user(user.id, login=True)
         
         # Return success response
         return jsonify({
@@ -81,6 +96,7 @@ def login():
         
     except Exception as e:
         current_app.logger.error(f'Login error: {str(e)}')
+        record_login('error', started, email=email)
         return jsonify({
             'success': False,
             'message': 'An error occurred during login'
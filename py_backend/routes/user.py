@@ -4,16 +4,130 @@ User routes module.
 Contains user profile management endpoints.
 """
 
+from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app
-from models import db
-from utils.auth import token_required
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+from models import db, User
+from utils.auth import invalidate_cached_user, token_required
+from utils.idempotency import idempotent
+from utils.replicas import stick_to_primary
+from utils.search import (
+    gram_statements, ngrams_enabled, normalize_search_text, query_grams, search_columns, search_users
+)
 from utils.validators import validate_name
 
 user_bp = Blueprint('user', __name__, url_prefix='/user')
 
 
+# Version reported for a tag that can never match (weak, or not ASCII digits);
+# no row has it
+NO_MATCH = 0
+
+
+def parse_if_match(header_value):
+    """
+    Parse an If-Match header into the row version it refers to.
+    
+    Accepts strong entity tags ("3") as well as a bare version number. The
+    wildcard "*" matches any version. If-Match uses strong comparison
+    (RFC 9110, section 13.1.1), so a weak tag (W/"3") is well formed but
+    never matches and yields NO_MATCH, as do non-ASCII digits.
+    
+    Args:
+        header_value (str): Raw If-Match header value
+        
+    Returns:
+        tuple: (is_valid, version) - version is None for a missing header or "*"
+    """
+    if header_value is None:
+        return True, None
+    
+    value = header_value.strip()
+    if value == '*':
+        return True, None
+    
+    weak = value.startswith('W/')
+    if weak:
+        value = value[2:]
+    value = value.strip('"')
+    
+    if not value.isdigit():
+        return False, None
+    
+    # isdigit() also accepts digits such as "²" that int() rejects; no
+    # version is written that way, so the tag never matches
+    if weak or not value.isascii():
+        return True, NO_MATCH
+    
+    return True, int(value)
+
+
+def versioned_update(user, expected_version, changes):
+    """
+    Apply profile changes in a single UPDATE guarded by the row version.
+    
+    The statement only matches when the stored version still equals
+    expected_version, so concurrent writers cannot overwrite each other.
+    The search columns (and trigrams, when enabled) follow a name change in
+    the same transaction.
+    The new row is read back with RETURNING where the dialect supports it;
+    otherwise the values written are already known and no SELECT is needed.
+    On success the loaded user is refreshed in place without being marked dirty.
+    
+    Args:
+        user (User): User loaded for the current request
+        expected_version (int): Version the client based its changes on
+        changes (dict): Column values to write
+        
+    Returns:
+        bool: True if the row was updated, False on a version conflict
+    """
+    table = User.__table__
+    values = dict(changes)
+    values['updated_at'] = datetime.utcnow()
+    values['version'] = expected_version + 1
+    
+    # Keep the normalized search columns in step with the name
+    search = None
+    if 'first_name' in changes or 'last_name' in changes:
+        search = search_columns(
+            values.get('first_name', user.first_name),
+            values.get('last_name', user.last_name),
+            user.email
+        )
+        values.update(search)
+    
+    statement = (
+        update(table)
+        .where(table.c.id == user.id)
+        .where(table.c.version == expected_version)
+        .values(**values)
+    )
+    
+    dialect = db.session.get_bind(mapper=User.__mapper__).dialect
+    if dialect.update_returning:
+        row = db.session.execute(statement.returning(*table.c)).first()
+        if row is None:
+            return False
+        values = row._asdict()
+    else:
+        result = db.session.execute(statement)
+        if result.rowcount == 0:
+            return False
+    
+    if search is not None and ngrams_enabled():
+        for grams_statement, parameters in gram_statements(user.id, search):
+            db.session.execute(grams_statement, parameters)
+    
+    for key, value in values.items():
+        set_committed_value(user, key, value)
+    
+    return True
+
+
 @user_bp.route('/me', methods=['GET'])
-@token_required
+@token_required(view=True)
 def get_current_user(current_user):
     """
     Get current authenticated user's information.
@@ -22,23 +136,28 @@ def get_current_user(current_user):
         Authorization: Bearer <token>
     
     Returns:
-        200: User data
+        200: User data (ETag header carries the row version)
         401: Unauthorized
     """
-    return jsonify({
+    response = jsonify({
         'success': True,
         'user': current_user.to_dict()
-    }), 200
+    })
+    response.headers['ETag'] = current_user.etag
+    return response, 200
 
 
 @user_bp.route('/update', methods=['PATCH'])
 @token_required
+@idempotent
 def update_user(current_user):
     """
     Update user's first name and/or last name.
     
     Headers:
         Authorization: Bearer <token>
+        If-Match: "<version>"  // optional, ETag from /user/me
+        Idempotency-Key: <unique key>  // optional, retries replay the response
     
     Request Body:
         {
@@ -50,9 +169,21 @@ def update_user(current_user):
         200: Update successful with updated user data
         400: Invalid request data
         401: Unauthorized
+        409: Profile was modified concurrently, or a request with the
+             same Idempotency-Key is still running
+        412: If-Match does not match the current version
+        422: Idempotency-Key was used with a different request
         500: Server error
     """
     try:
+        # Parse the optional precondition before touching the body
+        is_valid, if_match = parse_if_match(request.headers.get('If-Match'))
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid If-Match header'
+            }), 400
+        
         # Parse request data
         data = request.get_json()
         
@@ -73,6 +204,8 @@ def update_user(current_user):
                 'message': 'At least one field (first_name or last_name) is required'
             }), 400
         
+        changes = {}
+        
         # Validate first_name if provided
         if first_name:
             is_valid, error_msg = validate_name(first_name, "First name")
@@ -81,7 +214,7 @@ def update_user(current_user):
                     'success': False,
                     'message': error_msg
                 }), 400
-            current_user.first_name = first_name
+            changes['first_name'] = first_name
         
         # Validate last_name if provided
         if last_name:
@@ -91,17 +224,44 @@ def update_user(current_user):
                     'success': False,
                     'message': error_msg
                 }), 400
-            current_user.last_name = last_name
+            changes['last_name'] = last_name
+        
+        # A stale If-Match can be rejected without a round trip,
+        # the user was loaded for this very request
+        if if_match is not None and if_match != current_user.version:
+            return jsonify({
+                'success': False,
+                'message': 'User has been modified; reload and retry'
+            }), 412
+        
+        expected_version = current_user.version if if_match is None else if_match
+        
+        # Single compare-and-set UPDATE; updated_at and version are bumped here
+        if not versioned_update(current_user, expected_version, changes):
+            db.session.rollback()
+            status_code = 409 if if_match is None else 412
+            return jsonify({
+                'success': False,
+                'message': 'User has been modified; reload and retry'
+            }), status_code
         
-        # Commit changes to database
-        # updated_at will be automatically updated by SQLAlchemy
+        # Serialize before commit, which would expire the refreshed attributes
+        user_data = current_user.to_dict()
+        etag = current_user.etag
         db.session.commit()
         
-        return jsonify({
+        # Keep this user's reads on the primary until replicas catch up,
+        # and stop other workers on this host serving the old snapshot
+        stick_to_primary(user_data['id'])
+        invalidate_cached_user(user_data['id'], user_data['version'])
+        
+        response = jsonify({
             'success': True,
             'message': 'User updated successfully',
-            'user': current_user.to_dict()
-        }), 200
+            'user': user_data
+        })
+        response.headers['ETag'] = etag
+        return response, 200
         
     except Exception as e:
         db.session.rollback()
@@ -111,3 +271,63 @@ def update_user(current_user):
             'message': 'An error occurred while updating user'
         }), 500
 
+
+@user_bp.route('/search', methods=['GET'])
+@token_required(view=True)
+def search(current_user):
+    """
+    Type-ahead search for users by name or email.
+    
+    Headers:
+        Authorization: Bearer <token>
+    
+    Query Parameters:
+        q: Search text (case and accents are ignored)
+        limit: Maximum results (default SEARCH_DEFAULT_LIMIT, at most SEARCH_MAX_LIMIT)
+        mode: prefix (default) or substring (needs SEARCH_NGRAM_ENABLED)
+    
+    Returns:
+        200: Matching users (id, email, first_name, last_name)
+        400: Invalid query parameters
+        401: Unauthorized
+    """
+    query = normalize_search_text(request.args.get('q', ''))
+    if not query or len(query) > 100:
+        return jsonify({
+            'success': False,
+            'message': 'q must be between 1 and 100 characters'
+        }), 400
+    
+    max_limit = current_app.config.get('SEARCH_MAX_LIMIT', 50)
+    limit = request.args.get('limit', str(current_app.config.get('SEARCH_DEFAULT_LIMIT', 10)))
+    if not (limit.isascii() and limit.isdigit()) or not 1 <= int(limit) <= max_limit:
+        return jsonify({
+            'success': False,
+            'message': f'limit must be between 1 and {max_limit}'
+        }), 400
+    
+    mode = request.args.get('mode', 'prefix')
+    if mode not in ('prefix', 'substring'):
+        return jsonify({
+            'success': False,
+            'message': 'mode must be prefix or substring'
+        }), 400
+    
+    if mode == 'substring':
+        if not ngrams_enabled():
+            return jsonify({
+                'success': False,
+                'message': 'Substring search is not enabled'
+            }), 400
+        if not query_grams(query):
+            return jsonify({
+                'success': False,
+                'message': 'Substring search needs at least 3 consecutive characters'
+            }), 400
+    
+    users = search_users(query, int(limit), substring=mode == 'substring')
+    
+    return jsonify({
+        'success': True,
+        'users': users
+    }), 200
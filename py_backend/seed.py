@@ -10,6 +10,7 @@ Usage:
 from app import create_app, init_db
 from models import db, User
 from utils.auth import hash_password
+from utils.sharding import bind_user_shard
 
 
 def seed_users():
@@ -55,7 +56,8 @@ def seed_users():
         print("="*50 + "\n")
         
         for user_data in test_users:
-            # Check if user already exists
+            # Check if user already exists (on its shard when sharded)
+            bind_user_shard(db.session, email=user_data['email'])
             existing_user = User.query.filter_by(
                 email=user_data['email']
             ).first()
@@ -0,0 +1,141 @@
+"""
+User activity tests.
+Tests write-behind tracking of last_login_at and last_seen_at.
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, event, select
+from app import create_app
+from models import db, User
+from utils.activity import ActivityTracker
+
+
+def stored_user(user_id):
+    """Read a user row directly, bypassing the session identity map."""
+    return db.session.execute(select(User.__table__).where(User.__table__.c.id == user_id)).one()
+
+
+@pytest.fixture
+def activity_engine(tmp_path):
+    """File-backed engine with one user, shared across threads."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'activity.db'}")
+    User.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert().values(
+            id='user-1', email='user1@example.com', password='x',
+            first_name='Test', last_name='User',
+            updated_at=datetime(2025, 1, 1), version=1
+        ))
+    yield engine
+    engine.dispose()
+
+
+def read_row(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(User.__table__)).one()
+
+
+class TestActivityTracking:
+    """Test cases for activity recorded by requests."""
+
+    def test_login_and_request_tracked(self, client, test_user):
+        """Test that login sets both timestamps and requests move last_seen_at."""
+        response = client.post('/auth/login', json={
+            'email': 'test@example.com',
+            'password': 'password123'
+        })
+        user_id = response.get_json()['user']['id']
+        login_row = stored_user(user_id)
+        assert login_row.last_login_at is not None
+        assert login_row.last_seen_at == login_row.last_login_at
+
+        client.get('/user/me', headers={'Authorization': f"Bearer {response.get_json()['token']}"})
+        seen_row = stored_user(user_id)
+        assert seen_row.last_login_at == login_row.last_login_at
+        assert seen_row.last_seen_at >= login_row.last_seen_at
+        assert seen_row.version == login_row.version
+
+
+class TestActivityTracker:
+    """Test cases for the write-behind tracker."""
+
+    @pytest.fixture
+    def tracker(self, activity_engine):
+        app = create_app('testing')
+        tracker = ActivityTracker(app, activity_engine, User.__table__, flush_interval=60, max_pending=100)
+        yield tracker
+        tracker.stop()
+
+    def test_touches_coalesce(self, tracker, activity_engine):
+        """Test that repeated touches become one pending entry and one UPDATE."""
+        statements = []
+        event.listen(activity_engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        base = datetime(2025, 6, 1)
+
+        for minute in range(10):
+            tracker.touch('user-1', at=base + timedelta(minutes=minute))
+        tracker.touch('user-1', login=True, at=base + timedelta(minutes=5))
+
+        assert tracker.snapshot()['pending_users'] == 1
+        assert tracker.flush() == 1
+        assert len([statement for statement in statements if statement.startswith('UPDATE')]) == 1
+
+        row = read_row(activity_engine)
+        assert row.last_seen_at == base + timedelta(minutes=9)
+        assert row.last_login_at == base + timedelta(minutes=5)
+
+    def test_flush_split_into_chunks(self, activity_engine):
+        """Test that a flush larger than one chunk is written in bounded statements."""
+        with activity_engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [
+                dict(id=f'user-{index}', email=f'user{index}@example.com', password='x',
+                     first_name='Test', last_name='User', updated_at=datetime(2025, 1, 1), version=1)
+                for index in range(2, 8)
+            ])
+        tracker = ActivityTracker(create_app('testing'), activity_engine, User.__table__,
+                                  flush_interval=60, max_pending=100, chunk_size=3)
+        statements = []
+        event.listen(activity_engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        seen = datetime(2025, 6, 1)
+
+        for index in range(1, 8):
+            tracker.touch(f'user-{index}', at=seen)
+
+        assert tracker.flush() == 7
+        updates = [statement for statement in statements if statement.startswith('UPDATE')]
+        assert [statement.rpartition('IN (')[2].count('?') for statement in updates] == [3, 3, 1]
+        with activity_engine.connect() as conn:
+            assert set(conn.execute(select(User.__table__.c.last_seen_at)).scalars()) == {seen}
+        tracker.stop()
+
+    def test_profile_columns_untouched(self, tracker, activity_engine):
+        """Test that activity writes leave updated_at and version alone."""
+        tracker.touch('user-1', login=True)
+        tracker.flush()
+
+        row = read_row(activity_engine)
+        assert row.updated_at == datetime(2025, 1, 1)
+        assert row.version == 1
+
+    def test_never_moves_backwards(self, tracker, activity_engine):
+        """Test that an older flush does not overwrite a newer timestamp."""
+        tracker.touch('user-1', at=datetime(2025, 6, 2))
+        tracker.flush()
+        tracker.touch('user-1', at=datetime(2025, 6, 1))
+        tracker.flush()
+
+        assert read_row(activity_engine).last_seen_at == datetime(2025, 6, 2)
+
+    def test_failed_flush_retried(self, tmp_path):
+        """Test that pending timestamps survive a failed flush."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'missing.db'}")
+        tracker = ActivityTracker(create_app('testing'), engine, User.__table__, flush_interval=60, max_pending=100)
+        tracker.touch('user-1')
+
+        assert tracker.flush() == 0
+        assert tracker.snapshot()['failed_flushes'] == 1
+        assert tracker.snapshot()['pending_users'] == 1
+        engine.dispose()
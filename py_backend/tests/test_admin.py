@@ -0,0 +1,345 @@
+"""
+Admin route tests.
+Tests the keyset-paginated user listing, the streaming export and the
+batch profile update.
+"""
+
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, select
+from app import create_app, init_db
+from models import db, User, UserSearchGram
+from utils.auth import hash_password
+from utils.cache import MISS
+from utils.search import user_grams
+from utils.user_listing import decode_cursor, encode_cursor
+
+ADMIN_KEY = 'test-admin-key'
+HEADERS = {'X-Admin-Key': ADMIN_KEY}
+START = datetime(2024, 1, 1)
+
+
+def seed_users(count, same_timestamp_every=1):
+    """Add count users; every same_timestamp_every users share an updated_at."""
+    password_hash = hash_password('password123')
+    for index in range(count):
+        db.session.add(User(
+            email=f'user{index:03d}@example.com',
+            password=password_hash,
+            first_name='List',
+            last_name=str(index),
+            updated_at=START + timedelta(minutes=index // same_timestamp_every)
+        ))
+    db.session.commit()
+
+
+@pytest.fixture
+def admin_app(app):
+    """Test app with the admin API enabled and 25 users, three per timestamp."""
+    app.config['ADMIN_API_KEY'] = ADMIN_KEY
+    seed_users(25, same_timestamp_every=3)
+    return app
+
+
+def ordered_ids():
+    return [user.id for user in User.query.order_by(User.updated_at, User.id)]
+
+
+def pages(client, **params):
+    """Follow next_cursor to the end; returns the pages' users."""
+    result = []
+    cursor = None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        response = client.get('/admin/users', headers=HEADERS, query_string=query)
+        assert response.status_code == 200
+        body = response.get_json()
+        result.append(body['users'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return result
+
+
+class TestAdminKey:
+    """Test cases for admin authentication."""
+
+    def test_disabled_without_key(self, client):
+        """Test that the admin API does not exist while no key is configured."""
+        assert client.get('/admin/users', headers=HEADERS).status_code == 404
+
+    def test_wrong_key(self, admin_app, client):
+        """Test that a missing or wrong key is rejected."""
+        assert client.get('/admin/users').status_code == 401
+        assert client.get('/admin/users', headers={'X-Admin-Key': 'nope'}).status_code == 401
+
+
+class TestListing:
+    """Test cases for keyset pagination."""
+
+    def test_pages_cover_all_users_once(self, admin_app, client):
+        """Test that pages split across equal timestamps lose and repeat nothing."""
+        result = pages(client, limit=4)
+
+        assert [len(page) for page in result] == [4] * 6 + [1]
+        assert [user['id'] for page in result for user in page] == ordered_ids()
+        assert 'password' not in result[0][0]
+
+    def test_updated_range(self, admin_app, client):
+        """Test filtering by updated_at for incremental syncs."""
+        result = pages(client, limit=100, updated_since='2024-01-01T00:02:00Z',
+                       updated_before='2024-01-01T00:04:00+00:00')
+
+        assert sorted(int(user['last_name']) for user in result[0]) == list(range(6, 12))
+
+    def test_no_offset_scan(self, admin_app, client):
+        """Test that later pages seek past the cursor instead of skipping rows."""
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        pages(client, limit=10)
+
+        selects = [statement for statement in statements if 'FROM users' in statement]
+        assert len(selects) == 3
+        assert 'users.updated_at >' not in selects[0]
+        assert all('users.updated_at >' in statement for statement in selects[1:])
+
+    def test_invalid_parameters(self, admin_app, client):
+        """Test that bad limits, cursors and timestamps are rejected."""
+        for query in ({'limit': 0}, {'limit': 'ten'}, {'limit': '\u00b2'}, {'limit': 100000},
+                      {'cursor': '!!!'}, {'updated_since': 'yesterday'}):
+            assert client.get('/admin/users', headers=HEADERS, query_string=query).status_code == 400
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode to the position they encode."""
+        position = (datetime(2024, 5, 1, 12, 30, 0, 123456), '0a-user')
+
+        assert decode_cursor(encode_cursor(*position)) == position
+
+
+class TestExport:
+    """Test cases for the streaming export."""
+
+    def test_ndjson(self, admin_app, client):
+        """Test that the NDJSON export holds every user in listing order."""
+        admin_app.config['ADMIN_EXPORT_BATCH_SIZE'] = 4
+
+        response = client.get('/admin/users/export', headers=HEADERS)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.is_streamed
+        users = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [user['id'] for user in users] == ordered_ids()
+        assert users[0]['last_login_at'] is None
+
+    def test_csv_resumes_after_cursor(self, admin_app, client):
+        """Test the CSV export with a cursor and a time range."""
+        ids = ordered_ids()
+        first = db.session.get(User, ids[9])
+        cursor = encode_cursor(first.updated_at, first.id)
+
+        response = client.get('/admin/users/export', headers=HEADERS, query_string={
+            'format': 'csv', 'cursor': cursor, 'updated_before': '2024-01-01T00:06:00'
+        })
+
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert response.headers['Content-Disposition'] == 'attachment; filename=users.csv'
+        assert [row['id'] for row in rows] == ids[10:18]
+        assert rows[0]['last_seen_at'] == ''
+
+    def test_unknown_format(self, admin_app, client):
+        """Test that unsupported formats are rejected."""
+        assert client.get('/admin/users/export', headers=HEADERS,
+                          query_string={'format': 'xml'}).status_code == 400
+
+
+def batch(client, records):
+    return client.patch('/admin/users', headers=HEADERS, json={'users': records})
+
+
+class TestBatchUpdate:
+    """Test cases for the batch profile update."""
+
+    def test_per_record_results(self, admin_app, client):
+        """Test that valid records are applied and the others reported in order."""
+        ids = ordered_ids()
+        moved = db.session.get(User, ids[2])
+        moved.first_name, moved.version = 'Moved', 2
+        db.session.commit()
+
+        response = batch(client, [
+            {'id': ids[0], 'first_name': ' Ada ', 'last_name': 'Lovelace'},
+            {'id': ids[1], 'last_name': 'Hopper', 'version': 1},
+            {'id': ids[2], 'first_name': 'Stale', 'version': 1},
+            {'id': 'missing', 'first_name': 'Nobody'},
+            {'id': ids[3], 'first_name': 'x' * 101},
+            {'id': ids[4]},
+            {'id': ids[0], 'first_name': 'Again'},
+            'not a record'
+        ])
+
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['updated'] == 2
+        assert [(result['id'], result['status']) for result in body['results']] == [
+            (ids[0], 'updated'), (ids[1], 'updated'), (ids[2], 'conflict'), ('missing', 'not_found'),
+            (ids[3], 'invalid'), (ids[4], 'invalid'), (ids[0], 'invalid'), (None, 'invalid')
+        ]
+        assert body['results'][0]['version'] == 2
+        assert body['results'][2]['version'] == 2
+        assert body['results'][4]['message'] == 'First name cannot exceed 100 characters'
+        assert body['results'][6]['message'] == 'Duplicate id'
+
+        db.session.expire_all()
+        ada, hopper, moved = (db.session.get(User, user_id) for user_id in ids[:3])
+        assert (ada.first_name, ada.last_name, ada.version) == ('Ada', 'Lovelace', 2)
+        assert ada.search_name == 'ada lovelace'
+        assert ada.updated_at > START + timedelta(days=1)
+        assert (hopper.first_name, hopper.search_last_name) == ('List', 'hopper')
+        assert moved.first_name == 'Moved'
+
+    def test_chunked_case_updates(self, admin_app, client):
+        """Test that records are written with one UPDATE per chunk in one transaction."""
+        admin_app.config['ADMIN_BATCH_CHUNK_SIZE'] = 4
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        response = batch(client, [{'id': user_id, 'last_name': 'Renamed'} for user_id in ordered_ids()[:10]])
+
+        assert response.get_json()['updated'] == 10
+        updates = [statement for statement in statements if statement.startswith('UPDATE users')]
+        assert len(updates) == 3
+        assert all('CASE' in statement for statement in updates)
+        assert User.query.filter_by(last_name='Renamed').count() == 10
+
+    def test_failure_writes_nothing(self, admin_app, client):
+        """Test that an error in a later chunk rolls back the earlier ones."""
+        admin_app.config['ADMIN_BATCH_CHUNK_SIZE'] = 2
+        updates = []
+
+        def fail_second_update(conn, cursor, statement, *args):
+            if statement.startswith('UPDATE users'):
+                updates.append(statement)
+                if len(updates) == 2:
+                    raise RuntimeError('disk full')
+        event.listen(db.engine, 'before_cursor_execute', fail_second_update)
+
+        response = batch(client, [{'id': user_id, 'last_name': 'Renamed'} for user_id in ordered_ids()[:4]])
+
+        assert response.status_code == 500
+        event.remove(db.engine, 'before_cursor_execute', fail_second_update)
+        assert User.query.filter_by(last_name='Renamed').count() == 0
+
+    @pytest.mark.parametrize('returning', [True, False])
+    def test_racing_writer_is_a_conflict(self, admin_app, client, monkeypatch, returning):
+        """Test that a row another writer bumped to the same version is not reported as ours."""
+        monkeypatch.setattr(db.engine.dialect, 'update_returning', returning)
+        ids = ordered_ids()[:2]
+
+        def race(conn, cursor, statement, *args):
+            # Lands between the batch's SELECT and its UPDATE
+            if statement.startswith('UPDATE users SET first_name=CASE'):
+                cursor.connection.execute("UPDATE users SET first_name = 'Racer', version = version + 1 "
+                                          "WHERE id = ?", (ids[1],))
+        event.listen(db.engine, 'before_cursor_execute', race)
+
+        response = batch(client, [{'id': user_id, 'first_name': 'Batch'} for user_id in ids])
+
+        event.remove(db.engine, 'before_cursor_execute', race)
+        assert [(result['status'], result['version']) for result in response.get_json()['results']] == [
+            ('updated', 2), ('conflict', 2)
+        ]
+        db.session.expire_all()
+        assert db.session.get(User, ids[1]).first_name == 'Racer'
+
+    def test_refreshes_trigrams(self, admin_app, client):
+        """Test that renamed users get their trigrams replaced."""
+        admin_app.config['SEARCH_NGRAM_ENABLED'] = True
+        user_id = User.query.filter_by(email='user000@example.com').one().id
+
+        batch(client, [{'id': user_id, 'first_name': 'Grace', 'last_name': 'Hopper'}])
+
+        table = UserSearchGram.__table__
+        grams = set(db.session.execute(select(table.c.gram).where(table.c.user_id == user_id)).scalars())
+        assert grams == user_grams('grace hopper', 'user000@example.com')
+
+    def test_invalid_batches(self, admin_app, client):
+        """Test that missing, empty and oversized batches are rejected."""
+        admin_app.config['ADMIN_BATCH_MAX_RECORDS'] = 2
+
+        assert client.patch('/admin/users', headers=HEADERS, json={}).status_code == 400
+        assert batch(client, []).status_code == 400
+        assert batch(client, [{'id': 'a', 'first_name': 'A'}] * 3).status_code == 400
+        assert client.patch('/admin/users', json={'users': [{'id': 'a', 'first_name': 'A'}]}).status_code == 401
+
+    def test_bulk_cache_invalidation(self, tmp_path):
+        """Test that cached snapshots are dropped with a single broadcast."""
+        app = create_app('testing', config_overrides={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'batch.db'}",
+            'CACHE_L2_URL': f'memory://{uuid.uuid4().hex}',
+            'ADMIN_API_KEY': ADMIN_KEY
+        })
+        init_db(app)
+        with app.app_context():
+            seed_users(3)
+            ids = ordered_ids()
+            user_cache = app.extensions['user_cache']
+            for user_id in ids:
+                user_cache.set(f'user:{user_id}', {'id': user_id}, version=1)
+            messages = []
+            user_cache.backend.subscribe(user_cache.channel, messages.append)
+
+            batch(app.test_client(), [{'id': user_id, 'first_name': 'Cached'} for user_id in ids])
+
+            assert len(messages) == 1
+            assert all(user_cache.get(f'user:{user_id}') is MISS for user_id in ids)
+            user_cache.set(f'user:{ids[0]}', {'id': ids[0]}, version=1)
+            assert user_cache.get(f'user:{ids[0]}') is MISS
+            db.session.remove()
+
+
+class TestShardedListing:
+    """Test cases for admin endpoints over users spread across shards."""
+
+    @pytest.fixture
+    def sharded_app(self, tmp_path):
+        app = create_app('testing', config_overrides={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+            'SQLALCHEMY_SHARD_URIS': [f"sqlite:///{tmp_path / f'shard{index}.db'}" for index in range(3)],
+            'ADMIN_API_KEY': ADMIN_KEY
+        })
+        init_db(app)
+        with app.app_context():
+            seed_users(20, same_timestamp_every=2)
+            yield app
+            db.session.remove()
+
+    def test_pages_and_export_merge_shards(self, sharded_app):
+        """Test that pages and the export merge the shards in order."""
+        client = sharded_app.test_client()
+
+        listed = [user for page in pages(client, limit=3) for user in page]
+        exported = client.get('/admin/users/export', headers=HEADERS).get_data(as_text=True).splitlines()
+
+        keys = [(user['updated_at'], user['id']) for user in listed]
+        assert len(listed) == 20
+        assert keys == sorted(keys)
+        assert [json.loads(line)['id'] for line in exported] == [user['id'] for user in listed]
+
+    def test_batch_update_across_shards(self, sharded_app):
+        """Test that a batch is split by shard and every shard is written."""
+        client = sharded_app.test_client()
+        ids = [user['id'] for page in pages(client, limit=100) for user in page]
+
+        response = batch(client, [{'id': user_id, 'last_name': 'Sharded'} for user_id in ids])
+
+        assert response.get_json()['updated'] == 20
+        listed = [user for page in pages(client, limit=100) for user in page]
+        assert {user['last_name'] for user in listed} == {'Sharded'}
+        assert {user['version'] for user in listed} == {2}
@@ -0,0 +1,197 @@
+"""
+Admission control tests.
+Tests the priority lanes and CoDel-style shedding on queue wait.
+"""
+
+import threading
+import pytest
+from app import create_app
+from models import db, User
+from utils.auth import hash_password, generate_token
+from utils.admission import AdmissionController, Lane
+
+
+def make_lane(**options):
+    settings = dict(limit=1, target=0.01, interval=0.05, max_wait=1.0)
+    settings.update(options)
+    return Lane('test', **settings)
+
+
+class TestLane:
+    """Test cases for a single lane."""
+
+    def test_admits_up_to_limit(self):
+        """Test that a request waits for a slot and is admitted when one frees."""
+        lane = make_lane(limit=1, target=1.0)
+        assert lane.acquire()
+        timer = threading.Timer(0.05, lane.release)
+        timer.start()
+
+        assert lane.acquire()
+        lane.release()
+        snapshot = lane.snapshot()
+        assert snapshot['admitted'] == 2
+        assert snapshot['active'] == 0
+        assert snapshot['wait_ms_p95'] >= 40
+
+    def test_wait_is_bounded(self):
+        """Test that a request is shed after max_wait."""
+        lane = make_lane(max_wait=0.02)
+        assert lane.acquire()
+
+        assert not lane.acquire()
+        assert lane.snapshot()['shed_timeout'] == 1
+        assert lane.snapshot()['waiting'] == 0
+
+    def test_max_waiting_sheds_on_arrival(self):
+        """Test that arrivals beyond the waiting cap are shed without queueing."""
+        lane = make_lane(max_waiting=0)
+        assert lane.acquire()
+
+        assert not lane.acquire()
+        assert lane.snapshot()['shed_overloaded'] == 1
+
+    def test_no_waiting_cap_queues_arrivals(self):
+        """Test that without a cap, arrivals at a full lane wait instead of being shed."""
+        lane = make_lane(limit=1, target=1.0, max_wait=2.0)
+        assert lane.acquire()
+        results = []
+
+        def request():
+            admitted = lane.acquire()
+            results.append(admitted)
+            if admitted:
+                lane.release()
+
+        waiters = [threading.Thread(target=request) for _ in range(4)]
+        for waiter in waiters:
+            waiter.start()
+        threading.Timer(0.05, lane.release).start()
+        for waiter in waiters:
+            waiter.join(5)
+
+        assert results == [True] * 4
+        assert lane.snapshot()['shed_overloaded'] == 0
+
+    def test_codel_sheds_after_interval_above_target(self):
+        """Test that shedding starts only once waits stay above target for an interval."""
+        lane = make_lane(target=0.01, interval=0.05)
+
+        assert not lane._should_shed(0.02, now=100.0)
+        assert not lane._should_shed(0.02, now=100.04)
+        assert lane._should_shed(0.02, now=100.05)
+        assert lane.snapshot()['dropping']
+
+        # Further drops follow at interval / sqrt(count)
+        assert not lane._should_shed(0.02, now=100.06)
+        assert lane._should_shed(0.02, now=100.10)
+        assert lane._drop_count == 2
+
+    def test_codel_recovers_below_target(self):
+        """Test that one wait under target leaves the dropping state."""
+        lane = make_lane(target=0.01, interval=0.05)
+        lane._should_shed(0.02, now=100.0)
+        lane._should_shed(0.02, now=100.05)
+
+        assert not lane._should_shed(0.001, now=100.06)
+        assert not lane.snapshot()['dropping']
+        assert not lane._should_shed(0.02, now=100.07)
+
+    def test_dropping_sheds_arrivals_when_full(self):
+        """Test that a dropping lane sheds new arrivals while it has no free slot."""
+        lane = make_lane()
+        assert lane.acquire()
+        lane._dropping = True
+
+        assert not lane.acquire()
+        assert lane.snapshot()['shed_overloaded'] == 1
+
+    def test_retry_after_is_whole_seconds(self):
+        """Test that Retry-After is at least one second."""
+        assert make_lane().retry_after() == 1
+        lane = make_lane(interval=2.5)
+        assert lane.retry_after() == 3
+
+
+class TestAdmissionController:
+    """Test cases for endpoint routing."""
+
+    def test_lanes_by_endpoint(self):
+        """Test that endpoints match lanes in order and others are not controlled."""
+        expensive, cheap = make_lane(), make_lane()
+        controller = AdmissionController([(['auth.login'], expensive), (['user.*'], cheap)])
+
+        assert controller.lane_for('auth.login') is expensive
+        assert controller.lane_for('user.get_current_user') is cheap
+        assert controller.lane_for('health.live') is None
+        assert controller.lane_for(None) is None
+
+
+class TestAdmissionRequests:
+    """Test cases for admission control in requests."""
+
+    @pytest.fixture
+    def admission_app(self):
+        """App whose lanes shed after a short wait."""
+        app = create_app('testing', config_overrides={
+            'ADMISSION_MAX_WAIT_MS': 20,
+            'ADMISSION_EXPENSIVE_LIMIT': 1,
+            'ADMISSION_EXPENSIVE_INTERVAL_MS': 1500
+        })
+        with app.app_context():
+            db.create_all()
+            yield app
+            db.session.remove()
+            db.drop_all()
+
+    def test_login_shed_while_lane_full(self, admission_app):
+        """Test that a login waiting too long gets 503 with Retry-After."""
+        lane = admission_app.extensions['admission'].lane_for('auth.login')
+        assert lane.acquire()
+        client = admission_app.test_client()
+
+        response = client.post('/auth/login', json={'email': 'test@example.com', 'password': 'password123'})
+
+        assert response.status_code == 503
+        assert response.get_json()['success'] is False
+        assert response.headers['Retry-After'] == '2'
+        lane.release()
+
+    def test_reads_not_blocked_by_logins(self, admission_app):
+        """Test that token-authenticated reads use their own lane."""
+        user = User(email='reader@example.com', password=hash_password('password123'),
+                    first_name='Read', last_name='Er')
+        db.session.add(user)
+        db.session.commit()
+        token = generate_token(user.id)
+        lane = admission_app.extensions['admission'].lane_for('auth.login')
+        assert lane.acquire()
+        client = admission_app.test_client()
+
+        response = client.get('/user/me', headers={'Authorization': f'Bearer {token}'})
+
+        assert response.status_code == 200
+        lane.release()
+
+    def test_slots_released_after_request(self, client, test_user):
+        """Test that admitted requests give their slot back, and metrics are served."""
+        for _ in range(3):
+            client.post('/auth/login', json={'email': 'test@example.com', 'password': 'password123'})
+
+        metrics = client.get('/metrics').get_json()['metrics']['admission']
+        assert metrics['expensive']['admitted'] == 3
+        assert metrics['expensive']['active'] == 0
+        assert 'cheap' in metrics
+
+    def test_waiting_cap_opt_in(self):
+        """Test that lanes shed on queue wait only, unless a waiting cap is configured."""
+        default = create_app('testing').extensions['admission']
+        capped = create_app('testing', config_overrides={'ADMISSION_EXPENSIVE_MAX_WAITING': 3}).extensions['admission']
+
+        assert [lane.max_waiting for _, lane in default.lanes] == [None, None]
+        assert capped.lane_for('auth.login').max_waiting == 3
+
+    def test_disabled(self):
+        """Test that ADMISSION_ENABLED=False installs nothing."""
+        app = create_app('testing', config_overrides={'ADMISSION_ENABLED': False})
+        assert 'admission' not in app.extensions
@@ -0,0 +1,304 @@
+"""
+ASGI mode tests.
+Tests the natively async routes, the Flask fallback and the async
+database helpers, driving the ASGI application directly.
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+import pytest
+from sqlalchemy import event
+from app import init_db
+from models import db, User
+from utils.auth import hash_password
+from utils.cache import MemoryBackend
+from utils.async_db import HashExecutor, async_database_uri
+from utils.singleflight import AsyncSingleFlight
+
+pytest.importorskip('aiosqlite')
+
+from async_app import create_asgi_app  # noqa: E402
+
+
+async def call(app, method, path, body=None, headers=None):
+    """
+    Send one request to an ASGI application.
+
+    Returns:
+        tuple: (status, headers dict, parsed JSON body)
+    """
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    path, _, query_string = path.partition('?')
+    raw_headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in (headers or {}).items()]
+    if body is not None:
+        raw_headers.append((b'content-type', b'application/json'))
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string.encode('latin-1'),
+        'headers': raw_headers,
+        'http_version': '1.1',
+        'scheme': 'http',
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000)
+    }
+    messages = iter([{'type': 'http.request', 'body': payload, 'more_body': False}])
+    sent = []
+
+    async def receive():
+        return next(messages, {'type': 'http.disconnect'})
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    response_body = b''.join(message.get('body', b'') for message in sent[1:])
+    response_headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in sent[0]['headers']}
+    return sent[0]['status'], response_headers, json.loads(response_body) if response_body else None
+
+
+@pytest.fixture
+def asgi_app(tmp_path):
+    """ASGI application on a file database with one user."""
+    app = create_asgi_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'asgi.db'}"
+    })
+    init_db(app.flask_app)
+    with app.flask_app.app_context():
+        db.session.add(User(email='async@example.com', password=hash_password('password123'),
+                            first_name='Async', last_name='User'))
+        db.session.commit()
+    return app
+
+
+def run(app, scenario):
+    """Run a scenario and the application's shutdown on one event loop."""
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await app.shutdown()
+    return asyncio.run(main())
+
+
+async def login(app):
+    status, _, body = await call(app, 'POST', '/auth/login', {'email': 'async@example.com', 'password': 'password123'})
+    assert status == 200
+    return {'Authorization': f"Bearer {body['token']}"}
+
+
+class TestAsyncRoutes:
+    """Test cases for the natively async endpoints."""
+
+    def test_login(self, asgi_app):
+        """Test successful and failed logins."""
+        async def scenario():
+            ok = await call(asgi_app, 'POST', '/auth/login', {'email': 'async@example.com', 'password': 'password123'})
+            wrong = await call(asgi_app, 'POST', '/auth/login', {'email': 'async@example.com', 'password': 'nope12345'})
+            empty = await call(asgi_app, 'POST', '/auth/login')
+            return ok, wrong, empty
+
+        ok, wrong, empty = run(asgi_app, scenario)
+
+        assert ok[0] == 200
+        assert ok[2]['user']['email'] == 'async@example.com'
+        assert ok[1]['Access-Control-Allow-Origin'] == '*'
+        assert wrong[0] == 401
+        assert wrong[2]['message'] == 'Invalid email or password'
+        assert empty[0] == 400
+        assert asgi_app.flask_app.extensions['hash_executor'].snapshot()['completed'] == 2
+
+    def test_current_user(self, asgi_app):
+        """Test /user/me with and without a token."""
+        async def scenario():
+            headers = await login(asgi_app)
+            return await call(asgi_app, 'GET', '/user/me', headers=headers), await call(asgi_app, 'GET', '/user/me')
+
+        (status, headers, body), missing = run(asgi_app, scenario)
+
+        assert status == 200
+        assert body['user']['first_name'] == 'Async'
+        assert headers['ETag'] == '"1"'
+        assert missing[0] == 401
+
+    def test_update(self, asgi_app):
+        """Test a profile update and a stale If-Match."""
+        async def scenario():
+            headers = await login(asgi_app)
+            updated = await call(asgi_app, 'PATCH', '/user/update', {'first_name': 'Renamed'}, headers)
+            stale = await call(asgi_app, 'PATCH', '/user/update', {'first_name': 'Again'},
+                               dict(headers, **{'If-Match': '"1"'}))
+            current = await call(asgi_app, 'GET', '/user/me', headers=headers)
+            return updated, stale, current
+
+        updated, stale, current = run(asgi_app, scenario)
+
+        assert updated[0] == 200
+        assert updated[2]['user']['version'] == 2
+        assert updated[1]['ETag'] == '"2"'
+        assert stale[0] == 412
+        assert current[2]['user']['first_name'] == 'Renamed'
+
+    def test_update_retry_replayed(self, asgi_app):
+        """Test that a retried update with the same Idempotency-Key is not applied twice."""
+        async def scenario():
+            headers = dict(await login(asgi_app), **{'Idempotency-Key': 'pos-42'})
+            first = await call(asgi_app, 'PATCH', '/user/update', {'first_name': 'Once'}, headers)
+            retry = await call(asgi_app, 'PATCH', '/user/update', {'first_name': 'Once'}, headers)
+            return first, retry
+
+        first, retry = run(asgi_app, scenario)
+
+        assert first[2] == retry[2]
+        assert retry[2]['user']['version'] == 2
+        assert retry[1]['ETag'] == '"2"'
+        assert retry[1]['Idempotent-Replayed'] == 'true'
+
+    def test_update_refreshes_search_index(self, asgi_app):
+        """Test that an async name change updates the search columns and trigrams."""
+        asgi_app.flask_app.config['SEARCH_NGRAM_ENABLED'] = True
+
+        async def scenario():
+            headers = await login(asgi_app)
+            await call(asgi_app, 'PATCH', '/user/update', {'first_name': 'Renée'}, headers)
+            prefix = await call(asgi_app, 'GET', '/user/search?q=renee', headers=headers)
+            substring = await call(asgi_app, 'GET', '/user/search?q=ene&mode=substring', headers=headers)
+            return prefix, substring
+
+        prefix, substring = run(asgi_app, scenario)
+
+        assert [user['email'] for user in prefix[2]['users']] == ['async@example.com']
+        assert [user['email'] for user in substring[2]['users']] == ['async@example.com']
+
+    def test_concurrent_lookups_share_one_query(self, asgi_app):
+        """Test that identical lookups on the event loop run one query."""
+        queries = []
+        engine = asgi_app.flask_app.extensions['async_db'].primary.sync_engine
+        event.listen(engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: queries.append(statement))
+
+        async def scenario():
+            headers = await login(asgi_app)
+            queries.clear()
+            return await asyncio.gather(*(call(asgi_app, 'GET', '/user/me', headers=headers) for _ in range(10)))
+
+        responses = run(asgi_app, scenario)
+
+        assert all(status == 200 for status, _, _ in responses)
+        assert len([statement for statement in queries if 'FROM users' in statement]) < 10
+
+    def test_l2_cache_calls_off_event_loop(self, tmp_path):
+        """Test that two-tier cache round trips never run on the event loop thread."""
+        app = create_asgi_app('testing', config_overrides={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'cached.db'}",
+            'CACHE_L2_URL': f'memory://{uuid.uuid4().hex}'
+        })
+        init_db(app.flask_app)
+        with app.flask_app.app_context():
+            db.session.add(User(email='async@example.com', password=hash_password('password123'),
+                                first_name='Async', last_name='User'))
+            db.session.commit()
+        threads = []
+
+        class RecordingBackend(MemoryBackend):
+            def get(self, key):
+                threads.append(threading.get_ident())
+                return super().get(key)
+
+            def set(self, key, value, ttl):
+                threads.append(threading.get_ident())
+                super().set(key, value, ttl)
+
+            def publish(self, channel, message):
+                threads.append(threading.get_ident())
+                super().publish(channel, message)
+
+        app.flask_app.extensions['user_cache'].backend = RecordingBackend()
+
+        async def scenario():
+            headers = await login(app)
+            await call(app, 'GET', '/user/me', headers=headers)
+            await call(app, 'PATCH', '/user/update', {'first_name': 'Cached'}, headers)
+            return threading.get_ident()
+
+        loop_thread = run(app, scenario)
+
+        assert threads
+        assert loop_thread not in threads
+
+    def test_other_routes_served_by_flask(self, asgi_app):
+        """Test that routes without an async version go through the WSGI bridge."""
+        async def scenario():
+            return await call(asgi_app, 'GET', '/metrics'), await call(asgi_app, 'GET', '/missing')
+
+        (status, _, body), missing = run(asgi_app, scenario)
+
+        assert status == 200
+        assert 'password_hashing' in body['metrics']
+        assert missing[0] == 404
+
+    def test_preflight_answered_on_event_loop(self, asgi_app):
+        """Test that CORS preflights are answered without reaching a route."""
+        async def scenario():
+            return await call(asgi_app, 'OPTIONS', '/user/update', headers={
+                'Origin': 'https://pos.example.com',
+                'Access-Control-Request-Method': 'PATCH',
+                'Access-Control-Request-Headers': 'if-match, x-request-id'
+            })
+
+        status, headers, body = run(asgi_app, scenario)
+
+        assert status == 204
+        assert headers['Access-Control-Allow-Origin'] == '*'
+        assert 'Access-Control-Max-Age' in headers
+        assert headers['Access-Control-Allow-Headers'] == 'if-match, x-request-id'
+        assert body is None
+
+
+class TestAsyncHelpers:
+    """Test cases for the async building blocks."""
+
+    def test_async_database_uri(self):
+        """Test that sync drivers are replaced by async ones."""
+        assert async_database_uri('sqlite:///auth.db') == 'sqlite+aiosqlite:///auth.db'
+        assert async_database_uri('mysql+pymysql://u:p@db/auth') == 'mysql+aiomysql://u:p@db/auth'
+        with pytest.raises(ValueError):
+            async_database_uri('oracle://db/auth')
+
+    def test_async_single_flight_shares_errors(self):
+        """Test that followers see the leader's exception."""
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('down')
+
+        async def scenario():
+            return await asyncio.gather(*(flight.do('key', failing) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.snapshot() == {'leaders': 1, 'shared': 2, 'errors': 1, 'in_flight': 0}
+
+    def test_hash_backlog_readiness(self):
+        """Test that readiness fails while too many hashes are queued."""
+        executor = HashExecutor(threads=1, max_backlog=1)
+        gate = threading.Event()
+
+        async def scenario():
+            tasks = [asyncio.ensure_future(executor.run(gate.wait, 5)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            during = executor.check()
+            gate.set()
+            await asyncio.gather(*tasks)
+            return during
+
+        during = asyncio.run(scenario())
+        executor.shutdown()
+
+        assert during == (False, {'backlog': 3, 'max_backlog': 1})
+        assert executor.check() == (True, {'backlog': 0, 'max_backlog': 1})
@@ -0,0 +1,149 @@
+"""
+Login audit tests.
+Tests that login attempts are recorded and written in batches.
+"""
+
+import time
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, event, select
+from models import db, LoginAudit
+from utils.audit import AuditTrail
+
+
+def audit_rows():
+    """Return all audit rows ordered by insertion."""
+    return db.session.execute(select(LoginAudit).order_by(LoginAudit.id)).scalars().all()
+
+
+@pytest.fixture
+def audit_engine(tmp_path):
+    """File-backed engine with the audit table, shared across threads."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    LoginAudit.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def make_event(index):
+    return {
+        'user_id': None,
+        'email': f'user{index}@example.com',
+        'ip_address': '127.0.0.1',
+        'user_agent': 'pytest',
+        'outcome': 'success',
+        'latency_ms': 1.0,
+        'created_at': datetime.utcnow()
+    }
+
+
+class TestLoginAudit:
+    """Test cases for login audit recording."""
+
+    def test_success_recorded(self, app, client, test_user):
+        """Test that a successful login is recorded with its user and client."""
+        response = client.post('/auth/login', json={
+            'email': 'test@example.com',
+            'password': 'password123'
+        }, headers={'User-Agent': 'pytest-agent'})
+
+        rows = audit_rows()
+        assert len(rows) == 1
+        assert rows[0].outcome == 'success'
+        assert rows[0].user_id == response.get_json()['user']['id']
+        assert rows[0].user_agent == 'pytest-agent'
+        assert rows[0].latency_ms > 0
+
+    def test_failures_recorded(self, client, test_user):
+        """Test that failed attempts are recorded with their outcome."""
+        client.post('/auth/login', json={'email': 'test@example.com', 'password': 'wrong'})
+        client.post('/auth/login', json={'email': 'not-an-email', 'password': 'x'})
+
+        rows = audit_rows()
+        assert [row.outcome for row in rows] == ['invalid_credentials', 'invalid_request']
+        assert rows[0].user_id is None
+        assert rows[0].email == 'test@example.com'
+
+    def test_metrics(self, client, test_user):
+        """Test that audit counters are served at /metrics."""
+        client.post('/auth/login', json={'email': 'test@example.com', 'password': 'wrong'})
+
+        metrics = client.get('/metrics').get_json()['metrics']['login_audit']
+        assert metrics['written'] == 1
+        assert metrics['queue_depth'] == 0
+
+
+class TestAuditTrail:
+    """Test cases for the batched audit writer."""
+
+    def make_trail(self, app, engine, **options):
+        settings = dict(batch_size=10, flush_interval=60, max_queue=100, logger=app.logger)
+        settings.update(options)
+        return AuditTrail(engine, LoginAudit.__table__, **settings)
+
+    def test_multi_row_insert(self, app, audit_engine):
+        """Test that a flush writes each batch with one INSERT statement."""
+        statements = []
+        event.listen(audit_engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        trail = self.make_trail(app, audit_engine, batch_size=10)
+
+        for index in range(25):
+            trail.record(**make_event(index))
+        trail.stop()
+
+        inserts = [statement for statement in statements if statement.startswith('INSERT')]
+        assert len(inserts) == 3
+        assert trail.snapshot()['written'] == 25
+        with audit_engine.connect() as conn:
+            assert len(conn.execute(select(LoginAudit.__table__)).all()) == 25
+
+    def test_flush_on_batch_size(self, app, audit_engine):
+        """Test that a full batch wakes the background writer."""
+        trail = self.make_trail(app, audit_engine, batch_size=5)
+
+        for index in range(5):
+            trail.record(**make_event(index))
+
+        deadline = time.monotonic() + 5
+        while trail.snapshot()['written'] < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert trail.snapshot()['written'] == 5
+        trail.stop()
+
+    def test_flush_on_interval(self, app, audit_engine):
+        """Test that a partial batch is written after the flush interval."""
+        trail = self.make_trail(app, audit_engine, batch_size=100, flush_interval=0.05)
+        trail.record(**make_event(0))
+
+        deadline = time.monotonic() + 5
+        while trail.snapshot()['written'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert trail.snapshot()['written'] == 1
+        trail.stop()
+
+    def test_drops_when_full(self, app, audit_engine):
+        """Test that events beyond max_queue are dropped and counted."""
+        trail = self.make_trail(app, audit_engine, batch_size=100, max_queue=3)
+
+        for index in range(5):
+            trail.record(**make_event(index))
+
+        assert trail.snapshot()['dropped'] == 2
+        assert trail.snapshot()['queue_depth'] == 3
+        trail.stop()
+        assert trail.snapshot()['written'] == 3
+
+    def test_failed_batch_requeued(self, app, tmp_path):
+        """Test that rows survive a failed flush and are written later."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'late.db'}")
+        trail = self.make_trail(app, engine, batch_size=100)
+        trail.record(**make_event(0))
+
+        assert trail.flush() == 0
+        assert trail.snapshot()['failed_batches'] == 1
+        assert trail.snapshot()['queue_depth'] == 1
+
+        LoginAudit.__table__.create(engine)
+        assert trail.flush() == 1
+        engine.dispose()
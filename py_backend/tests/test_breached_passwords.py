@@ -0,0 +1,142 @@
+"""
+Breached password tests.
+Tests the memory-mapped corpus, the build tool and the password validator.
+"""
+
+import hashlib
+import pytest
+from app import create_app
+from build_breach_corpus import build, parse_digests, sorted_digests
+from utils.breached_passwords import BreachedPasswords, write_corpus
+from utils.validators import validate_password
+
+BREACHED = ['password123', 'letmein!', 'qwertyuiop', 'correct horse']
+
+
+def sha1(password):
+    return hashlib.sha1(password.encode('utf-8')).digest()
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    """Corpus of the BREACHED passwords plus filler hashes."""
+    path = str(tmp_path / 'breached.bin')
+    digests = [sha1(password) for password in BREACHED] + [sha1(f'filler-{n}') for n in range(2000)]
+    write_corpus(path, sorted(digests))
+    return path
+
+
+class TestCorpus:
+    """Test cases for lookups against the corpus file."""
+
+    def test_membership(self, corpus_path):
+        """Test that breached passwords are found and others are not."""
+        corpus = BreachedPasswords(corpus_path)
+
+        assert all(corpus.is_breached(password) for password in BREACHED)
+        assert corpus.is_breached('filler-1999')
+        assert not corpus.is_breached('a unique passphrase')
+        assert not corpus.is_breached('filler-2000')
+        assert corpus.snapshot()['hashes'] == 2004
+        assert corpus.snapshot()['breached'] == 5
+        corpus.close()
+
+    def test_truncated_hashes(self, tmp_path):
+        """Test lookups against hashes truncated to fewer bytes."""
+        path = str(tmp_path / 'short.bin')
+        write_corpus(path, sorted(sha1(password) for password in BREACHED), record_size=10)
+        corpus = BreachedPasswords(path)
+
+        assert corpus.record_size == 10
+        assert corpus.is_breached('letmein!')
+        assert not corpus.is_breached('letmein?')
+        corpus.close()
+
+    def test_empty_corpus(self, tmp_path):
+        """Test that an empty corpus matches nothing."""
+        path = str(tmp_path / 'empty.bin')
+        assert write_corpus(path, []) == 0
+        assert not BreachedPasswords(path).is_breached('password123')
+
+    def test_duplicates_written_once(self, tmp_path):
+        """Test that repeated digests are collapsed."""
+        digest = sha1('password123')
+        assert write_corpus(str(tmp_path / 'dup.bin'), [digest, digest, digest]) == 1
+
+    def test_rejects_unsorted_input(self, tmp_path):
+        """Test that digests out of order are refused."""
+        with pytest.raises(ValueError):
+            write_corpus(str(tmp_path / 'bad.bin'), [b'\xff' * 20, b'\x00' * 20])
+
+    def test_rejects_bad_files(self, corpus_path, tmp_path):
+        """Test that foreign and truncated files are refused."""
+        foreign = tmp_path / 'foreign.bin'
+        foreign.write_bytes(b'not a corpus' * 100)
+        truncated = tmp_path / 'truncated.bin'
+        with open(corpus_path, 'rb') as source:
+            truncated.write_bytes(source.read()[:-1])
+
+        with pytest.raises(ValueError):
+            BreachedPasswords(str(foreign))
+        with pytest.raises(ValueError):
+            BreachedPasswords(str(truncated))
+
+
+class TestBuildTool:
+    """Test cases for build_breach_corpus.py."""
+
+    def test_parse_dump(self):
+        """Test dump parsing with a minimum count."""
+        lines = [f'{sha1("password123").hex().upper()}:500\n', f'{sha1("rare").hex().upper()}:1\n', '\n']
+
+        assert list(parse_digests(lines, min_count=10)) == [sha1('password123')]
+        with pytest.raises(ValueError):
+            list(parse_digests(['not-a-hash:3']))
+
+    def test_external_sort(self, tmp_path):
+        """Test that runs spilled to disk merge into one ordered stream."""
+        digests = [sha1(f'password-{n}') for n in range(100)]
+
+        assert list(sorted_digests(digests, str(tmp_path), chunk_size=7)) == sorted(digests)
+
+    def test_build_from_unsorted_dump(self, tmp_path):
+        """Test converting a dump that is ordered by count, not hash."""
+        source = tmp_path / 'dump.txt'
+        source.write_text(''.join(
+            f'{sha1(password).hex().upper()}:{100 - index}\r\n' for index, password in enumerate(BREACHED)
+        ))
+        output = str(tmp_path / 'breached.bin')
+
+        assert build(str(source), output, chunk_size=2) == len(BREACHED)
+        assert BreachedPasswords(output).is_breached('correct horse')
+
+    def test_build_from_plaintext(self, tmp_path):
+        """Test converting a plain password list."""
+        source = tmp_path / 'passwords.txt'
+        source.write_text('\n'.join(BREACHED) + '\n')
+        output = str(tmp_path / 'breached.bin')
+
+        assert build(str(source), output, plaintext=True, hash_bytes=8) == len(BREACHED)
+        assert BreachedPasswords(output).is_breached('qwertyuiop')
+
+
+class TestValidatePassword:
+    """Test cases for the breach check in validate_password."""
+
+    def test_rejects_breached_password(self, corpus_path):
+        """Test that a configured corpus rejects breached passwords."""
+        app = create_app('testing', config_overrides={'BREACHED_PASSWORDS_FILE': corpus_path})
+
+        with app.app_context():
+            is_valid, error = validate_password('password123')
+            assert not is_valid
+            assert 'breach' in error
+            assert validate_password('a unique passphrase') == (True, None)
+
+        with app.test_client() as client:
+            metrics = client.get('/metrics').get_json()['metrics']
+            assert metrics['breached_passwords']['lookups'] == 2
+
+    def test_no_corpus_configured(self, app):
+        """Test that validation is unchanged without a corpus."""
+        assert validate_password('password123') == (True, None)
@@ -0,0 +1,195 @@
+"""
+Two-tier cache tests.
+Tests the L1/L2 user cache and invalidation broadcast between nodes, with
+the in-process backend standing in for Redis.
+"""
+
+import time
+import uuid
+import pytest
+from sqlalchemy import event
+from app import create_app, init_db
+from models import db, User
+from utils.auth import hash_password, generate_token
+from utils.cache import MISS, MemoryBackend, TwoTierCache, create_backend
+
+
+def make_cache(backend, **options):
+    settings = dict(channel='invalidate', l1_ttl=30, l2_ttl=300, negative_ttl=30, l1_max_entries=100)
+    settings.update(options)
+    return TwoTierCache(backend, **settings)
+
+
+class FailingBackend(MemoryBackend):
+    """Backend whose every call fails, like an unreachable Redis."""
+
+    def get(self, key):
+        raise ConnectionError('down')
+
+    def set(self, key, value, ttl):
+        raise ConnectionError('down')
+
+    def publish(self, channel, message):
+        raise ConnectionError('down')
+
+
+class TestTwoTierCache:
+    """Test cases for the cache tiers."""
+
+    def test_l1_then_l2(self):
+        """Test that a node reads another node's entry from L2 and then from L1."""
+        backend = MemoryBackend()
+        node_a, node_b = make_cache(backend), make_cache(backend)
+
+        assert node_b.get('user:1') is MISS
+        node_a.set('user:1', {'name': 'A'}, version=1)
+
+        assert node_b.get('user:1') == {'name': 'A'}
+        assert node_b.get('user:1') == {'name': 'A'}
+        assert node_b.snapshot()['l2_hits'] == 1
+        assert node_b.snapshot()['l1_hits'] == 1
+        assert node_b.snapshot()['hit_ratio'] == pytest.approx(2 / 3)
+
+    def test_invalidation_broadcast(self):
+        """Test that an invalidation on one node drops the other node's L1 copy."""
+        backend = MemoryBackend()
+        node_a, node_b = make_cache(backend), make_cache(backend)
+        received = []
+        node_b.add_invalidation_listener(lambda key, version: received.append((key, version)))
+        node_a.set('user:1', {'name': 'old'}, version=1)
+        assert node_b.get('user:1') == {'name': 'old'}
+
+        node_a.invalidate('user:1', version=2)
+
+        assert node_b.get('user:1') is MISS
+        assert received == [('user:1', 2)]
+
+    def test_bulk_invalidation(self):
+        """Test that many keys are dropped on every node with one message."""
+        backend = MemoryBackend()
+        node_a, node_b = make_cache(backend), make_cache(backend)
+        received = []
+        node_b.add_invalidation_listener(lambda key, version: received.append((key, version)))
+        messages = []
+        backend.subscribe('invalidate', messages.append)
+        for key in ('user:1', 'user:2'):
+            node_a.set(key, {'name': 'old'}, version=1)
+            assert node_b.get(key) == {'name': 'old'}
+
+        node_a.invalidate_many({'user:1': 2, 'user:2': 5})
+
+        assert len(messages) == 1
+        assert node_b.get('user:1') is MISS and node_b.get('user:2') is MISS
+        assert sorted(received) == [('user:1', 2), ('user:2', 5)]
+        node_b.set('user:2', {'name': 'old'}, version=4)
+        assert node_a.get('user:2') is MISS
+
+    def test_tombstone_refuses_older_version(self):
+        """Test that a read started before an update cannot re-cache the old value."""
+        node = make_cache(MemoryBackend())
+        node.invalidate('user:1', version=2)
+
+        node.set('user:1', {'name': 'old'}, version=1)
+        assert node.get('user:1') is MISS
+        assert node.snapshot()['stale_rejected'] == 1
+
+        node.set('user:1', {'name': 'new'}, version=2)
+        assert node.get('user:1') == {'name': 'new'}
+
+    def test_negative_entries(self):
+        """Test that unknown keys are remembered for the negative TTL only."""
+        node = make_cache(MemoryBackend(), negative_ttl=0.05)
+        node.set_negative('user:missing')
+
+        assert node.get('user:missing') is None
+        assert node.snapshot()['negative_hits'] == 1
+        time.sleep(0.06)
+        assert node.get('user:missing') is MISS
+
+    def test_l1_is_bounded(self):
+        """Test that L1 evicts the least recently used entries."""
+        node = make_cache(MemoryBackend(), l1_max_entries=2)
+        for index in range(3):
+            node.set(f'user:{index}', {'index': index})
+
+        assert node.snapshot()['l1_entries'] == 2
+
+    def test_l2_failure_is_a_miss(self):
+        """Test that an unreachable L2 never fails the lookup."""
+        node = make_cache(FailingBackend())
+
+        node.set('user:1', {'name': 'A'})
+        node.invalidate('user:1')
+        assert node.get('user:1') is MISS
+        assert node.snapshot()['l2_errors'] >= 3
+
+    def test_backend_urls(self):
+        """Test backend selection from CACHE_L2_URL."""
+        assert create_backend('memory://shared') is create_backend('memory://shared')
+        with pytest.raises(ValueError):
+            create_backend('memcached://localhost')
+
+
+class TestUserCacheAcrossNodes:
+    """Test cases for user lookups on two nodes sharing one L2."""
+
+    @pytest.fixture
+    def nodes(self, tmp_path):
+        """Two apps on one database and one in-process L2, plus a token."""
+        config = {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'nodes.db'}",
+            'CACHE_L2_URL': f'memory://{uuid.uuid4().hex}'
+        }
+        node_a = create_app('testing', config_overrides=config)
+        node_b = create_app('testing', config_overrides=config)
+        init_db(node_a)
+
+        with node_a.app_context():
+            user = User(email='node@example.com', password=hash_password('password123'),
+                        first_name='Node', last_name='User')
+            db.session.add(user)
+            db.session.commit()
+            token = generate_token(user.id)
+        yield node_a, node_b, {'Authorization': f'Bearer {token}'}
+        node_a.extensions['user_cache'].stop()
+        node_b.extensions['user_cache'].stop()
+
+    def test_update_on_one_node_visible_on_other(self, nodes):
+        """Test that node B stops serving its cached user after node A updates it."""
+        node_a, node_b, headers = nodes
+        client_a, client_b = node_a.test_client(), node_b.test_client()
+        client_a.get('/user/me', headers=headers)
+        assert client_b.get('/user/me', headers=headers).get_json()['user']['first_name'] == 'Node'
+
+        assert client_a.patch('/user/update', headers=headers, json={'first_name': 'Renamed'}).status_code == 200
+
+        response = client_b.get('/user/me', headers=headers)
+        assert response.get_json()['user']['first_name'] == 'Renamed'
+        assert node_b.extensions['user_cache'].snapshot()['invalidations_received'] == 1
+
+    def test_unknown_user_negatively_cached(self, nodes):
+        """Test that a token for a missing user is rejected without repeated queries."""
+        node_a, _, _ = nodes
+        with node_a.app_context():
+            token = generate_token(str(uuid.uuid4()))
+            queries = []
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *args: queries.append(statement))
+
+        client = node_a.test_client()
+        for _ in range(3):
+            response = client.get('/user/me', headers={'Authorization': f'Bearer {token}'})
+            assert response.status_code == 401
+
+        assert len([statement for statement in queries if 'FROM users' in statement]) == 1
+
+    def test_metrics(self, nodes):
+        """Test that user cache metrics are served at /metrics."""
+        node_a, _, headers = nodes
+        client = node_a.test_client()
+        client.get('/user/me', headers=headers)
+        client.get('/user/me', headers=headers)
+
+        metrics = client.get('/metrics').get_json()['metrics']['user_cache']
+        assert metrics['l1_hits'] == 1
+        assert metrics['hit_ratio'] == 0.5
@@ -0,0 +1,302 @@
+"""
+Client SDK tests.
+Tests humblepos_client against the application in-process and over a
+local HTTP server.
+"""
+
+import asyncio
+import json
+import socketserver
+import threading
+import time
+import jwt
+import pytest
+from models import User
+from werkzeug.serving import make_server
+from humblepos_client import (
+    ApiError, AsyncAuthClient, AsyncHttpTransport, AsyncWsgiTransport, AuthClient, AuthenticationError,
+    HttpTransport, RetryPolicy, TransportError, WsgiTransport, token_expiry
+)
+
+NO_WAIT = RetryPolicy(attempts=3, base=0, cap=0)
+
+
+class CountingTransport:
+    """Wraps a transport, recording requests and optionally failing first."""
+
+    def __init__(self, transport, failures=()):
+        self.transport = transport
+        self.failures = list(failures)
+        self.calls = []
+
+    def request(self, method, path, body=None, headers=None):
+        self.calls.append((method, path))
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure, {'retry-after': '0'}, {'success': False, 'message': 'Server is busy'}
+        return self.transport.request(method, path, body, headers)
+
+    def close(self):
+        self.transport.close()
+
+
+def make_client(app, failures=(), **options):
+    transport = CountingTransport(WsgiTransport(app), failures)
+    client = AuthClient(transport=transport, email='test@example.com', password='password123',
+                        retry=NO_WAIT, **options)
+    return client, transport
+
+
+def expired_token(app, user_id):
+    payload = {'user_id': user_id, 'exp': int(time.time()) - 10}
+    return jwt.encode(payload, app.config['JWT_SECRET_KEY'], algorithm=app.config['JWT_ALGORITHM'])
+
+
+class TestAuthClient:
+    """Test cases for the blocking client."""
+
+    def test_token_cached_between_calls(self, app, test_user):
+        """Test that one login serves several calls."""
+        client, transport = make_client(app)
+
+        assert client.me()['email'] == 'test@example.com'
+        assert client.me()['first_name'] == 'Test'
+        assert transport.calls.count(('POST', '/auth/login')) == 1
+        assert client.user['email'] == 'test@example.com'
+
+    def test_login_before_expiry(self, app, test_user):
+        """Test that a token close to expiry is replaced before use."""
+        client, transport = make_client(app, refresh_margin=0)
+        user_id = User.query.filter_by(email='test@example.com').one().id
+        client._store_token(expired_token(app, user_id))
+
+        assert client.me()['email'] == 'test@example.com'
+        assert transport.calls == [('POST', '/auth/login'), ('GET', '/user/me')]
+
+    def test_login_again_on_401(self, app, test_user):
+        """Test that a rejected token triggers one new login."""
+        client, transport = make_client(app)
+        client._store_token('revoked-token')
+
+        assert client.me()['email'] == 'test@example.com'
+        assert transport.calls == [('GET', '/user/me'), ('POST', '/auth/login'), ('GET', '/user/me')]
+
+    def test_bad_credentials(self, app, test_user):
+        """Test that a failed login raises AuthenticationError."""
+        client = AuthClient(transport=WsgiTransport(app), email='test@example.com', password='wrong-password')
+
+        with pytest.raises(AuthenticationError) as error:
+            client.me()
+        assert error.value.status == 401
+
+    def test_update_profile(self, app, test_user):
+        """Test an update and a stale expected version."""
+        client, _ = make_client(app)
+
+        user = client.update_profile(first_name='Renamed', version=1)
+        with pytest.raises(ApiError) as error:
+            client.update_profile(last_name='Again', version=1)
+
+        assert user['first_name'] == 'Renamed'
+        assert user['version'] == 2
+        assert error.value.status == 412
+
+    def test_retries_shed_requests(self, app, test_user):
+        """Test that 503 responses and broken connections are retried."""
+        client, transport = make_client(app, failures=[503, TransportError('reset')])
+
+        assert client.me()['email'] == 'test@example.com'
+        assert transport.calls[:3] == [('POST', '/auth/login')] * 3
+
+    def test_update_retried_after_commit(self, app, test_user):
+        """Test that an update whose response was lost is replayed, not applied twice."""
+        client, transport = make_client(app)
+        sent = []
+
+        def lose_first_response(method, path, body=None, headers=None):
+            status, response_headers, data = transport.transport.request(method, path, body, headers)
+            if method == 'PATCH':
+                sent.append(headers['Idempotency-Key'])
+                if len(sent) == 1:
+                    return 504, {'retry-after': '0'}, {'success': False, 'message': 'Gateway timeout'}
+            return status, response_headers, data
+        transport.request = lose_first_response
+
+        user = client.update_profile(first_name='Once', version=1)
+
+        assert user['version'] == 2
+        assert len(sent) == 2 and sent[0] == sent[1]
+        assert User.query.filter_by(email='test@example.com').one().version == 2
+
+    def test_gives_up_after_attempts(self, app):
+        """Test that the last failure is returned once attempts run out."""
+        client, transport = make_client(app, failures=[503, 503, 503])
+
+        with pytest.raises(ApiError) as error:
+            client.login()
+        assert error.value.status == 503
+        assert len(transport.calls) == 3
+
+    def test_users_for_tokens(self, app, test_user, auth_token):
+        """Test resolving several callers' tokens at once."""
+        client, _ = make_client(app)
+
+        users = client.users_for_tokens([auth_token, 'invalid', auth_token])
+
+        assert [user and user['email'] for user in users] == ['test@example.com', None, 'test@example.com']
+
+    def test_users_for_tokens_with_verifier(self, app):
+        """Test that a batch verifier is used when configured."""
+        class Verifier:
+            def verify_many(self, tokens, with_user=False):
+                return [{'id': token} for token in tokens]
+
+        client = AuthClient(transport=WsgiTransport(app), verifier=Verifier())
+
+        assert client.users_for_tokens(['a', 'b']) == [{'id': 'a'}, {'id': 'b'}]
+
+
+class KeepAliveServer(socketserver.ThreadingTCPServer):
+    """Minimal HTTP/1.1 server echoing the request path, counting connections."""
+
+    daemon_threads = True
+    connections = 0
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            self.server.connections += 1
+            while True:
+                request_line = self.rfile.readline()
+                if not request_line:
+                    return
+                headers = {}
+                for line in iter(self.rfile.readline, b'\r\n'):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                self.rfile.read(int(headers.get('content-length', 0)))
+
+                path = request_line.split()[1].decode('latin-1')
+                body = json.dumps({'path': path}).encode('utf-8')
+                if path == '/chunked':
+                    half = len(body) // 2
+                    framing = b'Transfer-Encoding: chunked\r\n\r\n' + b''.join(
+                        b'%x\r\n%s\r\n' % (len(part), part) for part in (body[:half], body[half:], b'')
+                    )
+                else:
+                    framing = b'Content-Length: %d\r\n\r\n' % len(body) + body
+                self.wfile.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n' + framing)
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), self.Handler)
+
+
+class TestHttpTransports:
+    """Test cases for the pooled HTTP transports."""
+
+    @pytest.fixture
+    def keep_alive_server(self):
+        server = KeepAliveServer()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    @pytest.fixture
+    def base_url(self, app, test_user):
+        """The application on Werkzeug's development server (which closes every connection)."""
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield f'http://127.0.0.1:{server.server_port}'
+        server.shutdown()
+
+    def test_sync_pool_reuses_connections(self, keep_alive_server):
+        """Test that sequential requests share one keep-alive connection."""
+        transport = HttpTransport(f'http://127.0.0.1:{keep_alive_server.server_address[1]}', pool_size=2)
+
+        paths = [transport.request('GET', path)[2]['path'] for path in ('/a', '/chunked', '/c')]
+        transport.close()
+
+        assert paths == ['/a', '/chunked', '/c']
+        assert keep_alive_server.connections == 1
+
+    def test_async_pool_limits_connections(self, keep_alive_server):
+        """Test that concurrent async requests share at most pool_size connections."""
+        async def scenario():
+            transport = AsyncHttpTransport(f'http://127.0.0.1:{keep_alive_server.server_address[1]}', pool_size=2)
+            responses = await asyncio.gather(*(transport.request('POST', f'/{n}', {'n': n}) for n in range(6)))
+            chunked = await transport.request('GET', '/chunked')
+            await transport.close()
+            return responses, chunked
+
+        responses, chunked = asyncio.run(scenario())
+
+        assert [body['path'] for _, _, body in responses] == [f'/{n}' for n in range(6)]
+        assert chunked[2] == {'path': '/chunked'}
+        assert keep_alive_server.connections <= 2
+
+    def test_clients_over_http(self, base_url):
+        """Test both clients end to end over HTTP with closing connections."""
+        async def scenario():
+            async with AsyncAuthClient(base_url, email='test@example.com', password='password123') as client:
+                return await asyncio.gather(*(client.me() for _ in range(3)))
+
+        with AuthClient(base_url, email='test@example.com', password='password123') as client:
+            assert client.me()['email'] == 'test@example.com'
+        assert all(user['email'] == 'test@example.com' for user in asyncio.run(scenario()))
+
+    def test_unreachable_server(self):
+        """Test that connection failures surface as ApiError after retries."""
+        client = AuthClient('http://127.0.0.1:9', email='a@example.com', password='password123', retry=NO_WAIT)
+
+        with pytest.raises(ApiError) as error:
+            client.login()
+        assert error.value.status is None
+
+
+class TestAsyncAuthClient:
+    """Test cases for the asyncio client."""
+
+    def test_shared_login(self, app, test_user):
+        """Test that concurrent calls wait for a single login."""
+        async def scenario():
+            client = AsyncAuthClient(transport=AsyncWsgiTransport(app), email='test@example.com',
+                                     password='password123')
+            logins = []
+            login = client.login
+
+            async def counting_login(*args):
+                logins.append(1)
+                return await login(*args)
+
+            client.login = counting_login
+            users = await asyncio.gather(*(client.me() for _ in range(4)))
+            updated = await client.update_profile(last_name='Async')
+            return users, updated, len(logins)
+
+        users, updated, logins = asyncio.run(scenario())
+
+        assert all(user['email'] == 'test@example.com' for user in users)
+        assert updated['last_name'] == 'Async'
+        assert logins == 1
+
+
+class TestHelpers:
+    """Test cases for token and retry helpers."""
+
+    def test_token_expiry(self, app):
+        """Test reading exp from a token without verifying it."""
+        token = expired_token(app, 'user-1')
+
+        assert token_expiry(token) == pytest.approx(time.time() - 10, abs=2)
+        assert token_expiry('garbage') is None
+
+    def test_retry_delay(self):
+        """Test backoff ceilings and Retry-After."""
+        policy = RetryPolicy(base=0.1, cap=1.0)
+
+        assert all(0 <= policy.delay(1) <= 0.2 for _ in range(50))
+        assert all(policy.delay(10) <= 1.0 for _ in range(50))
+        assert policy.delay(1, retry_after='0.5') >= 0.5
+        assert policy.delay(1, retry_after='30') == 1.0
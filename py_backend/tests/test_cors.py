@@ -0,0 +1,132 @@
+"""
+CORS tests.
+Tests the precomputed CORS headers and the preflight short-circuit.
+"""
+
+import pytest
+from app import create_app
+
+ORIGIN = 'https://pos.example.com'
+
+
+@pytest.fixture
+def cors_client():
+    """Client for an app allowing two specific origins; yields (app, client)."""
+    app = create_app('testing', config_overrides={
+        'CORS_ORIGINS': [ORIGIN, 'http://localhost:8080'],
+        'CORS_MAX_AGE': 600
+    })
+    with app.app_context():
+        yield app, app.test_client()
+
+
+def preflight(client, path='/user/me', origin=ORIGIN, request_headers='authorization'):
+    return client.options(path, headers={
+        'Origin': origin,
+        'Access-Control-Request-Method': 'GET',
+        'Access-Control-Request-Headers': request_headers
+    })
+
+
+class TestPreflight:
+    """Test cases for preflight requests."""
+
+    def test_allowed_origin(self, cors_client):
+        """Test the preflight headers for an allowed origin."""
+        _, client = cors_client
+
+        response = preflight(client)
+
+        assert response.status_code == 204
+        assert response.headers['Access-Control-Allow-Origin'] == ORIGIN
+        assert response.headers['Access-Control-Max-Age'] == '600'
+        assert 'PATCH' in response.headers['Access-Control-Allow-Methods']
+        assert response.headers['Access-Control-Allow-Headers'] == 'authorization'
+        assert response.headers['Vary'] == 'Origin'
+
+    def test_any_requested_header_allowed(self, cors_client):
+        """Test that by default the requested headers are echoed, listed or not."""
+        _, client = cors_client
+
+        response = preflight(client, request_headers='authorization, x-trace-id')
+
+        assert response.headers['Access-Control-Allow-Headers'] == 'authorization, x-trace-id'
+
+    def test_malformed_request_headers(self, cors_client):
+        """Test that a header list that does not parse is not echoed."""
+        _, client = cors_client
+
+        response = preflight(client, request_headers='x-a, bad header: 1')
+
+        assert response.headers['Access-Control-Allow-Origin'] == ORIGIN
+        assert 'Access-Control-Allow-Headers' not in response.headers
+
+    def test_configured_allow_headers(self):
+        """Test that an explicit list is sent as is, whatever was requested."""
+        client = create_app('testing', config_overrides={
+            'CORS_ALLOW_HEADERS': ['Authorization', 'Content-Type']
+        }).test_client()
+
+        response = preflight(client, request_headers='x-trace-id')
+
+        assert response.headers['Access-Control-Allow-Headers'] == 'Authorization, Content-Type'
+
+    def test_other_origin(self, cors_client):
+        """Test that a preflight from another origin is not allowed."""
+        app, client = cors_client
+
+        response = preflight(client, origin='https://evil.example.com')
+
+        assert response.status_code == 204
+        assert 'Access-Control-Allow-Origin' not in response.headers
+        assert app.extensions['cors'].snapshot()['preflights_rejected'] == 1
+
+    def test_skips_application(self, cors_client):
+        """Test that preflights never reach Flask's request handling."""
+        app, client = cors_client
+        seen = []
+        app.before_request(lambda: seen.append(1))
+
+        assert preflight(client, path='/does-not-exist').status_code == 204
+        assert seen == []
+
+    def test_plain_options_is_routed(self, cors_client):
+        """Test that OPTIONS without CORS headers still goes to Flask."""
+        _, client = cors_client
+
+        response = client.options('/user/me')
+
+        assert response.status_code == 200
+        assert 'GET' in response.headers['Allow']
+
+
+class TestResponses:
+    """Test cases for CORS headers on regular responses."""
+
+    def test_allowed_origin(self, cors_client):
+        """Test headers on a response to an allowed origin."""
+        _, client = cors_client
+
+        response = client.get('/user/me', headers={'Origin': 'http://localhost:8080'})
+
+        assert response.status_code == 401
+        assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:8080'
+        assert 'ETag' in response.headers['Access-Control-Expose-Headers']
+        assert response.headers['Vary'] == 'Origin'
+
+    def test_other_origin(self, cors_client):
+        """Test that other origins get no CORS headers, only Vary."""
+        _, client = cors_client
+
+        response = client.get('/', headers={'Origin': 'https://evil.example.com'})
+
+        assert 'Access-Control-Allow-Origin' not in response.headers
+        assert response.headers['Vary'] == 'Origin'
+
+    def test_wildcard(self):
+        """Test that a wildcard allows every origin, with or without an Origin header."""
+        client = create_app('testing', config_overrides={'CORS_ORIGINS': ['*']}).test_client()
+
+        assert client.get('/', headers={'Origin': 'https://any.example.com'}).headers['Access-Control-Allow-Origin'] == '*'
+        assert client.get('/').headers['Access-Control-Allow-Origin'] == '*'
+        assert preflight(client).headers['Access-Control-Allow-Origin'] == '*'
@@ -0,0 +1,120 @@
+"""
+Email domain policy tests.
+Tests rule parsing, trie lookups, hot reload and validate_email_domain.
+"""
+
+import os
+import pytest
+from app import create_app
+from build_domain_policy import build
+from utils.domain_policy import BLOCK, EXACT, ALLOW, DomainPolicy, parse_rules, write_policy
+from utils.validators import validate_email_domain
+
+RULES = """
+# disposable providers
+mailinator.com
+*.throwaway.io
+=mail.example.org
+!ok.mailinator.com
+"""
+
+
+@pytest.fixture
+def policy_path(tmp_path):
+    """Policy compiled from RULES."""
+    path = str(tmp_path / 'domains.bin')
+    write_policy(path, parse_rules(RULES.splitlines()))
+    return path
+
+
+class TestRules:
+    """Test cases for the text list format."""
+
+    def test_parse(self):
+        """Test rule prefixes, wildcards and comments."""
+        assert parse_rules(RULES.splitlines()) == {
+            'mailinator.com': BLOCK,
+            'throwaway.io': BLOCK,
+            'mail.example.org': EXACT,
+            'ok.mailinator.com': ALLOW
+        }
+
+    def test_invalid_rule(self):
+        """Test that malformed domains are refused."""
+        with pytest.raises(ValueError):
+            parse_rules(['bad..domain.com'])
+
+
+class TestDomainPolicy:
+    """Test cases for lookups in the compiled trie."""
+
+    def test_subtree_block(self, policy_path):
+        """Test that a plain rule blocks the domain and its subdomains."""
+        policy = DomainPolicy(policy_path)
+
+        assert policy.match('mailinator.com') == (True, 'mailinator.com')
+        assert policy.match('A.B.Mailinator.COM') == (True, 'mailinator.com')
+        assert policy.is_blocked('x.throwaway.io')
+        assert not policy.is_blocked('notmailinator.com')
+        assert not policy.is_blocked('com')
+
+    def test_exact_and_exceptions(self, policy_path):
+        """Test exact rules and allow exceptions under a blocked domain."""
+        policy = DomainPolicy(policy_path)
+
+        assert policy.is_blocked('mail.example.org')
+        assert not policy.is_blocked('eu.mail.example.org')
+        assert not policy.is_blocked('example.org')
+        assert policy.match('ok.mailinator.com') == (False, 'ok.mailinator.com')
+        assert not policy.is_blocked('team.ok.mailinator.com')
+        assert policy.snapshot()['rules'] == 4
+
+    def test_many_rules(self, tmp_path):
+        """Test a large list with shared suffixes."""
+        path = str(tmp_path / 'large.bin')
+        write_policy(path, {f'spam{n}.example{n % 50}.com': BLOCK for n in range(20000)})
+        policy = DomainPolicy(path)
+
+        assert policy.is_blocked('spam19999.example49.com')
+        assert policy.is_blocked('x.spam123.example23.com')
+        assert not policy.is_blocked('spam123.example24.com')
+
+    def test_hot_reload(self, policy_path, tmp_path):
+        """Test that a replaced file is picked up after the reload interval."""
+        policy = DomainPolicy(policy_path, reload_interval=0)
+        assert not policy.is_blocked('newspam.net')
+
+        source = tmp_path / 'rules.txt'
+        source.write_text(RULES + 'newspam.net\n')
+        build([str(source)], policy_path)
+
+        assert policy.is_blocked('newspam.net')
+        assert policy.snapshot()['reloads'] == 1
+
+    def test_bad_replacement_keeps_policy(self, policy_path):
+        """Test that an invalid new file leaves the loaded policy in place."""
+        policy = DomainPolicy(policy_path, reload_interval=0)
+        os.remove(policy_path)
+        with open(policy_path, 'wb') as broken:
+            broken.write(b'not a policy file')
+
+        assert policy.is_blocked('mailinator.com')
+        assert policy.snapshot()['reloads'] == 0
+
+
+class TestValidateEmailDomain:
+    """Test cases for validate_email_domain."""
+
+    def test_blocked_domain(self, policy_path):
+        """Test that a configured policy rejects blocked domains."""
+        app = create_app('testing', config_overrides={'EMAIL_DOMAIN_POLICY_FILE': policy_path})
+
+        with app.app_context():
+            is_valid, error = validate_email_domain('someone@inbox.mailinator.com')
+            assert not is_valid
+            assert 'domain' in error
+            assert validate_email_domain('someone@example.com') == (True, None)
+
+    def test_no_policy_configured(self, app):
+        """Test that every domain passes without a policy."""
+        assert validate_email_domain('someone@mailinator.com') == (True, None)
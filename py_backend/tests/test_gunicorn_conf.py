@@ -0,0 +1,77 @@
+"""
+Gunicorn configuration tests.
+Tests worker sizing, the connection budget check and fork hooks.
+"""
+
+import importlib.util
+import os
+import pytest
+from models import db
+
+
+@pytest.fixture
+def gunicorn_conf(monkeypatch):
+    """Load gunicorn.conf.py with explicit sizing so no hash is measured."""
+    monkeypatch.setenv('GUNICORN_WORKERS', '3')
+    monkeypatch.setenv('GUNICORN_THREADS', '4')
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeServer:
+    """Minimal stand-in for the gunicorn arbiter passed to hooks."""
+    
+    def __init__(self, app):
+        self.app = self
+        self._flask_app = app
+    
+    def wsgi(self):
+        return self._flask_app
+
+
+class TestSizing:
+    """Test cases for worker and thread sizing."""
+    
+    def test_explicit_sizing(self, gunicorn_conf):
+        """Test that environment overrides win over measured sizing."""
+        assert gunicorn_conf.workers == 3
+        assert gunicorn_conf.threads == 4
+    
+    def test_expensive_hash_uses_one_worker_per_core(self, gunicorn_conf):
+        """Test that CPU-heavy hashing avoids oversubscribing cores."""
+        assert gunicorn_conf.default_workers(4, hash_cost_ms=300) == 5
+        assert gunicorn_conf.default_workers(4, hash_cost_ms=1) == 9
+    
+    def test_threads_are_capped(self, gunicorn_conf):
+        """Test thread count bounds."""
+        assert gunicorn_conf.default_threads(300) == gunicorn_conf.MAX_THREADS
+        assert gunicorn_conf.default_threads(0.1) == 2
+
+
+class TestConnectionBudget:
+    """Test cases for the pool size check."""
+    
+    def test_budget_fits(self, gunicorn_conf):
+        """Test that a pool within the limit returns the peak."""
+        options = {'pool_size': 10, 'max_overflow': 20}
+        assert gunicorn_conf.validate_pool_budget(4, options, 151, reserved=5) == 120
+    
+    def test_budget_exceeded(self, gunicorn_conf):
+        """Test that an oversized pool is rejected."""
+        options = {'pool_size': 10, 'max_overflow': 20}
+        with pytest.raises(ValueError):
+            gunicorn_conf.validate_pool_budget(5, options, 151, reserved=5)
+
+
+class TestForkHooks:
+    """Test cases for the preload fork hooks."""
+    
+    def test_post_fork_replaces_pool(self, gunicorn_conf, app):
+        """Test that a worker starts with a fresh pool after fork."""
+        pool = db.engine.pool
+        gunicorn_conf.post_fork(FakeServer(app), worker=None)
+        
+        assert db.engine.pool is not pool
@@ -0,0 +1,93 @@
+"""
+Health probe tests.
+Tests liveness, cached readiness and the background prober.
+"""
+
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, event
+from utils.health import HealthProber, register_readiness_check
+
+
+class TestHealthEndpoints:
+    """Test cases for the health endpoints."""
+    
+    def test_health(self, client):
+        """Test the backwards-compatible health endpoint."""
+        response = client.get('/health')
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['status'] == 'healthy'
+        assert data['database'] == 'connected'
+    
+    def test_liveness(self, client):
+        """Test that liveness does not depend on the database."""
+        response = client.get('/health/live')
+        
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'alive'
+    
+    def test_readiness(self, client):
+        """Test that readiness reports the database and pool checks."""
+        response = client.get('/health/ready')
+        
+        assert response.status_code == 200
+        checks = response.get_json()['checks']
+        assert checks['database']['ok'] is True
+        assert 'db_pool' in checks
+    
+    def test_readiness_check_failure(self, app, client):
+        """Test that a failing registered check makes the app unready."""
+        register_readiness_check(app, 'hash_executor', lambda: (False, {'backlog': 500}))
+        response = client.get('/health/ready')
+        
+        assert response.status_code == 503
+        assert response.get_json()['checks']['hash_executor']['backlog'] == 500
+    
+    def test_pool_saturation_not_ready(self, app, client):
+        """Test that a saturated pool makes the app unready."""
+        metrics = app.extensions['pool_metrics']['primary']
+        metrics.snapshot = lambda: {'saturation': 1.0}
+        response = client.get('/health/ready')
+        
+        assert response.status_code == 503
+        assert response.get_json()['checks']['db_pool']['ok'] is False
+
+
+class TestHealthProber:
+    """Test cases for the background prober."""
+    
+    def test_unreachable_database(self, app, tmp_path):
+        """Test that a database that cannot be opened is reported."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'db.sqlite'}")
+        prober = HealthProber(app, engine, interval=0, timeout=1, max_pool_saturation=0.9)
+        
+        assert prober.probe_once()['database'] == 'disconnected'
+    
+    def test_probe_timeout(self, app, tmp_path):
+        """Test that a hung probe is reported without blocking later probes."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        release = threading.Event()
+        event.listen(engine, 'before_cursor_execute', lambda *args: release.wait(5))
+        prober = HealthProber(app, engine, interval=0, timeout=0.1, max_pool_saturation=0.9)
+        
+        started = time.perf_counter()
+        assert prober.probe_once()['database'] == 'timeout'
+        assert prober.probe_once()['database'] == 'timeout'
+        assert time.perf_counter() - started < 1
+        release.set()
+    
+    def test_background_result_is_cached(self, app, tmp_path):
+        """Test that readiness serves the cached result between probes."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        probes = []
+        event.listen(engine, 'before_cursor_execute', lambda *args: probes.append(1))
+        prober = HealthProber(app, engine, interval=60, timeout=1, max_pool_saturation=0.9)
+        
+        for _ in range(5):
+            assert prober.database_status()['database'] == 'connected'
+        prober.stop()
+        
+        assert len(probes) <= 2
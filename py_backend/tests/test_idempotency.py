@@ -0,0 +1,287 @@
+"""
+Idempotency tests.
+Tests replaying responses for repeated Idempotency-Keys, serialization of
+concurrent duplicates and the shared key table.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, insert, select
+from app import create_app, init_db
+from models import db, IdempotencyKey, User
+from utils.auth import generate_token, hash_password
+from utils.idempotency import BUSY, MISMATCH, PROCEED, REPLAY, IdempotencyStore, request_identity
+
+
+def add_user(email='idem@example.com'):
+    """Add a user; returns headers authenticating as them."""
+    user = User(email=email, password=hash_password('password123'), first_name='Idem', last_name='Potent')
+    db.session.add(user)
+    db.session.flush()
+    token = generate_token(user.id)
+    db.session.commit()
+    return {'Authorization': f'Bearer {token}'}
+
+
+def count_updates(engine):
+    """Start counting profile UPDATE statements; returns the live list."""
+    updates = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: updates.append(statement)
+                 if statement.startswith('UPDATE users SET first_name') else None)
+    return updates
+
+
+def patch(client, headers, key, **body):
+    return client.patch('/user/update', headers=dict(headers, **{'Idempotency-Key': key}), json=body)
+
+
+class TestIdempotentRoutes:
+    """Test cases for the Idempotency-Key header on mutating routes."""
+
+    def test_retry_replays_response(self, app, client):
+        """Test that a retry gets the first response without writing again."""
+        headers = add_user()
+        updates = count_updates(db.engine)
+
+        first = patch(client, headers, 'retry-1', first_name='Once')
+        retry = patch(client, headers, 'retry-1', first_name='Once')
+
+        assert first.status_code == retry.status_code == 200
+        assert retry.get_json() == first.get_json()
+        assert retry.headers['ETag'] == first.headers['ETag'] == '"2"'
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert 'Idempotent-Replayed' not in first.headers
+        assert len(updates) == 1
+        assert app.extensions['idempotency'].snapshot()['replayed'] == 1
+
+    def test_requests_without_key_run_every_time(self, client):
+        """Test that the header is opt-in."""
+        headers = add_user()
+
+        client.patch('/user/update', headers=headers, json={'first_name': 'A'})
+        response = client.patch('/user/update', headers=headers, json={'first_name': 'A'})
+
+        assert response.get_json()['user']['version'] == 3
+
+    def test_key_reused_with_other_body(self, client):
+        """Test that a key cannot be reused for a different request."""
+        headers = add_user()
+        patch(client, headers, 'reuse', first_name='First')
+
+        response = patch(client, headers, 'reuse', first_name='Second')
+
+        assert response.status_code == 422
+        assert User.query.one().first_name == 'First'
+
+    def test_keys_scoped_to_credentials(self, client):
+        """Test that two users may send the same key."""
+        alice, bob = add_user('alice@example.com'), add_user('bob@example.com')
+
+        patch(client, alice, 'shared', first_name='Alice')
+        response = patch(client, bob, 'shared', first_name='Alice')
+
+        assert 'Idempotent-Replayed' not in response.headers
+        assert response.get_json()['user']['email'] == 'bob@example.com'
+
+    def test_server_error_releases_key(self, app, client):
+        """Test that a retry after a failed request runs again."""
+        headers = add_user()
+
+        def fail(conn, cursor, statement, *args):
+            if statement.startswith('UPDATE users'):
+                raise RuntimeError('database went away')
+        event.listen(db.engine, 'before_cursor_execute', fail)
+        assert patch(client, headers, 'flaky', first_name='Later').status_code == 500
+        event.remove(db.engine, 'before_cursor_execute', fail)
+
+        response = patch(client, headers, 'flaky', first_name='Later')
+
+        assert response.status_code == 200
+        assert 'Idempotent-Replayed' not in response.headers
+        assert app.extensions['idempotency'].snapshot()['released'] == 1
+
+    def test_client_errors_are_replayed(self, client):
+        """Test that a rejected request is answered the same way on retry."""
+        headers = add_user()
+
+        first = patch(client, headers, 'bad', first_name='x' * 101)
+        retry = patch(client, headers, 'bad', first_name='x' * 101)
+
+        assert first.status_code == retry.status_code == 400
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+
+    def test_invalid_key(self, client):
+        """Test that empty and oversized keys are rejected."""
+        headers = add_user()
+
+        assert patch(client, headers, '', first_name='A').status_code == 400
+        assert patch(client, headers, 'k' * 256, first_name='A').status_code == 400
+
+    def test_admin_batch(self, app, client):
+        """Test that a retried batch update is replayed."""
+        app.config['ADMIN_API_KEY'] = 'admin-key'
+        add_user()
+        records = {'users': [{'id': User.query.one().id, 'last_name': 'Batched'}]}
+        headers = {'X-Admin-Key': 'admin-key', 'Idempotency-Key': 'batch-1'}
+
+        first = client.patch('/admin/users', headers=headers, json=records)
+        retry = client.patch('/admin/users', headers=headers, json=records)
+
+        assert retry.get_json() == first.get_json()
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert User.query.one().version == 2
+
+    def test_disabled(self):
+        """Test that the header is ignored when idempotency is disabled."""
+        app = create_app('testing', config_overrides={'IDEMPOTENCY_ENABLED': False})
+
+        assert 'idempotency' not in app.extensions
+
+
+class TestIdempotencyStore:
+    """Test cases for the in-process store."""
+
+    def test_duplicate_waits_for_first(self):
+        """Test that a concurrent duplicate blocks, then replays the first response."""
+        store = IdempotencyStore(ttl=60, max_entries=10, wait_timeout=5)
+        assert store.begin('key', 'fp') == (PROCEED, None)
+        outcomes = []
+        duplicate = threading.Thread(target=lambda: outcomes.append(store.begin('key', 'fp')))
+        duplicate.start()
+        duplicate.join(0.1)
+        assert duplicate.is_alive()
+
+        store.complete('key', 200, [('ETag', '"2"')], '{"success": true}')
+        duplicate.join(5)
+
+        assert outcomes == [(REPLAY, (200, [('ETag', '"2"')], '{"success": true}'))]
+        assert store.snapshot()['waited'] == 1
+
+    def test_duplicate_claims_released_key(self):
+        """Test that a waiting duplicate runs itself when the first request fails."""
+        store = IdempotencyStore(ttl=60, max_entries=10, wait_timeout=5)
+        store.begin('key', 'fp')
+        outcomes = []
+        duplicate = threading.Thread(target=lambda: outcomes.append(store.begin('key', 'fp')))
+        duplicate.start()
+
+        store.release('key')
+        duplicate.join(5)
+
+        assert outcomes == [(PROCEED, None)]
+
+    def test_busy_mismatch_and_expiry(self):
+        """Test the wait timeout, fingerprint check and TTL."""
+        store = IdempotencyStore(ttl=0.05, max_entries=10, wait_timeout=0.01)
+        store.begin('key', 'fp')
+
+        assert store.begin('key', 'fp') == (BUSY, None)
+        assert store.begin('key', 'other') == (MISMATCH, None)
+        store.complete('key', 200, [], '{}')
+        threading.Event().wait(0.06)
+        assert store.begin('key', 'other') == (PROCEED, None)
+
+    def test_eviction_keeps_pending_keys(self):
+        """Test that the oldest answered keys are evicted first."""
+        store = IdempotencyStore(ttl=60, max_entries=2, wait_timeout=0)
+        store.begin('pending', 'fp')
+        for key in ('a', 'b'):
+            store.begin(key, 'fp')
+            store.complete(key, 200, [], '{}')
+
+        assert store.begin('pending', 'fp') == (BUSY, None)
+        assert store.begin('b', 'fp')[0] == REPLAY
+        assert store.begin('a', 'fp') == (PROCEED, None)
+
+
+class TestSharedKeys:
+    """Test cases for keys stored in the database for every worker."""
+
+    @pytest.fixture
+    def workers(self, tmp_path):
+        """Two applications on one database, like two Gunicorn workers."""
+        settings = {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'idempotency.db'}",
+            'IDEMPOTENCY_DB_ENABLED': True,
+            'IDEMPOTENCY_WAIT_TIMEOUT': 0.2
+        }
+        apps = [create_app('testing', config_overrides=settings) for _ in range(2)]
+        init_db(apps[0])
+        with apps[0].app_context():
+            headers = add_user()
+            db.session.remove()
+        return apps, headers
+
+    def test_replayed_by_other_worker(self, workers):
+        """Test that a retry landing on another worker is replayed from the table."""
+        (worker_a, worker_b), headers = workers
+
+        first = patch(worker_a.test_client(), headers, 'shared-1', first_name='Once')
+        retry = patch(worker_b.test_client(), headers, 'shared-1', first_name='Once')
+
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert retry.get_json() == first.get_json()
+        with worker_b.app_context():
+            assert User.query.one().version == 2
+            db.session.remove()
+
+    def claim(self, worker, headers, key, lease):
+        """Insert the row of a request another worker is running, leased for lease."""
+        with worker.test_request_context('/user/update', method='PATCH', headers=dict(headers, **{
+            'Idempotency-Key': key
+        }), json={'first_name': 'Slow'}):
+            scoped_key, fingerprint = request_identity(key)
+            db.session.execute(insert(IdempotencyKey.__table__).values(
+                key=scoped_key, fingerprint=fingerprint, expires_at=datetime.utcnow() + lease
+            ))
+            db.session.commit()
+            db.session.remove()
+
+    def test_in_progress_on_other_worker(self, workers):
+        """Test that a duplicate of a request still running elsewhere gets 409."""
+        (worker_a, worker_b), headers = workers
+        client = worker_b.test_client()
+        self.claim(worker_b, headers, 'running', timedelta(seconds=30))
+
+        response = patch(client, headers, 'running', first_name='Slow')
+
+        assert response.status_code == 409
+        assert response.headers['Retry-After'] == '1'
+        with worker_b.app_context():
+            assert User.query.one().version == 1
+            db.session.remove()
+
+    def test_stale_claim_is_taken_over(self, workers):
+        """Test that a key whose worker died is claimed again once its lease runs out."""
+        (worker_a, worker_b), headers = workers
+        store = worker_a.extensions['idempotency']
+        store.lock_timeout = 0.1
+        with worker_a.test_request_context('/user/update', method='PATCH', headers=dict(headers, **{
+            'Idempotency-Key': 'orphaned'
+        }), json={'first_name': 'Slow'}):
+            key, fingerprint = request_identity('orphaned')
+        # Worker A claims the key, then dies without answering
+        assert store._claim_row(key, fingerprint, time.monotonic()) == (PROCEED, None)
+        time.sleep(0.15)
+
+        response = patch(worker_b.test_client(), headers, 'orphaned', first_name='Slow')
+
+        assert response.status_code == 200
+        assert response.get_json()['user']['version'] == 2
+
+    def test_answered_key_kept_for_ttl(self, workers):
+        """Test that storing the response extends the short lease to the full TTL."""
+        (worker_a, _), headers = workers
+        store = worker_a.extensions['idempotency']
+        store.lock_timeout = 0.1
+
+        patch(worker_a.test_client(), headers, 'answered', first_name='Once')
+        time.sleep(0.15)
+
+        with worker_a.app_context():
+            expires_at = db.session.execute(select(IdempotencyKey.__table__.c.expires_at)).scalar()
+            db.session.remove()
+        assert expires_at > datetime.utcnow() + timedelta(seconds=store.ttl - 60)
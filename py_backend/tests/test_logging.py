@@ -0,0 +1,146 @@
+"""
+Logging pipeline tests.
+Tests the bounded log queue, batched file writes, JSON formatting and
+per-route sampling.
+"""
+
+import json
+import logging
+import pytest
+from utils.log_pipeline import (
+    BatchingQueueListener, BatchRotatingFileHandler, DroppingQueueHandler,
+    JsonFormatter, init_log_pipeline, parse_sample_rates
+)
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """File handler writing to a temporary log file."""
+    handler = BatchRotatingFileHandler(str(tmp_path / 'app.log'), maxBytes=0, backupCount=0)
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    yield handler
+    handler.close()
+
+
+@pytest.fixture
+def pipeline(app, log_file):
+    """Route app.logger through the queue for one test."""
+    app.config['LOG_SAMPLE_RATES'] = '/health/live=0'
+    before = list(app.logger.handlers), app.logger.level
+    app.logger.setLevel(logging.INFO)
+    listener = init_log_pipeline(app, [log_file])
+    yield listener
+    listener.stop()
+    app.logger.handlers[:] = before[0]
+    app.logger.setLevel(before[1])
+
+
+def read_lines(handler):
+    with open(handler.baseFilename) as log:
+        return log.read().splitlines()
+
+
+class TestLogPipeline:
+    """Test cases for the queue-based logging pipeline."""
+
+    def test_records_written_by_listener(self, app, pipeline, log_file):
+        """Test that records reach the file once the listener drains the queue."""
+        app.logger.warning('queued %s', 'message')
+        pipeline.stop()
+
+        assert read_lines(log_file) == ['WARNING queued message']
+
+    def test_drops_when_full(self, log_file):
+        """Test that a full queue drops and counts records instead of blocking."""
+        listener = BatchingQueueListener([log_file], maxsize=2)
+        handler = DroppingQueueHandler(listener)
+        logger = logging.getLogger('test_drops_when_full')
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        for index in range(5):
+            logger.warning('record %d', index)
+
+        assert handler.dropped == 3
+        listener.start()
+        listener.stop()
+        assert read_lines(log_file) == ['WARNING record 0', 'WARNING record 1']
+
+    def test_batched_write(self, log_file):
+        """Test that queued records are written as one batch."""
+        listener = BatchingQueueListener([log_file], batch_size=100)
+        handler = DroppingQueueHandler(listener)
+        logger = logging.getLogger('test_batched_write')
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        for index in range(10):
+            logger.warning('record %d', index)
+        listener.start()
+        listener.stop()
+
+        assert listener.batches == 1
+        assert len(read_lines(log_file)) == 10
+
+    def test_exception_kept(self, app, pipeline, log_file):
+        """Test that tracebacks survive the trip through the queue."""
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            app.logger.exception('failed')
+        pipeline.stop()
+
+        text = '\n'.join(read_lines(log_file))
+        assert 'ERROR failed' in text
+        assert 'ValueError: boom' in text
+
+    def test_route_sampling(self, app, client, pipeline, log_file):
+        """Test that INFO records are sampled per route and warnings always kept."""
+        @app.route('/health/live-log')
+        def noisy():
+            app.logger.info('info from %s', 'noisy route')
+            return 'ok'
+
+        with app.test_request_context('/health/live'):
+            app.logger.info('sampled out')
+            app.logger.warning('always kept')
+        client.get('/health/live-log')
+        pipeline.stop()
+
+        lines = read_lines(log_file)
+        assert 'WARNING always kept' in lines
+        assert 'INFO info from noisy route' in lines
+        assert 'INFO sampled out' not in lines
+
+    def test_metrics(self, app, client, pipeline):
+        """Test that queue metrics are served at /metrics."""
+        response = client.get('/metrics')
+
+        logging_metrics = response.get_json()['metrics']['logging']
+        assert logging_metrics['queue_size'] == app.config['LOG_QUEUE_SIZE']
+        assert logging_metrics['dropped'] == 0
+
+    def test_parse_sample_rates(self):
+        """Test parsing of LOG_SAMPLE_RATES."""
+        assert parse_sample_rates('/health/live=0.01, /user/me=0.5') == {
+            '/health/live': 0.01,
+            '/user/me': 0.5
+        }
+        assert parse_sample_rates('') == {}
+
+
+class TestJsonFormatter:
+    """Test cases for structured log output."""
+
+    def test_request_fields(self, app, pipeline, log_file):
+        """Test that JSON lines include the request the record was logged in."""
+        log_file.setFormatter(JsonFormatter())
+        with app.test_request_context('/user/me', method='PUT'):
+            app.logger.warning('update %s', 'failed')
+        pipeline.stop()
+
+        data = json.loads(read_lines(log_file)[0])
+        assert data['level'] == 'WARNING'
+        assert data['message'] == 'update failed'
+        assert data['method'] == 'PUT'
+        assert data['path'] == '/user/me'
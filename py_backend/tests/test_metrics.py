@@ -0,0 +1,57 @@
+"""
+Metrics endpoint tests.
+Tests connection pool instrumentation exposed at /metrics.
+"""
+
+import logging
+import pytest
+from models import db
+
+
+class TestPoolMetrics:
+    """Test cases for connection pool metrics."""
+    
+    def test_metrics_endpoint(self, client, auth_token):
+        """Test that pool metrics are served after a database request."""
+        client.get('/user/me', headers={'Authorization': f'Bearer {auth_token}'})
+        response = client.get('/metrics')
+        
+        assert response.status_code == 200
+        pool = response.get_json()['metrics']['db_pool']['primary']
+        assert pool['counters']['checkouts'] > 0
+        assert pool['counters']['connects'] >= 1
+        assert pool['checkout_wait_ms']['samples'] > 0
+    
+    def test_invalidation_counted(self, app):
+        """Test that invalidated connections are counted."""
+        metrics = app.extensions['pool_metrics']['primary']
+        before = metrics.counters['invalidations']
+        
+        connection = db.engine.connect()
+        connection.invalidate()
+        connection.close()
+        
+        assert metrics.counters['invalidations'] == before + 1
+    
+    def test_slow_checkout_warning(self, app, caplog):
+        """Test that waits above the threshold are logged and counted."""
+        metrics = app.extensions['pool_metrics']['primary']
+        metrics.wait_warning_ms = 0
+        
+        with caplog.at_level(logging.WARNING, logger=app.logger.name):
+            with db.engine.connect():
+                pass
+        
+        assert metrics.counters['slow_checkouts'] >= 1
+        assert 'Slow connection checkout on primary' in caplog.text
+    
+    def test_wrapper_survives_dispose(self, app):
+        """Test that checkouts are still timed after the pool is recreated."""
+        metrics = app.extensions['pool_metrics']['primary']
+        db.engine.dispose()
+        before = metrics.snapshot()['checkout_wait_ms']['samples']
+        
+        with db.engine.connect():
+            pass
+        
+        assert metrics.snapshot()['checkout_wait_ms']['samples'] == before + 1
@@ -0,0 +1,180 @@
+"""
+Read replica routing tests.
+Uses two SQLite files standing in for the primary and a replica.
+"""
+
+import pytest
+from app import create_app
+from models import db, User
+from utils.auth import hash_password, generate_token
+from utils.replicas import ReplicaRouter
+
+USER_ID = '00000000-0000-4000-8000-000000000001'
+
+
+def make_app(tmp_path, replica_uri=None, **overrides):
+    """Create an app with a file-backed primary and one replica."""
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'SQLALCHEMY_REPLICA_URIS': [replica_uri or f"sqlite:///{tmp_path / 'replica.db'}"],
+    }
+    config.update(overrides)
+    return create_app('testing', config_overrides=config)
+
+
+def seed(engine, first_name, password_hash):
+    """Create the users table on engine and insert the shared test user."""
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert().values(
+            id=USER_ID,
+            email='test@example.com',
+            password=password_hash,
+            first_name=first_name,
+            last_name='User'
+        ))
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """App whose primary and replica hold different first names."""
+    app = make_app(tmp_path)
+
+    with app.app_context():
+        password_hash = hash_password('password123')
+        seed(db.engine, 'Primary', password_hash)
+        seed(app.extensions['replica_router'].engines[0], 'Replica', password_hash)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def token(replica_app):
+    """Token for the shared test user."""
+    return generate_token(USER_ID)
+
+
+class TestReplicaRouting:
+    """Test cases for read/write splitting."""
+
+    def test_user_me_reads_from_replica(self, replica_app, token):
+        """Test that /user/me is served by the replica."""
+        client = replica_app.test_client()
+        response = client.get('/user/me', headers={'Authorization': f'Bearer {token}'})
+
+        assert response.status_code == 200
+        assert response.get_json()['user']['first_name'] == 'Replica'
+
+    def test_login_reads_from_replica(self, replica_app):
+        """Test that the login lookup is served by the replica."""
+        client = replica_app.test_client()
+        response = client.post('/auth/login', json={
+            'email': 'test@example.com',
+            'password': 'password123'
+        })
+
+        assert response.status_code == 200
+        assert response.get_json()['user']['first_name'] == 'Replica'
+
+    def test_update_writes_to_primary_and_sticks(self, replica_app, token):
+        """Test that updates hit the primary and later reads stay there."""
+        client = replica_app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+
+        response = client.patch('/user/update', headers=headers, json={'last_name': 'Doe'})
+        assert response.status_code == 200
+        assert response.get_json()['user']['first_name'] == 'Primary'
+
+        db.session.expire_all()
+        response = client.get('/user/me', headers=headers)
+        assert response.get_json()['user']['last_name'] == 'Doe'
+
+        with replica_app.extensions['replica_router'].engines[0].connect() as conn:
+            row = conn.execute(User.__table__.select()).first()
+        assert row.last_name == 'User'
+
+    def test_sticky_window_expires(self, tmp_path):
+        """Test that reads return to the replica without a sticky window."""
+        app = make_app(tmp_path, DB_REPLICA_STICKY_SECONDS=0)
+
+        with app.app_context():
+            password_hash = hash_password('password123')
+            seed(db.engine, 'Primary', password_hash)
+            seed(app.extensions['replica_router'].engines[0], 'Replica', password_hash)
+            headers = {'Authorization': f'Bearer {generate_token(USER_ID)}'}
+            client = app.test_client()
+
+            client.patch('/user/update', headers=headers, json={'last_name': 'Doe'})
+            db.session.expire_all()
+            response = client.get('/user/me', headers=headers)
+
+            assert response.get_json()['user']['first_name'] == 'Replica'
+            db.session.remove()
+
+    def test_sticky_across_workers(self, tmp_path):
+        """Test that a read on another worker after an update stays on the primary."""
+        shared = {'SHARED_CACHE_ENABLED': True, 'SHARED_CACHE_PATH': str(tmp_path / 'host.cache'),
+                  'SHARED_CACHE_SLOTS': 256}
+        worker_a, worker_b = make_app(tmp_path, **shared), make_app(tmp_path, **shared)
+
+        with worker_a.app_context():
+            password_hash = hash_password('password123')
+            seed(db.engine, 'Primary', password_hash)
+            seed(worker_a.extensions['replica_router'].engines[0], 'Replica', password_hash)
+            headers = {'Authorization': f'Bearer {generate_token(USER_ID)}'}
+            worker_a.test_client().patch('/user/update', headers=headers, json={'last_name': 'Doe'})
+            db.session.remove()
+
+        with worker_b.app_context():
+            response = worker_b.test_client().get('/user/me', headers=headers)
+
+            assert response.get_json()['user']['last_name'] == 'Doe'
+            assert response.headers['ETag'] == '"2"'
+            db.session.remove()
+
+    def test_failing_replica_is_ejected(self, tmp_path):
+        """Test that a broken replica falls back to the primary and is ejected."""
+        broken_uri = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+        app = make_app(tmp_path, replica_uri=broken_uri)
+
+        with app.app_context():
+            seed(db.engine, 'Primary', hash_password('password123'))
+            headers = {'Authorization': f'Bearer {generate_token(USER_ID)}'}
+            response = app.test_client().get('/user/me', headers=headers)
+
+            assert response.status_code == 200
+            assert response.get_json()['user']['first_name'] == 'Primary'
+            assert app.extensions['replica_router'].healthy_count() == 0
+            db.session.remove()
+
+
+class TestReplicaRouter:
+    """Test cases for replica selection."""
+
+    def test_round_robin(self, tmp_path):
+        """Test that replicas are chosen in turn."""
+        app = make_app(tmp_path, SQLALCHEMY_REPLICA_URIS=[
+            f"sqlite:///{tmp_path / 'a.db'}",
+            f"sqlite:///{tmp_path / 'b.db'}"
+        ])
+
+        with app.app_context():
+            router = app.extensions['replica_router']
+            first, second, third = router.choose(), router.choose(), router.choose()
+
+            assert first is not second
+            assert first is third
+
+    def test_ejected_replica_is_skipped(self, tmp_path):
+        """Test that ejected replicas leave the rotation until readmitted."""
+        app = make_app(tmp_path)
+
+        with app.app_context():
+            engine = app.extensions['replica_router'].engines[0]
+            router = ReplicaRouter([engine], eject_seconds=60)
+            router.eject(engine)
+            assert router.choose() is None
+
+            router.eject_seconds = 0
+            router.eject(engine)
+            assert router.choose() is engine
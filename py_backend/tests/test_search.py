@@ -0,0 +1,193 @@
+"""
+User search tests.
+Tests normalization, prefix and substring search, and index maintenance.
+"""
+
+import pytest
+from sqlalchemy import event, select, update
+from app import create_app, init_db
+from build_search_index import backfill
+from models import db, User, UserSearchGram
+from utils.auth import generate_token, hash_password
+from utils.search import normalize_search_text, query_grams, user_grams
+
+STAFF = [
+    ('José', 'Álvarez', 'jose.alvarez@example.com'),
+    ('Jane', 'Smith', 'jane.smith@example.com'),
+    ('Janet', 'Smithers', 'jsmithers@example.com'),
+    ('Bob', 'Jansen', 'bob@example.com')
+]
+
+
+def add_staff():
+    """Add the staff users; returns headers authenticating as Jane Smith."""
+    password_hash = hash_password('password123')
+    users = [User(email=email, password=password_hash, first_name=first_name, last_name=last_name)
+             for first_name, last_name, email in STAFF]
+    db.session.add_all(users)
+    db.session.flush()
+    token = generate_token(users[1].id)
+    db.session.commit()
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def headers(app):
+    return add_staff()
+
+
+@pytest.fixture
+def ngram_app(app):
+    """The test app with the trigram table maintained."""
+    app.config['SEARCH_NGRAM_ENABLED'] = True
+    return app
+
+
+def search(client, headers, **params):
+    response = client.get('/user/search', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return [user['email'] for user in response.get_json()['users']]
+
+
+def grams_of(email):
+    user_id = User.query.filter_by(email=email).one().id
+    table = UserSearchGram.__table__
+    return set(db.session.execute(select(table.c.gram).where(table.c.user_id == user_id)).scalars())
+
+
+class TestNormalization:
+    """Test cases for search text normalization and trigrams."""
+
+    def test_normalize(self):
+        """Test that case, accents and spacing are ignored."""
+        assert normalize_search_text('  José   ÁLVAREZ ') == 'jose alvarez'
+        assert normalize_search_text('Straße') == 'strasse'
+        assert normalize_search_text(None) == ''
+
+    def test_grams(self):
+        """Test the trigrams of a user and of a query."""
+        assert user_grams('jo al', 'jose@example.com') == {'jos', 'ose'}
+        assert query_grams('smi') == {'smi'}
+        assert query_grams('th@exa') == set()
+
+    def test_columns_filled_on_insert(self, app, headers):
+        """Test that new users get their normalized search columns."""
+        user = User.query.filter_by(email='jose.alvarez@example.com').one()
+
+        assert user.search_name == 'jose alvarez'
+        assert user.search_last_name == 'alvarez'
+        assert user.search_email == 'jose.alvarez@example.com'
+
+
+class TestPrefixSearch:
+    """Test cases for prefix search."""
+
+    def test_name_last_name_and_email(self, client, headers):
+        """Test ranking: name prefix, then last name prefix, then email prefix."""
+        assert search(client, headers, q='jan') == [
+            'jane.smith@example.com', 'jsmithers@example.com', 'bob@example.com'
+        ]
+        assert search(client, headers, q='Jane Sm') == ['jane.smith@example.com']
+        assert search(client, headers, q='ALVA') == ['jose.alvarez@example.com']
+        assert search(client, headers, q='jsm') == ['jsmithers@example.com']
+
+    def test_limit(self, client, headers):
+        """Test that results stop at the limit."""
+        assert len(search(client, headers, q='j', limit=2)) == 2
+
+    def test_uses_range_not_like(self, app, client, headers):
+        """Test that the query is an index range, not a LIKE pattern."""
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        search(client, headers, q='smi')
+
+        selects = [statement for statement in statements if 'users.search_' in statement]
+        assert len(selects) == 3
+        assert all('LIKE' not in statement and '>=' in statement for statement in selects)
+
+    def test_invalid_parameters(self, client, headers):
+        """Test that empty queries and bad limits or modes are rejected."""
+        for params in ({'q': '  '}, {'q': 'a', 'limit': 0}, {'q': 'a', 'limit': 500}, {'q': 'a', 'limit': '\u00b2'},
+                       {'q': 'a', 'mode': 'fuzzy'}, {'q': 'smith', 'mode': 'substring'}):
+            assert client.get('/user/search', headers=headers, query_string=params).status_code == 400
+
+    def test_requires_token(self, client):
+        """Test that search is only available to authenticated users."""
+        assert client.get('/user/search?q=a').status_code == 401
+
+
+class TestSubstringSearch:
+    """Test cases for trigram-backed substring search."""
+
+    def test_substring(self, ngram_app, client):
+        """Test matches inside names and email local parts."""
+        headers = add_staff()
+
+        assert search(client, headers, q='mith', mode='substring') == [
+            'jane.smith@example.com', 'jsmithers@example.com'
+        ]
+        assert search(client, headers, q='varez@exa', mode='substring') == ['jose.alvarez@example.com']
+        assert search(client, headers, q='mithx', mode='substring') == []
+
+    def test_short_query_rejected(self, ngram_app, client):
+        """Test that queries without a trigram are rejected."""
+        headers = add_staff()
+
+        response = client.get('/user/search', headers=headers, query_string={'q': 'sm', 'mode': 'substring'})
+        assert response.status_code == 400
+
+    def test_update_refreshes_index(self, ngram_app, client):
+        """Test that a name change moves the search columns and trigrams."""
+        headers = add_staff()
+
+        response = client.patch('/user/update', headers=headers, json={'last_name': 'Zürich'})
+        assert response.status_code == 200
+
+        assert search(client, headers, q='zuri') == ['jane.smith@example.com']
+        assert search(client, headers, q='smi') == ['jsmithers@example.com']
+        assert grams_of('jane.smith@example.com') == user_grams('jane zurich', 'jane.smith@example.com')
+
+
+class TestBackfill:
+    """Test cases for build_search_index.backfill."""
+
+    def test_backfill(self, ngram_app):
+        """Test rebuilding columns and trigrams for rows written outside the ORM."""
+        add_staff()
+        table = User.__table__
+        db.session.execute(update(table).values(search_name=None, search_last_name=None, search_email=None))
+        db.session.execute(UserSearchGram.__table__.delete())
+        db.session.commit()
+
+        assert backfill(db.session, batch_size=3, grams=True) == len(STAFF)
+
+        user = User.query.filter_by(email='bob@example.com').one()
+        db.session.refresh(user)
+        assert user.search_name == 'bob jansen'
+        assert grams_of('bob@example.com') == {'bob', 'jan', 'ans', 'nse', 'sen'}
+
+
+class TestShardedSearch:
+    """Test cases for search across shards."""
+
+    def test_merged_results(self, tmp_path):
+        """Test that results from every shard are merged and ranked."""
+        app = create_app('testing', config_overrides={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+            'SQLALCHEMY_SHARD_URIS': [f"sqlite:///{tmp_path / f'shard{index}.db'}" for index in range(3)],
+            'SEARCH_NGRAM_ENABLED': True
+        })
+        init_db(app)
+        with app.app_context():
+            headers = add_staff()
+            client = app.test_client()
+
+            assert search(client, headers, q='jan') == [
+                'jane.smith@example.com', 'jsmithers@example.com', 'bob@example.com'
+            ]
+            assert search(client, headers, q='mith', mode='substring') == [
+                'jane.smith@example.com', 'jsmithers@example.com'
+            ]
+            db.session.remove()
@@ -0,0 +1,135 @@
+"""
+User sharding tests.
+Uses several SQLite files standing in for the shards.
+"""
+
+import pytest
+from sqlalchemy import select
+from app import create_app, init_db
+from models import db, User
+from utils.auth import hash_password, generate_token
+from utils.sharding import ShardMap
+
+SHARD_COUNT = 3
+EMAILS = [f'user{index}@example.com' for index in range(12)]
+
+
+@pytest.fixture
+def sharded_app(tmp_path):
+    """App with three shard files and a seeded user per email."""
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'SQLALCHEMY_SHARD_URIS': [
+            f"sqlite:///{tmp_path / f'shard{index}.db'}" for index in range(SHARD_COUNT)
+        ]
+    })
+    init_db(app)
+
+    with app.app_context():
+        password_hash = hash_password('password123')
+        for email in EMAILS:
+            db.session.add(User(
+                email=email,
+                password=password_hash,
+                first_name='Test',
+                last_name='User'
+            ))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def users_on(engine):
+    """Return the emails stored on a shard engine."""
+    with engine.connect() as conn:
+        return {row.email for row in conn.execute(select(User.__table__.c.email))}
+
+
+class TestShardMap:
+    """Test cases for the email and id mapping."""
+
+    def test_email_mapping_is_stable_and_normalized(self):
+        """Test that shard placement ignores case and whitespace."""
+        shard_map = ShardMap([object()] * 8)
+
+        assert shard_map.shard_for_email('User@Example.com ') == shard_map.shard_for_email('user@example.com')
+        assert shard_map.shard_for_email('user@example.com') == ShardMap([object()] * 8).shard_for_email('user@example.com')
+
+    def test_user_id_encodes_shard(self):
+        """Test that the shard can be recovered from a new user id."""
+        shard_map = ShardMap([object()] * 8)
+
+        for email in EMAILS:
+            user_id = shard_map.new_user_id(email)
+            assert len(user_id) == 36
+            assert shard_map.shard_for_id(user_id) == shard_map.shard_for_email(email)
+
+    def test_invalid_id_has_no_shard(self):
+        """Test that ids naming a missing shard are rejected."""
+        shard_map = ShardMap([object()] * 2)
+
+        assert shard_map.shard_for_id('ff000000-0000-4000-8000-000000000000') is None
+        assert shard_map.shard_for_id('zz') is None
+        assert shard_map.shard_for_id(None) is None
+
+
+class TestShardedStorage:
+    """Test cases for requests against sharded users."""
+
+    def test_users_are_written_to_their_shard(self, sharded_app):
+        """Test that each user row lands only on its email's shard."""
+        shard_map = sharded_app.extensions['shard_map']
+        placed = [users_on(engine) for engine in shard_map.engines]
+
+        for email in EMAILS:
+            shard = shard_map.shard_for_email(email)
+            assert email in placed[shard]
+            assert all(email not in emails for index, emails in enumerate(placed) if index != shard)
+
+        with db.engine.connect() as conn:
+            assert conn.execute(select(User.__table__.c.id)).first() is None
+
+    def test_login_and_update_route_to_shard(self, sharded_app):
+        """Test login, /user/me and /user/update for users on every shard."""
+        client = sharded_app.test_client()
+
+        for email in EMAILS[:SHARD_COUNT * 2]:
+            response = client.post('/auth/login', json={'email': email, 'password': 'password123'})
+            assert response.status_code == 200
+            headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+            response = client.patch('/user/update', headers=headers, json={'last_name': 'Doe'})
+            assert response.status_code == 200
+
+            response = client.get('/user/me', headers=headers)
+            assert response.get_json()['user']['email'] == email
+            assert response.get_json()['user']['last_name'] == 'Doe'
+
+    def test_token_for_unknown_shard_is_rejected(self, sharded_app):
+        """Test that a token naming a shard that does not exist is refused."""
+        token = generate_token('ff000000-0000-4000-8000-000000000000')
+        response = sharded_app.test_client().get(
+            '/user/me',
+            headers={'Authorization': f'Bearer {token}'}
+        )
+
+        assert response.status_code == 401
+
+    def test_scan_fans_out_to_all_shards(self, sharded_app):
+        """Test that an admin scan returns users from every shard."""
+        shard_map = sharded_app.extensions['shard_map']
+        rows = shard_map.scan(select(User.__table__.c.email))
+
+        assert sorted(row.email for row in rows) == sorted(EMAILS)
+
+    def test_activity_flushed_per_shard(self, sharded_app):
+        """Test that write-behind activity timestamps reach every user's shard."""
+        shard_map = sharded_app.extensions['shard_map']
+        tracker = sharded_app.extensions['activity']
+        rows = shard_map.scan(select(User.__table__.c.id))
+
+        for row in rows:
+            tracker.touch(row.id, login=True)
+
+        seen = shard_map.scan(select(User.__table__.c.last_login_at))
+        assert all(row.last_login_at is not None for row in seen)
@@ -0,0 +1,192 @@
+"""
+Shared-memory cache tests.
+Tests the memory-mapped slot table and its use for tokens and users.
+"""
+
+import multiprocessing
+import time
+import pytest
+from sqlalchemy import event
+from app import create_app, init_db
+from models import db, User
+from utils.auth import find_user, hash_password, generate_token
+from utils.shm_cache import SharedCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Path of a fresh cache file."""
+    return str(tmp_path / 'shared.cache')
+
+
+def make_cache(path, slot_count=64, slot_size=128, namespace='test'):
+    return SharedCache(path, slot_count=slot_count, slot_size=slot_size, namespace=namespace)
+
+
+def write_in_child(path, key, value):
+    cache = make_cache(path)
+    cache.set(key, value, ttl=60)
+    cache.close()
+
+
+def rewrite_in_child(path, rounds):
+    cache = make_cache(path, slot_count=1, slot_size=1024)
+    for index in range(rounds):
+        cache.set('hot', bytes([65 + index % 26]) * (index % 900 + 1), ttl=60)
+    cache.close()
+
+
+class TestSharedCache:
+    """Test cases for the slot table."""
+
+    def test_set_and_get(self, cache_path):
+        """Test a round trip and a miss."""
+        cache = make_cache(cache_path)
+
+        assert cache.set('token:a', b'payload', ttl=60)
+        assert cache.get('token:a') == b'payload'
+        assert cache.get('token:b') is None
+        assert cache.snapshot()['hits'] == 1
+        assert cache.snapshot()['misses'] == 1
+
+    def test_expiry(self, cache_path):
+        """Test that expired entries are not returned."""
+        cache = make_cache(cache_path)
+        cache.set('token:a', b'payload', ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get('token:a') is None
+
+    def test_value_too_large(self, cache_path):
+        """Test that values larger than a slot are refused."""
+        cache = make_cache(cache_path, slot_size=64)
+
+        assert not cache.set('user:1', b'x' * 100, ttl=60)
+        assert cache.snapshot()['too_large'] == 1
+
+    def test_bounded_with_eviction(self, cache_path):
+        """Test that a full table evicts instead of growing."""
+        cache = make_cache(cache_path, slot_count=4)
+
+        for index in range(10):
+            assert cache.set(f'key:{index}', b'v', ttl=60 + index)
+
+        assert cache.snapshot()['evictions'] == 6
+        assert cache.get('key:9') == b'v'
+        assert cache.get('key:0') is None
+
+    def test_invalidation_refuses_older_versions(self, cache_path):
+        """Test that a tombstone keeps an older snapshot out of the cache."""
+        cache = make_cache(cache_path)
+        cache.set('user:1', b'v1', ttl=60, version=1)
+
+        cache.invalidate('user:1', version=2)
+        assert cache.get('user:1') is None
+        assert not cache.set('user:1', b'v1', ttl=60, version=1)
+        assert cache.set('user:1', b'v2', ttl=60, version=2)
+        assert cache.get('user:1') == b'v2'
+
+    def test_namespaces_are_separate(self, cache_path):
+        """Test that caches under different secrets do not see each other's entries."""
+        make_cache(cache_path, namespace='old-secret').set('token:a', b'payload', ttl=60)
+
+        assert make_cache(cache_path, namespace='new-secret').get('token:a') is None
+
+    def test_shared_between_processes(self, cache_path):
+        """Test that an entry written by another process is visible."""
+        cache = make_cache(cache_path)
+        child = multiprocessing.get_context('fork').Process(
+            target=write_in_child, args=(cache_path, 'user:1', b'from child')
+        )
+        child.start()
+        child.join(10)
+
+        assert cache.get('user:1') == b'from child'
+
+    def test_reads_never_torn(self, cache_path):
+        """Test that concurrent reads see whole values while another process writes."""
+        cache = make_cache(cache_path, slot_count=1, slot_size=1024)
+        cache.set('hot', b'A', ttl=60)
+        child = multiprocessing.get_context('fork').Process(target=rewrite_in_child, args=(cache_path, 20000))
+        child.start()
+
+        while child.is_alive():
+            value = cache.get('hot')
+            if value is not None:
+                assert value == value[:1] * len(value)
+        child.join()
+
+    def test_geometry_change_recreates_file(self, cache_path):
+        """Test that a different slot layout starts a new table."""
+        make_cache(cache_path, slot_count=64).set('key', b'v', ttl=60)
+
+        cache = make_cache(cache_path, slot_count=128)
+        assert cache.slot_count == 128
+        assert cache.get('key') is None
+
+
+class TestSharedCacheIntegration:
+    """Test cases for cached tokens and user snapshots in requests."""
+
+    @pytest.fixture
+    def cached_app(self, tmp_path):
+        """File-backed app with its own shared cache file."""
+        app = create_app('testing', config_overrides={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'cached.db'}",
+            'SHARED_CACHE_ENABLED': True,
+            'SHARED_CACHE_PATH': str(tmp_path / 'app.cache'),
+            'SHARED_CACHE_SLOTS': 256
+        })
+        init_db(app)
+        with app.app_context():
+            user = User(email='cached@example.com', password=hash_password('password123'),
+                        first_name='Cached', last_name='User')
+            db.session.add(user)
+            db.session.commit()
+            app.config['TOKEN'] = generate_token(user.id)
+
+            queries = []
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *args: queries.append(statement))
+            app.config['QUERIES'] = queries
+        yield app
+
+    def user_selects(self, app):
+        return [statement for statement in app.config['QUERIES']
+                if statement.startswith('SELECT') and 'FROM users' in statement]
+
+    def test_user_served_from_cache(self, cached_app):
+        """Test that a second /user/me does not query the user."""
+        client = cached_app.test_client()
+        headers = {'Authorization': f"Bearer {cached_app.config['TOKEN']}"}
+
+        first = client.get('/user/me', headers=headers)
+        second = client.get('/user/me', headers=headers)
+
+        assert first.get_json()['user'] == second.get_json()['user']
+        assert len(self.user_selects(cached_app)) == 1
+        metrics = client.get('/metrics').get_json()['metrics']['shared_cache']
+        assert metrics['hits'] >= 2
+
+    def test_update_invalidates_snapshot(self, cached_app):
+        """Test that a profile update is visible on the next cached read."""
+        client = cached_app.test_client()
+        headers = {'Authorization': f"Bearer {cached_app.config['TOKEN']}"}
+        client.get('/user/me', headers=headers)
+
+        response = client.patch('/user/update', headers=headers, json={'first_name': 'Renamed'})
+        assert response.status_code == 200
+
+        response = client.get('/user/me', headers=headers)
+        assert response.get_json()['user']['first_name'] == 'Renamed'
+        assert response.get_json()['user']['version'] == 2
+
+    def test_password_not_cached(self, cached_app):
+        """Test that cached users still load the password hash from the database."""
+        client = cached_app.test_client()
+        headers = {'Authorization': f"Bearer {cached_app.config['TOKEN']}"}
+        client.get('/user/me', headers=headers)
+
+        with cached_app.test_request_context():
+            user = find_user(db.session, 'id', client.get('/user/me', headers=headers).get_json()['user']['id'])
+            assert user.password.startswith('pbkdf2:')
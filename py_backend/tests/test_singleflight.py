@@ -0,0 +1,168 @@
+"""
+Single-flight tests.
+Tests coalescing of concurrent identical user lookups.
+"""
+
+import threading
+import time
+import pytest
+from sqlalchemy import event
+from app import create_app, init_db
+from models import db, User
+from utils.auth import hash_password, generate_token
+from utils.singleflight import SingleFlight
+
+HERD_SIZE = 8
+
+
+def run_together(count, target):
+    """Start count threads on target(index) and wait for all of them."""
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+
+class TestSingleFlight:
+    """Test cases for the coalescing primitive."""
+
+    def test_concurrent_calls_share_one_run(self):
+        """Test that callers arriving during a call get its result."""
+        flight = SingleFlight()
+        release = threading.Event()
+        runs = []
+        results = [None] * HERD_SIZE
+
+        def lookup():
+            runs.append(1)
+            release.wait(5)
+            return 'row'
+
+        def call(index):
+            results[index] = flight.do('user-1', lookup)
+
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(HERD_SIZE)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while flight.snapshot()['shared'] < HERD_SIZE - 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(runs) == 1
+        assert sorted(results) == [('row', False)] + [('row', True)] * (HERD_SIZE - 1)
+        assert flight.snapshot() == {'leaders': 1, 'shared': HERD_SIZE - 1, 'errors': 0, 'in_flight': 0}
+
+    def test_errors_are_shared(self):
+        """Test that followers see the leader's exception."""
+        flight = SingleFlight()
+        release = threading.Event()
+        errors = []
+
+        def lookup():
+            release.wait(5)
+            raise RuntimeError('database down')
+
+        def call(index):
+            try:
+                flight.do('user-1', lookup)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(3)]
+        for thread in threads:
+            thread.start()
+        while flight.snapshot()['shared'] < 2:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert errors == ['database down'] * 3
+
+    def test_sequential_calls_not_cached(self):
+        """Test that a finished call is not reused by later callers."""
+        flight = SingleFlight()
+        calls = []
+
+        for _ in range(3):
+            flight.do('user-1', lambda: calls.append(1))
+
+        assert len(calls) == 3
+
+
+class TestCoalescedUserLookups:
+    """Test cases for coalesced lookups in token_required and login."""
+
+    @pytest.fixture
+    def herd_app(self, tmp_path):
+        """File-backed app whose user queries take 50ms."""
+        app = create_app('testing', config_overrides={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'herd.db'}"
+        })
+        init_db(app)
+        with app.app_context():
+            user = User(
+                email='herd@example.com',
+                password=hash_password('password123'),
+                first_name='Herd',
+                last_name='User'
+            )
+            db.session.add(user)
+            db.session.commit()
+            app.config['HERD_USER_ID'] = user.id
+
+            queries = []
+
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def slow_user_select(conn, cursor, statement, *args):
+                if statement.startswith('SELECT') and 'FROM users' in statement:
+                    queries.append(statement)
+                    time.sleep(0.05)
+
+            app.config['HERD_QUERIES'] = queries
+        yield app
+
+    def test_thundering_herd_shares_query(self, herd_app):
+        """Test that concurrent requests with one token issue fewer user queries."""
+        with herd_app.app_context():
+            token = generate_token(herd_app.config['HERD_USER_ID'])
+        statuses = []
+
+        def request_me(index):
+            response = herd_app.test_client().get('/user/me', headers={'Authorization': f'Bearer {token}'})
+            statuses.append((response.status_code, response.get_json()['user']['email']))
+
+        run_together(HERD_SIZE, request_me)
+
+        assert statuses == [(200, 'herd@example.com')] * HERD_SIZE
+        assert len(herd_app.config['HERD_QUERIES']) < HERD_SIZE
+        assert herd_app.extensions['single_flight'].snapshot()['shared'] > 0
+
+    def test_coalesced_user_can_be_updated(self, herd_app):
+        """Test that a shared lookup still yields an instance the request can modify."""
+        with herd_app.app_context():
+            token = generate_token(herd_app.config['HERD_USER_ID'])
+        statuses = []
+
+        def update(index):
+            response = herd_app.test_client().patch(
+                '/user/update',
+                headers={'Authorization': f'Bearer {token}'},
+                json={'last_name': f'Name{index}'}
+            )
+            statuses.append(response.status_code)
+
+        run_together(4, update)
+
+        # Concurrent unconditional updates either win or lose the version race
+        assert statuses.count(200) >= 1
+        assert set(statuses) <= {200, 409}
+
+    def test_disabled(self):
+        """Test that the single-flight group can be turned off."""
+        app = create_app('testing', config_overrides={'SINGLE_FLIGHT_ENABLED': False})
+        assert 'single_flight' not in app.extensions
@@ -0,0 +1,64 @@
+"""
+SQLite production profile tests.
+Checks that the tuned PRAGMAs are applied to every pooled connection.
+"""
+
+import pytest
+from sqlalchemy import text
+from app import create_app
+from models import db
+
+
+@pytest.fixture
+def sqlite_app(tmp_path, monkeypatch):
+    """App using the sqlite production configuration on a temp file."""
+    uri = f"sqlite:///{tmp_path / 'auth.db'}"
+    monkeypatch.setenv('DATABASE_URL', uri)
+    monkeypatch.setenv('JWT_SECRET_KEY', 'test-jwt-secret')
+
+    app = create_app('sqlite', config_overrides={'SQLALCHEMY_DATABASE_URI': uri})
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+class TestSQLiteProfile:
+    """Test cases for the sqlite configuration."""
+
+    def test_pragmas_applied(self, sqlite_app):
+        """Test that WAL and the tuned PRAGMAs are active."""
+        pragmas = sqlite_app.config['SQLITE_PRAGMAS']
+
+        with db.engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == pragmas['busy_timeout']
+            assert conn.execute(text('PRAGMA cache_size')).scalar() == pragmas['cache_size']
+            assert conn.execute(text('PRAGMA mmap_size')).scalar() == pragmas['mmap_size']
+
+    def test_pool_configuration(self, sqlite_app):
+        """Test that the pool is sized for a single SQLite file."""
+        pool = db.engine.pool
+
+        assert pool.size() == sqlite_app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size']
+        assert pool._max_overflow == 0
+
+    @pytest.fixture
+    def production_env(self, monkeypatch):
+        """Variables the production checks require, so only the URI is at fault."""
+        for name, value in (('SECRET_KEY', 'test-secret'), ('JWT_SECRET_KEY', 'test-jwt-secret'),
+                            ('DATABASE_URL', 'set-by-deployment')):
+            monkeypatch.setenv(name, value)
+
+    def test_rejects_non_sqlite_url(self, production_env):
+        """Test that the profile refuses to run against another database."""
+        with pytest.raises(ValueError, match='requires DATABASE_URL to be a SQLite file'):
+            create_app('sqlite', config_overrides={
+                'SQLALCHEMY_DATABASE_URI': 'mysql+pymysql://user:pw@localhost/auth_db'
+            })
+
+    def test_rejects_in_memory_database(self, production_env):
+        """Test that the profile refuses an in-memory SQLite database."""
+        with pytest.raises(ValueError, match='requires DATABASE_URL to be a SQLite file'):
+            create_app('sqlite', config_overrides={'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
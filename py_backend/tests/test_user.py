@@ -167,3 +167,133 @@ class TestUpdateUser:
         assert data['user']['first_name'] == 'John'
         assert data['user']['last_name'] == 'Doe'
 
+
+
+class TestOptimisticConcurrency:
+    """Test cases for versioned profile updates."""
+    
+    def test_get_user_returns_etag(self, client, auth_token):
+        """Test that /user/me exposes the row version as an ETag."""
+        response = client.get(
+            '/user/me',
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers['ETag'] == '"1"'
+        assert response.get_json()['user']['version'] == 1
+    
+    def test_update_increments_version(self, client, auth_token):
+        """Test that each update bumps the version and ETag."""
+        response = client.patch(
+            '/user/update',
+            headers={'Authorization': f'Bearer {auth_token}'},
+            json={'first_name': 'John'}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers['ETag'] == '"2"'
+        assert response.get_json()['user']['version'] == 2
+    
+    def test_update_with_matching_if_match(self, client, auth_token):
+        """Test update with a current If-Match precondition."""
+        response = client.patch(
+            '/user/update',
+            headers={
+                'Authorization': f'Bearer {auth_token}',
+                'If-Match': '"1"'
+            },
+            json={'last_name': 'Doe'}
+        )
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['user']['last_name'] == 'Doe'
+        assert data['user']['version'] == 2
+    
+    def test_update_with_stale_if_match(self, client, auth_token):
+        """Test that a stale If-Match is rejected with 412."""
+        headers = {
+            'Authorization': f'Bearer {auth_token}',
+            'If-Match': '"1"'
+        }
+        first = client.patch('/user/update', headers=headers, json={'first_name': 'John'})
+        second = client.patch('/user/update', headers=headers, json={'first_name': 'Jack'})
+        
+        assert first.status_code == 200
+        assert second.status_code == 412
+        assert second.get_json()['success'] is False
+        
+        response = client.get(
+            '/user/me',
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+        assert response.get_json()['user']['first_name'] == 'John'
+    
+    def test_update_with_weak_if_match(self, client, auth_token):
+        """Test that a weak entity tag never matches, even for the current version."""
+        response = client.patch(
+            '/user/update',
+            headers={
+                'Authorization': f'Bearer {auth_token}',
+                'If-Match': 'W/"1"'
+            },
+            json={'first_name': 'John'}
+        )
+        
+        assert response.status_code == 412
+        
+        response = client.get(
+            '/user/me',
+            headers={'Authorization': f'Bearer {auth_token}'}
+        )
+        assert response.get_json()['user']['version'] == 1
+    
+    def test_update_with_non_ascii_digits(self, client, auth_token):
+        """Test that digits int() cannot parse are a failed precondition, not an error."""
+        response = client.patch(
+            '/user/update',
+            headers={
+                'Authorization': f'Bearer {auth_token}',
+                'If-Match': '"\u00b2"'
+            },
+            json={'first_name': 'John'}
+        )
+        
+        assert response.status_code == 412
+    
+    def test_update_with_invalid_if_match(self, client, auth_token):
+        """Test that a malformed If-Match is rejected with 400."""
+        response = client.patch(
+            '/user/update',
+            headers={
+                'Authorization': f'Bearer {auth_token}',
+                'If-Match': 'not-a-version'
+            },
+            json={'first_name': 'John'}
+        )
+        
+        assert response.status_code == 400
+    
+    def test_concurrent_update_conflict(self, app, client, auth_token):
+        """Test that a write racing between load and update returns 409."""
+        from sqlalchemy import event
+        from models import db
+        
+        def concurrent_writer(conn, cursor, statement, parameters, context, executemany):
+            # Simulate another writer committing between load and update
+            if statement.startswith('UPDATE users'):
+                cursor.execute('UPDATE users SET version = version + 1')
+        
+        event.listen(db.engine, 'before_cursor_execute', concurrent_writer)
+        try:
+            response = client.patch(
+                '/user/update',
+                headers={'Authorization': f'Bearer {auth_token}'},
+                json={'first_name': 'John'}
+            )
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', concurrent_writer)
+        
+        assert response.status_code == 409
+        assert response.get_json()['success'] is False
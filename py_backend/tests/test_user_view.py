@@ -0,0 +1,110 @@
+"""
+UserView tests.
+Tests the read-only user model and its use on read-only paths.
+"""
+
+import uuid
+import pytest
+from sqlalchemy import event
+from app import create_app, init_db
+from models import db, User, UserView
+from utils.auth import find_user, hash_password
+
+
+def user_id():
+    return User.query.filter_by(email='test@example.com').one().id
+
+
+class TestUserView:
+    """Test cases for the UserView read model."""
+
+    def test_read_only(self, app, test_user):
+        """Test that a view cannot be changed or given new attributes."""
+        with app.test_request_context():
+            view = find_user(db.session, 'id', user_id(), view=True)
+
+        with pytest.raises(AttributeError):
+            view.first_name = 'Changed'
+        with pytest.raises(AttributeError):
+            view.password = 'secret'
+        assert not hasattr(view, '__dict__')
+
+    def test_matches_user(self, app, test_user):
+        """Test that a view serializes exactly like the ORM user."""
+        user = User.query.filter_by(email='test@example.com').one()
+
+        with app.test_request_context():
+            view = find_user(db.session, 'id', user.id, view=True)
+
+        assert isinstance(view, UserView)
+        assert view.to_dict() == user.to_dict()
+        assert view.etag == user.etag
+
+    def test_selects_view_columns_only(self, app, test_user):
+        """Test that the lookup never reads the password hash."""
+        target = user_id()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        with app.test_request_context():
+            view = find_user(db.session, 'id', target, view=True)
+
+        selects = [statement for statement in statements if 'FROM users' in statement]
+        assert view.email == 'test@example.com'
+        assert len(selects) == 1
+        assert 'password' not in selects[0]
+
+    def test_cached_lookup(self, tmp_path):
+        """Test that a cached snapshot is returned as a view without a query."""
+        app = create_app('testing', config_overrides={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'view.db'}",
+            'CACHE_L2_URL': f'memory://{uuid.uuid4().hex}'
+        })
+        init_db(app)
+        with app.app_context():
+            user = User(email='view@example.com', password=hash_password('password123'),
+                        first_name='View', last_name='User')
+            db.session.add(user)
+            db.session.commit()
+            target = user.id
+
+            with app.test_request_context():
+                first = find_user(db.session, 'id', target, view=True)
+            statements = []
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *args: statements.append(statement))
+
+            with app.test_request_context():
+                second = find_user(db.session, 'id', target, view=True)
+        app.extensions['user_cache'].stop()
+
+        assert isinstance(second, UserView)
+        assert second.to_dict() == first.to_dict()
+        assert statements == []
+
+    def test_missing_user(self, app):
+        """Test that an unknown id gives None."""
+        with app.test_request_context():
+            assert find_user(db.session, 'id', 'missing', view=True) is None
+
+
+class TestReadOnlyRoutes:
+    """Test cases for routes served from a UserView."""
+
+    def test_me_then_update(self, client, auth_token):
+        """Test /user/me from a view, then an update through the ORM."""
+        headers = {'Authorization': f'Bearer {auth_token}'}
+
+        response = client.get('/user/me', headers=headers)
+        assert response.status_code == 200
+        assert response.headers['ETag'] == '"1"'
+        assert response.get_json()['user']['email'] == 'test@example.com'
+
+        response = client.patch('/user/update', headers={**headers, 'If-Match': '"1"'},
+                                json={'first_name': 'Renamed'})
+        assert response.status_code == 200
+
+        response = client.get('/user/me', headers=headers)
+        assert response.get_json()['user']['first_name'] == 'Renamed'
+        assert response.headers['ETag'] == '"2"'
@@ -0,0 +1,161 @@
+"""
+Token verification sidecar tests.
+Tests the binary protocol, the Unix socket server and its client.
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import pytest
+from app import create_app, init_db
+from models import db, User
+from utils.auth import generate_token, hash_password
+from utils.verify_protocol import (
+    INVALID_TOKEN, OK, USER_NOT_FOUND, VERIFY, VERIFY_USER, FRAME,
+    ProtocolError, VerifyClient, decode_request, decode_response, encode_request, encode_response, split_frames
+)
+from utils.verify_server import VerifyServer
+
+
+@pytest.fixture
+def sidecar(tmp_path):
+    """Running sidecar on a file database with one user; yields (app, socket path, user id)."""
+    app = create_app('testing', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'sidecar.db'}"
+    })
+    init_db(app)
+    with app.app_context():
+        user = User(email='sidecar@example.com', password=hash_password('password123'),
+                    first_name='Side', last_name='Car')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    # Unix socket paths are limited to about 100 bytes, so avoid tmp_path
+    directory = tempfile.mkdtemp(prefix='verify')
+    path = os.path.join(directory, 'verify.sock')
+    server = VerifyServer(app, path, max_batch=8)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield app, path, user_id
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(directory)
+
+
+def token_for(app, user_id):
+    with app.app_context():
+        return generate_token(user_id)
+
+
+class TestProtocol:
+    """Test cases for frame encoding."""
+
+    def test_request_round_trip(self):
+        """Test that requests decode to what was encoded."""
+        frame = encode_request(7, VERIFY_USER, ['a.b.c', 'd.e.f'])
+        buffer = bytearray(frame + frame[:5])
+
+        frames = split_frames(buffer)
+
+        assert len(frames) == 1
+        assert decode_request(frames[0]) == (7, VERIFY_USER, ['a.b.c', 'd.e.f'])
+        assert bytes(buffer) == frame[:5]
+
+    def test_response_round_trip(self):
+        """Test that responses decode to what was encoded."""
+        frame = encode_response(9, [(OK, {'user_id': 'u1'}), (INVALID_TOKEN, None)])
+
+        assert decode_response(frame[FRAME.size:]) == (9, [(OK, {'user_id': 'u1'}), (INVALID_TOKEN, None)])
+
+
+class TestSidecar:
+    """Test cases for the server and client."""
+
+    def test_verify(self, sidecar):
+        """Test token payloads and users for valid and invalid tokens."""
+        app, path, user_id = sidecar
+        token = token_for(app, user_id)
+
+        with VerifyClient(path) as client:
+            assert client.verify(token)['user_id'] == user_id
+            assert client.verify('not-a-token') is None
+            user = client.verify_user(token)
+
+        assert user['email'] == 'sidecar@example.com'
+        assert user['version'] == 1
+        assert 'password' not in user
+
+    def test_unknown_user(self, sidecar):
+        """Test a valid token for a user that does not exist."""
+        app, path, _ = sidecar
+
+        with VerifyClient(path) as client:
+            assert client.call(VERIFY_USER, [token_for(app, 'missing-user')]) == [(USER_NOT_FOUND, None)]
+
+    def test_batch_and_pipeline(self, sidecar):
+        """Test batched requests and several requests in flight at once."""
+        app, path, user_id = sidecar
+        token = token_for(app, user_id)
+
+        with VerifyClient(path) as client:
+            batch = client.verify_many([token, 'bad', token], with_user=True)
+            pipelined = client.pipeline([(VERIFY, [token]), (VERIFY_USER, [token]), (VERIFY, ['bad'])])
+            stats = client.stats()
+
+        assert [user and user['id'] for user in batch] == [user_id, None, user_id]
+        assert [results[0][0] for results in pipelined] == [OK, OK, INVALID_TOKEN]
+        assert stats['requests'] == 5
+        assert stats['tokens'] == 6
+
+    def test_batch_limit(self, sidecar):
+        """Test that batches above max_batch are refused."""
+        _, path, _ = sidecar
+
+        with VerifyClient(path) as client:
+            results = client.call(VERIFY, ['token'] * 9)
+
+        assert len(results) == 9
+        assert all(status != OK for status, _ in results)
+
+    def test_large_batch_split(self, sidecar):
+        """Test that verify_many splits batches above max_batch instead of losing them."""
+        app, path, user_id = sidecar
+        token = token_for(app, user_id)
+
+        with VerifyClient(path, max_batch=8) as client:
+            users = client.verify_many([token] * 19, with_user=True)
+            stats = client.stats()
+
+        assert [user['id'] for user in users] == [user_id] * 19
+        assert stats['requests'] == 4  # three batches and the stats request
+
+    def test_refused_batch_raises(self, sidecar):
+        """Test that a batch the sidecar refuses raises rather than reading as invalid tokens."""
+        app, path, user_id = sidecar
+
+        with VerifyClient(path, max_batch=9) as client:
+            with pytest.raises(ProtocolError):
+                client.verify_many([token_for(app, user_id)] * 9)
+
+    def test_malformed_frame_closes_connection(self, sidecar):
+        """Test that the server hangs up on a frame it cannot parse."""
+        _, path, _ = sidecar
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(path)
+            sock.sendall(FRAME.pack(2) + b'\x00\x01')
+            assert sock.recv(1024) == b''
+
+    def test_client_reconnects(self, sidecar):
+        """Test that a broken connection is replaced transparently."""
+        app, path, user_id = sidecar
+        token = token_for(app, user_id)
+
+        with VerifyClient(path) as client:
+            assert client.verify(token)
+            client._sock.close()
+            assert client.verify(token)['user_id'] == user_id
@@ -0,0 +1,63 @@
+# token_sidecar.py
+"""
+Token verification sidecar.
+Lets other services on the host verify HumblePOS tokens, and fetch the
+token's user, over a Unix domain socket instead of an HTTP call to
+/user/me. Clients use utils/verify_protocol.VerifyClient.
+
+Usage:
+    python token_sidecar.py
+    python token_sidecar.py --socket /run/humblepos/verify.sock
+"""
+
+import argparse
+import os
+import signal
+import sys
+import tempfile
+import threading
+from app import create_app, setup_logging
+from utils.verify_server import VerifyServer
+
+
+def default_socket_path():
+    """Return the socket path used when VERIFY_SOCKET_PATH is unset."""
+    return os.path.join(tempfile.gettempdir(), 'humblepos-verify.sock')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', help='socket path (default: VERIFY_SOCKET_PATH)')
+    args = parser.parse_args()
+
+    app = create_app()
+    setup_logging(app)
+    path = args.socket or app.config.get('VERIFY_SOCKET_PATH') or default_socket_path()
+
+    server = VerifyServer(
+        app,
+        path,
+        max_batch=app.config.get('VERIFY_MAX_BATCH', 256),
+        mode=app.config.get('VERIFY_SOCKET_MODE', 0o660)
+    )
+
+    # shutdown() waits for serve_forever to return, so call it from
+    # another thread rather than from the signal handler itself
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    app.logger.info(f'Token verification sidecar listening on {path}')
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+User activity module.
+Tracks last_login_at and last_seen_at in memory and persists them in bulk,
+so authenticated reads do not become database writes.
+"""
+
+import atexit
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import case, or_, update
+from utils.background import PeriodicWorker
+from utils.metrics import register_metrics
+
+# Timestamp columns tracked per user
+ACTIVITY_COLUMNS = ('last_login_at', 'last_seen_at')
+
+
+class ActivityTracker:
+    """
+    Write-behind buffer for per-user activity timestamps.
+
+    Touches only update an in-memory map keyed by user id, so repeated
+    touches of the same user coalesce into one pending entry. The map is
+    written every flush_interval seconds, which bounds how stale the stored
+    values may be, or earlier once max_pending users are waiting. Each flush
+    issues one UPDATE ... SET col = CASE id WHEN ... END per chunk_size users,
+    all in one transaction per engine; bounded chunks keep every statement
+    under the bind parameter limits and the CASE short. Stored timestamps
+    never move backwards, so workers flushing out of order are harmless.
+    With a flush_interval of 0 every touch is written inline.
+
+    Attributes:
+        engine (Engine): Primary engine, used when sharding is disabled
+        table (Table): Users table
+        flush_interval (float): Maximum seconds a touch stays unpersisted
+        max_pending (int): Pending users that trigger an early flush
+        chunk_size (int): Users written per UPDATE statement
+    """
+
+    def __init__(self, app, engine, table, flush_interval, max_pending, chunk_size=500):
+        self.app = app
+        self.engine = engine
+        self.table = table
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self.counters = {
+            'touches': 0,
+            'flushes': 0,
+            'rows_updated': 0,
+            'failed_flushes': 0
+        }
+        self._worker = PeriodicWorker('user-activity', flush_interval, self.flush) if flush_interval > 0 else None
+
+    def touch(self, user_id, login=False, at=None):
+        """
+        Record that a user was seen, and optionally that they logged in.
+
+        Args:
+            user_id (str): User id
+            login (bool): Whether this is a successful login
+            at (datetime, optional): Time of the activity, defaults to now
+        """
+        at = at or datetime.utcnow()
+        with self._lock:
+            times = self._pending.setdefault(user_id, {})
+            self._merge(times, 'last_seen_at', at)
+            if login:
+                self._merge(times, 'last_login_at', at)
+            self.counters['touches'] += 1
+            pending = len(self._pending)
+
+        if self._worker is None:
+            self.flush()
+            return
+
+        self._worker.ensure_started()
+        if pending >= self.max_pending:
+            self._worker.wake()
+
+    @staticmethod
+    def _merge(times, column, at):
+        if times.get(column) is None or times[column] < at:
+            times[column] = at
+
+    def flush(self):
+        """
+        Persist all pending timestamps.
+
+        Entries of a failed flush are merged back and retried next time.
+
+        Returns:
+            int: Number of users written
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            written = 0
+            for engine, entries in self._group_by_engine(pending).items():
+                try:
+                    user_ids = list(entries)
+                    with engine.begin() as conn:
+                        for start in range(0, len(user_ids), self.chunk_size):
+                            chunk = {user_id: entries[user_id] for user_id in user_ids[start:start + self.chunk_size]}
+                            conn.execute(self._bulk_update(chunk))
+                    written += len(entries)
+                except Exception as e:
+                    self.app.logger.error(f'User activity flush failed: {str(e)}')
+                    self._restore(entries)
+                    with self._lock:
+                        self.counters['failed_flushes'] += 1
+
+            with self._lock:
+                self.counters['flushes'] += 1
+                self.counters['rows_updated'] += written
+            return written
+
+    def _group_by_engine(self, pending):
+        """Split pending entries by the engine holding each user."""
+        shard_map = self.app.extensions.get('shard_map')
+        if shard_map is None:
+            return {self.engine: pending}
+
+        groups = {}
+        for user_id, times in pending.items():
+            shard = shard_map.shard_for_id(user_id)
+            if shard is not None:
+                groups.setdefault(shard_map.engine(shard), {})[user_id] = times
+        return groups
+
+    def _bulk_update(self, entries):
+        """Build one UPDATE setting every tracked column with a CASE on id."""
+        table = self.table
+        values = {}
+        for column_name in ACTIVITY_COLUMNS:
+            whens = {user_id: times[column_name] for user_id, times in entries.items() if column_name in times}
+            if not whens:
+                continue
+            column = table.c[column_name]
+            new_value = case(whens, value=table.c.id, else_=column)
+            values[column_name] = case(
+                (or_(column.is_(None), column < new_value), new_value),
+                else_=column
+            )
+
+        # Keep updated_at's onupdate default out of activity writes
+        values['updated_at'] = table.c.updated_at
+        return update(table).where(table.c.id.in_(list(entries))).values(values)
+
+    def _restore(self, entries):
+        with self._lock:
+            for user_id, times in entries.items():
+                current = self._pending.setdefault(user_id, {})
+                for column_name, at in times.items():
+                    self._merge(current, column_name, at)
+
+    def stop(self):
+        """Stop the background thread and persist what is pending."""
+        if self._worker is not None:
+            self._worker.stop()
+        self.flush()
+
+    def snapshot(self):
+        """
+        Return the activity tracking metrics.
+
+        Returns:
+            dict: Pending users and counters
+        """
+        with self._lock:
+            return dict(self.counters, pending_users=len(self._pending), flush_interval=self.flush_interval)
+
+
+def touch_user(user_id, login=False):
+    """
+    Record activity of a user for the current application.
+
+    Args:
+        user_id (str): User id
+        login (bool): Whether this is a successful login
+    """
+    tracker = current_app.extensions.get('activity')
+    if tracker is not None:
+        tracker.touch(user_id, login=login)
+
+
+def init_activity(app, db):
+    """
+    Create the user activity tracker.
+
+    Args:
+        app (Flask): Flask application instance
+        db (SQLAlchemy): Database extension
+    """
+    from models import User
+
+    with app.app_context():
+        engine = db.engine
+
+    tracker = ActivityTracker(
+        app,
+        engine,
+        User.__table__,
+        flush_interval=app.config.get('ACTIVITY_FLUSH_INTERVAL', 30),
+        max_pending=app.config.get('ACTIVITY_MAX_PENDING', 10000),
+        chunk_size=app.config.get('ACTIVITY_CHUNK_SIZE', 500)
+    )
+    app.extensions['activity'] = tracker
+    atexit.register(tracker.stop)
+    register_metrics(app, 'user_activity', tracker.snapshot)
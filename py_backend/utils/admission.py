@@ -0,0 +1,245 @@
+"""
+Admission control module.
+Gives expensive endpoints (login) and cheap ones (token-authenticated reads)
+separate concurrency lanes, and sheds requests with 503 + Retry-After when a
+lane's queue wait stays too high, CoDel-style.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from fnmatch import fnmatchcase
+from flask import g, jsonify, request
+from utils.metrics import register_metrics
+
+# Recent queue waits kept per lane for metrics and Retry-After
+WAIT_SAMPLES = 256
+
+
+class Lane:
+    """
+    Concurrency limit with CoDel-style shedding on queue wait.
+
+    At most limit requests run at once; others wait for a slot. The time a
+    request waited (its sojourn) is checked when it gets a slot, as CoDel
+    does at dequeue: once the sojourn has stayed above target for a whole
+    interval, the lane enters a dropping state and sheds waiters at a rate
+    growing with the square root of the number shed, until a request gets
+    through in under target. While dropping, arrivals that find no free slot
+    are shed immediately instead of queueing. No request waits longer than
+    max_wait.
+
+    Attributes:
+        name (str): Lane name
+        limit (int): Concurrent requests admitted
+        target (float): Acceptable queue wait in seconds
+        interval (float): Seconds the wait must stay above target before shedding
+        max_wait (float): Upper bound on any request's queue wait in seconds
+        max_waiting (int): Optional cap on queued requests, protecting the
+            worker's threads for other lanes
+    """
+
+    def __init__(self, name, limit, target, interval, max_wait, max_waiting=None):
+        self.name = name
+        self.limit = limit
+        self.target = target
+        self.interval = interval
+        self.max_wait = max_wait
+        self.max_waiting = max_waiting
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._first_above = None
+        self._dropping = False
+        self._drop_count = 0
+        self._drop_next = 0.0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.counters = {'admitted': 0, 'shed_overloaded': 0, 'shed_queue_delay': 0, 'shed_timeout': 0}
+
+    def acquire(self):
+        """
+        Wait for a slot.
+
+        Returns:
+            bool: True if admitted (call release() afterwards), False if shed
+        """
+        started = time.monotonic()
+        with self._condition:
+            if self._active >= self.limit and (
+                self._dropping or (self.max_waiting is not None and self._waiting >= self.max_waiting)
+            ):
+                self.counters['shed_overloaded'] += 1
+                return False
+
+            self._waiting += 1
+            try:
+                while self._active >= self.limit:
+                    remaining = self.max_wait - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self.counters['shed_timeout'] += 1
+                        self._waits.append(self.max_wait)
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            now = time.monotonic()
+            sojourn = now - started
+            self._waits.append(sojourn)
+            if self._should_shed(sojourn, now):
+                self.counters['shed_queue_delay'] += 1
+                # The freed slot stays free for the next waiter
+                self._condition.notify()
+                return False
+
+            self._active += 1
+            self.counters['admitted'] += 1
+            return True
+
+    def _should_shed(self, sojourn, now):
+        """CoDel control law, evaluated with the lock held."""
+        if sojourn < self.target:
+            self._first_above = None
+            self._dropping = False
+            return False
+
+        if self._first_above is None:
+            self._first_above = now + self.interval
+            return False
+        if now < self._first_above:
+            return False
+
+        if not self._dropping:
+            self._dropping = True
+            self._drop_count = 1
+        elif now >= self._drop_next:
+            self._drop_count += 1
+        else:
+            return False
+        self._drop_next = now + self.interval / math.sqrt(self._drop_count)
+        return True
+
+    def release(self):
+        """Free the slot taken by acquire()."""
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def retry_after(self):
+        """Seconds a shed client should wait, from recent queue waits."""
+        with self._condition:
+            waits = sorted(self._waits)
+        typical = waits[len(waits) // 2] if waits else self.target
+        return max(1, math.ceil(max(typical, self.interval)))
+
+    def snapshot(self):
+        """
+        Return the lane's state and counters.
+
+        Returns:
+            dict: Occupancy, dropping state, counters and queue wait
+        """
+        with self._condition:
+            waits = sorted(self._waits)
+            return dict(
+                self.counters,
+                limit=self.limit,
+                active=self._active,
+                waiting=self._waiting,
+                dropping=self._dropping,
+                wait_ms_p50=waits[len(waits) // 2] * 1000 if waits else 0.0,
+                wait_ms_p95=waits[int(len(waits) * 0.95)] * 1000 if waits else 0.0
+            )
+
+
+class AdmissionController:
+    """
+    Routes each request to a lane by endpoint name.
+
+    Lanes are matched in order against fnmatch patterns such as 'auth.login'
+    or 'user.*'. Endpoints matching no lane (health probes, metrics) are not
+    admission controlled.
+
+    Attributes:
+        lanes (list): (patterns, Lane) pairs in matching order
+    """
+
+    def __init__(self, lanes):
+        self.lanes = lanes
+        self._by_endpoint = {}
+
+    def lane_for(self, endpoint):
+        """
+        Return the lane for an endpoint, or None.
+
+        Args:
+            endpoint (str): Flask endpoint name
+
+        Returns:
+            Lane: Matching lane, or None
+        """
+        if endpoint not in self._by_endpoint:
+            self._by_endpoint[endpoint] = next(
+                (lane for patterns, lane in self.lanes
+                 if endpoint and any(fnmatchcase(endpoint, pattern) for pattern in patterns)),
+                None
+            )
+        return self._by_endpoint[endpoint]
+
+    def snapshot(self):
+        """Return every lane's snapshot by name."""
+        return {lane.name: lane.snapshot() for _, lane in self.lanes}
+
+
+def _lane_from_config(app, name, prefix):
+    max_waiting = app.config.get(f'{prefix}_MAX_WAITING')
+    return Lane(
+        name,
+        limit=app.config[f'{prefix}_LIMIT'],
+        target=app.config[f'{prefix}_TARGET_MS'] / 1000,
+        interval=app.config[f'{prefix}_INTERVAL_MS'] / 1000,
+        max_wait=app.config.get('ADMISSION_MAX_WAIT_MS', 1000) / 1000,
+        max_waiting=max_waiting if max_waiting else None
+    )
+
+
+def init_admission(app):
+    """
+    Install the admission controller's request hooks.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    if not app.config.get('ADMISSION_ENABLED', True):
+        return
+
+    controller = AdmissionController([
+        (app.config['ADMISSION_EXPENSIVE_ENDPOINTS'], _lane_from_config(app, 'expensive', 'ADMISSION_EXPENSIVE')),
+        (app.config['ADMISSION_CHEAP_ENDPOINTS'], _lane_from_config(app, 'cheap', 'ADMISSION_CHEAP'))
+    ])
+    app.extensions['admission'] = controller
+    register_metrics(app, 'admission', controller.snapshot)
+
+    @app.before_request
+    def admit_request():
+        lane = controller.lane_for(request.endpoint)
+        if lane is None:
+            return None
+        if lane.acquire():
+            g.admission_lane = lane
+            return None
+
+        response = jsonify({
+            'success': False,
+            'message': 'Server is busy, please retry shortly'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(lane.retry_after())
+        return response
+
+    @app.teardown_request
+    def release_lane(exc):
+        lane = g.pop('admission_lane', None)
+        if lane is not None:
+            lane.release()
@@ -0,0 +1,157 @@
+"""
+ASGI helpers module.
+Request and response primitives for the natively async routes, and a
+bridge serving every other route from the Flask (WSGI) application.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+async def read_body(receive):
+    """
+    Read a whole request body from an ASGI receive channel.
+
+    Args:
+        receive (callable): ASGI receive
+
+    Returns:
+        bytes: Request body
+    """
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def send_response(send, status, headers, body):
+    """
+    Send a complete response.
+
+    Args:
+        send (callable): ASGI send
+        status (int): Status code
+        headers (list): (name, value) string pairs
+        body (bytes): Response body
+    """
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def build_environ(scope, body):
+    """
+    Build a WSGI environ from an ASGI HTTP scope.
+
+    Args:
+        scope (dict): ASGI HTTP scope
+        body (bytes): Request body
+
+    Returns:
+        dict: WSGI environ
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class WsgiBridge:
+    """
+    Serve a WSGI application from an ASGI server.
+
+    Each request runs on a thread of a bounded pool. The response is
+    streamed: every chunk the WSGI iterable yields is sent from the event
+    loop before the thread produces the next one.
+
+    Attributes:
+        app: WSGI application
+        executor (ThreadPoolExecutor): Threads running the application
+    """
+
+    def __init__(self, app, threads):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi-bridge')
+
+    async def __call__(self, scope, receive, send):
+        body = await read_body(receive)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._run, scope, body, send, loop)
+
+    def _run(self, scope, body, send, loop):
+        """Run the WSGI application on a pool thread."""
+        started = []
+
+        def call(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            pending[:] = [int(status.split(' ', 1)[0]), headers]
+
+        def start():
+            # Headers go out with the first chunk, as WSGI specifies
+            if not started:
+                status, headers = pending
+                call({
+                    'type': 'http.response.start',
+                    'status': status,
+                    'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+                })
+                started.append(True)
+
+        pending = []
+        result = self.app(build_environ(scope, body), start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    start()
+                    call({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        start()
+        call({'type': 'http.response.body', 'body': b''})
+
+    def close(self):
+        """Stop the pool's threads once running requests finish."""
+        self.executor.shutdown(wait=False)
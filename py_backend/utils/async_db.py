@@ -0,0 +1,352 @@
+"""
+Async database module.
+SQLAlchemy asyncio engines mirroring the application's sync engines, the
+async user lookup and update paths, and the password hashing executor used
+by the ASGI entry point.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from models import User, UserView
+from utils.auth import USER_SNAPSHOT_COLUMNS, build_user, cache_user, cached_user_snapshot, user_row_values
+from utils.cache import MISS
+from utils.health import register_readiness_check
+from utils.metrics import register_metrics
+from utils.search import gram_statements, ngrams_enabled, search_columns
+from utils.singleflight import AsyncSingleFlight
+from utils.sqlite_pragmas import init_sqlite_pragmas
+
+# Async drivers replacing the sync ones in configured database URLs
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg'
+}
+
+
+def async_database_uri(uri):
+    """
+    Rewrite a database URL to use an asyncio driver.
+
+    Args:
+        uri (str): Sync database URL, e.g. mysql+pymysql://...
+
+    Returns:
+        str: The same database with an async driver, e.g. mysql+aiomysql://...
+    """
+    url = make_url(uri)
+    if url.drivername in ASYNC_DRIVERS.values():
+        return uri
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        raise ValueError(f'No async driver known for {url.drivername}')
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+class AsyncDatabase:
+    """
+    Async engines for the primary, replicas and user shards.
+
+    The engines are created from the same URLs and pool options as the sync
+    ones, so routing decisions (shard map, replica router, sticky window)
+    are shared with the WSGI code paths.
+
+    Attributes:
+        primary (AsyncEngine): Primary database
+        replicas (list): Replica engines, in the replica router's order
+        shards (list): Shard engines, in the shard map's order
+    """
+
+    def __init__(self, app):
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        options.setdefault('echo', app.config.get('SQLALCHEMY_ECHO', False))
+
+        def create(uri):
+            url = make_url(async_database_uri(uri))
+            engine_options = dict(options)
+            if url.get_backend_name() == 'sqlite' and 'pool_size' in engine_options:
+                # aiosqlite defaults to no pooling; keep the configured pool
+                engine_options['poolclass'] = AsyncAdaptedQueuePool
+            return create_async_engine(url, **engine_options)
+
+        self.primary = create(app.config['SQLALCHEMY_DATABASE_URI'])
+        self.replicas = [create(uri) for uri in app.config.get('SQLALCHEMY_REPLICA_URIS') or []]
+        self.shards = [create(uri) for uri in app.config.get('SQLALCHEMY_SHARD_URIS') or []]
+        init_sqlite_pragmas(app, [engine.sync_engine for engine in self.engines()])
+
+    def engine_for(self, user_id=None, email=None):
+        """
+        Return the engine holding a user's row.
+
+        Args:
+            user_id (str, optional): Id of the user
+            email (str, optional): Email of the user
+
+        Returns:
+            AsyncEngine: Shard or primary engine, or None if user_id does
+            not name a valid shard
+        """
+        shard_map = current_app.extensions.get('shard_map')
+        if shard_map is None:
+            return self.primary
+        shard = shard_map.shard_for_id(user_id) if user_id is not None else shard_map.shard_for_email(email)
+        return self.shards[shard] if shard is not None else None
+
+    def engines(self):
+        """Return every async engine."""
+        return [self.primary, *self.replicas, *self.shards]
+
+    async def dispose(self):
+        """Close the pooled connections of every engine."""
+        for engine in self.engines():
+            await engine.dispose()
+
+
+class HashExecutor:
+    """
+    Thread pool for password hashing.
+
+    Werkzeug's PBKDF2 runs in hashlib, which releases the GIL, so hashes
+    run in parallel on several cores while the event loop keeps serving
+    other connections. The number of hashes queued or running is tracked
+    so readiness can fail, and logins be shed, before the backlog turns
+    into timeouts.
+
+    Attributes:
+        threads (int): Pool size
+        max_backlog (int): Backlog above which the check fails
+    """
+
+    def __init__(self, threads, max_backlog):
+        self.threads = threads
+        self.max_backlog = max_backlog
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='password-hash')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.counters = {'completed': 0, 'peak_backlog': 0}
+
+    async def run(self, function, *args):
+        """
+        Run a hashing function on the pool.
+
+        Args:
+            function (callable): e.g. verify_password
+            *args: Its arguments
+
+        Returns:
+            The function's return value
+        """
+        with self._lock:
+            self._pending += 1
+            self.counters['peak_backlog'] = max(self.counters['peak_backlog'], self._pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.counters['completed'] += 1
+
+    def check(self):
+        """
+        Readiness check: fail while the backlog is above max_backlog.
+
+        Returns:
+            tuple: (is_ok, details dict)
+        """
+        backlog = self._pending
+        return backlog <= self.max_backlog, {'backlog': backlog, 'max_backlog': self.max_backlog}
+
+    def snapshot(self):
+        """
+        Return executor metrics.
+
+        Returns:
+            dict: Pool size, current backlog and counters
+        """
+        return dict(self.counters, threads=self.threads, backlog=self._pending)
+
+    def shutdown(self):
+        """Stop the pool's threads once queued hashes finish."""
+        self._executor.shutdown(wait=False)
+
+
+async def run_cache_call(function, *args):
+    """
+    Call a user cache helper without blocking the event loop on the L2 cache.
+
+    With a two-tier cache every get, set or invalidation may be a network
+    round trip (Redis), so the call runs on a worker thread; the host's
+    shared memory cache alone is answered inline.
+
+    Args:
+        function (callable): cached_user_snapshot, cache_user, invalidate_cached_user, ...
+        *args: Its arguments
+
+    Returns:
+        The function's result
+    """
+    if current_app.extensions.get('user_cache') is None:
+        return function(*args)
+    return await asyncio.to_thread(function, *args)
+
+
+async def async_find_user(field, value, replica=True, sticky_key=None, view=False):
+    """
+    Async counterpart of utils.auth.find_user.
+
+    Uses the same caches and routing; concurrent identical lookups on the
+    event loop share one query. Cache calls run off the loop (see
+    run_cache_call).
+
+    Args:
+        field (str): 'id' or 'email'
+        value (str): Value to look up
+        replica (bool): Whether the read may be served by a replica
+        sticky_key (str, optional): Key checked against the sticky window
+        view (bool): Select only the UserView columns and return a UserView
+
+    Returns:
+        User: Detached user (columns not loaded stay unavailable; UserView
+        when view=True), or None
+    """
+    database = current_app.extensions['async_db']
+    router = current_app.extensions.get('replica_router')
+    if replica and sticky_key is not None and router is not None and router.is_sticky(sticky_key):
+        replica = False
+
+    if replica and field == 'id':
+        snapshot = await run_cache_call(cached_user_snapshot, value)
+        if snapshot is None:
+            return None
+        if snapshot is not MISS:
+            return UserView(**snapshot) if view else build_user(snapshot)
+
+    engine = database.engine_for(**({'user_id': value} if field == 'id' else {'email': value}))
+    if engine is None:
+        return None
+
+    table = User.__table__
+    columns = [table.c[key] for key in USER_SNAPSHOT_COLUMNS] if view else table.c
+    statement = select(*columns).where(table.c[field] == value).limit(1)
+
+    async def execute(target):
+        async with target.connect() as connection:
+            return (await connection.execute(statement)).first()
+
+    async def fetch():
+        # Replicas only serve unsharded user tables, as in the sync path
+        if not replica or router is None or database.shards:
+            return await execute(engine)
+        replica_engine = router.choose()
+        if replica_engine is None:
+            return await execute(engine)
+        try:
+            return await execute(database.replicas[router.engines.index(replica_engine)])
+        except DBAPIError:
+            router.eject(replica_engine)
+            return await execute(engine)
+
+    flight = current_app.extensions.get('async_single_flight')
+    if flight is None:
+        row = await fetch()
+    else:
+        row, _ = await flight.do((field, value, replica, view), fetch)
+
+    if view:
+        values = row._asdict() if row is not None else None
+        await run_cache_call(cache_user, field, value, values)
+        return UserView(**values) if values is not None else None
+
+    values = user_row_values(row)
+    await run_cache_call(cache_user, field, value, values)
+    return build_user(values) if values is not None else None
+
+
+async def async_versioned_update(user, expected_version, changes):
+    """
+    Async counterpart of routes.user.versioned_update.
+
+    Args:
+        user (User): User loaded for the current request
+        expected_version (int): Version the client based its changes on
+        changes (dict): Column values to write
+
+    Returns:
+        bool: True if the row was updated, False on a version conflict
+    """
+    table = User.__table__
+    values = dict(changes)
+    values['updated_at'] = datetime.utcnow()
+    values['version'] = expected_version + 1
+
+    search = None
+    if 'first_name' in changes or 'last_name' in changes:
+        search = search_columns(
+            values.get('first_name', user.first_name),
+            values.get('last_name', user.last_name),
+            user.email
+        )
+        values.update(search)
+
+    statement = (
+        update(table)
+        .where(table.c.id == user.id)
+        .where(table.c.version == expected_version)
+        .values(**values)
+    )
+
+    engine = current_app.extensions['async_db'].engine_for(user_id=user.id)
+    async with engine.begin() as connection:
+        if engine.dialect.update_returning:
+            row = (await connection.execute(statement.returning(*table.c))).first()
+            if row is None:
+                return False
+            values = row._asdict()
+        elif (await connection.execute(statement)).rowcount == 0:
+            return False
+
+        if search is not None and ngrams_enabled():
+            for grams_statement, parameters in gram_statements(user.id, search):
+                await connection.execute(grams_statement, parameters)
+
+    for key, value in values.items():
+        set_committed_value(user, key, value)
+
+    return True
+
+
+def init_async_db(app):
+    """
+    Create the async engines, hashing executor and async single-flight group.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    app.extensions['async_db'] = AsyncDatabase(app)
+
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    hash_executor = HashExecutor(
+        app.config.get('ASGI_HASH_THREADS') or cpu_count,
+        app.config.get('ASGI_HASH_MAX_BACKLOG', 16)
+    )
+    app.extensions['hash_executor'] = hash_executor
+    register_metrics(app, 'password_hashing', hash_executor.snapshot)
+    register_readiness_check(app, 'password_hashing', hash_executor.check)
+
+    if app.config.get('SINGLE_FLIGHT_ENABLED', True):
+        flight = AsyncSingleFlight()
+        app.extensions['async_single_flight'] = flight
+        register_metrics(app, 'async_single_flight', flight.snapshot)
@@ -0,0 +1,179 @@
+"""
+Login audit module.
+Buffers login audit events in memory and writes them to the primary database
+in batched multi-row inserts from a background thread.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import insert
+from utils.background import PeriodicWorker
+from utils.metrics import register_metrics
+
+
+class AuditTrail:
+    """
+    Write-behind buffer for audit rows.
+
+    Events are appended to a bounded in-memory queue and written as one
+    INSERT ... VALUES (...), (...) per batch when batch_size events are
+    waiting, every flush_interval seconds, and on shutdown. When the queue
+    is full new events are dropped and counted. With a flush_interval of 0
+    there is no background thread and every event is written inline.
+
+    Attributes:
+        engine (Engine): Engine the rows are written to
+        table (Table): Audit table
+        batch_size (int): Rows per INSERT statement
+        max_queue (int): Events kept in memory before dropping
+    """
+
+    def __init__(self, engine, table, batch_size, flush_interval, max_queue, logger):
+        self.engine = engine
+        self.table = table
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._events = deque()
+        self.counters = {
+            'recorded': 0,
+            'written': 0,
+            'dropped': 0,
+            'batches': 0,
+            'failed_batches': 0
+        }
+        self._worker = PeriodicWorker('login-audit', flush_interval, self.flush) if flush_interval > 0 else None
+
+    def record(self, **event):
+        """
+        Queue one audit row without touching the database.
+
+        Args:
+            **event: Column values of the audit row
+        """
+        with self._lock:
+            if len(self._events) >= self.max_queue:
+                self.counters['dropped'] += 1
+                return
+            self._events.append(event)
+            self.counters['recorded'] += 1
+            batch_ready = len(self._events) >= self.batch_size
+
+        if self._worker is None:
+            self.flush()
+            return
+
+        self._worker.ensure_started()
+        if batch_ready:
+            self._worker.wake()
+
+    def flush(self):
+        """
+        Write every queued event in batches of batch_size rows.
+
+        A failed batch is put back at the front of the queue, as far as
+        max_queue allows, and retried on the next flush.
+
+        Returns:
+            int: Rows written
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+                if not batch:
+                    return written
+
+                try:
+                    with self.engine.begin() as conn:
+                        conn.execute(insert(self.table).values(batch))
+                except Exception as e:
+                    self.logger.error(f'Login audit flush failed: {str(e)}')
+                    with self._lock:
+                        self.counters['failed_batches'] += 1
+                        room = max(self.max_queue - len(self._events), 0)
+                        self.counters['dropped'] += max(len(batch) - room, 0)
+                        self._events.extendleft(reversed(batch[:room]))
+                    return written
+
+                written += len(batch)
+                with self._lock:
+                    self.counters['written'] += len(batch)
+                    self.counters['batches'] += 1
+
+    def stop(self):
+        """Stop the background thread and write out the remaining events."""
+        if self._worker is not None:
+            self._worker.stop()
+        self.flush()
+
+    def snapshot(self):
+        """
+        Return the audit queue metrics.
+
+        Returns:
+            dict: Queue depth and counters
+        """
+        with self._lock:
+            return dict(self.counters, queue_depth=len(self._events), queue_size=self.max_queue)
+
+
+def record_login(outcome, started, email=None, user_id=None):
+    """
+    Queue an audit event for the current login request.
+
+    Args:
+        outcome (str): success, invalid_credentials, invalid_request or error
+        started (float): time.perf_counter() value when the request started
+        email (str, optional): Email the login was attempted with
+        user_id (str, optional): Authenticated user id
+    """
+    audit = current_app.extensions.get('audit')
+    if audit is None:
+        return
+
+    audit.record(
+        user_id=user_id,
+        email=email[:255] if email else None,
+        ip_address=request.remote_addr,
+        user_agent=request.user_agent.string[:255] or None,
+        outcome=outcome,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        created_at=datetime.utcnow()
+    )
+
+
+def init_audit(app, db):
+    """
+    Create the login audit trail for the primary database.
+
+    Args:
+        app (Flask): Flask application instance
+        db (SQLAlchemy): Database extension
+    """
+    if not app.config.get('AUDIT_ENABLED', True):
+        return
+
+    from models import LoginAudit
+
+    with app.app_context():
+        engine = db.engine
+
+    audit = AuditTrail(
+        engine,
+        LoginAudit.__table__,
+        batch_size=app.config.get('AUDIT_BATCH_SIZE', 100),
+        flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL', 1),
+        max_queue=app.config.get('AUDIT_QUEUE_SIZE', 10000),
+        logger=app.logger
+    )
+    app.extensions['audit'] = audit
+    atexit.register(audit.stop)
+    register_metrics(app, 'login_audit', audit.snapshot)
@@ -4,12 +4,28 @@ Authentication utilities module.
 Contains JWT token handling and password hashing functions.
 """
 
+import hmac
+import time
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import abort, request, jsonify, current_app
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import User
+from models import db, User, UserView
+from utils.activity import touch_user
+from utils.cache import MISS
+from utils.replicas import read_only
+from utils.sharding import bind_user_shard
+
+# Requests with these methods only read the authenticated user
+READ_ONLY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+# User columns kept in the shared cache; everything needed to serve
+# to_dict(), but never the password hash. The same columns make a UserView.
+USER_SNAPSHOT_COLUMNS = UserView.__slots__
 
 
 def hash_password(password):
@@ -73,29 +89,257 @@ def decode_token(token):
     Returns:
         dict: Token payload if valid, None otherwise
     """
+    # Payloads verified by any worker on this host are shared
+    cache = current_app.extensions.get('shared_cache')
+    cache_key = f'token:{token}'
+    if cache is not None:
+        payload = cache.get_json(cache_key)
+        if payload is not None and payload.get('exp', 0) > time.time():
+            return payload
+    
     try:
         secret_key = current_app.config.get('JWT_SECRET_KEY')
         algorithm = current_app.config.get('JWT_ALGORITHM', 'HS256')
         
         payload = jwt.decode(token, secret_key, algorithms=[algorithm])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    if cache is not None and 'exp' in payload:
+        ttl = min(payload['exp'] - time.time(), current_app.config.get('SHARED_CACHE_TOKEN_TTL', 300))
+        if ttl > 0:
+            cache.set_json(cache_key, payload, ttl)
+    return payload
+
+
+def find_user(session, field, value, replica=True, sticky_key=None, view=False):
+    """
+    Load a user by id or email, sharing concurrent identical lookups.
+    
+    Concurrent requests for the same user in this worker (e.g. a fleet of
+    terminals reconnecting with the same token) run one query together:
+    the row is fetched once and each caller gets its own instance attached
+    to its own session. Reads by id that may use a replica are first served
+    from the host's shared cache, then from the two-tier user cache, which
+    also remembers ids that do not exist.
+    
+    With view=True only the UserView columns are selected and no ORM
+    instance is built, for requests that just read the profile.
+    
+    Args:
+        session: Routing session (usually db.session)
+        field (str): 'id' or 'email'
+        value (str): Value to look up
+        replica (bool): Whether the read may be served by a replica
+        sticky_key (str, optional): Key checked against the sticky window
+        view (bool): Return a UserView instead of a User
+        
+    Returns:
+        User: Persistent user in session (UserView when view=True), or
+        None if not found
+    """
+    router = current_app.extensions.get('replica_router')
+    if replica and sticky_key is not None and router is not None and router.is_sticky(sticky_key):
+        replica = False
+    
+    if replica and field == 'id':
+        snapshot = cached_user_snapshot(value)
+        if snapshot is None:
+            return None
+        if snapshot is not MISS:
+            return UserView(**snapshot) if view else _attach_user(session, snapshot)
+    
+    table = User.__table__
+    columns = [table.c[key] for key in USER_SNAPSHOT_COLUMNS] if view else table.c
+    statement = select(*columns).where(table.c[field] == value).limit(1)
+    
+    def fetch():
+        if replica:
+            return read_only(session, lambda: session.execute(statement).first())
+        return session.execute(statement).first()
+    
+    flight = current_app.extensions.get('single_flight')
+    if flight is None:
+        row = fetch()
+    else:
+        row, _ = flight.do((field, value, replica, session.info.get('shard'), view), fetch)
+    
+    if view:
+        values = row._asdict() if row is not None else None
+        cache_user(field, value, values)
+        return UserView(**values) if values is not None else None
+    
+    values = user_row_values(row)
+    cache_user(field, value, values)
+    return _attach_user(session, values) if values is not None else None
+
+
+def cached_user_snapshot(user_id):
+    """
+    Look a user up in the host's shared cache, then the two-tier cache.
+    
+    Args:
+        user_id (str): User id
+        
+    Returns:
+        dict: Column values without the password hash, None if the user is
+        known not to exist, or MISS
+    """
+    shared_cache = current_app.extensions.get('shared_cache')
+    user_cache = current_app.extensions.get('user_cache')
+    cache_key = f'user:{user_id}'
+    
+    snapshot = shared_cache.get_json(cache_key) if shared_cache is not None else None
+    if snapshot is None and user_cache is not None:
+        snapshot = user_cache.get(cache_key)
+        if snapshot is None:
+            return None
+        if snapshot is MISS:
+            return MISS
+        if shared_cache is not None:
+            shared_cache.set_json(cache_key, snapshot, current_app.config.get('SHARED_CACHE_USER_TTL', 60),
+                                  version=snapshot['version'])
+    if snapshot is None:
+        return MISS
+    return dict(snapshot, updated_at=datetime.fromisoformat(snapshot['updated_at']))
+
+
+def user_row_values(row):
+    """Return a users row as a dict of column values, or None."""
+    if row is None:
+        return None
+    return {column.key: row._mapping[column] for column in User.__table__.c}
+
+
+def cache_user(field, value, values):
+    """
+    Store a user fetched from the database in the caches.
+    
+    Args:
+        field (str): Field the user was looked up by
+        value (str): Value looked up
+        values (dict): Column values, or None if no user matched
+    """
+    shared_cache = current_app.extensions.get('shared_cache')
+    user_cache = current_app.extensions.get('user_cache')
+    
+    if values is None:
+        if user_cache is not None and field == 'id':
+            user_cache.set_negative(f'user:{value}')
+        return
+    
+    if shared_cache is not None or user_cache is not None:
+        cache_key = f"user:{values['id']}"
+        snapshot = {key: values[key] for key in USER_SNAPSHOT_COLUMNS}
+        snapshot['updated_at'] = snapshot['updated_at'].isoformat()
+        if shared_cache is not None:
+            shared_cache.set_json(cache_key, snapshot, current_app.config.get('SHARED_CACHE_USER_TTL', 60),
+                                  version=values['version'])
+        if user_cache is not None:
+            user_cache.set(cache_key, snapshot, version=values['version'])
+
+
+def build_user(values):
+    """
+    Build a detached User from column values without a query.
+    
+    Args:
+        values (dict): Column values; missing columns stay unloaded
+        
+    Returns:
+        User: Detached instance
+    """
+    mapper = inspect(User)
+    user = mapper.class_manager.new_instance()
+    for prop in mapper.column_attrs:
+        if prop.key in values:
+            set_committed_value(user, prop.key, values[prop.key])
+    make_transient_to_detached(user)
+    return user
+
+
+def _attach_user(session, values):
+    """
+    Build a session-local User from column values without a query.
+    
+    Columns missing from values (e.g. the password hash, which is never
+    cached) are loaded from the database on first access.
+    """
+    return session.merge(build_user(values), load=False)
 
 
-def token_required(f):
+def invalidate_cached_user(user_id, version):
+    """
+    Drop a user's snapshot from every cache after an update.
+    
+    The host's shared cache is updated directly; the two-tier cache
+    broadcasts the invalidation to the other nodes. Tombstones keep reads
+    that started before the update from caching the previous version again.
+    
+    Args:
+        user_id (str): Updated user
+        version (int): New row version
+    """
+    cache_key = f'user:{user_id}'
+    
+    shared_cache = current_app.extensions.get('shared_cache')
+    if shared_cache is not None:
+        shared_cache.invalidate(
+            cache_key,
+            version=version,
+            ttl=current_app.config.get('SHARED_CACHE_USER_TTL', 60)
+        )
+    
+    user_cache = current_app.extensions.get('user_cache')
+    if user_cache is not None:
+        user_cache.invalidate(cache_key, version=version)
+
+
+def invalidate_cached_users(versions):
+    """
+    Drop many users' snapshots from every cache after a batch update.
+    
+    Like invalidate_cached_user, but the two-tier cache writes all
+    tombstones in one round trip and broadcasts a single message.
+    
+    Args:
+        versions (dict): User id to new row version
+    """
+    shared_cache = current_app.extensions.get('shared_cache')
+    if shared_cache is not None:
+        ttl = current_app.config.get('SHARED_CACHE_USER_TTL', 60)
+        for user_id, version in versions.items():
+            shared_cache.invalidate(f'user:{user_id}', version=version, ttl=ttl)
+    
+    user_cache = current_app.extensions.get('user_cache')
+    if user_cache is not None:
+        user_cache.invalidate_many({f'user:{user_id}': version for user_id, version in versions.items()})
+
+
+def token_required(f=None, *, view=False):
     """
     Decorator to protect routes requiring authentication.
     Validates JWT token and injects current_user into route function.
     
+    Routes that only read the user can ask for a UserView, which skips
+    building an ORM instance; routes that change the user get a User.
+    
     Usage:
         @app.route('/protected')
         @token_required
         def protected_route(current_user):
             return jsonify({'user': current_user.to_dict()})
+        
+        @app.route('/profile')
+        @token_required(view=True)
+        def profile(current_user):  # current_user is a UserView
+            return jsonify({'user': current_user.to_dict()})
     """
+    if f is None:
+        return lambda route: token_required(route, view=view)
+    
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
@@ -120,8 +364,19 @@ def token_required(f):
                 'message': 'Invalid or expired token'
             }), 401
         
-        # Get user from database
-        current_user = User.query.get(payload.get('user_id'))
+        # Get user from database; safe methods may read from a replica
+        user_id = payload.get('user_id')
+        if not bind_user_shard(db.session, user_id=user_id):
+            current_user = None
+        else:
+            current_user = find_user(
+                db.session,
+                'id',
+                user_id,
+                replica=request.method in READ_ONLY_METHODS,
+                sticky_key=user_id,
+                view=view
+            )
         
         if not current_user:
             return jsonify({
@@ -129,8 +384,41 @@ def token_required(f):
                 'message': 'User not found'
             }), 401
         
+        # Remember the user was active; written to the database in bulk later
+        touch_user(user_id)
+        
         # Pass current_user to the decorated function
         return f(current_user, *args, **kwargs)
     
     return decorated
 
+
+def admin_required(f):
+    """
+    Decorator to protect admin routes with the shared ADMIN_API_KEY.
+    
+    The key is sent in the X-Admin-Key header and compared in constant
+    time. Admin routes answer 404 while no key is configured.
+    
+    Usage:
+        @app.route('/admin/report')
+        @admin_required
+        def report():
+            return jsonify({'success': True})
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        admin_key = current_app.config.get('ADMIN_API_KEY')
+        if not admin_key:
+            abort(404)
+        
+        provided = request.headers.get('X-Admin-Key', '')
+        if not hmac.compare_digest(provided.encode('utf-8'), admin_key.encode('utf-8')):
+            return jsonify({
+                'success': False,
+                'message': 'Invalid admin key'
+            }), 401
+        
+        return f(*args, **kwargs)
+    
+    return decorated
@@ -0,0 +1,77 @@
+"""
+Background worker module.
+Runs periodic maintenance work on a daemon thread, restarted after fork.
+"""
+
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """
+    Daemon thread calling a function every interval seconds.
+
+    Threads do not survive fork, so the thread is started lazily with
+    ensure_started() and started again when called from a new process.
+    wake() runs the function early, stop() runs it a last time and joins.
+
+    Attributes:
+        name (str): Thread name
+        interval (float): Seconds between runs
+    """
+
+    def __init__(self, name, interval, target):
+        self.name = name
+        self.interval = interval
+        self.target = target
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self):
+        """Start the thread if it is not running in this process."""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping = False
+            self._wakeup = threading.Event()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Run the target as soon as possible instead of waiting for the interval."""
+        self._wakeup.set()
+
+    def stop(self, timeout=5):
+        """
+        Stop the thread after one final run of the target.
+
+        Args:
+            timeout (float): Seconds to wait for the thread to finish
+        """
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self._stopping = True
+        self._wakeup.set()
+        thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.target()
+            except Exception:
+                logger.exception(f'{self.name} run failed')
+            if self._stopping:
+                return
@@ -0,0 +1,197 @@
+"""
+Breached password module.
+Offline membership test against a memory-mapped, sorted corpus of SHA-1
+password hashes (e.g. the Pwned Passwords dump), built by
+build_breach_corpus.py.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+
+MAGIC = b'HPBP0001'
+
+# File header: magic, bytes per record, record count
+HEADER = struct.Struct('<8sIQ')
+HEADER_SIZE = 32
+
+# Records are bucketed by their first two bytes; the index holds the
+# record number where each bucket starts, plus one end entry
+PREFIX_BYTES = 2
+BUCKETS = 1 << (8 * PREFIX_BYTES)
+INDEX_ENTRY = struct.Struct('<Q')
+INDEX_SIZE = (BUCKETS + 1) * INDEX_ENTRY.size
+
+# Truncated hashes keep false positives negligible down to 8 bytes
+MIN_RECORD_SIZE = 8
+SHA1_SIZE = 20
+
+
+def records_offset():
+    """Byte offset of the first record."""
+    return HEADER_SIZE + INDEX_SIZE
+
+
+class BreachedPasswords:
+    """
+    Read-only view of a breached password corpus.
+
+    The file is mapped, not read: every worker on the host shares the page
+    cache copy, and only the index and the pages touched by lookups become
+    resident. A lookup hashes the password, reads the start and end of its
+    two-byte prefix bucket from the index and binary searches the bucket,
+    which for the full Pwned Passwords corpus is about 14 probes.
+
+    Attributes:
+        path (str): Corpus file
+        record_size (int): Bytes of each (possibly truncated) SHA-1 hash
+        count (int): Number of hashes
+        counters (dict): Per-process lookup statistics
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as corpus:
+            self._mmap = mmap.mmap(corpus.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.record_size, self.count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a breached password corpus')
+        if len(self._mmap) != records_offset() + self.count * self.record_size:
+            self._mmap.close()
+            raise ValueError(f'{path} is truncated or corrupt')
+        self.counters = {'lookups': 0, 'breached': 0}
+
+    def _bucket(self, prefix):
+        start = INDEX_ENTRY.unpack_from(self._mmap, HEADER_SIZE + prefix * INDEX_ENTRY.size)[0]
+        end = INDEX_ENTRY.unpack_from(self._mmap, HEADER_SIZE + (prefix + 1) * INDEX_ENTRY.size)[0]
+        return start, end
+
+    def contains_digest(self, digest):
+        """
+        Check a SHA-1 digest against the corpus.
+
+        Args:
+            digest (bytes): 20-byte SHA-1 digest
+
+        Returns:
+            bool: True if the (truncated) digest is in the corpus
+        """
+        key = digest[:self.record_size]
+        low, high = self._bucket(int.from_bytes(key[:PREFIX_BYTES], 'big'))
+        base = records_offset()
+        size = self.record_size
+        data = self._mmap
+        while low < high:
+            middle = (low + high) // 2
+            offset = base + middle * size
+            record = data[offset:offset + size]
+            if record < key:
+                low = middle + 1
+            elif record > key:
+                high = middle
+            else:
+                return True
+        return False
+
+    def is_breached(self, password):
+        """
+        Check a password against the corpus.
+
+        Args:
+            password (str): Plain text password
+
+        Returns:
+            bool: True if the password is known to be breached
+        """
+        breached = self.contains_digest(hashlib.sha1(password.encode('utf-8')).digest())
+        self.counters['lookups'] += 1
+        if breached:
+            self.counters['breached'] += 1
+        return breached
+
+    def snapshot(self):
+        """
+        Return corpus metrics.
+
+        Returns:
+            dict: Corpus size and lookup counters
+        """
+        return dict(self.counters, hashes=self.count, record_size=self.record_size, bytes=len(self._mmap))
+
+    def close(self):
+        """Unmap the corpus."""
+        self._mmap.close()
+
+
+def write_corpus(path, digests, record_size=SHA1_SIZE):
+    """
+    Write a corpus file from digests in ascending order.
+
+    Digests are truncated to record_size bytes; duplicates (including
+    those created by truncation) are written once. The file is written
+    under a temporary name and renamed into place, so workers mapping the
+    previous file are not disturbed.
+
+    Args:
+        path (str): Destination file
+        digests (iterable): SHA-1 digests (20 bytes) in ascending order
+        record_size (int): Bytes kept per hash, MIN_RECORD_SIZE to 20
+
+    Returns:
+        int: Number of hashes written
+    """
+    if not MIN_RECORD_SIZE <= record_size <= SHA1_SIZE:
+        raise ValueError(f'record_size must be between {MIN_RECORD_SIZE} and {SHA1_SIZE}')
+
+    counts = [0] * BUCKETS
+    count = 0
+    previous = None
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as corpus:
+        corpus.write(b'\0' * records_offset())
+        for digest in digests:
+            record = digest[:record_size]
+            if previous is not None and record <= previous:
+                if record == previous:
+                    continue
+                raise ValueError('Digests must be in ascending order')
+            corpus.write(record)
+            counts[int.from_bytes(record[:PREFIX_BYTES], 'big')] += 1
+            previous = record
+            count += 1
+
+        index = bytearray(INDEX_SIZE)
+        position = 0
+        for prefix in range(BUCKETS):
+            INDEX_ENTRY.pack_into(index, prefix * INDEX_ENTRY.size, position)
+            position += counts[prefix]
+        INDEX_ENTRY.pack_into(index, BUCKETS * INDEX_ENTRY.size, position)
+
+        corpus.seek(0)
+        corpus.write(HEADER.pack(MAGIC, record_size, count).ljust(HEADER_SIZE, b'\0'))
+        corpus.write(index)
+        corpus.flush()
+        os.fsync(corpus.fileno())
+    os.replace(temporary, path)
+    return count
+
+
+def init_breached_passwords(app):
+    """
+    Map the breached password corpus when BREACHED_PASSWORDS_FILE is set.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    path = app.config.get('BREACHED_PASSWORDS_FILE')
+    if not path:
+        return
+
+    from utils.metrics import register_metrics
+
+    corpus = BreachedPasswords(path)
+    app.extensions['breached_passwords'] = corpus
+    register_metrics(app, 'breached_passwords', corpus.snapshot)
+    app.logger.info(f'Breached password corpus loaded: {corpus.count} hashes')
@@ -0,0 +1,426 @@
+"""
+Two-tier cache module.
+An in-process L1 in front of a shared L2 backend (Redis, or an in-process
+stand-in), with invalidations broadcast to every node over pub/sub.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# Returned by TwoTierCache.get when nothing is cached for the key
+MISS = object()
+
+
+class MemoryBackend:
+    """
+    In-process L2 stand-in with the subset of Redis used by the cache.
+
+    Backends are looked up by name, so several applications in one process
+    (tests, or development with memory://name) share one "server". Messages
+    are delivered to subscribers synchronously.
+    """
+
+    _named = {}
+    _named_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._subscribers = {}
+
+    @classmethod
+    def named(cls, name):
+        """Return the shared backend called name, creating it if needed."""
+        with cls._named_lock:
+            return cls._named.setdefault(name, cls())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self._values.pop(key, None)
+                return None
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl)
+
+    def set_many(self, items, ttl):
+        with self._lock:
+            expires = time.monotonic() + ttl
+            for key, value in items.items():
+                self._values[key] = (value, expires)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def publish(self, channel, message):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, ()))
+        for callback in callbacks:
+            callback(message)
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+        return _MemorySubscription(self, channel, callback)
+
+
+class _MemorySubscription:
+    """Handle returned by MemoryBackend.subscribe."""
+
+    def __init__(self, backend, channel, callback):
+        self.backend = backend
+        self.channel = channel
+        self.callback = callback
+
+    def stop(self):
+        with self.backend._lock:
+            callbacks = self.backend._subscribers.get(self.channel, [])
+            if self.callback in callbacks:
+                callbacks.remove(self.callback)
+
+
+class RedisBackend:
+    """
+    L2 backend on a Redis-protocol server (Redis, Valkey, KeyDB, ...).
+
+    Requires the optional redis package. Subscriptions run redis-py's
+    pub/sub listener thread.
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_L2_URL uses Redis but the redis package is not installed')
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def set_many(self, items, ttl):
+        # One round trip; atomicity across keys is not needed
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipeline.set(key, value, px=max(int(ttl * 1000), 1))
+        pipeline.execute()
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def publish(self, channel, message):
+        self.client.publish(channel, message)
+
+    def subscribe(self, channel, callback):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{channel: lambda message: callback(message['data'])})
+        return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+
+def create_backend(url):
+    """
+    Create an L2 backend from a URL.
+
+    Args:
+        url (str): memory://name or redis://, rediss://, unix:// URL
+
+    Returns:
+        MemoryBackend or RedisBackend
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == 'memory':
+        return MemoryBackend.named(parsed.netloc or 'default')
+    if parsed.scheme in ('redis', 'rediss', 'unix'):
+        return RedisBackend(url)
+    raise ValueError(f'Unsupported cache backend: {url}')
+
+
+class TwoTierCache:
+    """
+    Read-through cache with a per-process L1 and a shared L2.
+
+    Values are JSON-serializable data stored with a version. Unknown keys
+    can be cached as negative entries with their own, shorter TTL.
+    invalidate() replaces the L2 entry with a tombstone carrying the new
+    version (older versions are then not stored again) and publishes the
+    key so every node drops it from L1. Pub/sub delivery is best effort, so
+    the L1 TTL also bounds how long a missed invalidation can be served.
+    L2 failures count as misses and never fail the request.
+
+    Attributes:
+        backend: L2 backend
+        channel (str): Pub/sub channel for invalidations
+        counters (dict): Per-process hit, miss and error statistics
+    """
+
+    def __init__(self, backend, channel, l1_ttl, l2_ttl, negative_ttl, l1_max_entries, prefix=''):
+        self.backend = backend
+        self.channel = channel
+        self.l1_ttl = l1_ttl
+        self.l2_ttl = l2_ttl
+        self.negative_ttl = negative_ttl
+        self.l1_max_entries = l1_max_entries
+        self.prefix = prefix
+        self.node_id = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._l1 = OrderedDict()
+        self._listeners = []
+        self._subscription = None
+        self._subscribed_pid = None
+        self.counters = {
+            'l1_hits': 0,
+            'l2_hits': 0,
+            'misses': 0,
+            'negative_hits': 0,
+            'sets': 0,
+            'stale_rejected': 0,
+            'invalidations_sent': 0,
+            'invalidations_received': 0,
+            'l2_errors': 0
+        }
+
+    def add_invalidation_listener(self, listener):
+        """
+        Call listener(key, version) for every invalidation received.
+
+        Args:
+            listener (callable): Hook, e.g. dropping a host-local cache entry
+        """
+        self._listeners.append(listener)
+
+    def _ensure_subscribed(self):
+        # Listener threads do not survive fork, so subscribe per process
+        if self._subscribed_pid == os.getpid():
+            return
+        with self._lock:
+            if self._subscribed_pid == os.getpid():
+                return
+            try:
+                self._subscription = self.backend.subscribe(self.channel, self._on_message)
+                self._subscribed_pid = os.getpid()
+            except Exception:
+                self.counters['l2_errors'] += 1
+
+    def _on_message(self, message):
+        try:
+            data = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        # Bulk invalidations carry a {key: version} map in one message
+        versions = data['keys'] if 'keys' in data else {data['key']: data.get('version', 0)}
+        for key, version in versions.items():
+            self._drop_l1(key)
+            self.counters['invalidations_received'] += 1
+            for listener in self._listeners:
+                listener(key, version)
+
+    def _drop_l1(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def _store_l1(self, key, envelope, ttl):
+        with self._lock:
+            self._l1[key] = (envelope, time.monotonic() + min(ttl, self.l1_ttl))
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l2_get(self, key):
+        try:
+            raw = self.backend.get(self.prefix + key)
+        except Exception:
+            self.counters['l2_errors'] += 1
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def _l2_set(self, key, envelope, ttl):
+        try:
+            self.backend.set(self.prefix + key, json.dumps(envelope, separators=(',', ':')), ttl)
+        except Exception:
+            self.counters['l2_errors'] += 1
+
+    def _result(self, envelope, counter):
+        if 'tombstone' in envelope:
+            self.counters['misses'] += 1
+            return MISS
+        if envelope.get('negative'):
+            self.counters['negative_hits'] += 1
+            return None
+        self.counters[counter] += 1
+        return envelope['data']
+
+    def get(self, key):
+        """
+        Look up key in L1, then L2.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            The cached data, None for a negative entry, or MISS
+        """
+        self._ensure_subscribed()
+
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._l1[key]
+                entry = None
+        if entry is not None:
+            return self._result(entry[0], 'l1_hits')
+
+        envelope = self._l2_get(key)
+        if envelope is None:
+            self.counters['misses'] += 1
+            return MISS
+        if 'tombstone' not in envelope:
+            self._store_l1(key, envelope, self.negative_ttl if envelope.get('negative') else self.l2_ttl)
+        return self._result(envelope, 'l2_hits')
+
+    def set(self, key, data, version=0):
+        """
+        Cache data for key in both tiers.
+
+        Args:
+            key (str): Cache key
+            data: JSON-serializable value
+            version (int): Version of data; not stored over a newer L2 entry
+        """
+        current = self._l2_get(key)
+        if current is not None and current.get('version', 0) > version:
+            # Check-then-set is not atomic; a lost race is bounded by l2_ttl
+            self.counters['stale_rejected'] += 1
+            return
+        envelope = {'version': version, 'data': data}
+        self._l2_set(key, envelope, self.l2_ttl)
+        self._store_l1(key, envelope, self.l2_ttl)
+        self.counters['sets'] += 1
+
+    def set_negative(self, key):
+        """
+        Remember that key does not exist, for negative_ttl seconds.
+
+        Args:
+            key (str): Cache key
+        """
+        envelope = {'version': 0, 'negative': True}
+        self._l2_set(key, envelope, self.negative_ttl)
+        self._store_l1(key, envelope, self.negative_ttl)
+
+    def invalidate(self, key, version=0):
+        """
+        Drop key on every node.
+
+        Args:
+            key (str): Cache key
+            version (int): Version now current; older values are refused
+        """
+        self._drop_l1(key)
+        self._l2_set(key, {'version': version, 'tombstone': True}, self.l2_ttl)
+        message = json.dumps({'key': key, 'version': version, 'origin': self.node_id})
+        try:
+            self.backend.publish(self.channel, message)
+            self.counters['invalidations_sent'] += 1
+        except Exception:
+            self.counters['l2_errors'] += 1
+
+    def invalidate_many(self, versions):
+        """
+        Drop many keys on every node with one L2 round trip and one message.
+
+        Args:
+            versions (dict): Cache key to the version now current
+        """
+        if not versions:
+            return
+        with self._lock:
+            for key in versions:
+                self._l1.pop(key, None)
+        tombstones = {
+            self.prefix + key: json.dumps({'version': version, 'tombstone': True}, separators=(',', ':'))
+            for key, version in versions.items()
+        }
+        try:
+            self.backend.set_many(tombstones, self.l2_ttl)
+        except Exception:
+            self.counters['l2_errors'] += 1
+        message = json.dumps({'keys': versions, 'origin': self.node_id})
+        try:
+            self.backend.publish(self.channel, message)
+            self.counters['invalidations_sent'] += len(versions)
+        except Exception:
+            self.counters['l2_errors'] += 1
+
+    def stop(self):
+        """Stop listening for invalidations."""
+        if self._subscription is not None and self._subscribed_pid == os.getpid():
+            self._subscription.stop()
+        self._subscription = None
+        self._subscribed_pid = None
+
+    def snapshot(self):
+        """
+        Return cache metrics for this process.
+
+        Returns:
+            dict: Counters, hit ratios and L1 size
+        """
+        counters = dict(self.counters)
+        hits = counters['l1_hits'] + counters['l2_hits'] + counters['negative_hits']
+        lookups = hits + counters['misses']
+        with self._lock:
+            l1_entries = len(self._l1)
+        return dict(
+            counters,
+            l1_entries=l1_entries,
+            hit_ratio=hits / lookups if lookups else None,
+            l1_hit_ratio=counters['l1_hits'] / lookups if lookups else None
+        )
+
+
+def init_user_cache(app):
+    """
+    Create the two-tier user cache when CACHE_L2_URL is set.
+
+    Invalidations received from other nodes also drop the user from the
+    host's shared-memory cache.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    url = app.config.get('CACHE_L2_URL')
+    if not url:
+        return
+
+    from utils.metrics import register_metrics
+
+    cache = TwoTierCache(
+        create_backend(url),
+        channel=app.config.get('CACHE_INVALIDATION_CHANNEL', 'humblepos:auth:invalidate'),
+        l1_ttl=app.config.get('CACHE_L1_TTL', 30),
+        l2_ttl=app.config.get('CACHE_L2_TTL', 300),
+        negative_ttl=app.config.get('CACHE_NEGATIVE_TTL', 30),
+        l1_max_entries=app.config.get('CACHE_L1_MAX_ENTRIES', 10000),
+        prefix=app.config.get('CACHE_KEY_PREFIX', 'humblepos:auth:')
+    )
+
+    shared_cache = app.extensions.get('shared_cache')
+    if shared_cache is not None:
+        ttl = app.config.get('SHARED_CACHE_USER_TTL', 60)
+        cache.add_invalidation_listener(
+            lambda key, version: shared_cache.invalidate(key, version=version, ttl=ttl)
+        )
+
+    app.extensions['user_cache'] = cache
+    register_metrics(app, 'user_cache', cache.snapshot)
@@ -0,0 +1,167 @@
+"""
+CORS module.
+Cross-origin headers computed once at startup for each allowed origin, and
+a WSGI middleware that answers preflight requests before Flask routes them.
+"""
+
+import re
+import threading
+
+# A comma-separated list of header names (RFC 9110 tokens), as browsers send
+# in Access-Control-Request-Headers
+HEADER_LIST = re.compile(r"[!#$%&'*+.^_`|~0-9A-Za-z-]+(?:[ \t]*,[ \t]*[!#$%&'*+.^_`|~0-9A-Za-z-]+)*")
+
+
+class CorsPolicy:
+    """
+    Precomputed CORS headers for the configured origins.
+
+    Every allowed origin gets its response and preflight header lists built
+    up front, so a request costs one dict lookup on its Origin header. An
+    allow_headers of ['*'] reflects the headers a preflight asks for, once
+    they parse as a list of header names, as flask_cors did.
+
+    Attributes:
+        origins (list): Allowed origins, or ['*']
+        max_age (int): Seconds browsers may cache a preflight result
+        counters (dict): Preflights answered for allowed and other origins
+    """
+
+    def __init__(self, origins, methods, allow_headers, expose_headers=(), max_age=7200):
+        self.origins = list(origins)
+        self.max_age = max_age
+        self.counters = {'preflights': 0, 'preflights_rejected': 0}
+        self._lock = threading.Lock()
+        self._wildcard = '*' in self.origins
+        self._reflect_headers = '*' in allow_headers
+
+        # Responses vary by Origin unless every origin gets the same answer
+        vary = [] if self._wildcard else [('Vary', 'Origin')]
+        response_extra = [('Access-Control-Expose-Headers', ', '.join(expose_headers))] if expose_headers else []
+        preflight_extra = [
+            ('Access-Control-Allow-Methods', ', '.join(methods)),
+            ('Access-Control-Max-Age', str(max_age))
+        ]
+        if not self._reflect_headers:
+            preflight_extra.insert(1, ('Access-Control-Allow-Headers', ', '.join(allow_headers)))
+
+        allowed = ['*'] if self._wildcard else self.origins
+        self._response_headers = {
+            origin: [('Access-Control-Allow-Origin', origin), *vary, *response_extra] for origin in allowed
+        }
+        self._preflight_headers = {
+            origin: [('Access-Control-Allow-Origin', origin), *vary, *preflight_extra, ('Content-Length', '0')]
+            for origin in allowed
+        }
+        self._vary_only = vary
+        self._rejected_preflight = [*vary, ('Content-Length', '0')]
+
+    def response_headers(self, origin):
+        """
+        Headers to add to a response.
+
+        Args:
+            origin (str): Origin header of the request, if any
+
+        Returns:
+            list: (name, value) pairs; do not modify
+        """
+        # With a wildcard every response carries the header, as flask_cors did
+        if self._wildcard:
+            return self._response_headers['*']
+        headers = self._response_headers.get(origin) if origin else None
+        return headers if headers is not None else self._vary_only
+
+    def preflight_headers(self, origin, request_headers=None):
+        """
+        Headers of a preflight response.
+
+        Args:
+            origin (str): Origin header of the preflight
+            request_headers (str, optional): Its Access-Control-Request-Headers,
+                echoed back when every header is allowed
+
+        Returns:
+            list: (name, value) pairs; without Access-Control-Allow-Origin
+            when the origin is not allowed
+        """
+        headers = self._preflight_headers.get('*' if self._wildcard else origin)
+        self._count('preflights' if headers is not None else 'preflights_rejected')
+        if headers is None:
+            return self._rejected_preflight
+        if self._reflect_headers and request_headers and HEADER_LIST.fullmatch(request_headers.strip()):
+            # Content-Length stays last
+            return [*headers[:-1], ('Access-Control-Allow-Headers', request_headers.strip()), headers[-1]]
+        return headers
+
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def snapshot(self):
+        """
+        Return CORS metrics.
+
+        Returns:
+            dict: Counters and the preflight cache lifetime
+        """
+        with self._lock:
+            return dict(self.counters, max_age=self.max_age)
+
+
+def is_preflight(method, origin, request_method):
+    """Whether a request is a CORS preflight."""
+    return method == 'OPTIONS' and origin is not None and request_method is not None
+
+
+class CorsMiddleware:
+    """
+    WSGI middleware applying a CorsPolicy.
+
+    Preflights are answered with 204 straight from the precomputed headers,
+    without routing, request context, admission control or database
+    session. Other responses get the origin's headers appended.
+    """
+
+    def __init__(self, wsgi_app, policy):
+        self.wsgi_app = wsgi_app
+        self.policy = policy
+
+    def __call__(self, environ, start_response):
+        origin = environ.get('HTTP_ORIGIN')
+        if is_preflight(environ['REQUEST_METHOD'], origin, environ.get('HTTP_ACCESS_CONTROL_REQUEST_METHOD')):
+            headers = self.policy.preflight_headers(origin, environ.get('HTTP_ACCESS_CONTROL_REQUEST_HEADERS'))
+            start_response('204 No Content', list(headers))
+            return [b'']
+
+        extra = self.policy.response_headers(origin)
+        if not extra:
+            return self.wsgi_app(environ, start_response)
+
+        def cors_start_response(status, headers, exc_info=None):
+            headers.extend(extra)
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, cors_start_response)
+
+
+def init_cors(app):
+    """
+    Build the CORS policy from configuration and install the middleware.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    from utils.metrics import register_metrics
+
+    policy = CorsPolicy(
+        app.config['CORS_ORIGINS'],
+        methods=app.config.get('CORS_ALLOW_METHODS', ['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS']),
+        allow_headers=app.config.get('CORS_ALLOW_HEADERS', ['*']),
+        expose_headers=app.config.get('CORS_EXPOSE_HEADERS', []),
+        max_age=app.config.get('CORS_MAX_AGE', 7200)
+    )
+    app.wsgi_app = CorsMiddleware(app.wsgi_app, policy)
+    app.extensions['cors'] = policy
+    register_metrics(app, 'cors', policy.snapshot)
+    app.logger.info(f'CORS enabled for origins: {policy.origins}')
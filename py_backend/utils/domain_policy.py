@@ -0,0 +1,295 @@
+"""
+Email domain policy module.
+Blocks disposable and abusive email domains using a compiled, memory-mapped
+label trie built by build_domain_policy.py from a plain text list.
+
+List syntax, one rule per line ('#' starts a comment):
+    mailinator.com        block the domain and every subdomain
+    =mail.example.org     block exactly this domain
+    !ok.mailinator.com    allow this domain and its subdomains again
+The most specific matching rule wins.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'HPDP0001'
+
+# File header: magic, root node offset, rule count
+HEADER = struct.Struct('<8sII')
+HEADER_SIZE = 16
+
+# Node: rule flags, child count; followed by its sorted child entries of
+# (label offset, label length, child node offset). Labels live in a blob
+# after the nodes.
+NODE = struct.Struct('<II')
+CHILD = struct.Struct('<IHI')
+
+BLOCK = 1
+EXACT = 2
+ALLOW = 4
+
+RULE_PREFIXES = {'=': EXACT, '!': ALLOW}
+
+
+def domain_labels(domain):
+    """
+    Split a domain into labels, top-level domain first.
+
+    Args:
+        domain (str): Domain name
+
+    Returns:
+        list: Lowercase labels in reverse order
+    """
+    return domain.strip().rstrip('.').lower().split('.')[::-1]
+
+
+def parse_rules(lines):
+    """
+    Parse a text domain list.
+
+    Args:
+        lines (iterable): Lines of the list
+
+    Returns:
+        dict: Domain -> rule flags
+    """
+    rules = {}
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        flag = RULE_PREFIXES.get(line[0], BLOCK)
+        domain = line[1:] if flag != BLOCK else line
+        # Accept "*.example.com" as an alias for a subtree block
+        if domain.startswith('*.'):
+            domain = domain[2:]
+        domain = domain.strip().rstrip('.').lower()
+        if not domain or '..' in domain or domain.startswith('.'):
+            raise ValueError(f'Invalid domain rule: {line}')
+        rules[domain] = rules.get(domain, 0) | flag
+    return rules
+
+
+def write_policy(path, rules):
+    """
+    Compile rules into a policy file.
+
+    The trie is written under a temporary name and renamed into place, so
+    workers still mapping the previous file keep a consistent view until
+    they reload.
+
+    Args:
+        path (str): Destination file
+        rules (dict): Domain -> rule flags, as returned by parse_rules
+
+    Returns:
+        int: Number of rules written
+    """
+    # Build the trie in memory: node = [flags, {label: node}]
+    root = [0, {}]
+    for domain, flags in rules.items():
+        node = root
+        for label in domain_labels(domain):
+            node = node[1].setdefault(label, [0, {}])
+        node[0] |= flags
+
+    # Lay nodes out breadth first so each node's offset is known before
+    # its parent's child table is written
+    order = [root]
+    for node in order:
+        order.extend(child for _, child in sorted(node[1].items()))
+
+    offsets = {}
+    position = HEADER_SIZE
+    for node in order:
+        offsets[id(node)] = position
+        position += NODE.size + len(node[1]) * CHILD.size
+
+    labels = bytearray()
+    label_offsets = {}
+    body = bytearray()
+    for node in order:
+        body += NODE.pack(node[0], len(node[1]))
+        # Children are sorted by encoded label for the binary search
+        for encoded, child in sorted((label.encode('utf-8'), child) for label, child in node[1].items()):
+            if encoded not in label_offsets:
+                label_offsets[encoded] = position + len(labels)
+                labels += encoded
+            body += CHILD.pack(label_offsets[encoded], len(encoded), offsets[id(child)])
+
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as policy:
+        policy.write(HEADER.pack(MAGIC, HEADER_SIZE, len(rules)))
+        policy.write(body)
+        policy.write(labels)
+        policy.flush()
+        os.fsync(policy.fileno())
+    os.replace(temporary, path)
+    return len(rules)
+
+
+class DomainPolicy:
+    """
+    Read-only view of a compiled domain policy.
+
+    Every worker maps the same file, so the list costs one page cache copy
+    per host. A lookup walks the trie from the top-level domain, one child
+    binary search per label. The file is re-checked at most every
+    reload_interval seconds and remapped when it has been replaced, so an
+    updated list takes effect without restarting workers.
+
+    Attributes:
+        path (str): Policy file
+        reload_interval (float): Seconds between checks for a new file
+        counters (dict): Per-process lookup statistics
+    """
+
+    def __init__(self, path, reload_interval=30):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.counters = {'lookups': 0, 'blocked': 0, 'reloads': 0}
+        self._lock = threading.Lock()
+        self._view = None
+        self._open()
+        self._checked_at = time.monotonic()
+
+    def _open(self):
+        with open(self.path, 'rb') as policy:
+            stat = os.fstat(policy.fileno())
+            data = mmap.mmap(policy.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, root, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            data.close()
+            raise ValueError(f'{self.path} is not a domain policy file')
+
+        # Swap in the new mapping with one assignment; lookups in progress
+        # keep the old one alive through their own reference
+        previous = self._view
+        self._view = (data, root)
+        self.rule_count = count
+        self._stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if previous is not None:
+            self.counters['reloads'] += 1
+
+    def reload_if_changed(self, now=None):
+        """
+        Remap the policy file if it was replaced since it was loaded.
+
+        A missing or invalid file keeps the current policy in place.
+
+        Args:
+            now (float, optional): Current monotonic time
+
+        Returns:
+            bool: True if a new policy was loaded
+        """
+        now = time.monotonic() if now is None else now
+        if now - self._checked_at < self.reload_interval:
+            return False
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return False
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == self._stat:
+                    return False
+                self._open()
+                return True
+            except (OSError, ValueError):
+                return False
+
+    def _find_child(self, data, node, label):
+        count = NODE.unpack_from(data, node)[1]
+        low, high = 0, count
+        base = node + NODE.size
+        while low < high:
+            middle = (low + high) // 2
+            label_offset, label_length, child = CHILD.unpack_from(data, base + middle * CHILD.size)
+            candidate = data[label_offset:label_offset + label_length]
+            if candidate < label:
+                low = middle + 1
+            elif candidate > label:
+                high = middle
+            else:
+                return child
+        return None
+
+    def match(self, domain):
+        """
+        Find the rule deciding a domain.
+
+        Args:
+            domain (str): Domain name
+
+        Returns:
+            tuple: (blocked, matching rule domain or None)
+        """
+        self.reload_if_changed()
+        data, node = self._view
+        labels = domain_labels(domain)
+        blocked, rule = False, None
+        for depth, label in enumerate(labels):
+            node = self._find_child(data, node, label.encode('utf-8'))
+            if node is None:
+                break
+            flags = NODE.unpack_from(data, node)[0]
+            exact = depth == len(labels) - 1
+            if flags & ALLOW:
+                blocked, rule = False, labels[depth::-1]
+            if flags & BLOCK or (flags & EXACT and exact):
+                blocked, rule = True, labels[depth::-1]
+
+        self.counters['lookups'] += 1
+        if blocked:
+            self.counters['blocked'] += 1
+        return blocked, '.'.join(rule) if rule else None
+
+    def is_blocked(self, domain):
+        """
+        Check whether a domain is blocked.
+
+        Args:
+            domain (str): Domain name
+
+        Returns:
+            bool: True if signups from the domain are refused
+        """
+        return self.match(domain)[0]
+
+    def snapshot(self):
+        """
+        Return policy metrics.
+
+        Returns:
+            dict: Rule count and lookup counters
+        """
+        return dict(self.counters, rules=self.rule_count, bytes=len(self._view[0]))
+
+    def close(self):
+        """Unmap the policy."""
+        self._view[0].close()
+
+
+def init_domain_policy(app):
+    """
+    Map the email domain policy when EMAIL_DOMAIN_POLICY_FILE is set.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    path = app.config.get('EMAIL_DOMAIN_POLICY_FILE')
+    if not path:
+        return
+
+    from utils.metrics import register_metrics
+
+    policy = DomainPolicy(path, app.config.get('EMAIL_DOMAIN_POLICY_RELOAD_INTERVAL', 30))
+    app.extensions['domain_policy'] = policy
+    register_metrics(app, 'email_domain_policy', policy.snapshot)
+    app.logger.info(f'Email domain policy loaded: {policy.rule_count} rules')
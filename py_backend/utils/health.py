@@ -0,0 +1,152 @@
+"""
+Health checking module.
+Probes the database in the background and serves cached liveness and
+readiness results, so load balancer probes never wait on the database.
+"""
+
+import threading
+import time
+from sqlalchemy import text
+from utils.background import PeriodicWorker
+
+
+class HealthProber:
+    """
+    Cached database health with a bounded probe time.
+
+    Each probe runs SELECT 1 on a helper thread and gives up after timeout
+    seconds; a hung probe is not stacked with new ones. With an interval of
+    0 there is no background thread and every readiness call probes inline.
+
+    Attributes:
+        interval (float): Seconds between background probes
+        timeout (float): Seconds before a probe counts as failed
+        max_pool_saturation (float): Pool usage above which the app is not ready
+    """
+
+    def __init__(self, app, engine, interval, timeout, max_pool_saturation):
+        self.app = app
+        self.engine = engine
+        self.interval = interval
+        self.timeout = timeout
+        self.max_pool_saturation = max_pool_saturation
+        self.result = None
+        self._pending = None
+        self._worker = PeriodicWorker('health-prober', interval, self.probe_once) if interval > 0 else None
+
+    def probe_once(self):
+        """
+        Check the database and cache the outcome.
+
+        Returns:
+            dict: database status, latency and check time
+        """
+        if self._pending is not None and self._pending.is_alive():
+            # The previous probe is still stuck; report it instead of piling up
+            self.result = dict(self.result or {}, database='timeout', checked_at=time.time())
+            return self.result
+
+        outcome = {}
+
+        def check():
+            started = time.perf_counter()
+            try:
+                with self.engine.connect() as conn:
+                    conn.execute(text('SELECT 1'))
+                outcome['database'] = 'connected'
+            except Exception as e:
+                self.app.logger.error(f'Database health check failed: {str(e)}')
+                outcome['database'] = 'disconnected'
+            outcome['latency_ms'] = (time.perf_counter() - started) * 1000
+
+        self._pending = threading.Thread(target=check, name='health-probe', daemon=True)
+        self._pending.start()
+        self._pending.join(self.timeout)
+
+        if self._pending.is_alive():
+            self.app.logger.error(f'Database health check timed out after {self.timeout}s')
+            outcome = {'database': 'timeout', 'latency_ms': None}
+
+        self.result = dict(outcome, checked_at=time.time())
+        return self.result
+
+    def database_status(self):
+        """
+        Return the cached database result, probing first if needed.
+
+        Returns:
+            dict: database status, latency and check time
+        """
+        if self._worker is None:
+            return self.probe_once()
+
+        if self.result is None:
+            self.probe_once()
+        self._worker.ensure_started()
+
+        result = dict(self.result)
+        if time.time() - result['checked_at'] > 3 * self.interval + self.timeout:
+            # The prober thread is not keeping up; do not trust an old success
+            result['database'] = 'stale'
+        return result
+
+    def readiness(self):
+        """
+        Combine the database result, pool saturation and registered checks.
+
+        Returns:
+            tuple: (is_ready, details dict)
+        """
+        database = self.database_status()
+        checks = {'database': {'ok': database['database'] == 'connected', **database}}
+
+        pool_metrics = self.app.extensions.get('pool_metrics', {}).get('primary')
+        if pool_metrics is not None:
+            saturation = pool_metrics.snapshot()['saturation']
+            checks['db_pool'] = {
+                'ok': saturation is None or saturation < self.max_pool_saturation,
+                'saturation': saturation
+            }
+
+        for name, check in self.app.extensions.get('readiness_checks', {}).items():
+            is_ok, detail = check()
+            checks[name] = {'ok': is_ok, **detail}
+
+        return all(check['ok'] for check in checks.values()), checks
+
+    def stop(self):
+        """Stop the background prober."""
+        if self._worker is not None:
+            self._worker.stop(timeout=self.timeout)
+
+
+def register_readiness_check(app, name, check):
+    """
+    Add a check to the readiness probe.
+
+    Args:
+        app (Flask): Flask application instance
+        name (str): Check name in the readiness response
+        check (callable): Zero-argument function returning (is_ok, details dict)
+    """
+    app.extensions.setdefault('readiness_checks', {})[name] = check
+
+
+def init_health(app, db):
+    """
+    Create the health prober for the primary database.
+
+    Args:
+        app (Flask): Flask application instance
+        db (SQLAlchemy): Database extension
+    """
+    with app.app_context():
+        engine = db.engine
+
+    app.extensions['health'] = HealthProber(
+        app,
+        engine,
+        interval=app.config.get('HEALTH_CHECK_INTERVAL', 5),
+        timeout=app.config.get('HEALTH_CHECK_TIMEOUT', 2),
+        max_pool_saturation=app.config.get('READINESS_MAX_POOL_SATURATION', 0.9)
+    )
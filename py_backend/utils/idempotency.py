@@ -0,0 +1,454 @@
+"""
+Idempotency module.
+Replays the stored response when a client retries a mutating request with
+the same Idempotency-Key, so the retry does not write again.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, current_app, jsonify, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from utils.metrics import register_metrics
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Outcomes of IdempotencyStore.begin
+PROCEED = 'proceed'
+REPLAY = 'replay'
+MISMATCH = 'mismatch'
+BUSY = 'busy'
+
+# Response headers stored and replayed with the body
+STORED_HEADERS = ('ETag',)
+
+# Seconds between checks of a duplicate running in another worker
+DB_POLL_INTERVAL = 0.05
+
+# Expired rows are purged once every PURGE_EVERY claims
+PURGE_EVERY = 1000
+
+
+class _Entry:
+    """An in-process key: pending until response is set."""
+
+    __slots__ = ('fingerprint', 'expires', 'response', 'done')
+
+    def __init__(self, fingerprint, expires):
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.response = None
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """
+    TTL'd store of responses by idempotency key.
+
+    The first request with a key claims it; duplicates arriving while it
+    runs wait for it (up to wait_timeout) and then replay its response.
+    Keys live in process memory and, when a table is given, in the database
+    as well, which extends both the replay and the wait to every worker.
+    A key reused with a different request is refused, and a request that
+    fails with a server error releases its key so a retry runs again.
+    A claimed row is only leased for lock_timeout seconds until its
+    response is stored, so a key whose worker died is freed soon rather
+    than after the full TTL.
+
+    Attributes:
+        ttl (float): Seconds a response is kept
+        lock_timeout (float): Seconds a claimed row stays locked without a response
+        max_entries (int): Keys kept in process memory
+        wait_timeout (float): Seconds a duplicate waits for the first request
+        engine (Engine): Database holding the table, or None
+        table (Table): Idempotency key table, or None
+    """
+
+    def __init__(self, ttl, max_entries, wait_timeout, lock_timeout=60, engine=None, table=None):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.engine = engine
+        self.table = table
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._claims = 0
+        self.counters = {
+            'claimed': 0,
+            'stored': 0,
+            'replayed': 0,
+            'waited': 0,
+            'busy': 0,
+            'mismatched': 0,
+            'released': 0,
+            'db_errors': 0
+        }
+
+    def begin(self, key, fingerprint):
+        """
+        Claim key for a request, or find what to answer instead.
+
+        Blocks while a duplicate is in progress, at most wait_timeout.
+
+        Args:
+            key (str): Scoped key from request_identity
+            fingerprint (str): Fingerprint of the request
+
+        Returns:
+            tuple: (PROCEED, None), (REPLAY, response), (MISMATCH, None) or
+                (BUSY, None); response is (status_code, headers, body)
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires <= time.monotonic():
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    entry = _Entry(fingerprint, time.monotonic() + self.ttl)
+                    self._entries[key] = entry
+                    self._evict()
+                    break
+
+            outcome = self._check(entry, fingerprint)
+            if outcome is not None:
+                return outcome
+            self.counters['waited'] += 1
+            if not entry.done.wait(max(deadline - time.monotonic(), 0)):
+                self.counters['busy'] += 1
+                return BUSY, None
+            outcome = self._check(entry, fingerprint)
+            if outcome is not None:
+                return outcome
+            # The first request failed and released the key; claim it now
+
+        if self.table is None:
+            self.counters['claimed'] += 1
+            return PROCEED, None
+
+        try:
+            state, response = self._claim_row(key, fingerprint, deadline)
+        except Exception:
+            self.counters['db_errors'] += 1
+            self._drop(key, entry)
+            raise
+
+        if state == PROCEED:
+            self.counters['claimed'] += 1
+        elif state == REPLAY:
+            # Another worker answered; keep its response for local retries
+            entry.response = response
+            entry.done.set()
+            self.counters['replayed'] += 1
+        else:
+            self.counters['busy' if state == BUSY else 'mismatched'] += 1
+            self._drop(key, entry)
+        return state, response
+
+    def _check(self, entry, fingerprint):
+        """Outcome for an existing entry, or None while it is pending."""
+        if entry.fingerprint != fingerprint:
+            self.counters['mismatched'] += 1
+            return MISMATCH, None
+        if entry.response is not None:
+            self.counters['replayed'] += 1
+            return REPLAY, entry.response
+        return None
+
+    def _evict(self):
+        # Oldest keys first; pending ones are still serializing duplicates
+        for _ in range(len(self._entries)):
+            if len(self._entries) <= self.max_entries:
+                return
+            key, entry = next(iter(self._entries.items()))
+            if entry.response is None:
+                self._entries.move_to_end(key)
+            else:
+                del self._entries[key]
+
+    def _drop(self, key, entry):
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def _claim_row(self, key, fingerprint, deadline):
+        """Claim key in the table, or wait for the worker that holds it."""
+        table = self.table
+        self._claims += 1
+        if self._claims % PURGE_EVERY == 0:
+            self.purge()
+
+        while True:
+            now = datetime.utcnow()
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(table).values(
+                        key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=self.lock_timeout)
+                    ))
+                return PROCEED, None
+            except IntegrityError:
+                pass
+
+            with self.engine.begin() as conn:
+                row = conn.execute(select(table).where(table.c.key == key)).first()
+                if row is not None and row.expires_at <= now:
+                    conn.execute(delete(table).where(table.c.key == key)
+                                 .where(table.c.expires_at == row.expires_at))
+                    continue
+            if row is None:
+                continue
+            if row.fingerprint != fingerprint:
+                return MISMATCH, None
+            if row.status_code is not None:
+                return REPLAY, (row.status_code, json.loads(row.headers), row.body)
+            if time.monotonic() >= deadline:
+                return BUSY, None
+            time.sleep(DB_POLL_INTERVAL)
+
+    def complete(self, key, status_code, headers, body):
+        """
+        Store the response of a claimed key and wake its duplicates.
+
+        Args:
+            key (str): Key returned PROCEED by begin
+            status_code (int): Response status
+            headers (list): (name, value) pairs to replay
+            body (str): Response body
+        """
+        response = (status_code, list(headers), body)
+        if self.table is not None:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(self.table)
+                        .where(self.table.c.key == key)
+                        .values(status_code=status_code, headers=json.dumps(response[1]), body=body,
+                                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl))
+                    )
+            except Exception:
+                # The change is committed; only other workers lose the replay
+                self.counters['db_errors'] += 1
+                current_app.logger.error('Could not store idempotent response', exc_info=True)
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            entry.response = response
+            entry.done.set()
+        self.counters['stored'] += 1
+
+    def release(self, key):
+        """
+        Forget a claimed key whose request failed, so a retry runs again.
+
+        Args:
+            key (str): Key returned PROCEED by begin
+        """
+        if self.table is not None:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(delete(self.table).where(self.table.c.key == key)
+                                 .where(self.table.c.status_code.is_(None)))
+            except Exception:
+                # The row expires on its own
+                self.counters['db_errors'] += 1
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.done.set()
+        self.counters['released'] += 1
+
+    def purge(self):
+        """Delete expired rows from the table."""
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.expires_at <= datetime.utcnow()))
+
+    def snapshot(self):
+        """
+        Return idempotency metrics for this process.
+
+        Returns:
+            dict: Counters and keys held in memory
+        """
+        with self._lock:
+            entries = len(self._entries)
+        return dict(self.counters, entries=entries, database=self.table is not None)
+
+
+def init_idempotency(app, db):
+    """
+    Create the idempotency store.
+
+    Args:
+        app (Flask): Flask application instance
+        db (SQLAlchemy): Database extension
+    """
+    if not app.config.get('IDEMPOTENCY_ENABLED', True):
+        return
+
+    engine = table = None
+    if app.config.get('IDEMPOTENCY_DB_ENABLED', False):
+        from models import IdempotencyKey
+
+        with app.app_context():
+            engine = db.engine
+        table = IdempotencyKey.__table__
+
+    store = IdempotencyStore(
+        ttl=app.config.get('IDEMPOTENCY_TTL', 86400),
+        max_entries=app.config.get('IDEMPOTENCY_MAX_ENTRIES', 10000),
+        wait_timeout=app.config.get('IDEMPOTENCY_WAIT_TIMEOUT', 5),
+        lock_timeout=app.config.get('IDEMPOTENCY_LOCK_TIMEOUT', 60),
+        engine=engine,
+        table=table
+    )
+    app.extensions['idempotency'] = store
+    register_metrics(app, 'idempotency', store.snapshot)
+
+
+def request_identity(key):
+    """
+    Scope a client key to the endpoint and credentials, and fingerprint the request.
+
+    Keys are only unique per client, so the stored key includes the method,
+    path and credential headers; only hashes are kept.
+
+    Args:
+        key (str): Idempotency-Key header value
+
+    Returns:
+        tuple: (scoped key, request fingerprint)
+    """
+    credentials = request.headers.get('Authorization') or request.headers.get('X-Admin-Key') or ''
+    scope = '\n'.join((request.method, request.path, credentials, key))
+    fingerprint = hashlib.sha256(request.headers.get('If-Match', '').encode('utf-8') + b'\n')
+    fingerprint.update(request.get_data())
+    return hashlib.sha256(scope.encode('utf-8')).hexdigest(), fingerprint.hexdigest()
+
+
+def _refusal(state):
+    """(body, status code, headers) for a key that cannot be used now."""
+    if state == MISMATCH:
+        return {
+            'success': False,
+            'message': 'Idempotency-Key was already used with a different request'
+        }, 422, []
+    return {
+        'success': False,
+        'message': 'A request with this Idempotency-Key is still in progress'
+    }, 409, [('Retry-After', '1')]
+
+
+def _parse_key():
+    """Return (key or None, error tuple or None) for the current request."""
+    key = request.headers.get(HEADER)
+    if key is None:
+        return None, None
+    if not 1 <= len(key) <= MAX_KEY_LENGTH:
+        return None, ({
+            'success': False,
+            'message': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'
+        }, 400, [])
+    return key, None
+
+
+def idempotent(f):
+    """
+    Decorator making a JSON route replay its response for a repeated Idempotency-Key.
+
+    Requests without the header run as usual. Apply below the
+    authentication decorator, so retries are still authenticated.
+
+    Usage:
+        @user_bp.route('/update', methods=['PATCH'])
+        @token_required
+        @idempotent
+        def update_user(current_user):
+            ...
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        store = current_app.extensions.get('idempotency')
+        key, failure = _parse_key()
+        if store is None or (key is None and failure is None):
+            return f(*args, **kwargs)
+        if failure:
+            body, status_code, headers = failure
+            return jsonify(body), status_code, headers
+
+        scoped_key, fingerprint = request_identity(key)
+        state, stored = store.begin(scoped_key, fingerprint)
+        if state == REPLAY:
+            status_code, headers, body = stored
+            return Response(body, status_code, headers=[*headers, ('Idempotent-Replayed', 'true')],
+                            mimetype='application/json')
+        if state != PROCEED:
+            body, status_code, headers = _refusal(state)
+            return jsonify(body), status_code, headers
+
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+        except Exception:
+            store.release(scoped_key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            store.release(scoped_key)
+        else:
+            headers = [(name, response.headers[name]) for name in STORED_HEADERS if name in response.headers]
+            store.complete(scoped_key, response.status_code, headers, response.get_data(as_text=True))
+        return response
+
+    return decorated
+
+
+async def run_idempotent(handler):
+    """
+    Async counterpart of the idempotent decorator for the native ASGI routes.
+
+    Store calls that may block (waiting for a duplicate, or the table) run
+    on a worker thread, off the event loop.
+
+    Args:
+        handler (callable): Coroutine function returning (body, status code, headers)
+
+    Returns:
+        tuple: (body, status code, extra headers)
+    """
+    store = current_app.extensions.get('idempotency')
+    key, failure = _parse_key()
+    if store is None or (key is None and failure is None):
+        return await handler()
+    if failure:
+        return failure
+
+    scoped_key, fingerprint = request_identity(key)
+    state, stored = await asyncio.to_thread(store.begin, scoped_key, fingerprint)
+    if state == REPLAY:
+        status_code, headers, body = stored
+        return json.loads(body), status_code, [*headers, ('Idempotent-Replayed', 'true')]
+    if state != PROCEED:
+        return _refusal(state)
+
+    try:
+        body, status_code, headers = await handler()
+    except Exception:
+        await asyncio.to_thread(store.release, scoped_key)
+        raise
+    if status_code >= 500:
+        await asyncio.to_thread(store.release, scoped_key)
+    else:
+        stored_headers = [(name, value) for name, value in headers if name in STORED_HEADERS]
+        await asyncio.to_thread(store.complete, scoped_key, status_code, stored_headers,
+                                current_app.json.dumps(body))
+    return body, status_code, headers
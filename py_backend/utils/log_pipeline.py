@@ -0,0 +1,288 @@
+"""
+Logging pipeline module.
+Moves log I/O off the request path: records go into a bounded queue and a
+listener thread writes them to the real handlers in batches.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, RotatingFileHandler
+from flask import has_request_context, request
+from flask.logging import default_handler
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the caller.
+
+    When the queue is full the record is dropped and counted instead of
+    waiting for the listener or raising. Unlike QueueHandler.prepare, only
+    the message arguments are merged and the traceback rendered to text, so
+    formatting stays on the listener thread and a JSON formatter there still
+    sees the record's fields.
+
+    Attributes:
+        dropped (int): Records dropped because the queue was full
+    """
+
+    def __init__(self, listener):
+        super().__init__(listener.queue)
+        self.listener = listener
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.listener.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener:
+    """
+    Thread draining a log queue into handlers in batches.
+
+    Up to batch_size queued records are handed over at once; handlers with
+    an emit_batch method write them with a single write and flush. The
+    queue and thread are recreated in forked children.
+
+    Attributes:
+        queue (Queue): Bounded queue fed by DroppingQueueHandler
+        handlers (tuple): Handlers the records are written to
+        batch_size (int): Maximum records per batch
+    """
+
+    _SENTINEL = None
+
+    def __init__(self, handlers, maxsize=10000, batch_size=256):
+        self.handlers = tuple(handlers)
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize)
+        self.batches = 0
+        self._thread = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        """Start the listener thread."""
+        self._thread = threading.Thread(target=self._run, name='log-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write out everything queued so far and stop the thread."""
+        if self._thread is None:
+            return
+        self.queue.put(self._SENTINEL)
+        self._thread.join()
+        self._thread = None
+
+    def _after_fork(self):
+        # The parent's thread is gone and its queue lock may be held
+        if self._thread is not None:
+            self.queue = queue.Queue(self.maxsize)
+            self.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            batch = []
+            stopping = record is self._SENTINEL
+            if not stopping:
+                batch.append(record)
+
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._SENTINEL:
+                    stopping = True
+                else:
+                    batch.append(record)
+
+            if batch:
+                self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, batch):
+        self.batches += 1
+        for handler in self.handlers:
+            records = [record for record in batch if record.levelno >= handler.level]
+            if not records:
+                continue
+            if hasattr(handler, 'emit_batch'):
+                handler.emit_batch(records)
+            else:
+                for record in records:
+                    handler.handle(record)
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotating file handler that can write many records at once.
+
+    emit_batch formats the records, rotates if needed, and issues a single
+    write and flush under one lock acquisition.
+    """
+
+    def emit_batch(self, records):
+        try:
+            lines = [self.format(record) for record in records if self.filter(record)]
+            if not lines:
+                return
+            data = self.terminator.join(lines) + self.terminator
+
+            self.acquire()
+            try:
+                if self.stream is None:
+                    self.stream = self._open()
+                if self.maxBytes > 0 and self.stream.tell() + len(data) >= self.maxBytes:
+                    self.doRollover()
+                self.stream.write(data)
+                self.stream.flush()
+            finally:
+                self.release()
+        except Exception:
+            self.handleError(records[-1])
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the request method, path and route to records logged in a request."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            record.route = request.url_rule.rule if request.url_rule else None
+            record.remote_addr = request.remote_addr
+        return True
+
+
+class RouteSamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of INFO-and-below records for noisy routes.
+
+    Warnings and errors are always kept.
+
+    Attributes:
+        rates (dict): Route rule or path to the fraction of records kept
+        sampled_out (int): Records dropped by sampling
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not self.rates or not has_request_context():
+            return True
+
+        route = request.url_rule.rule if request.url_rule else request.path
+        rate = self.rates.get(route, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+
+        self.sampled_out += 1
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    REQUEST_FIELDS = ('method', 'path', 'route', 'remote_addr')
+
+    def format(self, record):
+        data = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno
+        }
+        for field in self.REQUEST_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data)
+
+
+def parse_sample_rates(value):
+    """
+    Parse LOG_SAMPLE_RATES, e.g. "/health=0.01,/user/me=0.1".
+
+    Args:
+        value (str): Comma-separated route=rate pairs
+
+    Returns:
+        dict: Route to sampling rate
+    """
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            route, rate = item.rsplit('=', 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+def init_log_pipeline(app, handlers):
+    """
+    Route app.logger through a bounded queue drained by a batching listener.
+
+    Args:
+        app (Flask): Flask application instance
+        handlers (list): Handlers that do the actual I/O
+
+    Returns:
+        BatchingQueueListener: The started listener
+    """
+    from utils.metrics import register_metrics
+
+    handlers = list(handlers)
+    if default_handler in app.logger.handlers:
+        # Flask's stderr handler would still write on the request thread
+        app.logger.removeHandler(default_handler)
+        handlers.append(default_handler)
+
+    listener = BatchingQueueListener(
+        handlers,
+        maxsize=app.config.get('LOG_QUEUE_SIZE', 10000),
+        batch_size=app.config.get('LOG_BATCH_SIZE', 256)
+    )
+    queue_handler = DroppingQueueHandler(listener)
+    sampler = RouteSamplingFilter(parse_sample_rates(app.config.get('LOG_SAMPLE_RATES')))
+    queue_handler.addFilter(sampler)
+    queue_handler.addFilter(RequestContextFilter())
+
+    app.logger.addHandler(queue_handler)
+    listener.start()
+    app.extensions['log_listener'] = listener
+
+    register_metrics(app, 'logging', lambda: {
+        'queue_depth': listener.queue.qsize(),
+        'queue_size': listener.maxsize,
+        'dropped': queue_handler.dropped,
+        'sampled_out': sampler.sampled_out,
+        'batches': listener.batches
+    })
+    return listener
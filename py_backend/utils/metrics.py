@@ -0,0 +1,29 @@
+"""
+Metrics registry module.
+Collects named metric providers and serves their snapshots at /metrics.
+"""
+
+
+def register_metrics(app, name, provider):
+    """
+    Register a metrics provider for the application.
+
+    Args:
+        app (Flask): Flask application instance
+        name (str): Section name in the /metrics response
+        provider (callable): Zero-argument function returning a JSON-serializable dict
+    """
+    app.extensions.setdefault('metrics', {})[name] = provider
+
+
+def collect_metrics(app):
+    """
+    Take a snapshot of every registered provider.
+
+    Args:
+        app (Flask): Flask application instance
+
+    Returns:
+        dict: Section name to provider snapshot
+    """
+    return {name: provider() for name, provider in app.extensions.get('metrics', {}).items()}
@@ -0,0 +1,176 @@
+"""
+Connection pool instrumentation module.
+Tracks checkout wait, pool occupancy, invalidations and connection age
+through SQLAlchemy pool events.
+"""
+
+import threading
+import time
+from collections import deque
+from sqlalchemy import event
+from utils.metrics import register_metrics
+from utils.routing import named_engines
+
+# Recent checkout waits kept for percentiles
+WAIT_SAMPLES = 1024
+
+# Minimum seconds between two slow-checkout warnings for the same pool
+WARNING_INTERVAL = 10
+
+
+class PoolMetrics:
+    """
+    Metrics for one engine's connection pool.
+
+    The pool's connect() is wrapped to time checkouts, including waits for
+    a free connection. The wrapper is reapplied when the engine is disposed
+    and its pool recreated; the pool events themselves carry over.
+
+    Attributes:
+        name (str): Engine name used in logs and metrics
+        engine (Engine): Instrumented engine
+        wait_warning_ms (float): Checkout wait that triggers a warning
+    """
+
+    def __init__(self, name, engine, wait_warning_ms, logger):
+        self.name = name
+        self.engine = engine
+        self.wait_warning_ms = wait_warning_ms
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._last_warning = 0.0
+        self._suppressed_warnings = 0
+        self.counters = {
+            'checkouts': 0,
+            'connects': 0,
+            'closes': 0,
+            'invalidations': 0,
+            'soft_invalidations': 0,
+            'slow_checkouts': 0
+        }
+        self.wait_ms_max = 0.0
+        self.connection_age_max = 0.0
+
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'close', self._on_close)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+        event.listen(engine, 'soft_invalidate', self._on_soft_invalidate)
+        event.listen(engine, 'engine_disposed', self._on_disposed)
+        self._wrap_pool(engine.pool)
+
+    def _wrap_pool(self, pool):
+        """Time every checkout from the given pool."""
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            connection = connect()
+            self._record_wait((time.perf_counter() - started) * 1000)
+            return connection
+
+        pool.connect = timed_connect
+
+    def _record_wait(self, wait_ms):
+        with self._lock:
+            self._waits.append(wait_ms)
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+            if wait_ms < self.wait_warning_ms:
+                return
+
+            self.counters['slow_checkouts'] += 1
+            now = time.monotonic()
+            if now - self._last_warning < WARNING_INTERVAL:
+                self._suppressed_warnings += 1
+                return
+            suppressed, self._suppressed_warnings = self._suppressed_warnings, 0
+            self._last_warning = now
+
+        self.logger.warning(
+            f'Slow connection checkout on {self.name}: {wait_ms:.1f}ms '
+            f'({self.engine.pool.status()}; {suppressed} similar warnings suppressed)'
+        )
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        connection_record.info['connected_at'] = time.monotonic()
+        with self._lock:
+            self.counters['connects'] += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connected_at = connection_record.info.get('connected_at')
+        age = time.monotonic() - connected_at if connected_at is not None else 0.0
+        with self._lock:
+            self.counters['checkouts'] += 1
+            self.connection_age_max = max(self.connection_age_max, age)
+
+    def _on_close(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.counters['closes'] += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        # pool_pre_ping failures and disconnect errors end up here
+        with self._lock:
+            self.counters['invalidations'] += 1
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.counters['soft_invalidations'] += 1
+
+    def _on_disposed(self, engine):
+        self._wrap_pool(engine.pool)
+
+    def snapshot(self):
+        """
+        Return the current pool metrics.
+
+        Returns:
+            dict: Occupancy, counters, checkout wait and connection age
+        """
+        pool = self.engine.pool
+        size = pool.size() if hasattr(pool, 'size') else None
+        overflow = max(pool.overflow(), 0) if hasattr(pool, 'overflow') else None
+        max_overflow = getattr(pool, '_max_overflow', None)
+        checked_out = pool.checkedout() if hasattr(pool, 'checkedout') else None
+
+        capacity = (size or 0) + max(max_overflow or 0, 0)
+        saturation = checked_out / capacity if capacity and checked_out is not None else None
+
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                'pool': type(pool).__name__,
+                'size': size,
+                'max_overflow': max_overflow,
+                'checked_out': checked_out,
+                'overflow': overflow,
+                'saturation': saturation,
+                'counters': dict(self.counters),
+                'checkout_wait_ms': {
+                    'avg': sum(waits) / len(waits) if waits else 0.0,
+                    'p95': waits[int(len(waits) * 0.95)] if waits else 0.0,
+                    'max': self.wait_ms_max,
+                    'samples': len(waits)
+                },
+                'connection_age_max_s': self.connection_age_max
+            }
+
+
+def init_pool_metrics(app):
+    """
+    Instrument every engine of the application and register the metrics.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    wait_warning_ms = app.config.get('DB_POOL_WAIT_WARNING_MS', 100)
+    pools = {
+        name: PoolMetrics(name, engine, wait_warning_ms, app.logger)
+        for name, engine in named_engines(app)
+    }
+    app.extensions['pool_metrics'] = pools
+
+    register_metrics(app, 'db_pool', lambda: {
+        name: metrics.snapshot() for name, metrics in pools.items()
+    })
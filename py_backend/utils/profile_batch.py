@@ -0,0 +1,229 @@
+"""
+Batch profile update module.
+Renames many users in one transaction with chunked CASE updates, for HR
+sync jobs that would otherwise send one PATCH /user/update per user.
+"""
+
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+from models import db, User
+from utils.search import bulk_gram_statements, ngrams_enabled, search_columns
+from utils.validators import validate_name
+
+NAME_FIELDS = (('first_name', 'First name'), ('last_name', 'Last name'))
+
+
+def parse_records(records):
+    """
+    Validate batch records with the same rules as PATCH /user/update.
+
+    Every record is checked before anything is written. Records must have
+    an id and at least one of first_name and last_name; version, when given,
+    is the row version the caller based the change on.
+
+    Args:
+        records (list): Raw records from the request body
+
+    Returns:
+        tuple: (changes by user id, {index: error message} for invalid records)
+    """
+    changes = {}
+    errors = {}
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[index] = 'Record must be an object'
+            continue
+
+        user_id = record.get('id')
+        if not user_id or not isinstance(user_id, str):
+            errors[index] = 'id is required'
+            continue
+        if user_id in changes:
+            errors[index] = 'Duplicate id'
+            continue
+
+        version = record.get('version')
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool) or version < 1):
+            errors[index] = 'version must be a positive integer'
+            continue
+
+        values = {}
+        for field, label in NAME_FIELDS:
+            if record.get(field) is None:
+                continue
+            is_valid, error_msg = validate_name(record[field], label)
+            if not is_valid:
+                errors[index] = error_msg
+                break
+            values[field] = record[field].strip()
+        if index in errors:
+            continue
+        if not values:
+            errors[index] = 'At least one field (first_name or last_name) is required'
+            continue
+
+        changes[user_id] = {'index': index, 'version': version, 'values': values}
+    return changes, errors
+
+
+def _group_by_session(changes):
+    """Split changes by the database holding each user; unknown shards are dropped."""
+    shard_map = current_app.extensions.get('shard_map')
+    if shard_map is None:
+        return {db.session: changes}, {}
+
+    groups = {}
+    sessions = {}
+    for user_id, change in changes.items():
+        shard = shard_map.shard_for_id(user_id)
+        if shard is None:
+            continue
+        engine = shard_map.engine(shard)
+        if engine not in sessions:
+            sessions[engine] = Session(bind=engine)
+        groups.setdefault(sessions[engine], {})[user_id] = change
+    return groups, sessions
+
+
+def _apply_chunk(session, chunk, now):
+    """
+    Update one chunk of users with a single statement.
+
+    Rows are read (and locked, where the database supports it) first, so
+    missing users and stale versions are reported per record; the UPDATE
+    then sets every column with a CASE on id and is still guarded by the
+    versions that were read.
+
+    Returns:
+        dict: User id to (status, new version or None)
+    """
+    table = User.__table__
+    rows = {row.id: row for row in session.execute(
+        select(table.c.id, table.c.first_name, table.c.last_name, table.c.email, table.c.version)
+        .where(table.c.id.in_(list(chunk)))
+        .with_for_update()
+    )}
+
+    results = {}
+    updates = {}
+    for user_id, change in chunk.items():
+        row = rows.get(user_id)
+        if row is None:
+            results[user_id] = ('not_found', None)
+        elif change['version'] is not None and change['version'] != row.version:
+            results[user_id] = ('conflict', row.version)
+        else:
+            values = change['values']
+            updates[user_id] = dict(
+                values,
+                version=row.version,
+                **search_columns(values.get('first_name', row.first_name),
+                                 values.get('last_name', row.last_name), row.email)
+            )
+    if not updates:
+        return results
+
+    values = {}
+    for column_name in ('first_name', 'last_name', 'search_name', 'search_last_name'):
+        whens = {user_id: update_values[column_name]
+                 for user_id, update_values in updates.items() if column_name in update_values}
+        if whens:
+            values[column_name] = case(whens, value=table.c.id, else_=table.c[column_name])
+    values['version'] = table.c.version + 1
+    values['updated_at'] = now
+
+    expected = case({user_id: update_values['version'] for user_id, update_values in updates.items()},
+                    value=table.c.id)
+    statement = (
+        update(table)
+        .where(table.c.id.in_(list(updates)))
+        .where(table.c.version == expected)
+        .values(values)
+    )
+
+    # Without row locks another writer may have bumped a row between the
+    # SELECT and the UPDATE, leaving it at the version this UPDATE would have set
+    if session.get_bind(mapper=User.__mapper__).dialect.update_returning:
+        written = set(session.execute(statement.returning(table.c.id)).scalars())
+    elif session.execute(statement).rowcount == len(updates):
+        written = set(updates)
+    else:
+        written = _written_rows(session, updates)
+    lost = [user_id for user_id in updates if user_id not in written]
+    if lost:
+        current = dict(session.execute(select(table.c.id, table.c.version).where(table.c.id.in_(lost))).all())
+        for user_id in lost:
+            results[user_id] = ('conflict', current.get(user_id))
+            del updates[user_id]
+
+    if updates and ngrams_enabled():
+        for statement, parameters in bulk_gram_statements(updates):
+            session.execute(statement, parameters)
+
+    for user_id, update_values in updates.items():
+        results[user_id] = ('updated', update_values['version'] + 1)
+    return results
+
+
+def _written_rows(session, updates):
+    """
+    Ids whose row now holds exactly what this chunk wrote.
+
+    Used when the UPDATE cannot return the ids it matched: the version alone
+    cannot tell our write from a racing one, so the names must match too.
+    """
+    table = User.__table__
+    written = set()
+    for row in session.execute(
+        select(table.c.id, table.c.version, table.c.first_name, table.c.last_name)
+        .where(table.c.id.in_(list(updates)))
+    ):
+        update_values = updates[row.id]
+        if row.version == update_values['version'] + 1 and all(
+            getattr(row, column_name) == update_values[column_name]
+            for column_name in ('first_name', 'last_name') if column_name in update_values
+        ):
+            written.add(row.id)
+    return written
+
+
+def apply_profile_batch(changes, chunk_size):
+    """
+    Apply validated name changes in one transaction per database.
+
+    Each chunk of at most chunk_size users costs a SELECT and one UPDATE
+    (plus the trigram statements when enabled), whatever the number of
+    users in it. Nothing is committed until every chunk succeeded; with
+    sharding each shard commits its own transaction once all are done.
+
+    Args:
+        changes (dict): Output of parse_records
+        chunk_size (int): Users per UPDATE statement
+
+    Returns:
+        dict: User id to (status, version) with status updated, not_found
+            or conflict
+    """
+    groups, shard_sessions = _group_by_session(changes)
+    results = {user_id: ('not_found', None) for user_id in changes}
+    now = datetime.utcnow()
+
+    try:
+        for session, group in groups.items():
+            user_ids = list(group)
+            for start in range(0, len(user_ids), chunk_size):
+                chunk = {user_id: group[user_id] for user_id in user_ids[start:start + chunk_size]}
+                results.update(_apply_chunk(session, chunk, now))
+        for session in groups:
+            session.commit()
+    except Exception:
+        for session in groups:
+            session.rollback()
+        raise
+    finally:
+        for session in shard_sessions.values():
+            session.close()
+
+    return results
@@ -0,0 +1,201 @@
+"""
+Read replica routing module.
+Sends read-only work to replica engines and everything else to the primary.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, OperationalError
+from utils.routing import create_engines
+
+
+class ReplicaRouter:
+    """
+    Round-robin selection over replica engines with health-based ejection.
+
+    A replica that raises a connection-level error is ejected for
+    eject_seconds and re-admitted automatically afterwards. Users that
+    recently wrote are kept on the primary for sticky_seconds so they
+    read their own writes despite replication lag. The sticky window is
+    also marked in the host's shared cache, when there is one, so a read
+    landing on another worker stays on the primary as well.
+
+    Attributes:
+        engines (list): Replica engines in round-robin order
+        eject_seconds (float): How long a failing replica stays ejected
+        sticky_seconds (float): Read-your-writes window after a write
+        shared_cache (SharedCache): Host cache holding sticky marks, or None
+    """
+
+    def __init__(self, engines, eject_seconds=30, sticky_seconds=5, shared_cache=None):
+        self.engines = list(engines)
+        self.eject_seconds = eject_seconds
+        self.sticky_seconds = sticky_seconds
+        self.shared_cache = shared_cache
+        self._lock = threading.Lock()
+        self._next = 0
+        self._ejected_until = {}
+        self._sticky_until = {}
+
+        for engine in self.engines:
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        """Eject the replica when the error points at the connection."""
+        if context.engine is None:
+            return
+        error = context.sqlalchemy_exception
+        if context.is_disconnect or isinstance(error, OperationalError):
+            self.eject(context.engine)
+
+    def choose(self):
+        """
+        Pick the next healthy replica.
+
+        Returns:
+            Engine: Replica engine, or None if every replica is ejected
+        """
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = self.engines[self._next % len(self.engines)]
+                self._next += 1
+                if self._ejected_until.get(engine, 0) <= now:
+                    return engine
+        return None
+
+    def eject(self, engine):
+        """
+        Take a replica out of rotation for eject_seconds.
+
+        Args:
+            engine (Engine): Replica engine that failed
+        """
+        with self._lock:
+            self._ejected_until[engine] = time.monotonic() + self.eject_seconds
+
+        current_app.logger.warning(
+            f'Replica ejected for {self.eject_seconds}s: {engine.url.render_as_string()}'
+        )
+
+    def healthy_count(self):
+        """Return the number of replicas currently in rotation."""
+        now = time.monotonic()
+        with self._lock:
+            return sum(
+                1 for engine in self.engines
+                if self._ejected_until.get(engine, 0) <= now
+            )
+
+    def stick(self, key):
+        """
+        Keep reads for key on the primary for the sticky window.
+
+        Args:
+            key (str): Usually the user id that just wrote
+        """
+        if self.sticky_seconds <= 0:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._sticky_until[key] = now + self.sticky_seconds
+
+            # Drop expired entries once the map grows, keeping it bounded
+            if len(self._sticky_until) > 10000:
+                self._sticky_until = {
+                    k: until for k, until in self._sticky_until.items()
+                    if until > now
+                }
+
+        if self.shared_cache is not None:
+            self.shared_cache.set(f'sticky:{key}', b'1', self.sticky_seconds)
+
+    def is_sticky(self, key):
+        """Return True if reads for key must stay on the primary."""
+        until = self._sticky_until.get(key)
+        if until is not None and until > time.monotonic():
+            return True
+        return self.shared_cache is not None and self.shared_cache.get(f'sticky:{key}') is not None
+
+
+def init_replicas(app, db):
+    """
+    Create the replica router and its engines.
+
+    Args:
+        app (Flask): Flask application instance
+        db (SQLAlchemy): Database extension
+    """
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not uris:
+        return
+
+    engines = create_engines(app, uris)
+
+    app.extensions['replica_router'] = ReplicaRouter(
+        engines,
+        eject_seconds=app.config.get('DB_REPLICA_EJECT_SECONDS', 30),
+        sticky_seconds=app.config.get('DB_REPLICA_STICKY_SECONDS', 5),
+        shared_cache=app.extensions.get('shared_cache')
+    )
+    app.logger.info(f'Read replicas enabled: {len(engines)}')
+
+
+@contextmanager
+def replica_reads(session):
+    """
+    Allow reads issued inside the block to be served by a replica.
+
+    Args:
+        session: Routing session (usually db.session)
+    """
+    previous = session.info.get('read_only')
+    session.info['read_only'] = True
+    try:
+        yield
+    finally:
+        session.info['read_only'] = previous
+
+
+def read_only(session, query, sticky_key=None):
+    """
+    Run a read-only query on a replica, falling back to the primary.
+
+    The primary is used directly when no replica is configured, when
+    sticky_key wrote recently, or when the replica fails mid-query.
+
+    Args:
+        session: Routing session (usually db.session)
+        query (callable): Zero-argument function performing the read
+        sticky_key (str, optional): Key checked against the sticky window
+
+    Returns:
+        The return value of query
+    """
+    router = current_app.extensions.get('replica_router')
+    if router is None or (sticky_key is not None and router.is_sticky(sticky_key)):
+        return query()
+
+    try:
+        with replica_reads(session):
+            return query()
+    except DBAPIError:
+        # The failing replica has been ejected by the handle_error hook
+        session.rollback()
+        return query()
+
+
+def stick_to_primary(key):
+    """
+    Keep reads for key on the primary after a write.
+
+    Args:
+        key (str): Usually the id of the user that was written
+    """
+    router = current_app.extensions.get('replica_router')
+    if router is not None:
+        router.stick(key)
@@ -0,0 +1,167 @@
+"""
+Session routing module.
+Chooses the engine for each statement: user shard, read replica or primary.
+"""
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Table, create_engine, event, inspect
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import Select
+
+
+def create_engines(app, uris):
+    """
+    Create engines for extra databases with the app's engine options.
+
+    Replica and shard engines are kept out of SQLALCHEMY_BINDS so they do
+    not get bind-key metadata of their own.
+
+    Args:
+        app (Flask): Flask application instance
+        uris (list): Database URLs
+
+    Returns:
+        list: One engine per URL
+    """
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options.setdefault('echo', app.config.get('SQLALCHEMY_ECHO', False))
+    return [create_engine(uri, **options) for uri in uris]
+
+
+def named_engines(app):
+    """
+    Return every engine the application uses, with a display name.
+
+    Args:
+        app (Flask): Flask application instance
+
+    Returns:
+        list: (name, engine) pairs - primary and binds, then replicas and shards
+    """
+    with app.app_context():
+        engines = [
+            ('primary' if key is None else key, engine)
+            for key, engine in app.extensions['sqlalchemy'].engines.items()
+        ]
+
+    router = app.extensions.get('replica_router')
+    if router is not None:
+        engines.extend((f'replica_{index}', engine) for index, engine in enumerate(router.engines))
+
+    shard_map = app.extensions.get('shard_map')
+    if shard_map is not None:
+        engines.extend((f'shard_{index}', engine) for index, engine in enumerate(shard_map.engines))
+
+    return engines
+
+
+def all_engines(app):
+    """
+    Return every engine the application uses.
+
+    Args:
+        app (Flask): Flask application instance
+
+    Returns:
+        list: Default and bind engines, then replica and shard engines
+    """
+    return [engine for _, engine in named_engines(app)]
+
+
+def dispose_engines(app, close=True):
+    """
+    Drop the pooled connections of every engine.
+
+    A forked worker must call this with close=False: the inherited sockets
+    belong to the parent, and closing them would break its connections.
+
+    Args:
+        app (Flask): Flask application instance
+        close (bool): Whether to close the pooled connections
+    """
+    for engine in all_engines(app):
+        engine.dispose(close=close)
+
+
+def _target_table(mapper, clause):
+    """Return the table a statement is aimed at, if it can be determined."""
+    if mapper is not None:
+        return inspect(mapper).local_table
+    if isinstance(clause, Table):
+        return clause
+    if isinstance(clause, UpdateBase) and isinstance(clause.table, Table):
+        return clause.table
+    if isinstance(clause, Select):
+        froms = clause.get_final_froms()
+        if froms and isinstance(froms[0], Table):
+            return froms[0]
+    return None
+
+
+class RoutingSession(Session):
+    """
+    Flask-SQLAlchemy session that routes statements between engines.
+
+    Tables flagged with info={'sharded': True} go to the shard bound with
+    utils.sharding.bind_user_shard. Other reads go to a replica only inside
+    utils.replicas.replica_reads() and only while the session has not written
+    in the current transaction; flushes and DML always use the primary.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+
+        # Flushes pick a connection per instance so new rows land on their shard
+        if 'shard_map' in current_app.extensions:
+            self.connection_callable = self._connection_for_instance
+
+    def _connection_for_instance(self, mapper=None, instance=None, **kwargs):
+        """Return the connection a flushed instance must be written through."""
+        shard_map = current_app.extensions['shard_map']
+        table = _target_table(mapper, None)
+        if instance is not None and table is not None and table.info.get('sharded'):
+            engine = shard_map.engine(shard_map.shard_for_id(instance.id))
+            return self.connection(bind_arguments={'bind': engine})
+        return self.connection(bind_arguments={'mapper': mapper})
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+
+        shard = self.info.get('shard')
+        if shard is not None:
+            table = _target_table(mapper, clause)
+            if table is not None and table.info.get('sharded'):
+                return current_app.extensions['shard_map'].engine(shard)
+
+        is_write = self._flushing or (clause is not None and getattr(clause, 'is_dml', False))
+        if is_write:
+            self.info['wrote'] = True
+        elif self.info.get('read_only') and not self.info.get('wrote'):
+            router = current_app.extensions.get('replica_router')
+            engine = router.choose() if router is not None else None
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def _reset_write_flag(session):
+    """Reads may return to replicas once the writing transaction ends."""
+    session.info.pop('wrote', None)
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _assign_shard_ids(session, flush_context, instances):
+    """Give new rows of sharded tables an id that encodes their shard."""
+    shard_map = current_app.extensions.get('shard_map')
+    if shard_map is None:
+        return
+
+    for instance in session.new:
+        table = _target_table(type(instance), None)
+        if table is not None and table.info.get('sharded') and instance.id is None:
+            instance.id = shard_map.new_user_id(instance.email)
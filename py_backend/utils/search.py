@@ -0,0 +1,254 @@
+"""
+User search module.
+Type-ahead search over user names and emails: indexed prefix ranges on
+normalized columns, and an optional trigram table for substring search.
+"""
+
+import unicodedata
+from flask import current_app, has_app_context
+from sqlalchemy import and_, delete, event, func, insert, or_, select
+from models import db, User, UserSearchGram
+from utils.replicas import read_only
+
+NGRAM_SIZE = 3
+
+# Substring search probes up to GRAM_PROBES trigrams of the query, counting
+# each one's users up to GRAM_PROBE_LIMIT, to pick the rarest
+GRAM_PROBES = 8
+GRAM_PROBE_LIMIT = 1000
+
+# Lengths of the normalized columns; casefolding can lengthen text (ß -> ss)
+SEARCH_COLUMN_LENGTHS = {'search_name': 201, 'search_last_name': 100, 'search_email': 255}
+
+RESULT_COLUMNS = ('id', 'email', 'first_name', 'last_name')
+
+
+def normalize_search_text(text):
+    """
+    Normalize text for search: strip accents, casefold and collapse spaces.
+
+    Args:
+        text (str): Name, email or query
+
+    Returns:
+        str: Normalized text ('' for None)
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def search_columns(first_name, last_name, email):
+    """
+    Compute the normalized search columns of a user.
+
+    Args:
+        first_name (str): First name
+        last_name (str): Last name
+        email (str): Email address
+
+    Returns:
+        dict: search_name, search_last_name and search_email values
+    """
+    values = {
+        'search_name': normalize_search_text(f'{first_name or ""} {last_name or ""}'),
+        'search_last_name': normalize_search_text(last_name),
+        'search_email': normalize_search_text(email)
+    }
+    return {key: value[:SEARCH_COLUMN_LENGTHS[key]] for key, value in values.items()}
+
+
+def _grams(words):
+    return {word[i:i + NGRAM_SIZE] for word in words for i in range(len(word) - NGRAM_SIZE + 1)}
+
+
+def user_grams(search_name, search_email):
+    """
+    Trigrams indexed for a user: those of each name word and of the email's local part.
+
+    The domain is left out; a handful of domains would otherwise give every
+    user the same long posting lists.
+
+    Args:
+        search_name (str): Normalized name
+        search_email (str): Normalized email
+
+    Returns:
+        set: Trigrams
+    """
+    return _grams(search_name.split() + [search_email.partition('@')[0]])
+
+
+def query_grams(query):
+    """
+    Trigrams every user matching a substring query must have indexed.
+
+    Args:
+        query (str): Normalized query
+
+    Returns:
+        set: Trigrams (empty when no word has three characters)
+    """
+    return _grams(word.partition('@')[0] for word in query.split())
+
+
+def gram_statements(user_id, search):
+    """
+    Statements replacing a user's trigrams.
+
+    Returned as (statement, parameters) pairs so they run on a session or a
+    (sync or async) connection alike, in the caller's transaction.
+
+    Args:
+        user_id (str): User whose name or email changed
+        search (dict): Values from search_columns
+
+    Returns:
+        list: (statement, parameters or None) pairs
+    """
+    table = UserSearchGram.__table__
+    statements = [(delete(table).where(table.c.user_id == user_id), None)]
+    rows = [{'gram': gram, 'user_id': user_id}
+            for gram in sorted(user_grams(search['search_name'], search['search_email']))]
+    if rows:
+        statements.append((insert(table), rows))
+    return statements
+
+
+def bulk_gram_statements(searches):
+    """
+    Statements replacing the trigrams of many users at once.
+
+    Args:
+        searches (dict): User id to values from search_columns
+
+    Returns:
+        list: (statement, parameters or None) pairs, as gram_statements
+    """
+    table = UserSearchGram.__table__
+    statements = [(delete(table).where(table.c.user_id.in_(list(searches))), None)]
+    rows = [{'gram': gram, 'user_id': user_id}
+            for user_id, search in searches.items()
+            for gram in sorted(user_grams(search['search_name'], search['search_email']))]
+    if rows:
+        statements.append((insert(table), rows))
+    return statements
+
+
+def ngrams_enabled():
+    """Whether the trigram table is maintained and searchable."""
+    return has_app_context() and current_app.config.get('SEARCH_NGRAM_ENABLED', False)
+
+
+@event.listens_for(User, 'before_insert')
+def _fill_search_columns(mapper, connection, target):
+    """Derive the search columns of new users from their name and email."""
+    for key, value in search_columns(target.first_name, target.last_name, target.email).items():
+        setattr(target, key, value)
+
+
+@event.listens_for(User, 'after_insert')
+def _index_new_user(mapper, connection, target):
+    """Add a new user's trigrams in the inserting transaction."""
+    if ngrams_enabled():
+        for statement, parameters in gram_statements(target.id, {
+            'search_name': target.search_name,
+            'search_email': target.search_email
+        }):
+            connection.execute(statement, parameters)
+
+
+def _prefix_range(column, prefix):
+    """column LIKE 'prefix%' as a range, which every database can seek in an index."""
+    return and_(column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+def _result(row):
+    return {key: getattr(row, key) for key in RESULT_COLUMNS}
+
+
+def _prefix_matches(session, query, limit):
+    """Ranked matches on name, then last name, then email prefixes."""
+    table = User.__table__
+    columns = [table.c[key] for key in RESULT_COLUMNS]
+
+    matches = []
+    for rank, key in enumerate(('search_name', 'search_last_name', 'search_email')):
+        column = table.c[key]
+        statement = (
+            select(*columns, column.label('sort_key'))
+            .where(_prefix_range(column, query))
+            .order_by(column)
+            .limit(limit)
+        )
+        matches.extend((rank, row.sort_key, _result(row)) for row in session.execute(statement))
+    return matches
+
+
+def _postings(session, gram):
+    """Number of users holding a trigram, counted up to GRAM_PROBE_LIMIT."""
+    grams = UserSearchGram.__table__
+    sample = select(grams.c.user_id).where(grams.c.gram == gram).limit(GRAM_PROBE_LIMIT).subquery()
+    return session.execute(select(func.count()).select_from(sample)).scalar()
+
+
+def _substring_matches(session, query, limit):
+    """Matches anywhere in the name or email, found through the rarest trigram."""
+    table = User.__table__
+    grams = UserSearchGram.__table__
+
+    # Walk the shortest posting list and check the whole substring on each
+    # user, stopping at limit; a rare trigram gives few users to check and a
+    # common one gives matches quickly
+    rarest = min(sorted(query_grams(query))[:GRAM_PROBES], key=lambda gram: _postings(session, gram))
+    statement = (
+        select(*(table.c[key] for key in RESULT_COLUMNS), table.c.search_name)
+        .join(grams, grams.c.user_id == table.c.id)
+        .where(grams.c.gram == rarest)
+        .where(or_(
+            table.c.search_name.contains(query, autoescape=True),
+            table.c.search_email.contains(query, autoescape=True)
+        ))
+        .limit(limit)
+    )
+    return [(0, row.search_name, _result(row)) for row in session.execute(statement)]
+
+
+def search_users(query, limit, substring=False):
+    """
+    Search users by name or email.
+
+    Prefix search ranks users whose name, then last name, then email starts
+    with the query; each is a range scan on an index. Substring search
+    requires SEARCH_NGRAM_ENABLED and a query with three consecutive
+    characters. With sharding every shard is searched and the results merged.
+
+    Args:
+        query (str): Normalized, non-empty query
+        limit (int): Maximum results
+        substring (bool): Match anywhere instead of at the start
+
+    Returns:
+        list: Users as dicts with id, email, first_name and last_name
+    """
+    def run(session):
+        if substring:
+            return _substring_matches(session, query, limit)
+        return _prefix_matches(session, query, limit)
+
+    shard_map = current_app.extensions.get('shard_map')
+    if shard_map is not None:
+        matches = [match for shard_matches in shard_map.fan_out(lambda shard, session: run(session))
+                   for match in shard_matches]
+    else:
+        matches = read_only(db.session, lambda: run(db.session))
+
+    users = []
+    seen = set()
+    for _, _, user in sorted(matches, key=lambda match: (match[0], match[1])):
+        if user['id'] not in seen:
+            seen.add(user['id'])
+            users.append(user)
+            if len(users) == limit:
+                break
+    return users
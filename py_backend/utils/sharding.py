@@ -0,0 +1,185 @@
+"""
+User sharding module.
+Maps users to one of N databases by a stable hash of their email.
+"""
+
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy.orm import Session
+from utils.routing import create_engines
+
+
+# The shard is stored in the first byte of the user id
+MAX_SHARDS = 256
+
+
+def normalize_email(email):
+    """Normalize an email the same way login does before hashing it."""
+    return email.strip().lower()
+
+
+class ShardMap:
+    """
+    Stable mapping of users onto shard engines.
+
+    New users are placed by a hash of their normalized email. The shard
+    number is encoded in the first two hex digits of the user id, so a
+    request carrying only the id can be routed without a directory lookup.
+
+    Attributes:
+        engines (list): Shard engines, indexed by shard number
+    """
+
+    def __init__(self, engines):
+        if not 0 < len(engines) <= MAX_SHARDS:
+            raise ValueError(f'Sharding supports 1 to {MAX_SHARDS} shards')
+        self.engines = list(engines)
+
+    def shard_for_email(self, email):
+        """
+        Return the shard owning an email address.
+
+        Args:
+            email (str): Email address (normalized before hashing)
+
+        Returns:
+            int: Shard number
+        """
+        digest = hashlib.blake2b(normalize_email(email).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % len(self.engines)
+
+    def shard_for_id(self, user_id):
+        """
+        Decode the shard number from a user id.
+
+        Args:
+            user_id (str): User id created by new_user_id
+
+        Returns:
+            int: Shard number, or None if the id does not name a valid shard
+        """
+        try:
+            shard = int(str(user_id)[:2], 16)
+        except (TypeError, ValueError):
+            return None
+        return shard if shard < len(self.engines) else None
+
+    def new_user_id(self, email):
+        """
+        Create a UUID-shaped user id that encodes the email's shard.
+
+        Args:
+            email (str): Email address of the new user
+
+        Returns:
+            str: User id
+        """
+        shard = self.shard_for_email(email)
+        return f'{shard:02x}{str(uuid.uuid4())[2:]}'
+
+    def engine(self, shard):
+        """Return the engine for a shard number."""
+        return self.engines[shard]
+
+    def create_all(self, metadata):
+        """
+        Create the sharded tables on every shard.
+
+        Args:
+            metadata (MetaData): Metadata holding the sharded tables
+        """
+        tables = [table for table in metadata.sorted_tables if table.info.get('sharded')]
+        for engine in self.engines:
+            metadata.create_all(engine, tables=tables)
+
+    def fan_out(self, function):
+        """
+        Run function(shard, session) on every shard in parallel.
+
+        Each call gets its own short-lived session bound to that shard.
+
+        Args:
+            function (callable): Work to run per shard
+
+        Returns:
+            list: Results in shard order
+        """
+        def run(shard):
+            with Session(bind=self.engines[shard]) as session:
+                return function(shard, session)
+
+        with ThreadPoolExecutor(max_workers=len(self.engines)) as executor:
+            return list(executor.map(run, range(len(self.engines))))
+
+    def scan(self, statement):
+        """
+        Execute a read-only statement on every shard and merge the rows.
+
+        Args:
+            statement: SQLAlchemy select statement
+
+        Returns:
+            list: Rows from all shards, in shard order
+        """
+        results = self.fan_out(lambda shard, session: session.execute(statement).all())
+        return [row for rows in results for row in rows]
+
+
+def init_sharding(app, db):
+    """
+    Create the shard map and its engines.
+
+    Args:
+        app (Flask): Flask application instance
+        db (SQLAlchemy): Database extension
+    """
+    uris = app.config.get('SQLALCHEMY_SHARD_URIS') or []
+    if not uris:
+        return
+
+    engines = create_engines(app, uris)
+
+    app.extensions['shard_map'] = ShardMap(engines)
+
+    @app.teardown_request
+    def reset_user_shard(exception=None):
+        """Forget the request's shard so the next request routes afresh."""
+        if db.session.registry.has():
+            db.session.info.pop('shard', None)
+
+    if app.config.get('SQLALCHEMY_REPLICA_URIS'):
+        app.logger.warning('Read replicas are not used for sharded user tables')
+
+    app.logger.info(f'User sharding enabled: {len(engines)} shards')
+
+
+def bind_user_shard(session, user_id=None, email=None):
+    """
+    Route the session's user-table statements to the owning shard.
+
+    A no-op returning True when sharding is disabled.
+
+    Args:
+        session: Routing session (usually db.session)
+        user_id (str, optional): Id of the user being accessed
+        email (str, optional): Email of the user being accessed
+
+    Returns:
+        bool: False if user_id does not name a valid shard
+    """
+    shard_map = current_app.extensions.get('shard_map')
+    if shard_map is None:
+        return True
+
+    if user_id is not None:
+        shard = shard_map.shard_for_id(user_id)
+    else:
+        shard = shard_map.shard_for_email(email)
+
+    if shard is None:
+        return False
+
+    session.info['shard'] = shard
+    return True
@@ -0,0 +1,308 @@
+"""
+Shared-memory cache module.
+A fixed-size, memory-mapped hash table that every gunicorn worker on a host
+reads and writes, used for verified token payloads and user snapshots.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'HPSC0001'
+
+# File header: magic, slot count, slot size
+FILE_HEADER = struct.Struct('<8sII')
+FILE_HEADER_SIZE = 64
+
+# Slot header: sequence, flags, key digest, expiry, version, value length
+SLOT_HEADER = struct.Struct('<II16sdQI')
+SLOT_HEADER_SIZE = 48
+SEQUENCE = struct.Struct('<I')
+
+FLAG_EMPTY = 0
+FLAG_LIVE = 1
+FLAG_TOMBSTONE = 2
+
+# Slots probed per key (a small bucket around the hashed index)
+WAYS = 4
+
+# Attempts to read a slot that keeps changing before treating it as a miss
+READ_RETRIES = 8
+
+
+def default_cache_path():
+    """Return a path in /dev/shm, or the temp directory where that is missing."""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'humblepos-auth.cache')
+
+
+class SharedCache:
+    """
+    Cross-process cache in a memory-mapped file.
+
+    The file holds slot_count slots of slot_size bytes, so memory use is
+    fixed. A key is hashed with a keyed BLAKE2b (the namespace secret) and
+    may live in any of WAYS consecutive slots; when they are all in use the
+    entry expiring first is evicted.
+
+    Each slot starts with a sequence number used as a seqlock: writers make
+    it odd, write the slot and make it even again, and readers retry when
+    the number was odd or changed while they copied the slot, so reads take
+    no locks. Writers serialize per bucket with an fcntl byte-range lock
+    (plus a thread lock, since fcntl locks are per process).
+
+    Entries may carry a version. invalidate() leaves a tombstone with the
+    new version, and set() refuses to store an older version over it, so a
+    read that started before an update cannot put the old record back.
+
+    Attributes:
+        path (str): Backing file
+        slot_count (int): Number of slots
+        slot_size (int): Bytes per slot, including the 48-byte slot header
+        counters (dict): Per-process hit, miss and write statistics
+    """
+
+    def __init__(self, path, slot_count, slot_size, namespace):
+        if slot_size <= SLOT_HEADER_SIZE:
+            raise ValueError(f'Shared cache slots must be larger than {SLOT_HEADER_SIZE} bytes')
+        self.path = path
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.max_value_size = slot_size - SLOT_HEADER_SIZE
+        self._salt = hashlib.blake2b(namespace.encode('utf-8'), digest_size=32).digest()
+        self._thread_lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'stale_rejected': 0,
+            'evictions': 0,
+            'too_large': 0,
+            'read_retries': 0
+        }
+        self._fd, self._mmap = self._open()
+
+    def _open(self):
+        size = FILE_HEADER_SIZE + self.slot_count * self.slot_size
+        header = FILE_HEADER.pack(MAGIC, self.slot_count, self.slot_size)
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX, FILE_HEADER_SIZE, 0)
+            existing = os.pread(fd, FILE_HEADER.size, 0)
+            if existing != header:
+                if existing.startswith(MAGIC):
+                    # Different geometry: start a new file, processes still
+                    # mapping the old one keep using it until they exit
+                    logger.warning(f'Recreating shared cache {self.path} with new geometry')
+                    os.unlink(self.path)
+                    fcntl.lockf(fd, fcntl.LOCK_UN, FILE_HEADER_SIZE, 0)
+                    os.close(fd)
+                    return self._open()
+                os.ftruncate(fd, size)
+                os.pwrite(fd, header, 0)
+            fcntl.lockf(fd, fcntl.LOCK_UN, FILE_HEADER_SIZE, 0)
+            return fd, mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        except Exception:
+            os.close(fd)
+            raise
+
+    def _digest(self, key):
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=16, key=self._salt).digest()
+
+    def _bucket(self, digest):
+        start = int.from_bytes(digest[:8], 'little') % self.slot_count
+        return [(start + way) % self.slot_count for way in range(min(WAYS, self.slot_count))]
+
+    def _offset(self, slot):
+        return FILE_HEADER_SIZE + slot * self.slot_size
+
+    def _read_slot(self, slot):
+        """Return a consistent (flags, digest, expires, version, value) or None."""
+        offset = self._offset(slot)
+        for _ in range(READ_RETRIES):
+            sequence, flags, digest, expires, version, length = SLOT_HEADER.unpack_from(self._mmap, offset)
+            if sequence & 1:
+                self.counters['read_retries'] += 1
+                continue
+            value = self._mmap[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + min(length, self.max_value_size)]
+            if SEQUENCE.unpack_from(self._mmap, offset)[0] == sequence:
+                return flags, digest, expires, version, value
+            self.counters['read_retries'] += 1
+        return None
+
+    def get(self, key):
+        """
+        Return the cached bytes for key, or None.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            bytes: Cached value, or None on a miss
+        """
+        digest = self._digest(key)
+        now = time.time()
+        for slot in self._bucket(digest):
+            entry = self._read_slot(slot)
+            if entry is None or entry[1] != digest:
+                continue
+            flags, _, expires, _, value = entry
+            if flags == FLAG_LIVE and expires > now:
+                self.counters['hits'] += 1
+                return value
+            break
+        self.counters['misses'] += 1
+        return None
+
+    def set(self, key, value, ttl, version=0):
+        """
+        Store bytes for key for ttl seconds.
+
+        Args:
+            key (str): Cache key
+            value (bytes): Value, at most slot_size - 48 bytes
+            ttl (float): Seconds until the entry expires
+            version (int): Version of the value; older versions than a
+                cached entry or tombstone for the key are not stored
+
+        Returns:
+            bool: True if the value was stored
+        """
+        if len(value) > self.max_value_size:
+            self.counters['too_large'] += 1
+            return False
+        return self._write(key, FLAG_LIVE, value, time.time() + ttl, version)
+
+    def invalidate(self, key, version=0, ttl=60):
+        """
+        Drop key for every worker on the host.
+
+        Args:
+            key (str): Cache key
+            version (int): Version now current; older values are refused
+                for ttl seconds
+            ttl (float): Lifetime of the tombstone
+
+        Returns:
+            bool: True if the tombstone was written
+        """
+        return self._write(key, FLAG_TOMBSTONE, b'', time.time() + ttl, version)
+
+    def _write(self, key, flags, value, expires, version):
+        digest = self._digest(key)
+        bucket = self._bucket(digest)
+        now = time.time()
+
+        with self._thread_lock:
+            locked = self._lock_bucket(bucket, fcntl.LOCK_EX)
+            try:
+                target = None
+                fallback = None
+                for slot in bucket:
+                    current_flags, current_digest, current_expires, current_version, _ = (
+                        SLOT_HEADER.unpack_from(self._mmap, self._offset(slot))[1:]
+                    )
+                    live = current_flags != FLAG_EMPTY and current_expires > now
+                    if current_digest == digest:
+                        if live and current_version > version:
+                            self.counters['stale_rejected'] += 1
+                            return False
+                        target = slot
+                        break
+                    if not live:
+                        target = target if target is not None else slot
+                    elif fallback is None or current_expires < fallback[1]:
+                        fallback = (slot, current_expires)
+
+                if target is None:
+                    target = fallback[0]
+                    self.counters['evictions'] += 1
+
+                offset = self._offset(target)
+                sequence = SEQUENCE.unpack_from(self._mmap, offset)[0]
+                SEQUENCE.pack_into(self._mmap, offset, (sequence + 1) & 0xFFFFFFFF)
+                self._mmap[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + len(value)] = value
+                SLOT_HEADER.pack_into(self._mmap, offset, (sequence + 1) & 0xFFFFFFFF,
+                                      flags, digest, expires, version, len(value))
+                SEQUENCE.pack_into(self._mmap, offset, (sequence + 2) & 0xFFFFFFFF)
+                if flags == FLAG_LIVE:
+                    self.counters['sets'] += 1
+                return True
+            finally:
+                self._lock_bucket(locked, fcntl.LOCK_UN)
+
+    def _lock_bucket(self, bucket, operation):
+        """Lock or unlock the byte ranges of a bucket's slots (which may wrap)."""
+        ranges = []
+        for slot in bucket:
+            if ranges and ranges[-1][1] == slot:
+                ranges[-1][1] = slot + 1
+            else:
+                ranges.append([slot, slot + 1])
+        for first, end in ranges:
+            fcntl.lockf(self._fd, operation, (end - first) * self.slot_size, self._offset(first))
+        return bucket
+
+    def get_json(self, key):
+        """Return the cached JSON value for key, or None."""
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key, data, ttl, version=0):
+        """Store a JSON-serializable value for key."""
+        return self.set(key, json.dumps(data, separators=(',', ':')).encode('utf-8'), ttl, version)
+
+    def snapshot(self):
+        """
+        Return cache metrics for this process.
+
+        Returns:
+            dict: Geometry and counters
+        """
+        lookups = self.counters['hits'] + self.counters['misses']
+        return dict(
+            self.counters,
+            slots=self.slot_count,
+            slot_size=self.slot_size,
+            bytes=FILE_HEADER_SIZE + self.slot_count * self.slot_size,
+            hit_ratio=self.counters['hits'] / lookups if lookups else None
+        )
+
+    def close(self):
+        """Unmap the cache and close the file."""
+        self._mmap.close()
+        os.close(self._fd)
+
+
+def init_shared_cache(app):
+    """
+    Map the host's shared cache for the application.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    if not app.config.get('SHARED_CACHE_ENABLED', True):
+        return
+
+    from utils.metrics import register_metrics
+
+    # Entries written under other secrets hash to other slots
+    namespace = f"{app.config['SECRET_KEY']}:{app.config.get('JWT_SECRET_KEY')}"
+    cache = SharedCache(
+        app.config.get('SHARED_CACHE_PATH') or default_cache_path(),
+        slot_count=app.config.get('SHARED_CACHE_SLOTS', 65536),
+        slot_size=app.config.get('SHARED_CACHE_SLOT_SIZE', 512),
+        namespace=namespace
+    )
+    app.extensions['shared_cache'] = cache
+    register_metrics(app, 'shared_cache', cache.snapshot)
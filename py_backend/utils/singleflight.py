@@ -0,0 +1,169 @@
+"""
+Single-flight module.
+Coalesces concurrent identical lookups inside a worker so that one caller
+runs the query and the others wait for and share its result.
+"""
+
+import asyncio
+import threading
+from utils.metrics import register_metrics
+
+
+class _Call:
+    """One in-flight lookup and its outcome."""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Duplicate call suppression keyed by an arbitrary hashable key.
+
+    The first caller for a key (the leader) runs the function; callers
+    arriving while it runs block and receive the same result or exception.
+    Nothing is cached: once the leader finishes, the next caller runs the
+    function again. Results are shared between threads, so functions should
+    return immutable values such as Core rows, not session-bound objects.
+
+    Attributes:
+        counters (dict): leaders (calls executed) and shared (calls coalesced)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.counters = {'leaders': 0, 'shared': 0, 'errors': 0}
+
+    def do(self, key, function):
+        """
+        Run function for key unless an identical call is already running.
+
+        Args:
+            key: Hashable identity of the lookup
+            function (callable): Zero-argument function performing it
+
+        Returns:
+            tuple: (result, shared) where shared is True if another caller ran it
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.counters['shared'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.counters['leaders'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.counters['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def snapshot(self):
+        """
+        Return coalescing metrics.
+
+        Returns:
+            dict: Counters and the number of lookups in flight
+        """
+        with self._lock:
+            return dict(self.counters, in_flight=len(self._calls))
+
+
+class AsyncSingleFlight:
+    """
+    Duplicate call suppression for coroutines on one event loop.
+
+    Same contract as SingleFlight: the leader awaits the coroutine and
+    callers arriving meanwhile await its outcome. All callers run on the
+    loop's thread, so no lock is needed.
+
+    Attributes:
+        counters (dict): leaders (calls executed) and shared (calls coalesced)
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.counters = {'leaders': 0, 'shared': 0, 'errors': 0}
+
+    async def do(self, key, function):
+        """
+        Await function() for key unless an identical call is already running.
+
+        Args:
+            key: Hashable identity of the lookup
+            function (callable): Zero-argument coroutine function performing it
+
+        Returns:
+            tuple: (result, shared) where shared is True if another caller ran it
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.counters['shared'] += 1
+            # Shielded so a cancelled follower does not cancel the leader
+            return await asyncio.shield(future), True
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.counters['leaders'] += 1
+        try:
+            result = await function()
+        except BaseException as e:
+            self.counters['errors'] += 1
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Retrieved here so an unawaited future does not log a warning
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def snapshot(self):
+        """
+        Return coalescing metrics.
+
+        Returns:
+            dict: Counters and the number of lookups in flight
+        """
+        return dict(self.counters, in_flight=len(self._calls))
+
+
+def init_single_flight(app):
+    """
+    Create the application's single-flight group for user lookups.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    if not app.config.get('SINGLE_FLIGHT_ENABLED', True):
+        return
+
+    flight = SingleFlight()
+    app.extensions['single_flight'] = flight
+    register_metrics(app, 'single_flight', flight.snapshot)
@@ -0,0 +1,48 @@
+"""
+SQLite tuning module.
+Applies per-connection PRAGMA settings through engine connect events.
+"""
+
+from sqlalchemy import event
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """
+    Run the given PRAGMA statements on every new DBAPI connection.
+
+    Settings such as synchronous, cache_size and busy_timeout are
+    per-connection in SQLite, so they have to be applied whenever the pool
+    opens a connection rather than once per database.
+
+    Args:
+        engine (Engine): SQLite engine
+        pragmas (dict): PRAGMA name to value, applied in order
+    """
+    statements = [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def init_sqlite_pragmas(app, engines):
+    """
+    Install SQLITE_PRAGMAS on every file-backed SQLite engine.
+
+    Args:
+        app (Flask): Flask application instance
+        engines (list): Engines created for the application
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+
+    for engine in engines:
+        if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+            install_sqlite_pragmas(engine, pragmas)
+            app.logger.info(f'SQLite pragmas applied: {engine.url.database}')
@@ -0,0 +1,236 @@
+"""
+User listing module.
+Keyset pagination over users ordered by (updated_at, id), and streaming
+exports in NDJSON or CSV for incremental syncs.
+"""
+
+import base64
+import csv
+import heapq
+import io
+import json
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+from models import db, User
+from utils.replicas import read_only, replica_reads
+
+# Columns listed and exported; never the password hash
+LISTING_COLUMNS = (
+    'id', 'email', 'first_name', 'last_name', 'updated_at', 'version', 'last_login_at', 'last_seen_at'
+)
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+
+def encode_cursor(updated_at, user_id):
+    """
+    Build the opaque cursor pointing just after a row.
+
+    Args:
+        updated_at (datetime): updated_at of the last row returned
+        user_id (str): id of the last row returned
+
+    Returns:
+        str: URL-safe cursor
+    """
+    raw = f'{updated_at.isoformat()}|{user_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor built by encode_cursor.
+
+    Args:
+        cursor (str): Cursor from a previous page
+
+    Returns:
+        tuple: (updated_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        updated_at, user_id = raw.split('|', 1)
+        return datetime.fromisoformat(updated_at), user_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp into the naive UTC form stored in updated_at.
+
+    Args:
+        value (str): Timestamp, e.g. 2024-05-01T00:00:00Z
+
+    Returns:
+        datetime: Naive UTC datetime
+
+    Raises:
+        ValueError: If the timestamp is malformed
+    """
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def listing_statement(after=None, since=None, until=None, limit=None):
+    """
+    Build the select for one page or an export, in (updated_at, id) order.
+
+    The position is a keyset predicate rather than an OFFSET, so every page
+    is an index range scan on ix_users_updated_at_id starting at the cursor.
+
+    Args:
+        after (tuple, optional): (updated_at, id) of the last row already seen
+        since (datetime, optional): Only rows with updated_at >= since
+        until (datetime, optional): Only rows with updated_at < until
+        limit (int, optional): Maximum rows
+
+    Returns:
+        Select: Statement over LISTING_COLUMNS
+    """
+    table = User.__table__
+    statement = select(*(table.c[key] for key in LISTING_COLUMNS))
+
+    if since is not None:
+        statement = statement.where(table.c.updated_at >= since)
+    if until is not None:
+        statement = statement.where(table.c.updated_at < until)
+    if after is not None:
+        # The redundant updated_at >= bound gives the planner a range to
+        # seek to; the OR alone makes some planners scan the whole index
+        updated_at, user_id = after
+        statement = statement.where(and_(
+            table.c.updated_at >= updated_at,
+            or_(table.c.updated_at > updated_at, table.c.id > user_id)
+        ))
+
+    statement = statement.order_by(table.c.updated_at, table.c.id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def _sort_key(row):
+    return row.updated_at, row.id
+
+
+def row_values(row):
+    """Column values of a listed row, with timestamps in ISO 8601."""
+    return [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+
+def list_users(limit, after=None, since=None, until=None):
+    """
+    Return one page of users.
+
+    With sharding, every shard returns its first limit + 1 rows after the
+    cursor and the pages are merged.
+
+    Args:
+        limit (int): Page size
+        after (tuple, optional): Position from decode_cursor
+        since (datetime, optional): Lower updated_at bound (inclusive)
+        until (datetime, optional): Upper updated_at bound (exclusive)
+
+    Returns:
+        tuple: (list of user dicts, next cursor or None on the last page)
+    """
+    statement = listing_statement(after, since, until, limit + 1)
+
+    shard_map = current_app.extensions.get('shard_map')
+    if shard_map is not None:
+        pages = shard_map.fan_out(lambda shard, session: session.execute(statement).all())
+        rows = list(heapq.merge(*pages, key=_sort_key))
+    else:
+        rows = read_only(db.session, lambda: db.session.execute(statement).all())
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].updated_at, page[-1].id) if len(rows) > limit else None
+    return [dict(zip(LISTING_COLUMNS, row_values(row))) for row in page], next_cursor
+
+
+def iter_users(after=None, since=None, until=None, batch_size=1000):
+    """
+    Yield every matching user row in (updated_at, id) order.
+
+    Rows come from a server-side cursor fetched batch_size at a time
+    (yield_per), so memory does not grow with the table. With sharding,
+    one cursor per shard is open and the streams are merged.
+
+    Args:
+        after (tuple, optional): Position from decode_cursor
+        since (datetime, optional): Lower updated_at bound (inclusive)
+        until (datetime, optional): Upper updated_at bound (exclusive)
+        batch_size (int): Rows fetched per round trip
+
+    Yields:
+        Row: Values of LISTING_COLUMNS
+    """
+    statement = listing_statement(after, since, until).execution_options(yield_per=batch_size)
+
+    shard_map = current_app.extensions.get('shard_map')
+    if shard_map is not None:
+        sessions = [Session(bind=engine) for engine in shard_map.engines]
+        try:
+            yield from heapq.merge(*(session.execute(statement) for session in sessions), key=_sort_key)
+        finally:
+            for session in sessions:
+                session.close()
+        return
+
+    with replica_reads(db.session):
+        result = db.session.execute(statement)
+        try:
+            yield from result
+        finally:
+            result.close()
+
+
+def export_chunks(rows, export_format, batch_size=1000):
+    """
+    Serialize rows as NDJSON or CSV, yielding one chunk per batch.
+
+    Args:
+        rows (iterable): Rows from iter_users
+        export_format (str): 'ndjson' or 'csv'
+        batch_size (int): Rows per yielded chunk
+
+    Yields:
+        bytes: UTF-8 encoded lines
+    """
+    buffer = io.StringIO()
+
+    if export_format == 'csv':
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(LISTING_COLUMNS)
+
+        def write(values):
+            writer.writerow(['' if value is None else value for value in values])
+    else:
+        encoder = json.JSONEncoder(separators=(',', ':'))
+
+        def write(values):
+            buffer.write(encoder.encode(dict(zip(LISTING_COLUMNS, values))))
+            buffer.write('\n')
+
+    for count, row in enumerate(rows, 1):
+        write(row_values(row))
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
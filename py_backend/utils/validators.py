@@ -5,6 +5,10 @@ Contains validation functions for user input.
 """
 
 import re
+from flask import current_app, has_app_context
+
+# Compiled once at import; used on every login
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 
 
 def validate_email(email):
@@ -20,15 +24,40 @@ def validate_email(email):
     if not email or not isinstance(email, str):
         return False
     
-    # Basic email regex pattern
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email.strip()) is not None
+    return EMAIL_PATTERN.match(email.strip()) is not None
+
+
+def validate_email_domain(email):
+    """
+    Check an email's domain against the configured domain policy.
+    
+    Only meant for new addresses (signup, email change): existing users
+    must still be able to log in after their domain is blocked. Without a
+    policy configured, or outside an application, every domain passes.
+    
+    Args:
+        email (str): Email address, already validated by validate_email
+        
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    policy = current_app.extensions.get('domain_policy') if has_app_context() else None
+    if policy is None:
+        return True, None
+    
+    if policy.is_blocked(email.strip().rsplit('@', 1)[-1]):
+        return False, "Email addresses from this domain are not accepted"
+    
+    return True, None
 
 
 def validate_password(password, min_length=8):
     """
     Validate password meets minimum requirements.
     
+    Inside an application with a breached password corpus configured,
+    passwords found in the corpus are rejected as well.
+    
     Args:
         password (str): Password to validate
         min_length (int): Minimum password length
@@ -42,6 +71,10 @@ def validate_password(password, min_length=8):
     if len(password) < min_length:
         return False, f"Password must be at least {min_length} characters"
     
+    corpus = current_app.extensions.get('breached_passwords') if has_app_context() else None
+    if corpus is not None and corpus.is_breached(password):
+        return False, "This password has appeared in a data breach; please choose another"
+    
     return True, None
 
 
@@ -0,0 +1,324 @@
+"""
+Token verification protocol module.
+Wire format and client for the token verification sidecar
+(token_sidecar.py), which lets other services on the host verify
+HumblePOS tokens over a Unix domain socket instead of calling /user/me.
+
+Only the standard library is used, so internal services can copy or
+import this module without the API's dependencies.
+
+Every message is a frame: a 4-byte big-endian payload length, then
+    request:  request id (u32), opcode (u8), item count (u16),
+              then per token: length (u16), token bytes
+    response: request id (u32), item count (u16),
+              then per item: status (u8), length (u32), JSON body
+Items in a response are in the order of the request's tokens. Clients may
+send several frames before reading (pipelining); responses come back in
+request order and carry the request id.
+"""
+
+import itertools
+import json
+import socket
+import struct
+import threading
+
+FRAME = struct.Struct('>I')
+REQUEST = struct.Struct('>IBH')
+RESPONSE = struct.Struct('>IH')
+TOKEN_LENGTH = struct.Struct('>H')
+ITEM = struct.Struct('>BI')
+
+# Frames larger than this are a protocol error and close the connection
+MAX_FRAME_SIZE = 1 << 20
+
+# Opcodes
+VERIFY = 1          # body: token payload
+VERIFY_USER = 2     # body: user, as returned by /user/me
+STATS = 3           # no tokens; one item with server counters
+
+# Item statuses
+OK = 0
+INVALID_TOKEN = 1
+USER_NOT_FOUND = 2
+BAD_REQUEST = 3
+ERROR = 4
+
+
+class ProtocolError(Exception):
+    """Raised for malformed or oversized frames."""
+
+
+def encode_request(request_id, opcode, tokens=()):
+    """
+    Encode a request frame.
+
+    Args:
+        request_id (int): Id echoed in the response
+        opcode (int): VERIFY, VERIFY_USER or STATS
+        tokens (list): Tokens to verify
+
+    Returns:
+        bytes: Frame including its length prefix
+    """
+    parts = [REQUEST.pack(request_id, opcode, len(tokens))]
+    for token in tokens:
+        encoded = token.encode('ascii') if isinstance(token, str) else token
+        parts.append(TOKEN_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    payload = b''.join(parts)
+    return FRAME.pack(len(payload)) + payload
+
+
+def decode_request(payload):
+    """
+    Decode a request frame's payload.
+
+    Args:
+        payload (bytes): Frame without its length prefix
+
+    Returns:
+        tuple: (request_id, opcode, list of token strings)
+    """
+    if len(payload) < REQUEST.size:
+        raise ProtocolError('Request header is truncated')
+    request_id, opcode, count = REQUEST.unpack_from(payload, 0)
+    tokens = []
+    offset = REQUEST.size
+    for _ in range(count):
+        if offset + TOKEN_LENGTH.size > len(payload):
+            raise ProtocolError('Token list is truncated')
+        length = TOKEN_LENGTH.unpack_from(payload, offset)[0]
+        offset += TOKEN_LENGTH.size
+        if offset + length > len(payload):
+            raise ProtocolError('Token list is truncated')
+        tokens.append(payload[offset:offset + length].decode('ascii', errors='replace'))
+        offset += length
+    return request_id, opcode, tokens
+
+
+def encode_response(request_id, results):
+    """
+    Encode a response frame.
+
+    Args:
+        request_id (int): Id of the request answered
+        results (list): (status, body) pairs; body is JSON-serializable or None
+
+    Returns:
+        bytes: Frame including its length prefix
+    """
+    parts = [RESPONSE.pack(request_id, len(results))]
+    for status, body in results:
+        encoded = json.dumps(body, separators=(',', ':')).encode('utf-8') if body is not None else b''
+        parts.append(ITEM.pack(status, len(encoded)))
+        parts.append(encoded)
+    payload = b''.join(parts)
+    return FRAME.pack(len(payload)) + payload
+
+
+def decode_response(payload):
+    """
+    Decode a response frame's payload.
+
+    Args:
+        payload (bytes): Frame without its length prefix
+
+    Returns:
+        tuple: (request_id, list of (status, body))
+    """
+    if len(payload) < RESPONSE.size:
+        raise ProtocolError('Response header is truncated')
+    request_id, count = RESPONSE.unpack_from(payload, 0)
+    results = []
+    offset = RESPONSE.size
+    for _ in range(count):
+        if offset + ITEM.size > len(payload):
+            raise ProtocolError('Response items are truncated')
+        status, length = ITEM.unpack_from(payload, offset)
+        offset += ITEM.size
+        body = payload[offset:offset + length]
+        offset += length
+        results.append((status, json.loads(body) if body else None))
+    return request_id, results
+
+
+def split_frames(buffer):
+    """
+    Remove every complete frame from the front of a buffer.
+
+    Args:
+        buffer (bytearray): Received bytes; consumed frames are deleted
+
+    Returns:
+        list: Frame payloads
+    """
+    frames = []
+    offset = 0
+    while len(buffer) - offset >= FRAME.size:
+        length = FRAME.unpack_from(buffer, offset)[0]
+        if length > MAX_FRAME_SIZE:
+            raise ProtocolError(f'Frame of {length} bytes exceeds the limit')
+        end = offset + FRAME.size + length
+        if end > len(buffer):
+            break
+        frames.append(bytes(buffer[offset + FRAME.size:end]))
+        offset = end
+    del buffer[:offset]
+    return frames
+
+
+class VerifyClient:
+    """
+    Client for the token verification sidecar.
+
+    Keeps one connection open and reconnects once when it breaks;
+    verification is idempotent, so the request is simply resent. Safe to
+    share between threads (calls are serialized).
+
+    Usage:
+        client = VerifyClient('/tmp/humblepos-verify.sock')
+        payload = client.verify(token)           # None if invalid
+        user = client.verify_user(token)         # None if invalid or unknown
+        users = client.verify_many(tokens, with_user=True)
+
+    Attributes:
+        path (str): Sidecar socket
+        timeout (float): Socket timeout in seconds
+        max_batch (int): Tokens per request, at most the sidecar's VERIFY_MAX_BATCH
+    """
+
+    def __init__(self, path, timeout=5, max_batch=256):
+        self.path = path
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self._sock = None
+        self._buffer = bytearray()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._sock = sock
+        self._buffer = bytearray()
+
+    def _exchange(self, requests):
+        if self._sock is None:
+            self._connect()
+        ids = []
+        frames = []
+        for opcode, tokens in requests:
+            request_id = next(self._ids) & 0xFFFFFFFF
+            ids.append(request_id)
+            frames.append(encode_request(request_id, opcode, tokens))
+        self._sock.sendall(b''.join(frames))
+
+        responses = {}
+        while len(responses) < len(ids):
+            for frame in split_frames(self._buffer):
+                request_id, results = decode_response(frame)
+                responses[request_id] = results
+            if len(responses) < len(ids):
+                chunk = self._sock.recv(65536)
+                if not chunk:
+                    raise ConnectionError('Verification sidecar closed the connection')
+                self._buffer += chunk
+        return [responses[request_id] for request_id in ids]
+
+    def pipeline(self, requests):
+        """
+        Send several requests at once and wait for all responses.
+
+        Args:
+            requests (list): (opcode, tokens) pairs
+
+        Returns:
+            list: Per request, a list of (status, body) pairs
+        """
+        with self._lock:
+            try:
+                return self._exchange(requests)
+            except (OSError, ProtocolError):
+                self.close()
+                return self._exchange(requests)
+
+    def call(self, opcode, tokens=()):
+        """
+        Send one request.
+
+        Args:
+            opcode (int): VERIFY, VERIFY_USER or STATS
+            tokens (list): Tokens to verify
+
+        Returns:
+            list: (status, body) pairs
+        """
+        return self.pipeline([(opcode, list(tokens))])[0]
+
+    def verify(self, token):
+        """
+        Verify a token's signature and expiry.
+
+        Args:
+            token (str): JWT token
+
+        Returns:
+            dict: Token payload if valid, None otherwise
+        """
+        status, body = self.call(VERIFY, [token])[0]
+        return body if status == OK else None
+
+    def verify_user(self, token):
+        """
+        Verify a token and return its user.
+
+        Args:
+            token (str): JWT token
+
+        Returns:
+            dict: User as returned by /user/me, None if invalid or unknown
+        """
+        status, body = self.call(VERIFY_USER, [token])[0]
+        return body if status == OK else None
+
+    def verify_many(self, tokens, with_user=False):
+        """
+        Verify a batch of tokens, pipelining one request per max_batch tokens.
+
+        Args:
+            tokens (list): JWT tokens
+            with_user (bool): Return users instead of token payloads
+
+        Returns:
+            list: Payload (or user) per token, None where invalid
+
+        Raises:
+            ProtocolError: If the sidecar refused a request, e.g. because
+                max_batch is above its limit
+        """
+        opcode = VERIFY_USER if with_user else VERIFY
+        tokens = list(tokens)
+        requests = [(opcode, tokens[start:start + self.max_batch])
+                    for start in range(0, len(tokens), self.max_batch)]
+        results = [item for response in (self.pipeline(requests) if requests else []) for item in response]
+        if any(status == BAD_REQUEST for status, _ in results):
+            raise ProtocolError('Verification sidecar refused the request')
+        return [body if status == OK else None for status, body in results]
+
+    def stats(self):
+        """Return the sidecar's counters."""
+        return self.call(STATS)[0][1]
+
+    def close(self):
+        """Close the connection; the next call reconnects."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,183 @@
+"""
+Token verification server module.
+Serves the verification protocol (utils/verify_protocol.py) over a Unix
+domain socket for the token_sidecar.py entry point.
+
+Tokens are checked with decode_token, so they follow exactly the API's
+rules, and users come from the same caches as authenticated API requests:
+the host's shared cache, the two-tier cache, and only then the database.
+Profile updates made by the API invalidate those caches, so the sidecar
+never serves a user older than the API would.
+"""
+
+import os
+import socketserver
+import threading
+from models import UserView, db
+from utils.auth import cached_user_snapshot, decode_token, find_user
+from utils.cache import MISS
+from utils.sharding import bind_user_shard
+from utils.verify_protocol import (
+    BAD_REQUEST, ERROR, INVALID_TOKEN, OK, STATS, USER_NOT_FOUND, VERIFY, VERIFY_USER,
+    ProtocolError, decode_request, encode_response, split_frames
+)
+
+
+class VerifyHandler(socketserver.BaseRequestHandler):
+    """
+    One client connection.
+
+    Reads whatever the client has sent, answers every complete frame in
+    order and writes all the responses with one send, so a pipelining
+    client gets its answers in as few packets as it sent requests.
+    """
+
+    def handle(self):
+        server = self.server
+        buffer = bytearray()
+        with server.app.app_context():
+            while True:
+                chunk = self.request.recv(65536)
+                if not chunk:
+                    return
+                buffer += chunk
+                try:
+                    frames = split_frames(buffer)
+                except ProtocolError as e:
+                    server.app.logger.warning(f'Verification sidecar: {e}; closing connection')
+                    return
+                if not frames:
+                    continue
+
+                responses = []
+                for frame in frames:
+                    response = server.handle_frame(frame)
+                    if response is None:
+                        return
+                    responses.append(response)
+                db.session.remove()
+                self.request.sendall(b''.join(responses))
+
+
+class VerifyServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Threaded token verification server on a Unix domain socket.
+
+    Attributes:
+        app (Flask): Application providing configuration, caches and database
+        max_batch (int): Most tokens accepted in one request
+        counters (dict): Request statistics
+    """
+
+    daemon_threads = True
+
+    # socketserver's default backlog of 5 makes a burst of connecting
+    # clients fail with EAGAIN on Unix sockets
+    request_queue_size = 128
+
+    def __init__(self, app, path, max_batch=256, mode=0o660):
+        self.app = app
+        self.max_batch = max_batch
+        self.counters = {'connections': 0, 'requests': 0, 'tokens': 0, 'invalid': 0,
+                         'not_found': 0, 'errors': 0, 'cache_hits': 0}
+        self._counter_lock = threading.Lock()
+
+        # A socket left behind by a previous run would make bind fail
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, VerifyHandler)
+        os.chmod(path, mode)
+
+    def _count(self, **increments):
+        with self._counter_lock:
+            for key, value in increments.items():
+                self.counters[key] += value
+
+    def process_request(self, request, client_address):
+        self._count(connections=1)
+        super().process_request(request, client_address)
+
+    def handle_frame(self, frame):
+        """
+        Answer one request frame.
+
+        Args:
+            frame (bytes): Frame payload
+
+        Returns:
+            bytes: Response frame, or None to close the connection
+        """
+        try:
+            request_id, opcode, tokens = decode_request(frame)
+        except ProtocolError as e:
+            self.app.logger.warning(f'Verification sidecar: {e}; closing connection')
+            return None
+
+        self._count(requests=1, tokens=len(tokens))
+        if opcode == STATS:
+            return encode_response(request_id, [(OK, self.snapshot())])
+        if opcode not in (VERIFY, VERIFY_USER) or len(tokens) > self.max_batch:
+            return encode_response(request_id, [(BAD_REQUEST, None)] * max(len(tokens), 1))
+
+        return encode_response(request_id, [self.verify(token, opcode == VERIFY_USER) for token in tokens])
+
+    def verify(self, token, with_user):
+        """
+        Verify one token.
+
+        Args:
+            token (str): JWT token
+            with_user (bool): Look the user up as well
+
+        Returns:
+            tuple: (status, body)
+        """
+        try:
+            payload = decode_token(token)
+            if not payload:
+                self._count(invalid=1)
+                return INVALID_TOKEN, None
+            if not with_user:
+                return OK, payload
+
+            user = self.lookup_user(payload.get('user_id'))
+            if user is None:
+                self._count(not_found=1)
+                return USER_NOT_FOUND, None
+            return OK, user
+        except Exception as e:
+            self._count(errors=1)
+            self.app.logger.error(f'Verification sidecar error: {str(e)}')
+            return ERROR, None
+
+    def lookup_user(self, user_id):
+        """
+        Load a user from the caches, falling back to the database.
+
+        Args:
+            user_id (str): User id from the token
+
+        Returns:
+            dict: User as returned by /user/me, or None if not found
+        """
+        snapshot = cached_user_snapshot(user_id)
+        if snapshot is None:
+            return None
+        if snapshot is not MISS:
+            self._count(cache_hits=1)
+            return UserView(**snapshot).to_dict()
+
+        if not bind_user_shard(db.session, user_id=user_id):
+            return None
+        user = find_user(db.session, 'id', user_id, view=True)
+        return user.to_dict() if user else None
+
+    def snapshot(self):
+        """
+        Return server metrics.
+
+        Returns:
+            dict: Request counters
+        """
+        with self._counter_lock:
+            return dict(self.counters)
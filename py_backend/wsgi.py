@@ -0,0 +1,9 @@
+"""
+WSGI entry point.
+Used by Gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app, setup_logging
+
+app = create_app()
+setup_logging(app)